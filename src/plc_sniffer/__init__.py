@@ -4,6 +4,7 @@ __version__ = "0.1.0"
 __author__ = "Oriol Rius"
 __email__ = "oriol@example.com"
 
+from .shm_ring import ShmRingReader
 from .sniffer import PlcSniffer
 
-__all__ = ["PlcSniffer"]
\ No newline at end of file
+__all__ = ["PlcSniffer", "ShmRingReader"]
@@ -1,21 +1,26 @@
 """Main entry point for PLC Sniffer."""
 
-import sys
-import signal
 import logging
 import os
-from typing import Optional, Any
+import signal
+import sys
+import threading
 from types import FrameType
+from typing import Dict, Optional
 
+from .async_runtime import AsyncRuntime
+from .calibrate import calibrated_config
+from .calibrate import main as calibrate_main
 from .config import ConfigManager
-from .validators import ValidationError
-from .sniffer import PlcSniffer
 from .health import HealthCheckServer
-
+from .sniffer import PlcSniffer, configure_logging
+from .statsd import StatsdExporter
+from .validators import ValidationError
 
 logger = logging.getLogger(__name__)
 sniffer: Optional[PlcSniffer] = None
 health_server: Optional[HealthCheckServer] = None
+statsd_exporter: Optional[StatsdExporter] = None
 
 
 def signal_handler(signum: int, frame: Optional[FrameType]) -> None:
@@ -23,35 +28,67 @@ def signal_handler(signum: int, frame: Optional[FrameType]) -> None:
     logger.info(f"Received signal {signum}, shutting down...")
     if health_server:
         health_server.stop()
+    if statsd_exporter:
+        statsd_exporter.stop()
     if sniffer:
         sniffer.stop()
     sys.exit(0)
 
 
+def reload_handler(signum: int, frame: Optional[FrameType]) -> None:
+    """Reload configuration on SIGHUP without stopping capture."""
+    logger.info(f"Received signal {signum}, reloading configuration...")
+    if sniffer:
+        # Reload off the capture thread so packet processing is not blocked
+        threading.Thread(
+            target=sniffer.reload_from_environment, name="config-reload", daemon=True
+        ).start()
+
+
 def main() -> None:
     """Main entry point."""
-    global sniffer, health_server
-    
+    global sniffer, health_server, statsd_exporter
+
+    if sys.argv[1:2] == ["calibrate"]:
+        calibrate_main(sys.argv[2:])
+        return
+
     # Register signal handlers
     signal.signal(signal.SIGINT, signal_handler)
     signal.signal(signal.SIGTERM, signal_handler)
-    
+    signal.signal(signal.SIGHUP, reload_handler)
+
     try:
         # Load configuration
         config = ConfigManager.from_environment()
-        
+        calibrated: Dict[str, int] = {}
+        if config.calibrate == "auto":
+            configure_logging(config.log_level)
+            config, calibrated = calibrated_config(config)
+
         # Create sniffer
         sniffer = PlcSniffer(config)
-        
+        sniffer.calibrated = calibrated
+
+        health_port = int(os.environ.get("HEALTH_CHECK_PORT", "8080"))
+        if config.runtime == "asyncio":
+            # Capture, forwarding, HTTP and signals all run on one event loop
+            AsyncRuntime(sniffer, health_port).run()
+            return
+
         # Start health check server if enabled
-        health_port = int(os.environ.get('HEALTH_CHECK_PORT', '8080'))
         if health_port > 0:
             health_server = HealthCheckServer(port=health_port)
             health_server.start(sniffer)
-        
+
+        # Start pushing metrics if an agent is configured
+        if config.statsd_host:
+            statsd_exporter = StatsdExporter.from_config(config)
+            statsd_exporter.start(sniffer)
+
         # Start sniffing
         sniffer.start()
-        
+
     except ValidationError as e:
         logger.error(f"Configuration error: {e}")
         sys.exit(1)
@@ -61,7 +98,9 @@ def main() -> None:
     finally:
         if health_server:
             health_server.stop()
+        if statsd_exporter:
+            statsd_exporter.stop()
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,227 @@
+"""Adaptive (AIMD) forwarding rate driven by downstream feedback."""
+
+import asyncio
+import logging
+import socket
+import threading
+from typing import Callable, Dict, NamedTuple, Optional
+
+from .config import SnifferConfig
+
+logger = logging.getLogger(__name__)
+
+# Why the rate was cut
+DECREASE_REASONS = ("send_error", "queue_growth", "ack_loss")
+
+# Destination queue fill above which a growing queue counts as congestion
+QUEUE_HIGH_WATER = 0.5
+
+# Share of an interval's datagrams that may be unacknowledged (in flight or
+# acknowledged late) before it counts as loss
+ACK_LOSS_TOLERANCE = 0.02
+
+
+class Feedback(NamedTuple):
+    """Downstream state sampled once per interval; counters are cumulative."""
+
+    send_errors: int  # sends that failed or had to be parked for retry
+    queue_full: int  # payloads dropped at full destination queues
+    queue_depth: int  # payloads waiting in destination and retry queues
+    queue_capacity: int
+    sent: int  # payloads handed to the destination sockets
+    limited: int  # payloads held back by the rate limit
+    backlog: int  # payloads waiting for the rate limit (traffic class queues)
+
+
+class AckListener:
+    """Receive acknowledgements from collectors.
+
+    Each collector periodically sends a UDP datagram holding, as ASCII
+    digits, the total number of datagrams it has received. The latest count
+    per collector address is kept; the socket is drained without blocking.
+    """
+
+    def __init__(self, port: int, host: str = "0.0.0.0"):
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.setblocking(False)
+        self.socket.bind((host, port))
+        self.counts: Dict[str, int] = {}
+        self.malformed = 0
+
+    def poll(self) -> int:
+        """Read pending acknowledgements.
+
+        Returns:
+            Datagrams acknowledged by all collectors
+        """
+        while True:
+            try:
+                data, address = self.socket.recvfrom(64)
+            except (BlockingIOError, InterruptedError):
+                break
+            try:
+                self.counts[address[0]] = int(data.strip())
+            except ValueError:
+                self.malformed += 1
+        return sum(self.counts.values())
+
+    def close(self) -> None:
+        """Close the socket."""
+        self.socket.close()
+
+
+class AdaptiveRate:
+    """Adapt the forwarding rate: additive increase, multiplicative decrease.
+
+    Every ``interval`` the downstream feedback is compared with the previous
+    sample. Send errors (``ENOBUFS``, ICMP port unreachable, an open circuit
+    breaker), a destination queue that overflowed or keeps growing past
+    ``QUEUE_HIGH_WATER``, or collectors acknowledging fewer datagrams than
+    were sent multiply the rate by ``backoff``. Otherwise, if the rate limit
+    held packets back, the rate grows by ``step``. The rate stays between
+    ``floor`` and ``ceiling`` and starts at the ceiling; it is handed to
+    ``apply``, which sets it on the token bucket in use.
+    """
+
+    def __init__(
+        self,
+        feedback: Callable[[], Feedback],
+        apply: Callable[[int], None],
+        ceiling: int,
+        floor: int = 100,
+        step: int = 100,
+        backoff: float = 0.5,
+        interval: float = 1.0,
+        acks: Optional[AckListener] = None,
+    ):
+        self.feedback = feedback
+        self.apply = apply
+        self.ceiling = ceiling
+        self.floor = floor
+        self.step = step
+        self.backoff = backoff
+        self.interval = interval
+        self.acks = acks
+
+        self.rate = float(ceiling)
+        self.increases = 0
+        self.decreases: Dict[str, int] = {reason: 0 for reason in DECREASE_REASONS}
+        self._previous: Optional[Feedback] = None
+        self._acked: Optional[int] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    @classmethod
+    def from_config(
+        cls,
+        config: SnifferConfig,
+        feedback: Callable[[], Feedback],
+        apply: Callable[[int], None],
+    ) -> "AdaptiveRate":
+        """Create the controller described by the ``ADAPTIVE_*`` settings."""
+        acks = (
+            AckListener(config.adaptive_ack_port) if config.adaptive_ack_port else None
+        )
+        return cls(
+            feedback,
+            apply,
+            config.rate_limit,
+            config.adaptive_rate_min,
+            config.adaptive_rate_step,
+            config.adaptive_rate_backoff,
+            config.adaptive_rate_interval,
+            acks,
+        )
+
+    def start(self, loop: Optional[asyncio.AbstractEventLoop] = None) -> None:
+        """Start adjusting, on ``loop`` if given, otherwise on a thread."""
+        self._stop.clear()
+        self._previous = self.feedback()
+        if loop is not None:
+            self._timer = loop.call_later(self.interval, self._tick, loop)
+            return
+        self._thread = threading.Thread(
+            target=self._run, name="adaptive-rate", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop adjusting and close the acknowledgement socket."""
+        self._stop.set()
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+        if self.acks is not None:
+            self.acks.close()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.update()
+
+    def _tick(self, loop: asyncio.AbstractEventLoop) -> None:
+        self.update()
+        self._timer = loop.call_later(self.interval, self._tick, loop)
+
+    def set_ceiling(self, ceiling: int) -> None:
+        """Change the highest rate (after a reload) and re-apply the current one."""
+        self.ceiling = ceiling
+        self.floor = min(self.floor, ceiling)
+        self.rate = min(self.rate, ceiling)
+        self.apply(int(self.rate))
+
+    def update(self) -> float:
+        """Sample the feedback and adjust the rate once.
+
+        Returns:
+            The permitted rate in packets per second
+        """
+        current = self.feedback()
+        previous = self._previous or current
+        self._previous = current
+        acked = self.acks.poll() if self.acks is not None else None
+        previous_acked, self._acked = self._acked, acked
+        reason = self.congestion(previous, current)
+        if reason is None and acked is not None and previous_acked is not None:
+            reason = self.ack_loss(current.sent - previous.sent, acked - previous_acked)
+
+        if reason is not None:
+            self.rate = max(self.floor, self.rate * self.backoff)
+            self.decreases[reason] += 1
+            logger.debug(
+                f"Congestion ({reason}), forwarding rate cut to {self.rate:.0f} pps"
+            )
+        elif (
+            current.limited > previous.limited or current.backlog
+        ) and self.rate < self.ceiling:
+            self.rate = min(self.ceiling, self.rate + self.step)
+            self.increases += 1
+
+        self.apply(int(self.rate))
+        return self.rate
+
+    def congestion(self, previous: Feedback, current: Feedback) -> Optional[str]:
+        """Reason the downstream is congested since ``previous``, or None."""
+        if current.send_errors > previous.send_errors:
+            return "send_error"
+        if current.queue_full > previous.queue_full:
+            return "queue_growth"
+        if (
+            current.queue_depth > previous.queue_depth
+            and current.queue_depth > current.queue_capacity * QUEUE_HIGH_WATER
+        ):
+            return "queue_growth"
+        return None
+
+    @staticmethod
+    def ack_loss(sent: int, acked: int) -> Optional[str]:
+        """``ack_loss`` if collectors acknowledged too few of ``sent`` datagrams.
+
+        A negative ``acked`` means a collector restarted and is ignored.
+        """
+        if sent > 0 and 0 <= acked < sent * (1 - ACK_LOSS_TOLERANCE):
+            return "ack_loss"
+        return None
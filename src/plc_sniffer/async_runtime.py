@@ -0,0 +1,169 @@
+"""asyncio runtime hosting capture, forwarding and the HTTP server in one loop."""
+
+import asyncio
+import logging
+import signal
+import threading
+from typing import Optional
+
+from .health import HealthCheckHandler
+from .sniffer import PlcSniffer
+from .statsd import StatsdExporter
+
+logger = logging.getLogger(__name__)
+
+# Packets read per readiness callback before yielding to other callbacks
+READ_BATCH = 64
+
+# Seconds a client gets to send its request headers
+REQUEST_TIMEOUT = 5.0
+
+
+class AsyncHealthServer:
+    """Serve the health and metrics endpoints with ``asyncio.start_server``.
+
+    Requests are handled by :class:`HealthCheckHandler` on buffered streams,
+    so both runtimes expose exactly the same endpoints.
+    """
+
+    def __init__(self, port: int = 8080):
+        self.port = port
+        self.server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self, sniffer: PlcSniffer) -> None:
+        """Start listening."""
+        HealthCheckHandler.sniffer = sniffer
+        self.server = await asyncio.start_server(self._handle, "0.0.0.0", self.port)
+        logger.info(f"Health check server started on port {self.port}")
+
+    async def _handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            request = await asyncio.wait_for(
+                reader.readuntil(b"\r\n\r\n"), REQUEST_TIMEOUT
+            )
+            peer = writer.get_extra_info("peername") or ("", 0)
+            if request.startswith(b"GET /debug/profile"):
+                # Profiling samples this loop's thread, so it must not block it
+                response = await asyncio.get_running_loop().run_in_executor(
+                    None, HealthCheckHandler.respond, request, peer[:2]
+                )
+            else:
+                response = HealthCheckHandler.respond(request, peer[:2])
+            writer.write(response)
+            await writer.drain()
+        except (
+            asyncio.IncompleteReadError,
+            asyncio.LimitOverrunError,
+            asyncio.TimeoutError,
+        ):
+            pass
+        except ConnectionError as e:
+            logger.debug(f"Health check client disconnected: {e}")
+        finally:
+            writer.close()
+
+    async def stop(self) -> None:
+        """Stop listening and wait for the server to close."""
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
+        logger.info("Health check server stopped")
+
+
+class AsyncRuntime:
+    """Run the sniffer on a single asyncio event loop.
+
+    The capture socket is made non-blocking and registered with
+    ``loop.add_reader``; each readiness callback drains up to ``READ_BATCH``
+    packets, in batches of up to ``PIPELINE_BATCH`` with the raw and mirror
+    engines. Destinations are sent to inline from the loop through
+    non-blocking sockets whose retry queues are flushed when the socket
+    becomes writable, and the health server is an asyncio server. Signals
+    are handled by ``loop.add_signal_handler``: SIGINT and SIGTERM stop the
+    loop cleanly, SIGHUP reloads the configuration on the loop.
+    """
+
+    def __init__(self, sniffer: PlcSniffer, health_port: int = 0):
+        self.sniffer = sniffer
+        self.health_server = AsyncHealthServer(health_port) if health_port > 0 else None
+        self.statsd_exporter: Optional[StatsdExporter] = None
+        self._stopped: Optional[asyncio.Event] = None
+
+    def run(self) -> None:
+        """Run until stopped by a signal or a capture error."""
+        asyncio.run(self.main())
+
+    async def main(self) -> None:
+        """Open capture and output, then process packets until stopped."""
+        loop = asyncio.get_running_loop()
+        self._stopped = asyncio.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, self.stop)
+        loop.add_signal_handler(signal.SIGHUP, self.reload)
+
+        self.sniffer.loop = loop
+        reader_fd: Optional[int] = None
+        try:
+            self.sniffer.open()
+            self.sniffer.capture_thread_ids = [threading.get_ident()]
+            if self.health_server is not None:
+                await self.health_server.start(self.sniffer)
+            if self.sniffer.config.statsd_host:
+                self.statsd_exporter = StatsdExporter.from_config(self.sniffer.config)
+                self.statsd_exporter.start(self.sniffer, loop)
+
+            capture_socket = self.sniffer.capture_socket.ins
+            capture_socket.setblocking(False)
+            reader_fd = capture_socket.fileno()
+            loop.add_reader(reader_fd, self._on_readable)
+            logger.info("Running on the asyncio event loop")
+
+            await self._stopped.wait()
+        finally:
+            if reader_fd is not None:
+                loop.remove_reader(reader_fd)
+            if self.health_server is not None:
+                await self.health_server.stop()
+            if self.statsd_exporter is not None:
+                self.statsd_exporter.stop()
+                self.statsd_exporter = None
+            self.sniffer.stop()
+            for signum in (signal.SIGINT, signal.SIGTERM, signal.SIGHUP):
+                loop.remove_signal_handler(signum)
+            self.sniffer.loop = None
+
+    def stop(self) -> None:
+        """Stop processing; the loop exits once cleanup is done."""
+        logger.info("Shutting down...")
+        self.sniffer.running = False
+        if self._stopped is not None:
+            self._stopped.set()
+
+    def reload(self) -> None:
+        """Reload configuration from the environment on the loop."""
+        logger.info("Reloading configuration...")
+        self.sniffer.reload_from_environment()
+
+    def _on_readable(self) -> None:
+        sniffer = self.sniffer
+        try:
+            if sniffer.config.capture_engine != "scapy":
+                taken = 0
+                while sniffer.running and taken < READ_BATCH:
+                    limit = min(sniffer.config.pipeline_batch, READ_BATCH - taken)
+                    received = sniffer.receive_frames(limit=limit)
+                    if not received:
+                        return
+                    taken += received
+                return
+            for _ in range(READ_BATCH):
+                if not sniffer.running or not sniffer.receive_packet():
+                    return
+        except BlockingIOError:
+            pass
+        except OSError as e:
+            logger.error(f"Sniffer error: {e}")
+            self.stop()
@@ -0,0 +1,79 @@
+"""Flow-consistent load balancing with weighted rendezvous (HRW) hashing."""
+
+import hashlib
+import math
+from typing import Dict, Optional, Sequence, Tuple
+
+from .packet import PacketMeta
+
+FlowKey = Tuple[str, int, str, int]
+
+_HASH_SPACE = float(1 << 64)
+
+
+def flow_key(meta: PacketMeta) -> FlowKey:
+    """Return the flow tuple used to pin a stream to a destination."""
+    return (meta.src_ip, meta.src_port, meta.dst_ip, meta.dst_port)
+
+
+def _hash64(data: bytes) -> int:
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little")
+
+
+def hrw_score(key: bytes, node: bytes, weight: float) -> float:
+    """Weighted rendezvous score of a node for a key.
+
+    Uses the logarithmic method, ``-weight / ln(u)`` with ``u`` uniform in
+    (0, 1), so a node's share of keys is proportional to its weight and
+    adding or removing a node only moves the keys it wins or loses.
+    """
+    u = (_hash64(key + b"|" + node) + 1) / (_HASH_SPACE + 1)
+    return -weight / math.log(u)
+
+
+class RendezvousHash:
+    """Pick a node per key, caching the decision per flow.
+
+    The cache is cleared whenever the set of eligible nodes changes, so flows
+    move away from an ejected node and back once it is healthy again.
+    """
+
+    def __init__(
+        self, nodes: Sequence[str], weights: Sequence[float], cache_size: int = 65536
+    ):
+        self.nodes = [node.encode() for node in nodes]
+        self.weights = list(weights)
+        self.cache_size = cache_size
+        self._cache: Dict[FlowKey, int] = {}
+        self._eligible: Tuple[bool, ...] = (True,) * len(self.nodes)
+
+    def choose(self, key: FlowKey, eligible: Optional[Tuple[bool, ...]] = None) -> int:
+        """Return the index of the node that owns ``key``, or -1 if none is eligible.
+
+        Args:
+            key: Flow tuple
+            eligible: Per-node availability; the last one given when omitted
+        """
+        if eligible is not None and eligible != self._eligible:
+            self._eligible = eligible
+            self._cache.clear()
+
+        index = self._cache.get(key)
+        if index is not None:
+            return index
+
+        encoded = repr(key).encode()
+        best = -1
+        best_score = -1.0
+        for i, node in enumerate(self.nodes):
+            if not self._eligible[i]:
+                continue
+            score = hrw_score(encoded, node, self.weights[i])
+            if score > best_score:
+                best, best_score = i, score
+
+        if best >= 0:
+            if len(self._cache) >= self.cache_size:
+                self._cache.clear()
+            self._cache[key] = best
+        return best
@@ -0,0 +1,91 @@
+"""Pool of preallocated receive buffers shared by the capture and send paths."""
+
+import threading
+from typing import List
+
+
+class BufferLease:
+    """A slab checked out of a :class:`BufferPool`, reference counted.
+
+    The capture loop holds one reference while it processes the frame, and
+    every worker queue that keeps a view of the payload holds another until
+    the send completes. The slab returns to the pool when the last one is
+    released.
+    """
+
+    __slots__ = ("slab", "view", "refs", "pooled", "used", "_pool")
+
+    def __init__(self, pool: "BufferPool", slab: bytearray, pooled: bool):
+        self.slab = slab
+        self.view = memoryview(slab)
+        self.refs = 0
+        self.pooled = pooled
+        self.used = False
+        self._pool = pool
+
+    def retain(self) -> None:
+        """Take another reference to the slab."""
+        self._pool._retain(self)
+
+    def release(self) -> None:
+        """Drop a reference; the slab is reused once none are left."""
+        self._pool._release(self)
+
+
+class BufferPool:
+    """Fixed set of ``bytearray`` slabs handed out as leases.
+
+    When every slab is in use, :meth:`acquire` falls back to a temporary
+    slab that is dropped on release, so capture never stalls; such
+    fallbacks are counted as exhaustion.
+    """
+
+    def __init__(self, slab_count: int, slab_size: int):
+        self.slab_count = slab_count
+        self.slab_size = slab_size
+        self._lock = threading.Lock()
+        self._free: List[BufferLease] = [
+            BufferLease(self, bytearray(slab_size), pooled=True)
+            for _ in range(slab_count)
+        ]
+
+        self.acquired = 0
+        self.reused = 0
+        self.exhausted = 0
+        self.in_use = 0
+
+    @property
+    def available(self) -> int:
+        """Slabs ready to be handed out."""
+        return len(self._free)
+
+    def acquire(self) -> BufferLease:
+        """Check out a slab with a single reference."""
+        with self._lock:
+            if self._free:
+                lease = (
+                    self._free.pop()
+                )  # most recently used slab is likely still in cache
+                if lease.used:
+                    self.reused += 1
+                lease.used = True
+            else:
+                self.exhausted += 1
+                lease = BufferLease(self, bytearray(self.slab_size), pooled=False)
+            lease.refs = 1
+            self.acquired += 1
+            self.in_use += 1
+        return lease
+
+    def _retain(self, lease: BufferLease) -> None:
+        with self._lock:
+            lease.refs += 1
+
+    def _release(self, lease: BufferLease) -> None:
+        with self._lock:
+            lease.refs -= 1
+            if lease.refs:
+                return
+            self.in_use -= 1
+            if lease.pooled:
+                self._free.append(lease)
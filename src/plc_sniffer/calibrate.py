@@ -0,0 +1,477 @@
+"""Startup self-calibration of batch, queue and ring sizes.
+
+Synthetic frames are pushed through the raw engine's decode, the pipeline
+and the configured output, with every destination replaced by a UDP socket
+bound on the loopback interface, once for every combination in a small grid
+of settings. The combination with the lowest cost per packet is kept in a
+cache file, which later starts on the same host and configuration reuse
+instead of measuring again. ``plc-sniffer calibrate`` runs the same
+measurement on demand and prints every candidate.
+"""
+
+import argparse
+import itertools
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from dataclasses import replace
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from scapy.all import IP, UDP, Ether, Raw  # type: ignore[attr-defined]
+
+from .config import ConfigManager, Destination, SnifferConfig
+from .sink import open_sink_socket
+from .sniffer import PlcSniffer
+from .validators import ValidationError
+
+logger = logging.getLogger(__name__)
+
+CACHE_VERSION = 1
+
+# Values tried for each setting; the defaults are among them
+PIPELINE_BATCHES = (8, 32, 128, 512)
+DESTINATION_QUEUE_SIZES = (256, 1024, 4096)
+SHM_RING_SLOTS = (4096, 16384, 65536)
+
+# Candidates losing more than this share of payloads are not chosen
+MAX_LOSS = 0.001
+
+
+class CalibrationResult(NamedTuple):
+    """Measured cost of one combination of settings."""
+
+    settings: Dict[str, int]
+    ns_per_packet: float
+    loss_ratio: float
+
+
+class SyntheticCapture:
+    """Stands in for a raw capture socket, handing out prebuilt frames.
+
+    ``recv_into`` returns a length of 0 once ``remaining`` frames were
+    handed out, which ends the batch like an expired receive timeout.
+    """
+
+    def __init__(self, frames: Sequence[bytes]):
+        self.frames = list(frames)
+        self.remaining = 0
+
+    def recv_into(self, buffer: bytearray, wait: bool = True) -> Tuple[int, float]:
+        if not self.remaining:
+            return 0, 0.0
+        self.remaining -= 1
+        frame = self.frames[self.remaining % len(self.frames)]
+        buffer[: len(frame)] = frame
+        return len(frame), time.time()
+
+
+def synthetic_frames(flows: int = 64, payload_size: int = 64) -> List[bytes]:
+    """UDP frames of ``flows`` distinct flows with ``payload_size`` byte payloads."""
+    return [
+        bytes(
+            Ether()
+            / IP(
+                src=f"10.{flow >> 16 & 0xFF}.{flow >> 8 & 0xFF}.{flow & 0xFF}",
+                dst="10.255.0.1",
+            )
+            / UDP(sport=40000 + flow % 20000, dport=502)
+            / Raw(bytes(payload_size))
+        )
+        for flow in range(flows)
+    ]
+
+
+def calibration_grid(config: SnifferConfig) -> Dict[str, Tuple[int, ...]]:
+    """Settings worth calibrating for ``config`` and the values to try.
+
+    The batch size only matters to the raw and mirror engines, the
+    destination queues only to threaded fan-out to several destinations
+    and the ring geometry only to shared-memory output.
+    """
+    grid: Dict[str, Tuple[int, ...]] = {}
+    if config.capture_engine != "scapy":
+        grid["pipeline_batch"] = PIPELINE_BATCHES
+    if config.output_mode == "shm":
+        grid["shm_ring_slots"] = SHM_RING_SLOTS
+    elif (
+        config.output_mode == "udp"
+        and len(destination_labels(config)) > 1
+        and config.runtime == "threads"
+        and config.capture_threads == 1
+    ):
+        grid["destination_queue_size"] = DESTINATION_QUEUE_SIZES
+    return grid
+
+
+def destination_labels(config: SnifferConfig) -> List[str]:
+    """Distinct destinations forwarded to, over all routes."""
+    if config.routes:
+        destinations = [dest for route in config.routes for dest in route.destinations]
+    else:
+        destinations = config.forward_destinations
+    return sorted({dest.label for dest in destinations})
+
+
+def fingerprint(config: SnifferConfig) -> Dict[str, Any]:
+    """What a cached calibration was measured on; a cache is only reused on a match."""
+    return {
+        "host": platform.node(),
+        "machine": platform.machine(),
+        "kernel": platform.release(),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "capture_engine": config.capture_engine,
+        "capture_threads": config.capture_threads,
+        "output_mode": config.output_mode,
+        "destinations": len(destination_labels(config)),
+        "distribution": config.distribution,
+        "pipeline_stages": list(config.pipeline_stages),
+    }
+
+
+def candidate_config(
+    config: SnifferConfig,
+    destinations: List[Destination],
+    ring_path: str,
+    settings: Dict[str, int],
+) -> SnifferConfig:
+    """``config`` with ``settings`` applied, forwarding only to the calibration sinks.
+
+    Everything that would hold packets back on purpose (rate limits,
+    sampling, traffic classes, spilling) is turned off, and re-injection
+    is measured as UDP output.
+    """
+    return replace(
+        config,
+        capture_engine="raw",
+        output_mode="udp" if config.output_mode == "inject" else config.output_mode,
+        shm_ring_path=ring_path,
+        destinations=destinations,
+        routes=[],
+        traffic_classes=[],
+        rate_limit=0,
+        rate_control="static",
+        spill_dir="",
+        sample_fraction=1.0,
+        sample_every=1,
+        stage_timing_sample=0,
+        statsd_host="",
+        calibrate="off",
+        **settings,
+    )
+
+
+@contextmanager
+def quiet_sniffer() -> Iterator[None]:
+    """Hold back the start, stop and statistics logs of the candidate sniffers."""
+    package_logger = logging.getLogger("plc_sniffer")
+    level = package_logger.level
+    package_logger.setLevel(logging.WARNING)
+    try:
+        yield
+    finally:
+        package_logger.setLevel(level)
+
+
+def _feed(sniffer: PlcSniffer, capture: SyntheticCapture, count: int) -> None:
+    """Run ``count`` frames through the pipeline and wait for the queues to drain."""
+    capture.remaining = count
+    while sniffer.receive_frames(capture):
+        pass
+    if sniffer.router is not None:
+        deadline = time.monotonic() + 5.0
+        while any(worker.queue_depth for worker in sniffer.router.workers):
+            if time.monotonic() > deadline:
+                break
+            time.sleep(0.0001)
+
+
+def _loss_ratio(sniffer: PlcSniffer) -> float:
+    """Larger of the pipeline's and the output's share of dropped payloads."""
+    stats = sniffer.stats
+    pipeline_loss = (
+        stats.packets_dropped / stats.packets_processed
+        if stats.packets_processed
+        else 0.0
+    )
+    dropped = sent = 0
+    if sniffer.router is not None:
+        dropped = sum(worker.stats.dropped for worker in sniffer.router.workers)
+        sent = sum(worker.stats.sent for worker in sniffer.router.workers)
+    elif sniffer.ring is not None:
+        dropped, sent = sniffer.ring.dropped, sniffer.ring.records_written
+    output_loss = dropped / (sent + dropped) if sent + dropped else 0.0
+    return max(pipeline_loss, output_loss)
+
+
+def measure(
+    config: SnifferConfig, frames: Sequence[bytes], packets: int, rounds: int
+) -> Tuple[float, float]:
+    """Cost of forwarding ``packets`` frames with ``config``.
+
+    Returns:
+        Nanoseconds per packet of the fastest round, and the share of
+        payloads the output dropped over all rounds
+    """
+    sniffer = PlcSniffer(config)
+    capture = SyntheticCapture(frames)
+    sniffer.open_output()
+    try:
+        # Warm up sockets, caches and per-flow state before timing
+        _feed(sniffer, capture, min(packets, 1000))
+        best = float("inf")
+        for _ in range(rounds):
+            started = time.perf_counter_ns()
+            _feed(sniffer, capture, packets)
+            best = min(best, (time.perf_counter_ns() - started) / packets)
+
+        loss_ratio = _loss_ratio(sniffer)
+    finally:
+        sniffer.stop()
+    return best, loss_ratio
+
+
+def run_calibration(
+    config: SnifferConfig,
+    packets: int = 10000,
+    rounds: int = 3,
+    grid: Optional[Dict[str, Tuple[int, ...]]] = None,
+) -> List[CalibrationResult]:
+    """Measure every combination of ``grid`` (``calibration_grid`` by default).
+
+    Args:
+        config: Configuration the candidates are derived from
+        packets: Frames forwarded per round
+        rounds: Timed rounds per candidate; the fastest counts
+        grid: Settings and the values to try
+
+    Returns:
+        One result per combination, in grid order
+    """
+    if grid is None:
+        grid = calibration_grid(config)
+    frames = synthetic_frames()
+    sinks = [
+        open_sink_socket("127.0.0.1", 0, rcvbuf=0, timeout=0.1)
+        for _ in destination_labels(config)
+    ]
+    # Nothing reads the sinks: a full receive buffer drops on the receiving
+    # side, so the sender's cost is what is measured
+    destinations = [Destination("127.0.0.1", sink.getsockname()[1]) for sink in sinks]
+    ring_dir = (
+        os.path.dirname(config.shm_ring_path) if config.output_mode == "shm" else None
+    )
+    results = []
+    try:
+        with tempfile.TemporaryDirectory(dir=ring_dir) as directory, quiet_sniffer():
+            ring_path = os.path.join(directory, "calibration.ring")
+            for values in itertools.product(*grid.values()):
+                settings = dict(zip(grid, values))
+                candidate = candidate_config(config, destinations, ring_path, settings)
+                ns_per_packet, loss_ratio = measure(candidate, frames, packets, rounds)
+                results.append(CalibrationResult(settings, ns_per_packet, loss_ratio))
+    finally:
+        for sink in sinks:
+            sink.close()
+    return results
+
+
+def best_result(
+    results: Sequence[CalibrationResult], max_loss: float = MAX_LOSS
+) -> CalibrationResult:
+    """Fastest result within ``max_loss``, or the one with the least loss if none is."""
+    acceptable = [result for result in results if result.loss_ratio <= max_loss]
+    if not acceptable:
+        return min(
+            results, key=lambda result: (result.loss_ratio, result.ns_per_packet)
+        )
+    return min(acceptable, key=lambda result: result.ns_per_packet)
+
+
+def save_cache(
+    path: str,
+    config: SnifferConfig,
+    results: Sequence[CalibrationResult],
+    best: CalibrationResult,
+) -> None:
+    """Write the calibration to ``path``, replacing any previous file atomically."""
+    data = {
+        "version": CACHE_VERSION,
+        "created": time.time(),
+        "fingerprint": fingerprint(config),
+        "settings": best.settings,
+        "results": [result._asdict() for result in results],
+    }
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".calibration-")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f, indent=2)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def load_cache(path: str, config: SnifferConfig) -> Optional[Dict[str, int]]:
+    """Settings cached for this host and configuration, or None to calibrate again."""
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable calibration cache {path}: {e}")
+        return None
+
+    if not isinstance(data, dict) or data.get("version") != CACHE_VERSION:
+        logger.info(f"Calibration cache {path} has an old format")
+        return None
+    if data.get("fingerprint") != fingerprint(config):
+        logger.info(
+            f"Calibration cache {path} was measured on another host or configuration"
+        )
+        return None
+    settings = data.get("settings")
+    if not isinstance(settings, dict) or set(settings) != set(calibration_grid(config)):
+        return None
+    try:
+        replace(config, **settings)
+    except (TypeError, ValidationError) as e:
+        logger.warning(f"Ignoring invalid calibration cache {path}: {e}")
+        return None
+    return settings
+
+
+def calibrated_config(
+    config: SnifferConfig, packets: int = 10000, rounds: int = 3
+) -> Tuple[SnifferConfig, Dict[str, int]]:
+    """Apply the cached calibration, measuring and caching it first if there is none.
+
+    Returns:
+        The configuration with the calibrated settings, and those settings
+    """
+    grid = calibration_grid(config)
+    if not grid:
+        logger.info("Nothing to calibrate for this capture engine and output")
+        return config, {}
+
+    path = config.calibration_cache
+    settings = load_cache(path, config)
+    if settings is None:
+        candidates = len(list(itertools.product(*grid.values())))
+        logger.info(f"Calibrating {', '.join(grid)} over {candidates} candidates")
+        results = run_calibration(config, packets, rounds, grid)
+        best = best_result(results)
+        settings = best.settings
+        logger.info(f"Calibration chose {best.ns_per_packet:.0f} ns/packet")
+        try:
+            save_cache(path, config, results, best)
+        except OSError as e:
+            logger.warning(f"Could not write calibration cache {path}: {e}")
+    else:
+        logger.info(f"Using calibration from {path}")
+
+    logger.info(
+        "Calibrated settings: "
+        + ", ".join(f"{name}={value}" for name, value in settings.items())
+    )
+    return replace(config, **settings), settings
+
+
+def format_results(
+    results: Sequence[CalibrationResult], best: CalibrationResult
+) -> str:
+    """Table of all candidates with the chosen one marked."""
+    names = list(best.settings)
+    widths = [max(len(name), 6) for name in names]
+    lines = [
+        "  ".join(name.rjust(width) for name, width in zip(names, widths))
+        + "   ns/packet    loss"
+    ]
+    for result in results:
+        values = "  ".join(
+            str(result.settings[name]).rjust(width)
+            for name, width in zip(names, widths)
+        )
+        marker = "  *" if result is best else ""
+        lines.append(
+            f"{values}  {result.ns_per_packet:10.0f}  {result.loss_ratio:6.2%}{marker}"
+        )
+    return "\n".join(lines)
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="plc-sniffer calibrate",
+        description=(
+            "Measure batch, queue and ring sizes against loopback sinks "
+            "and cache the fastest."
+        ),
+    )
+    parser.add_argument(
+        "--packets", type=int, default=10000, help="frames forwarded per round"
+    )
+    parser.add_argument(
+        "--rounds", type=int, default=3, help="timed rounds per candidate"
+    )
+    parser.add_argument(
+        "--max-loss", type=float, default=MAX_LOSS, help="highest acceptable loss ratio"
+    )
+    parser.add_argument(
+        "--cache", help="cache file to write (default: CALIBRATION_CACHE)"
+    )
+    parser.add_argument("--no-save", action="store_true", help="only print the results")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args(argv)
+    if args.packets < 1 or args.rounds < 1:
+        parser.error("--packets and --rounds must be at least 1")
+    return args
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    """Entry point of ``plc-sniffer calibrate``."""
+    args = parse_args(argv)
+    try:
+        config = ConfigManager.from_environment()
+    except ValidationError as e:
+        sys.exit(f"plc-sniffer calibrate: {e}")
+
+    grid = calibration_grid(config)
+    if not grid:
+        print(
+            "Nothing to calibrate for this capture engine and output", file=sys.stderr
+        )
+        return
+    try:
+        results = run_calibration(config, args.packets, args.rounds, grid)
+    except (OSError, ValidationError) as e:
+        sys.exit(f"plc-sniffer calibrate: {e}")
+    best = best_result(results, args.max_loss)
+
+    if args.json:
+        print(
+            json.dumps(
+                {
+                    "settings": best.settings,
+                    "results": [result._asdict() for result in results],
+                },
+                indent=2,
+            )
+        )
+    else:
+        print(format_results(results, best))
+
+    if not args.no_save:
+        path = args.cache or config.calibration_cache
+        try:
+            save_cache(path, config, results, best)
+        except OSError as e:
+            sys.exit(f"plc-sniffer calibrate: cannot write {path}: {e}")
+        print(f"Saved to {path}", file=sys.stderr)
@@ -0,0 +1,152 @@
+"""Capture socket management for the scapy engine."""
+
+import logging
+import socket
+import struct
+import threading
+import weakref
+from typing import Any, MutableMapping, Optional, Tuple
+
+from scapy.all import conf  # type: ignore[attr-defined]
+from scapy.arch.linux import attach_filter
+
+logger = logging.getLogger(__name__)
+
+SOL_PACKET = 263
+PACKET_STATISTICS = 6
+PACKET_FANOUT = 18
+
+# Spread frames over the group by flow hash, defragmenting first so that all
+# fragments of a datagram reach the same socket
+PACKET_FANOUT_HASH = 0
+PACKET_FANOUT_FLAG_DEFRAG = 0x8000
+
+# struct tpacket_stats_v3: tp_packets, tp_drops, tp_freeze_q_cnt
+TPACKET_STATS_V3 = struct.Struct("III")
+
+
+def open_capture_socket(interface: str, bpf_filter: str) -> Any:
+    """Open a listening socket on the interface with a BPF filter attached.
+
+    The socket is handed to ``sniff(opened_socket=...)`` so that it outlives
+    configuration reloads and its filter can be swapped in place.
+    """
+    return conf.L2listen(iface=interface, filter=bpf_filter)
+
+
+def set_capture_filter(capture_socket: Any, bpf_filter: str, interface: str) -> None:
+    """Compile a BPF program and attach it to a live capture socket.
+
+    ``SO_ATTACH_FILTER`` replaces the previous program atomically, so the
+    socket keeps receiving without a gap and without being reopened.
+    """
+    attach_filter(capture_socket.ins, bpf_filter, interface)
+    logger.info(f"Capture filter replaced: {bpf_filter}")
+
+
+def join_fanout_group(capture_socket: Any, group_id: int) -> None:
+    """Add a capture socket to a ``PACKET_FANOUT`` group.
+
+    The kernel then delivers each frame to exactly one socket of the group,
+    chosen by flow hash, so every flow is always handled by the same thread.
+    """
+    mode = PACKET_FANOUT_HASH | PACKET_FANOUT_FLAG_DEFRAG
+    capture_socket.ins.setsockopt(
+        SOL_PACKET, PACKET_FANOUT, (group_id & 0xFFFF) | (mode << 16)
+    )
+
+
+def read_packet_statistics(sock: socket.socket) -> Tuple[int, int, int]:
+    """Read and reset the kernel counters of an ``AF_PACKET`` socket.
+
+    ``tp_packets`` includes the dropped frames. ``tp_freeze_q_cnt`` only
+    exists for ``TPACKET_V3`` rings; older sockets return the 8-byte struct.
+
+    Returns:
+        (packets, drops, freeze queue count) since the previous read
+    """
+    raw = sock.getsockopt(SOL_PACKET, PACKET_STATISTICS, TPACKET_STATS_V3.size)
+    raw = raw.ljust(TPACKET_STATS_V3.size, b"\0")
+    packets, drops, freeze_queue = TPACKET_STATS_V3.unpack(raw)
+    return packets, drops, freeze_queue
+
+
+def read_pcap_statistics(pcap_fd: Any) -> Tuple[int, int]:
+    """Read the cumulative ``pcap_stats`` counters of a libpcap handle.
+
+    Returns:
+        (received, dropped) since the handle was opened
+    """
+    from ctypes import byref
+
+    from scapy.libs.winpcapy import pcap_stat, pcap_stats
+
+    stats = pcap_stat()
+    if pcap_stats(pcap_fd.pcap, byref(stats)) != 0:
+        raise OSError("pcap_stats failed")
+    return stats.ps_recv, stats.ps_drop
+
+
+class CaptureStats:
+    """Kernel-side capture counters, which also see frames Python never got.
+
+    Reading ``PACKET_STATISTICS`` resets the kernel counters, so every poll
+    adds its deltas here; libpcap keeps cumulative counters of its own per
+    handle, so the last reading of each capture socket is remembered.
+    ``recent_loss_ratio`` is the loss between the last two polls that saw
+    traffic, which recovers after a burst unlike the lifetime ratio.
+    """
+
+    def __init__(self) -> None:
+        self.received = 0
+        self.dropped = 0
+        self.freeze_queue = 0
+        self.recent_loss_ratio = 0.0
+        self.available = False
+        self._lock = threading.Lock()
+        # Last cumulative libpcap reading per capture socket
+        self._pcap_totals: MutableMapping[
+            Any, Tuple[int, int]
+        ] = weakref.WeakKeyDictionary()
+
+    @property
+    def loss_ratio(self) -> float:
+        """Fraction of the frames seen by the kernel that were dropped."""
+        return self.dropped / self.received if self.received else 0.0
+
+    def poll(self, *capture_sockets: Any) -> None:
+        """Fold the current counters of the capture socket(s) in."""
+        with self._lock:
+            readings = [
+                counters
+                for counters in map(self._read, capture_sockets)
+                if counters is not None
+            ]
+            if not readings:
+                return
+            received, dropped, freeze_queue = (sum(column) for column in zip(*readings))
+            self.received += received
+            self.dropped += dropped
+            self.freeze_queue += freeze_queue
+            if received:
+                self.recent_loss_ratio = dropped / received
+            self.available = True
+
+    def _read(self, capture_socket: Any) -> Optional[Tuple[int, int, int]]:
+        """Counter deltas since the previous poll, or None if unsupported."""
+        try:
+            ins = getattr(capture_socket, "ins", None)
+            if hasattr(ins, "getsockopt"):
+                return read_packet_statistics(ins)
+
+            pcap_fd = getattr(capture_socket, "pcap_fd", None)
+            if pcap_fd is not None:
+                received, dropped = read_pcap_statistics(pcap_fd)
+                last_received, last_dropped = self._pcap_totals.get(
+                    capture_socket, (0, 0)
+                )
+                self._pcap_totals[capture_socket] = (received, dropped)
+                return received - last_received, dropped - last_dropped, 0
+        except (OSError, ImportError) as e:
+            logger.debug(f"Capture statistics unavailable: {e}")
+        return None
@@ -1,27 +1,294 @@
 """Configuration management for PLC Sniffer."""
 
+import json
 import os
-from dataclasses import dataclass
-from typing import Dict, Any
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Set, Tuple, Union
 
+from .pipeline import DEFAULT_STAGES, DROPPING_STAGES
+from .reassembly import NON_FIRST_FRAGMENT_FILTER
 from .validators import (
+    ValidationError,
     validate_bpf_filter,
+    validate_calibration_mode,
+    validate_capture_engine,
+    validate_class_scheduling,
+    validate_cpu_list,
+    validate_destination,
+    validate_distribution,
+    validate_gc_mode,
     validate_interface,
     validate_ip_address,
     validate_log_level,
+    validate_mac_address,
+    validate_mirror_encap,
+    validate_output_mode,
     validate_packet_size,
     validate_port,
+    validate_port_range,
+    validate_rate_control,
     validate_rate_limit,
-    ValidationError
+    validate_realtime_priority,
+    validate_ring_slot_size,
+    validate_ring_slots,
+    validate_runtime,
+    validate_statsd_format,
+    validate_subnet,
+    validate_weight,
 )
 
-__all__ = ['SnifferConfig', 'ConfigManager', 'ValidationError']
+__all__ = [
+    "Destination",
+    "Route",
+    "TrafficClass",
+    "SnifferConfig",
+    "ConfigManager",
+    "ValidationError",
+]
+
+# Name of the class that takes traffic matching no configured class
+DEFAULT_CLASS = "default"
+
+
+class Destination(NamedTuple):
+    """A collector that receives forwarded payloads."""
+
+    ip: str
+    port: int
+    weight: float = 1.0  # share of flows in hash distribution
+
+    @property
+    def label(self) -> str:
+        """Destination as ``ip:port`` (IPv6 in brackets)."""
+        if ":" in self.ip:
+            return f"[{self.ip}]:{self.port}"
+        return f"{self.ip}:{self.port}"
+
+    @classmethod
+    def parse(cls, spec: Union[str, Tuple[Any, ...]]) -> "Destination":
+        """Build a validated destination from ``ip:port[@weight]`` or a tuple."""
+        if isinstance(spec, tuple):
+            weight = spec[2] if len(spec) > 2 else 1.0
+            return cls(
+                validate_ip_address(spec[0]),
+                validate_port(spec[1]),
+                validate_weight(weight),
+            )
+        address, _, weight = spec.strip().partition("@")
+        return cls(*validate_destination(address), validate_weight(weight or 1.0))
+
+
+def parse_destinations(spec: str) -> List[Destination]:
+    """Parse a comma-separated list of ``ip:port`` destinations."""
+    return [Destination.parse(item) for item in spec.split(",") if item.strip()]
+
+
+def parse_pipeline_stages(spec: str) -> List[str]:
+    """Parse comma-separated stage names, defaulting to the built-in pipeline."""
+    stages = [item.strip() for item in spec.split(",") if item.strip()]
+    return stages or list(DEFAULT_STAGES)
+
+
+class Route(NamedTuple):
+    """Sends packets matching a port, port range or source subnet to its own targets."""
+
+    name: str
+    destinations: List[Destination]
+    port: Optional[int] = None
+    port_range: Optional[Tuple[int, int]] = None
+    src_net: Optional[str] = None
+    distribution: Optional[str] = None  # falls back to SnifferConfig.distribution
+
+    @property
+    def bpf_term(self) -> str:
+        """BPF expression matching this route's traffic."""
+        if self.port is not None:
+            return f"dst port {self.port}"
+        if self.port_range is not None:
+            return f"dst portrange {self.port_range[0]}-{self.port_range[1]}"
+        return f"src net {self.src_net}"
+
+    @classmethod
+    def parse(cls, spec: Union[Dict[str, Any], "Route"], index: int = 0) -> "Route":
+        """Build a validated route from a mapping.
+
+        For example ``{"port": 502, "destinations": [...]}``.
+
+        Exactly one of ``port``, ``ports`` (``"low-high"``) or ``src_net`` must be
+        given.
+        """
+        if isinstance(spec, Route):
+            spec = {
+                "name": spec.name,
+                "destinations": spec.destinations,
+                "port": spec.port,
+                "ports": f"{spec.port_range[0]}-{spec.port_range[1]}"
+                if spec.port_range
+                else None,
+                "src_net": spec.src_net,
+                "distribution": spec.distribution,
+            }
+        if not isinstance(spec, dict):
+            raise ValidationError(f"Route {index} must be an object")
+        port, port_range, src_net = parse_match(spec, f"Route {index}")
+
+        destinations = spec.get("destinations") or []
+        if isinstance(destinations, str):
+            destinations = destinations.split(",")
+        if not destinations:
+            raise ValidationError(f"Route {index} has no destinations")
+
+        distribution = spec.get("distribution")
+        return cls(
+            name=str(spec.get("name") or f"route{index}"),
+            destinations=[Destination.parse(dest) for dest in destinations],
+            port=port,
+            port_range=port_range,
+            src_net=src_net,
+            distribution=validate_distribution(distribution) if distribution else None,
+        )
+
+
+def parse_match(
+    spec: Dict[str, Any], what: str
+) -> Tuple[Optional[int], Optional[Tuple[int, int]], Optional[str]]:
+    """Validate the ``port`` / ``ports`` / ``src_net`` rule of a route or traffic class.
+
+    Returns:
+        Port, port range and source subnet; exactly one of them is set
+    """
+    matches = [key for key in ("port", "ports", "src_net") if spec.get(key) is not None]
+    if len(matches) != 1:
+        raise ValidationError(
+            f"{what} must have exactly one of 'port', 'ports' or 'src_net'"
+        )
+    return (
+        validate_port(spec["port"]) if "port" in matches else None,
+        validate_port_range(spec["ports"]) if "ports" in matches else None,
+        validate_subnet(spec["src_net"]) if "src_net" in matches else None,
+    )
+
+
+def parse_routes(spec: str) -> List[Route]:
+    """Parse routes from a JSON list of route objects."""
+    if not spec.strip():
+        return []
+    try:
+        items = json.loads(spec)
+    except json.JSONDecodeError as e:
+        raise ValidationError(f"Invalid ROUTES JSON: {e}")
+    if not isinstance(items, list):
+        raise ValidationError("ROUTES must be a JSON list")
+    return [Route.parse(item, index) for index, item in enumerate(items)]
+
+
+class TrafficClass(NamedTuple):
+    """Packets matching a port, port range or source subnet, scheduled together."""
+
+    name: str
+    port: Optional[int] = None
+    port_range: Optional[Tuple[int, int]] = None
+    src_net: Optional[str] = None
+    priority: int = 0  # lower is served first under strict scheduling
+    weight: int = 1  # share of the output under weighted scheduling
+    deadline: float = (
+        0.0  # seconds after capture a packet is shed instead of forwarded, 0 = none
+    )
+    queue_size: int = 1024
+
+    @classmethod
+    def parse(
+        cls, spec: Union[Dict[str, Any], "TrafficClass"], index: int = 0
+    ) -> "TrafficClass":
+        """Build a validated class from a mapping.
+
+        For example ``{"name": "safety", "port": 502}``.
+
+        Exactly one of ``port``, ``ports`` (``"low-high"``) or ``src_net`` must
+        be given; ``priority``, ``weight``, ``deadline_ms`` and ``queue_size``
+        are optional.
+        """
+        if isinstance(spec, TrafficClass):
+            return spec
+        if not isinstance(spec, dict):
+            raise ValidationError(f"Traffic class {index} must be an object")
+        port, port_range, src_net = parse_match(spec, f"Traffic class {index}")
+
+        name = str(spec.get("name") or f"class{index}")
+        if name == DEFAULT_CLASS:
+            raise ValidationError(f"Traffic class name '{DEFAULT_CLASS}' is reserved")
+        try:
+            priority = int(spec.get("priority", index))
+            weight = int(spec.get("weight", 1))
+            deadline = float(spec.get("deadline_ms", 0)) / 1000
+            queue_size = int(spec.get("queue_size", 1024))
+        except (TypeError, ValueError) as e:
+            raise ValidationError(f"Traffic class {index}: {e}")
+        if weight < 1:
+            raise ValidationError(f"Traffic class {index} weight must be at least 1")
+        if deadline < 0:
+            raise ValidationError(f"Traffic class {index} deadline cannot be negative")
+        if queue_size <= 0:
+            raise ValidationError(f"Traffic class {index} queue size must be positive")
+        return cls(
+            name, port, port_range, src_net, priority, weight, deadline, queue_size
+        )
+
+
+def parse_traffic_classes(spec: str) -> List[TrafficClass]:
+    """Parse traffic classes from a JSON list of class objects."""
+    if not spec.strip():
+        return []
+    try:
+        items = json.loads(spec)
+    except json.JSONDecodeError as e:
+        raise ValidationError(f"Invalid TRAFFIC_CLASSES JSON: {e}")
+    if not isinstance(items, list):
+        raise ValidationError("TRAFFIC_CLASSES must be a JSON list")
+    return [TrafficClass.parse(item, index) for index, item in enumerate(items)]
+
+
+def check_match_conflicts(
+    rules: Sequence[Union[Route, TrafficClass]], kind: str
+) -> None:
+    """Reject routes (or classes) matching the same packets at the same priority."""
+    names: Set[str] = set()
+    ports: Set[int] = set()
+    subnets: Set[str] = set()
+    ranges: List[Tuple[int, int, str]] = []
+
+    for rule in rules:
+        if rule.name in names:
+            raise ValidationError(f"Duplicate {kind} name '{rule.name}'")
+        names.add(rule.name)
+        if rule.port is not None:
+            if rule.port in ports:
+                raise ValidationError(
+                    f"Port {rule.port} is matched by more than one {kind}"
+                )
+            ports.add(rule.port)
+        elif rule.port_range is not None:
+            ranges.append((rule.port_range[0], rule.port_range[1], rule.name))
+        elif rule.src_net is not None:
+            if rule.src_net in subnets:
+                raise ValidationError(
+                    f"Subnet {rule.src_net} is matched by more than one {kind}"
+                )
+            subnets.add(rule.src_net)
+
+    ranges.sort()
+    for (_, prev_high, prev_name), (low, _, name) in zip(ranges, ranges[1:]):
+        if low <= prev_high:
+            raise ValidationError(
+                f"Port ranges of {kind} '{prev_name}' and '{name}' overlap"
+            )
 
 
 @dataclass
 class SnifferConfig:
     """Configuration for PLC Sniffer."""
-    
+
     interface: str
     filter: str
     destination_ip: str
@@ -30,7 +297,75 @@ class SnifferConfig:
     max_packet_size: int = 65535
     rate_limit: int = 0  # 0 means no limit
     socket_timeout: float = 5.0
-    
+    output_mode: str = "udp"  # 'udp', 'shm' or 'inject'
+    shm_ring_path: str = "/dev/shm/plc_sniffer.ring"
+    shm_ring_slots: int = 65536
+    shm_ring_slot_size: int = 2048
+    send_buffer_size: int = 1048576
+    retry_queue_size: int = 1024
+    circuit_breaker_threshold: int = 50  # 0 disables the breaker
+    circuit_breaker_cooldown: float = 5.0
+    destinations: List[Destination] = field(default_factory=list)
+    destination_queue_size: int = 4096
+    distribution: str = "fanout"  # 'fanout' or 'hash'
+    routes: List[Route] = field(default_factory=list)
+    reassembly_max_datagrams: int = 64  # 0 disables fragment reassembly
+    reassembly_timeout: float = 30.0
+    cycle_flows: int = 1024  # 0 disables cycle tracking
+    cycle_idle_timeout: float = 60.0
+    cycle_metrics_flows: int = 10
+    max_capture_loss: float = 0.0  # readiness fails above this ratio, 0 disables
+    capture_cpus: List[int] = field(default_factory=list)
+    forwarder_cpus: List[int] = field(default_factory=list)
+    realtime_priority: int = 0  # SCHED_FIFO priority, 0 keeps the default scheduler
+    gc_mode: str = "auto"  # 'auto', 'freeze' or 'idle'
+    capture_engine: str = "scapy"  # 'scapy', 'raw' or 'mirror'
+    buffer_pool_slabs: int = 256
+    buffer_slab_size: int = 2048
+    runtime: str = "threads"  # 'threads' or 'asyncio'
+    capture_threads: int = 1  # >1 captures in parallel through a PACKET_FANOUT group
+    statsd_host: str = ""  # empty disables the StatsD exporter
+    statsd_port: int = 8125
+    statsd_interval: float = 10.0
+    statsd_format: str = "dogstatsd"  # 'statsd' or 'dogstatsd'
+    statsd_prefix: str = "plc_sniffer"
+    statsd_max_datagram: int = 1432
+    profile_max_seconds: int = 0  # longest /debug/profile run, 0 disables the endpoint
+    stage_timing_sample: int = 0  # time the stages of 1 in N batches, 0 disables
+    traffic_classes: List[TrafficClass] = field(default_factory=list)
+    class_scheduling: str = "strict"  # 'strict' or 'weighted'
+    rate_control: str = (
+        "static"  # 'aimd' adapts the rate below RATE_LIMIT to downstream feedback
+    )
+    adaptive_rate_min: int = 100
+    adaptive_rate_step: int = 100  # pps added per interval while the limit is reached
+    adaptive_rate_backoff: float = 0.5  # rate multiplier on congestion
+    adaptive_rate_interval: float = 1.0
+    adaptive_ack_port: int = (
+        0  # UDP port collectors report received counts to, 0 disables
+    )
+    pipeline_stages: List[str] = field(default_factory=lambda: list(DEFAULT_STAGES))
+    pipeline_batch: int = (
+        32  # most frames decoded and passed through the stages together
+    )
+    spill_dir: str = ""  # directory of the disk spill queues, empty disables spilling
+    spill_segment_size: int = 16777216
+    spill_max_bytes: int = 1073741824  # per destination
+    spill_replay_rate: int = 1000  # pps replayed per destination after an outage
+    sample_fraction: float = 1.0  # share of flows kept by the 'sample' stage
+    sample_every: int = 1  # keep 1 in N packets of each sampled flow
+    inject_interface: str = (
+        ""  # interface frames are re-injected on with OUTPUT_MODE=inject
+    )
+    inject_dst_mac: str = ""
+    inject_ring_frames: int = 4096
+    inject_frame_size: int = 2048
+    mirror_encap: str = "vxlan"  # tunnel of CAPTURE_ENGINE=mirror: 'vxlan' or 'gre'
+    mirror_bind: str = "0.0.0.0"
+    mirror_port: int = 4789
+    calibrate: str = "off"  # 'auto' tunes batch, queue and ring sizes at startup
+    calibration_cache: str = "/var/tmp/plc-sniffer-calibration.json"
+
     def __post_init__(self) -> None:
         """Validate configuration after initialization."""
         self.interface = validate_interface(self.interface)
@@ -40,50 +375,351 @@ class SnifferConfig:
         self.log_level = validate_log_level(self.log_level)
         self.max_packet_size = validate_packet_size(self.max_packet_size)
         self.rate_limit = validate_rate_limit(self.rate_limit)
-        
+        self.output_mode = validate_output_mode(self.output_mode)
+        self.shm_ring_slots = validate_ring_slots(self.shm_ring_slots)
+        self.shm_ring_slot_size = validate_ring_slot_size(self.shm_ring_slot_size)
+        self.capture_cpus = validate_cpu_list(self.capture_cpus)
+        self.forwarder_cpus = validate_cpu_list(self.forwarder_cpus)
+        self.realtime_priority = validate_realtime_priority(self.realtime_priority)
+        self.gc_mode = validate_gc_mode(self.gc_mode)
+        self.capture_engine = validate_capture_engine(self.capture_engine)
+        self.runtime = validate_runtime(self.runtime)
+        self.statsd_format = validate_statsd_format(self.statsd_format)
+        self.rate_control = validate_rate_control(self.rate_control)
+        self.calibrate = validate_calibration_mode(self.calibrate)
+        if self.statsd_host:
+            self.statsd_host = validate_ip_address(self.statsd_host)
+            self.statsd_port = validate_port(self.statsd_port)
+
         if self.socket_timeout <= 0:
             raise ValidationError("Socket timeout must be positive")
+        if self.send_buffer_size < 0:
+            raise ValidationError("Send buffer size cannot be negative")
+        if self.retry_queue_size < 0:
+            raise ValidationError("Retry queue size cannot be negative")
+        if self.circuit_breaker_threshold < 0:
+            raise ValidationError("Circuit breaker threshold cannot be negative")
+        if self.circuit_breaker_cooldown <= 0:
+            raise ValidationError("Circuit breaker cooldown must be positive")
+        if self.destination_queue_size <= 0:
+            raise ValidationError("Destination queue size must be positive")
+        if self.reassembly_max_datagrams < 0:
+            raise ValidationError("Reassembly datagram limit cannot be negative")
+        if self.reassembly_timeout <= 0:
+            raise ValidationError("Reassembly timeout must be positive")
+        if self.cycle_flows < 0:
+            raise ValidationError("Cycle flow limit cannot be negative")
+        if self.cycle_idle_timeout <= 0:
+            raise ValidationError("Cycle idle timeout must be positive")
+        if self.cycle_metrics_flows < 0:
+            raise ValidationError("Cycle metrics flow limit cannot be negative")
+        if self.buffer_pool_slabs <= 0:
+            raise ValidationError("Buffer pool size must be positive")
+        if not 64 <= self.buffer_slab_size <= 65536:
+            raise ValidationError("Buffer slab size must be between 64 and 65536 bytes")
+        if not 1 <= self.capture_threads <= 64:
+            raise ValidationError("Capture threads must be between 1 and 64")
+        if self.capture_threads > 1 and self.output_mode == "shm":
+            raise ValidationError(
+                "Parallel capture threads cannot share the shared-memory ring"
+            )
+        if self.capture_threads > 1 and self.runtime == "asyncio":
+            raise ValidationError(
+                "Parallel capture threads require the threads runtime"
+            )
+        if self.capture_engine == "mirror":
+            self.mirror_encap = validate_mirror_encap(self.mirror_encap)
+            self.mirror_bind = validate_ip_address(self.mirror_bind)
+            if ":" in self.mirror_bind:
+                raise ValidationError("Mirror capture listens on IPv4 only")
+            self.mirror_port = validate_port(self.mirror_port)
+            if self.capture_threads > 1:
+                raise ValidationError("Mirror capture runs on a single capture thread")
+        if self.calibrate == "auto" and not self.calibration_cache:
+            raise ValidationError(
+                "Calibration needs CALIBRATION_CACHE to store its results"
+            )
+        if self.statsd_interval <= 0:
+            raise ValidationError("StatsD interval must be positive")
+        if not 64 <= self.statsd_max_datagram <= 65507:
+            raise ValidationError(
+                "StatsD datagram size must be between 64 and 65507 bytes"
+            )
+        if self.stage_timing_sample < 0:
+            raise ValidationError("Stage timing sample interval cannot be negative")
+        if not 0 <= self.profile_max_seconds <= 300:
+            raise ValidationError(
+                "Profile duration limit must be between 0 and 300 seconds"
+            )
+        if not 0 <= self.max_capture_loss < 1:
+            raise ValidationError("Max capture loss must be between 0 and 1")
+        if self.rate_control == "aimd":
+            if not self.rate_limit:
+                raise ValidationError(
+                    "Adaptive rate control needs RATE_LIMIT as the highest rate"
+                )
+            if self.output_mode != "udp":
+                raise ValidationError("Adaptive rate control needs UDP output")
+            if not 1 <= self.adaptive_rate_min <= self.rate_limit:
+                raise ValidationError(
+                    "Adaptive minimum rate must be between 1 and the rate limit"
+                )
+            if self.adaptive_rate_step <= 0:
+                raise ValidationError("Adaptive rate step must be positive")
+            if not 0 < self.adaptive_rate_backoff < 1:
+                raise ValidationError("Adaptive rate backoff must be between 0 and 1")
+            if self.adaptive_rate_interval <= 0:
+                raise ValidationError("Adaptive rate interval must be positive")
+            if self.adaptive_ack_port:
+                self.adaptive_ack_port = validate_port(self.adaptive_ack_port)
+        if len(set(self.pipeline_stages)) != len(self.pipeline_stages):
+            raise ValidationError("Pipeline stages must not repeat")
+        if "forward" not in self.pipeline_stages:
+            raise ValidationError("Pipeline stages must include 'forward'")
+        if "cycles" in self.pipeline_stages:
+            earlier = self.pipeline_stages[: self.pipeline_stages.index("cycles")]
+            for name in earlier:
+                if name in DROPPING_STAGES:
+                    raise ValidationError(
+                        f"Pipeline stage 'cycles' must run before '{name}', "
+                        "which drops packets"
+                    )
+        if not 1 <= self.pipeline_batch <= 1024:
+            raise ValidationError("Pipeline batch size must be between 1 and 1024")
+        if self.spill_dir:
+            if self.output_mode != "udp":
+                raise ValidationError("Spilling to disk needs UDP output")
+            if not 1048576 <= self.spill_segment_size <= 1073741824:
+                raise ValidationError(
+                    "Spill segment size must be between 1 MiB and 1 GiB"
+                )
+            if self.spill_max_bytes < 2 * self.spill_segment_size:
+                raise ValidationError("Spill size cap must hold at least two segments")
+            if self.spill_replay_rate <= 0:
+                raise ValidationError("Spill replay rate must be positive")
+        if not 0.0 < self.sample_fraction <= 1.0:
+            raise ValidationError(
+                "Sample fraction must be greater than 0 and at most 1"
+            )
+        if not 1 <= self.sample_every <= 1000000:
+            raise ValidationError("Sample interval must be between 1 and 1000000")
+        if self.sample_rate < 1.0 and "sample" not in self.pipeline_stages:
+            raise ValidationError("Sampling needs the 'sample' pipeline stage")
+        if self.output_mode == "inject":
+            if not self.inject_interface:
+                raise ValidationError("Re-injection needs INJECT_INTERFACE")
+            self.inject_interface = validate_interface(self.inject_interface)
+            self.inject_dst_mac = validate_mac_address(self.inject_dst_mac)
+            if self.destinations or self.routes:
+                raise ValidationError(
+                    "Re-injection sends to DESTINATION_IP only, "
+                    "not to DESTINATIONS or ROUTES"
+                )
+            frames = self.inject_ring_frames
+            if not 16 <= frames <= 1048576 or frames & (frames - 1):
+                raise ValidationError(
+                    "Injection ring frames must be a power of two "
+                    "between 16 and 1048576"
+                )
+            size = self.inject_frame_size
+            if not 2048 <= size <= 65536 or size & (size - 1):
+                raise ValidationError(
+                    "Injection frame size must be a power of two between 2048 and 65536"
+                )
+
+        # Only an explicit list is stored: a derived legacy destination would
+        # trip the inject check and go stale under dataclasses.replace()
+        self.destinations = [Destination.parse(dest) for dest in self.destinations]
+        if len({dest.label for dest in self.destinations}) != len(self.destinations):
+            raise ValidationError("Duplicate destinations configured")
+        self.distribution = validate_distribution(self.distribution)
+
+        self.routes = [
+            Route.parse(route, index) for index, route in enumerate(self.routes)
+        ]
+        check_match_conflicts(self.routes, "route")
+
+        self.traffic_classes = [
+            TrafficClass.parse(traffic_class, index)
+            for index, traffic_class in enumerate(self.traffic_classes)
+        ]
+        check_match_conflicts(self.traffic_classes, "traffic class")
+        self.class_scheduling = validate_class_scheduling(self.class_scheduling)
+
+    @property
+    def capture_filter(self) -> str:
+        """BPF filter for the capture, narrowed to the routed traffic if routes are set.
+
+        With reassembly enabled, non-first UDP fragments are captured as well:
+        they carry no UDP header, so port filters never match them.
+        """
+        capture_filter = self.filter
+        if self.routes:
+            terms = " or ".join(route.bpf_term for route in self.routes)
+            capture_filter = f"({capture_filter}) and ({terms})"
+        if self.reassembly_max_datagrams:
+            capture_filter = f"({capture_filter}) or ({NON_FIRST_FRAGMENT_FILTER})"
+        return capture_filter
+
+    @property
+    def forward_destinations(self) -> List[Destination]:
+        """DESTINATIONS, or the single legacy destination if none are listed."""
+        if self.destinations:
+            return self.destinations
+        return [Destination(self.destination_ip, self.destination_port)]
+
+    @property
+    def sample_rate(self) -> float:
+        """Expected share of packets kept by sampling; divide counts by it to scale."""
+        return self.sample_fraction / self.sample_every
 
 
 class ConfigManager:
     """Manages configuration loading and validation."""
-    
+
+    @staticmethod
+    def read_config_file(path: str) -> Dict[str, str]:
+        """Read ``KEY=VALUE`` lines in the same format as ``.env`` files.
+
+        Args:
+            path: Path of the configuration file
+
+        Returns:
+            Dictionary of variables defined in the file
+
+        Raises:
+            ValidationError: If the file cannot be read or a line is malformed
+        """
+        try:
+            with open(path, encoding="utf-8") as f:
+                lines = f.readlines()
+        except OSError as e:
+            raise ValidationError(f"Cannot read config file '{path}': {e}")
+
+        variables = {}
+        for number, raw in enumerate(lines, 1):
+            line = raw.strip()
+            if not line or line.startswith("#"):
+                continue
+            key, sep, value = line.partition("=")
+            if not sep or not key.strip():
+                raise ValidationError(f"{path}:{number}: expected KEY=VALUE")
+            value = re.split(r"\s+#", value, maxsplit=1)[0].strip()
+            if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'":
+                value = value[1:-1]
+            variables[key.strip()] = value
+        return variables
+
     @staticmethod
     def from_environment() -> SnifferConfig:
         """Load configuration from environment variables.
-        
+
+        If ``CONFIG_FILE`` is set, variables from that file override the
+        process environment. The file is re-read on every call, which is what
+        makes configuration reloads pick up changes.
+
         Returns:
             Validated SnifferConfig instance
-            
+
         Raises:
             ValidationError: If any configuration value is invalid
         """
+        env: Dict[str, str] = dict(os.environ)
+        if env.get("CONFIG_FILE"):
+            env.update(ConfigManager.read_config_file(env["CONFIG_FILE"]))
+
         try:
             config = SnifferConfig(
-                interface=os.environ.get('INTERFACE', 'eth0'),
-                filter=os.environ.get('FILTER', 'udp'),
-                destination_ip=os.environ.get('DESTINATION_IP', '127.0.0.1'),
-                destination_port=int(os.environ.get('DESTINATION_PORT', '8514')),
-                log_level=os.environ.get('LOG_LEVEL', 'INFO'),
-                max_packet_size=int(os.environ.get('MAX_PACKET_SIZE', '65535')),
-                rate_limit=int(os.environ.get('RATE_LIMIT', '0')),
-                socket_timeout=float(os.environ.get('SOCKET_TIMEOUT', '5.0'))
+                interface=env.get("INTERFACE", "eth0"),
+                filter=env.get("FILTER", "udp"),
+                destination_ip=env.get("DESTINATION_IP", "127.0.0.1"),
+                destination_port=int(env.get("DESTINATION_PORT", "8514")),
+                log_level=env.get("LOG_LEVEL", "INFO"),
+                max_packet_size=int(env.get("MAX_PACKET_SIZE", "65535")),
+                rate_limit=int(env.get("RATE_LIMIT", "0")),
+                socket_timeout=float(env.get("SOCKET_TIMEOUT", "5.0")),
+                output_mode=env.get("OUTPUT_MODE", "udp"),
+                shm_ring_path=env.get("SHM_RING_PATH", "/dev/shm/plc_sniffer.ring"),
+                shm_ring_slots=int(env.get("SHM_RING_SLOTS", "65536")),
+                shm_ring_slot_size=int(env.get("SHM_RING_SLOT_SIZE", "2048")),
+                send_buffer_size=int(env.get("SEND_BUFFER_SIZE", "1048576")),
+                retry_queue_size=int(env.get("RETRY_QUEUE_SIZE", "1024")),
+                circuit_breaker_threshold=int(
+                    env.get("CIRCUIT_BREAKER_THRESHOLD", "50")
+                ),
+                circuit_breaker_cooldown=float(
+                    env.get("CIRCUIT_BREAKER_COOLDOWN", "5.0")
+                ),
+                destinations=parse_destinations(env.get("DESTINATIONS", "")),
+                destination_queue_size=int(env.get("DESTINATION_QUEUE_SIZE", "4096")),
+                distribution=env.get("DISTRIBUTION", "fanout"),
+                routes=parse_routes(env.get("ROUTES", "")),
+                reassembly_max_datagrams=int(env.get("REASSEMBLY_MAX_DATAGRAMS", "64")),
+                reassembly_timeout=float(env.get("REASSEMBLY_TIMEOUT", "30.0")),
+                cycle_flows=int(env.get("CYCLE_FLOWS", "1024")),
+                cycle_idle_timeout=float(env.get("CYCLE_IDLE_TIMEOUT", "60.0")),
+                cycle_metrics_flows=int(env.get("CYCLE_METRICS_FLOWS", "10")),
+                max_capture_loss=float(env.get("MAX_CAPTURE_LOSS", "0")),
+                capture_cpus=validate_cpu_list(env.get("CAPTURE_CPUS", "")),
+                forwarder_cpus=validate_cpu_list(env.get("FORWARDER_CPUS", "")),
+                realtime_priority=int(env.get("REALTIME_PRIORITY", "0")),
+                gc_mode=env.get("GC_MODE", "auto"),
+                capture_engine=env.get("CAPTURE_ENGINE", "scapy"),
+                buffer_pool_slabs=int(env.get("BUFFER_POOL_SLABS", "256")),
+                buffer_slab_size=int(env.get("BUFFER_SLAB_SIZE", "2048")),
+                runtime=env.get("RUNTIME", "threads"),
+                capture_threads=int(env.get("CAPTURE_THREADS", "1")),
+                statsd_host=env.get("STATSD_HOST", ""),
+                statsd_port=int(env.get("STATSD_PORT", "8125")),
+                statsd_interval=float(env.get("STATSD_INTERVAL", "10.0")),
+                statsd_format=env.get("STATSD_FORMAT", "dogstatsd"),
+                statsd_prefix=env.get("STATSD_PREFIX", "plc_sniffer"),
+                statsd_max_datagram=int(env.get("STATSD_MAX_DATAGRAM", "1432")),
+                profile_max_seconds=int(env.get("PROFILE_MAX_SECONDS", "0")),
+                stage_timing_sample=int(env.get("STAGE_TIMING_SAMPLE", "0")),
+                traffic_classes=parse_traffic_classes(env.get("TRAFFIC_CLASSES", "")),
+                class_scheduling=env.get("CLASS_SCHEDULING", "strict"),
+                rate_control=env.get("RATE_CONTROL", "static"),
+                adaptive_rate_min=int(env.get("ADAPTIVE_RATE_MIN", "100")),
+                adaptive_rate_step=int(env.get("ADAPTIVE_RATE_STEP", "100")),
+                adaptive_rate_backoff=float(env.get("ADAPTIVE_RATE_BACKOFF", "0.5")),
+                adaptive_rate_interval=float(env.get("ADAPTIVE_RATE_INTERVAL", "1.0")),
+                adaptive_ack_port=int(env.get("ADAPTIVE_ACK_PORT", "0")),
+                pipeline_stages=parse_pipeline_stages(env.get("PIPELINE_STAGES", "")),
+                pipeline_batch=int(env.get("PIPELINE_BATCH", "32")),
+                spill_dir=env.get("SPILL_DIR", ""),
+                spill_segment_size=int(env.get("SPILL_SEGMENT_SIZE", "16777216")),
+                spill_max_bytes=int(env.get("SPILL_MAX_BYTES", "1073741824")),
+                spill_replay_rate=int(env.get("SPILL_REPLAY_RATE", "1000")),
+                sample_fraction=float(env.get("SAMPLE_FRACTION", "1.0")),
+                sample_every=int(env.get("SAMPLE_EVERY", "1")),
+                inject_interface=env.get("INJECT_INTERFACE", ""),
+                inject_dst_mac=env.get("INJECT_DST_MAC", ""),
+                inject_ring_frames=int(env.get("INJECT_RING_FRAMES", "4096")),
+                inject_frame_size=int(env.get("INJECT_FRAME_SIZE", "2048")),
+                mirror_encap=env.get("MIRROR_ENCAP", "vxlan"),
+                mirror_bind=env.get("MIRROR_BIND", "0.0.0.0"),
+                mirror_port=int(env.get("MIRROR_PORT", "4789")),
+                calibrate=env.get("CALIBRATE", "off"),
+                calibration_cache=env.get(
+                    "CALIBRATION_CACHE", "/var/tmp/plc-sniffer-calibration.json"
+                ),
             )
             return config
         except ValueError as e:
             raise ValidationError(f"Configuration error: {e}")
-    
+
     @staticmethod
     def from_dict(config_dict: Dict[str, Any]) -> SnifferConfig:
         """Create configuration from dictionary.
-        
+
         Args:
             config_dict: Dictionary with configuration values
-            
+
         Returns:
             Validated SnifferConfig instance
-            
+
         Raises:
             ValidationError: If any configuration value is invalid
         """
-        return SnifferConfig(**config_dict)
\ No newline at end of file
+        return SnifferConfig(**config_dict)
@@ -0,0 +1,191 @@
+"""Per-flow cycle time and jitter analytics."""
+
+import math
+from array import array
+from bisect import bisect_left
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+from .balancer import FlowKey, flow_key
+from .metrics import Shards, summed
+from .packet import PacketMeta
+
+# Upper bounds in seconds, from 500us to 5s; typical PLC cycles are 1-100ms
+CYCLE_BUCKETS = (
+    0.0005,
+    0.001,
+    0.002,
+    0.005,
+    0.01,
+    0.02,
+    0.05,
+    0.1,
+    0.2,
+    0.5,
+    1.0,
+    2.0,
+    5.0,
+)
+
+# Flow table slots checked for idleness on every packet
+SWEEP_PER_PACKET = 2
+
+
+class FlowCycles(NamedTuple):
+    """Cycle statistics of one flow."""
+
+    flow: str
+    packets: int
+    mean: float
+    stddev: float
+    max: float
+    histogram: List[int]  # per bucket, last one is +Inf
+
+
+def flow_label(key: FlowKey) -> str:
+    """Human-readable flow name, ``src:port->dst:port``."""
+    src_ip, src_port, dst_ip, dst_port = key
+    return f"{src_ip}:{src_port}->{dst_ip}:{dst_port}"
+
+
+class CycleTracker:
+    """Track inter-arrival time per flow with constant cost per packet.
+
+    Statistics live in preallocated arrays indexed by a flow slot: Welford's
+    running mean and variance, the maximum, and a fixed-bucket histogram.
+    Intervals are computed from the capture timestamps, not from the time
+    the packet reaches Python. A clock hand visits ``SWEEP_PER_PACKET``
+    slots per packet and frees flows idle for longer than ``idle_timeout``;
+    new flows arriving while the table is full are counted as untracked.
+    """
+
+    def __init__(
+        self,
+        max_flows: int = 1024,
+        idle_timeout: float = 60.0,
+        buckets: Sequence[float] = CYCLE_BUCKETS,
+    ):
+        self.max_flows = max_flows
+        self.idle_timeout = idle_timeout
+        self.buckets = tuple(buckets)
+        self._width = len(self.buckets) + 1
+
+        self._index: Dict[FlowKey, int] = {}
+        self._keys: List[Optional[FlowKey]] = [None] * max_flows
+        self._free = list(range(max_flows - 1, -1, -1))
+        self._last = array("d", [0.0]) * max_flows
+        self._count = array("q", [0]) * max_flows
+        self._mean = array("d", [0.0]) * max_flows
+        self._m2 = array("d", [0.0]) * max_flows
+        self._max = array("d", [0.0]) * max_flows
+        self._hist = array("q", [0]) * (max_flows * self._width)
+        self._hand = 0
+
+        self.evicted = 0
+        self.untracked = 0
+
+    @property
+    def tracked(self) -> int:
+        """Flows currently in the table."""
+        return len(self._index)
+
+    def observe(self, meta: PacketMeta) -> None:
+        """Record the arrival of a packet."""
+        key = flow_key(meta)
+        now = meta.timestamp
+        self._sweep(now)
+
+        slot = self._index.get(key)
+        if slot is None:
+            self._open(key, now)
+            return
+
+        interval = now - self._last[slot]
+        self._last[slot] = now
+        if interval < 0:
+            return  # capture timestamps went backwards
+
+        n = self._count[slot] + 1
+        self._count[slot] = n
+        delta = interval - self._mean[slot]
+        mean = self._mean[slot] + delta / n
+        self._mean[slot] = mean
+        self._m2[slot] += delta * (interval - mean)
+        if interval > self._max[slot]:
+            self._max[slot] = interval
+        self._hist[slot * self._width + bisect_left(self.buckets, interval)] += 1
+
+    def flows(self) -> List[FlowCycles]:
+        """Statistics of all tracked flows, highest jitter first."""
+        result = []
+        for key, slot in list(self._index.items()):
+            n = self._count[slot]
+            base = slot * self._width
+            result.append(
+                FlowCycles(
+                    flow_label(key),
+                    n + 1,
+                    self._mean[slot],
+                    math.sqrt(self._m2[slot] / (n - 1)) if n > 1 else 0.0,
+                    self._max[slot],
+                    self._hist[base : base + self._width].tolist(),
+                )
+            )
+        result.sort(key=lambda flow: flow.stddev, reverse=True)
+        return result
+
+    def _open(self, key: FlowKey, now: float) -> None:
+        if not self._free:
+            self.untracked += 1
+            return
+
+        slot = self._free.pop()
+        self._index[key] = slot
+        self._keys[slot] = key
+        self._last[slot] = now
+        self._count[slot] = 0
+        self._mean[slot] = 0.0
+        self._m2[slot] = 0.0
+        self._max[slot] = 0.0
+        base = slot * self._width
+        self._hist[base : base + self._width] = array("q", [0]) * self._width
+
+    def _sweep(self, now: float) -> None:
+        for _ in range(SWEEP_PER_PACKET):
+            slot = self._hand
+            self._hand = (slot + 1) % self.max_flows
+            key = self._keys[slot]
+            if key is not None and now - self._last[slot] > self.idle_timeout:
+                del self._index[key]
+                self._keys[slot] = None
+                self._free.append(slot)
+                self.evicted += 1
+
+
+class ShardedCycleTracker:
+    """One :class:`CycleTracker` per capture thread, merged when read.
+
+    Parallel capture threads receive flow-hashed traffic, so every flow is
+    tracked by exactly one shard and the merged view is exact.
+    """
+
+    def __init__(self, max_flows: int = 1024, idle_timeout: float = 60.0):
+        self.max_flows = max_flows
+        self.idle_timeout = idle_timeout
+        self.buckets = CYCLE_BUCKETS
+        self.shards: Shards[CycleTracker] = Shards(
+            lambda: CycleTracker(max_flows, idle_timeout)
+        )
+
+    tracked = summed("tracked")
+    evicted = summed("evicted")
+    untracked = summed("untracked")
+
+    def observe(self, meta: PacketMeta) -> None:
+        """Record the arrival of a packet in the calling thread's shard."""
+        self.shards.get().observe(meta)
+
+    def flows(self) -> List[FlowCycles]:
+        """Statistics of all tracked flows, highest jitter first."""
+        result = [flow for shard in self.shards.all for flow in shard.flows()]
+        result.sort(key=lambda flow: flow.stddev, reverse=True)
+        return result
@@ -0,0 +1,342 @@
+"""Multi-destination fan-out through a pool of per-destination forwarders."""
+
+import asyncio
+import functools
+import logging
+import queue
+import threading
+import time
+from typing import Callable, List, Optional, Sequence, Tuple, Union
+
+from .balancer import RendezvousHash, flow_key
+from .buffers import BufferLease
+from .config import Destination, SnifferConfig
+from .forwarder import LoopForwarder, ShardedForwarder, UdpForwarder
+from .metrics import Histogram, Shards, summed
+from .packet import PacketMeta, Payload
+from .runtime import pin_current_thread
+from .spill import SpillQueue
+
+logger = logging.getLogger(__name__)
+
+Forwarder = Union[UdpForwarder, ShardedForwarder]
+
+# Payload, time it was queued, buffer it is a view of and its addressing
+QueueItem = Tuple[Payload, float, Optional[BufferLease], Optional[PacketMeta]]
+
+
+class DestinationStatsShard:
+    """Destination counters updated by a single thread."""
+
+    __slots__ = (
+        "sent",
+        "bytes_sent",
+        "send_failed",
+        "queue_full",
+        "spilled",
+        "latency",
+    )
+
+    def __init__(self) -> None:
+        self.sent = 0
+        self.bytes_sent = 0
+        self.send_failed = 0
+        self.queue_full = 0
+        self.spilled = 0
+        self.latency = Histogram()
+
+
+class DestinationStats:
+    """Counters and send latency of a single destination.
+
+    Updated through the calling thread's shard, so several capture threads
+    can send to the same destination without a lock.
+    """
+
+    sent = summed("sent")
+    bytes_sent = summed("bytes_sent")
+    send_failed = summed("send_failed")
+    queue_full = summed("queue_full")
+    spilled = summed("spilled")
+
+    def __init__(self) -> None:
+        self.shards: Shards[DestinationStatsShard] = Shards(DestinationStatsShard)
+
+    @property
+    def latency(self) -> Histogram:
+        """Send latency over all threads."""
+        return Histogram.merge(shard.latency for shard in self.shards.all)
+
+    @property
+    def dropped(self) -> int:
+        """Payloads that never reached the socket for this destination."""
+        return self.send_failed + self.queue_full
+
+
+class DestinationWorker:
+    """Owns the socket and bounded queue of one destination.
+
+    In threaded mode payloads are handed over with :meth:`offer` and sent from
+    a dedicated thread, so a destination that stalls only fills its own queue.
+    With a spill queue, payloads that cannot be sent or queued are stored on
+    disk for later replay instead of being dropped.
+    """
+
+    def __init__(
+        self,
+        destination: Destination,
+        forwarder: Forwarder,
+        queue_size: int,
+        cpus: Sequence[int] = (),
+        priority: int = 0,
+        spill: Optional[SpillQueue] = None,
+    ):
+        self.destination = destination
+        self.name = destination.label
+        self.forwarder = forwarder
+        self.stats = DestinationStats()
+        self.queue_size = queue_size
+        self.running = False
+        self.stopped = False  # set by stop(); later payloads are rejected
+        self.cpus = list(cpus)
+        self.priority = priority
+        self.spill = spill
+
+        self._queue: "queue.Queue[QueueItem]" = queue.Queue(maxsize=queue_size)
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def queue_depth(self) -> int:
+        """Payloads waiting to be sent."""
+        return self._queue.qsize()
+
+    @property
+    def healthy(self) -> bool:
+        """False while the destination's circuit breaker is open."""
+        return self.forwarder.breaker.available
+
+    def send_now(
+        self,
+        payload: Payload,
+        queued_at: Optional[float] = None,
+        meta: Optional[PacketMeta] = None,
+    ) -> bool:
+        """Send a payload from the calling thread, spilling it if that fails."""
+        start = time.perf_counter() if queued_at is None else queued_at
+        stats = self.stats.shards.get()
+        if self.forwarder.send(payload):
+            stats.sent += 1
+            stats.bytes_sent += len(payload)
+            stats.latency.observe(time.perf_counter() - start)
+            return True
+        if self.spill is not None and self.spill.append(payload, meta):
+            stats.spilled += 1
+            return True
+        stats.send_failed += 1
+        return False
+
+    def offer(
+        self,
+        payload: Payload,
+        lease: Optional[BufferLease] = None,
+        meta: Optional[PacketMeta] = None,
+    ) -> bool:
+        """Queue a payload for the worker thread without blocking.
+
+        Args:
+            payload: Datagram payload
+            lease: Pooled buffer the payload is a view of; it is kept until
+                the payload has been sent
+            meta: Addressing and timing of the datagram, kept if it is spilled
+        """
+        if self.stopped:
+            return False
+        if lease is not None:
+            lease.retain()
+        try:
+            self._queue.put_nowait((payload, time.perf_counter(), lease, meta))
+        except queue.Full:
+            if lease is not None:
+                lease.release()
+            stats = self.stats.shards.get()
+            if self.spill is not None and self.spill.append(payload, meta):
+                stats.spilled += 1
+                return True
+            stats.queue_full += 1
+            return False
+        if self.stopped:
+            # stop() may have drained the queue before this put
+            self._release_queued()
+            return False
+        return True
+
+    def start(self) -> None:
+        """Start the sender thread (no-op if already running)."""
+        if self._thread is not None:
+            return
+        self.running = True
+        self._thread = threading.Thread(
+            target=self._run, name=f"forward-{self.name}", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self) -> None:
+        pin_current_thread(self.cpus, self.priority, f"forwarder {self.name}")
+        while self.running:
+            try:
+                payload, queued_at, lease, meta = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                self.forwarder.flush()
+                continue
+            self.send_now(payload, queued_at, meta)
+            if lease is not None:
+                lease.release()
+
+    def _release_queued(self) -> None:
+        """Discard queued payloads and return their buffers."""
+        while True:
+            try:
+                _, _, lease, _ = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if lease is not None:
+                lease.release()
+
+    def stop(self) -> None:
+        """Stop the sender thread, return queued buffers and close the socket.
+
+        A capture thread may still be sending through the worker after a
+        reload swapped it out; such sends are rejected rather than reopening
+        the socket or queueing buffers nobody releases.
+        """
+        self.stopped = True
+        self.running = False
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self._release_queued()
+        self.forwarder.shutdown()
+
+
+class DestinationPool:
+    """Distribute payloads across destinations.
+
+    In ``fanout`` mode every payload is replicated to all destinations. In
+    ``hash`` mode each flow is pinned to one destination by weighted rendezvous
+    hashing on the flow tuple; destinations whose circuit breaker is open are
+    ejected until they recover.
+
+    With a single destination payloads are sent inline from the capture
+    thread. With several, each destination gets its own worker thread and
+    queue so a slow collector does not delay the others, unless the pool
+    runs on an event loop, where every send is inline and non-blocking.
+    """
+
+    def __init__(
+        self,
+        workers: Sequence[DestinationWorker],
+        mode: str = "fanout",
+        threaded: Optional[bool] = None,
+        weights: Optional[Sequence[float]] = None,
+    ):
+        self.workers = list(workers)
+        self.mode = mode
+        self.threaded = len(self.workers) > 1 if threaded is None else threaded
+        self._no_destination: Shards[List[int]] = Shards(lambda: [0])
+        self.balancer: Optional[RendezvousHash] = None
+        if mode == "hash" and len(self.workers) > 1:
+            self.balancer = RendezvousHash(
+                [w.name for w in self.workers],
+                weights or [w.destination.weight for w in self.workers],
+            )
+
+    @property
+    def no_destination(self) -> int:
+        """Payloads dropped because no destination was healthy."""
+        return sum(count[0] for count in self._no_destination.all)
+
+    def send(
+        self,
+        payload: Payload,
+        meta: Optional[PacketMeta] = None,
+        lease: Optional[BufferLease] = None,
+    ) -> bool:
+        """Hand a payload to its destination(s).
+
+        Returns:
+            True if at least one destination accepted the payload
+        """
+        if len(self.workers) == 1:
+            return self._dispatch(self.workers[0], payload, lease, meta)
+
+        if self.balancer is not None:
+            eligible = tuple(w.healthy for w in self.workers)
+            key = flow_key(meta) if meta is not None else ("", 0, "", 0)
+            index = self.balancer.choose(key, eligible)
+            if index < 0:
+                self._no_destination.get()[0] += 1
+                return False
+            return self._dispatch(self.workers[index], payload, lease, meta)
+
+        accepted = False
+        for worker in self.workers:
+            if self._dispatch(worker, payload, lease, meta):
+                accepted = True
+        return accepted
+
+    def _dispatch(
+        self,
+        worker: DestinationWorker,
+        payload: Payload,
+        lease: Optional[BufferLease],
+        meta: Optional[PacketMeta],
+    ) -> bool:
+        if self.threaded:
+            return worker.offer(payload, lease, meta)
+        return worker.send_now(payload, meta=meta)
+
+    def start(self) -> None:
+        """Start worker threads if running in threaded mode."""
+        if self.threaded:
+            for worker in self.workers:
+                worker.start()
+
+    def stop(self) -> None:
+        """Stop all workers and close their sockets."""
+        for worker in self.workers:
+            worker.stop()
+
+
+def create_forwarder(
+    config: SnifferConfig,
+    destination: Destination,
+    loop: Optional[asyncio.AbstractEventLoop] = None,
+    spill: Optional[SpillQueue] = None,
+) -> Forwarder:
+    """Create a UDP forwarder for a destination using the configured tuning.
+
+    With an event loop the forwarder's retry queue is drained by the loop;
+    with parallel capture threads every thread gets a forwarder of its own.
+    Payloads that expire in the retry queue are stored in ``spill`` if given.
+    """
+    forwarder_class: Callable[..., UdpForwarder] = UdpForwarder
+    if loop is not None:
+        forwarder_class = functools.partial(LoopForwarder, loop)
+    factory = functools.partial(
+        forwarder_class,
+        (destination.ip, destination.port),
+        send_buffer_size=config.send_buffer_size,
+        retry_queue_size=config.retry_queue_size,
+        retry_timeout=config.socket_timeout,
+        breaker_threshold=config.circuit_breaker_threshold,
+        breaker_cooldown=config.circuit_breaker_cooldown,
+        spill=spill.append if spill is not None else None,
+    )
+    if config.capture_threads > 1:
+        return ShardedForwarder(factory)
+    return factory()
+
+
+def describe_destinations(destinations: List[Destination]) -> str:
+    """Human-readable list of destinations for log messages."""
+    return ", ".join(dest.label for dest in destinations)
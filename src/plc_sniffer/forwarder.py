@@ -0,0 +1,493 @@
+"""Resilient UDP forwarding with errno classification and a circuit breaker."""
+
+import asyncio
+import errno
+import logging
+import socket
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, NamedTuple, Optional, Tuple
+
+from .metrics import Shards
+from .packet import Payload
+
+logger = logging.getLogger(__name__)
+
+# What to do when a send fails with a given errno
+RETRY = "retry"  # transient: keep the payload in the retry queue
+DROP = "drop"  # the payload cannot be delivered now: count and drop
+RECONNECT = "reconnect"  # the socket itself is broken: drop and rebuild it
+
+# Delay before retrying a parked payload when the socket is writable but sends fail
+RETRY_BACKOFF = 0.01
+
+# Quiet time after ECONNREFUSED before sends count as breaker successes again.
+# A datagram to a closed port leaves the socket fine and only the following
+# send reports the ICMP port unreachable, so a "successful" send proves
+# nothing until no refusal followed for a while. Longer than Linux's default
+# ICMP rate limit of one error per second.
+REFUSED_HOLD = 1.5
+
+ERRNO_ACTIONS: Dict[int, str] = {
+    errno.EAGAIN: RETRY,
+    errno.EWOULDBLOCK: RETRY,
+    errno.ENOBUFS: RETRY,
+    errno.EINTR: RETRY,
+    # A previous datagram triggered an ICMP port unreachable; the error is
+    # consumed by this send, so the payload can go out on the next attempt.
+    # It still counts as a failure of the destination (see REFUSED_HOLD).
+    errno.ECONNREFUSED: RETRY,
+    errno.EHOSTUNREACH: DROP,
+    errno.ENETUNREACH: DROP,
+    errno.EHOSTDOWN: DROP,
+    errno.EMSGSIZE: DROP,
+    errno.EPERM: DROP,
+    errno.EACCES: DROP,
+    errno.EBADF: RECONNECT,
+    errno.ENOTCONN: RECONNECT,
+    errno.EDESTADDRREQ: RECONNECT,
+    errno.EPIPE: RECONNECT,
+    errno.ENOTSOCK: RECONNECT,
+}
+
+
+def classify_errno(err: Optional[int]) -> str:
+    """Map a socket errno to the retry, drop or reconnect action."""
+    if err is None:
+        return RECONNECT
+    return ERRNO_ACTIONS.get(err, RECONNECT)
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with a cooldown.
+
+    After ``threshold`` consecutive failures the breaker opens and rejects
+    sends for ``cooldown`` seconds. The first send after the cooldown is let
+    through as a probe; its success closes the breaker, its failure reopens it.
+    """
+
+    def __init__(self, threshold: int, cooldown: float):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trips = 0
+
+    @property
+    def is_open(self) -> bool:
+        """Whether the breaker is currently rejecting sends."""
+        return self.opened_at is not None
+
+    @property
+    def available(self) -> bool:
+        """Whether a send would be attempted, without consuming the probe."""
+        return (
+            self.opened_at is None or time.monotonic() - self.opened_at >= self.cooldown
+        )
+
+    def allow(self) -> bool:
+        """Check whether a send may be attempted."""
+        if self.opened_at is None:
+            return True
+        if time.monotonic() - self.opened_at >= self.cooldown:
+            # Half-open: let a probe through, one more failure reopens
+            self.opened_at = None
+            self.failures = self.threshold - 1
+            return True
+        return False
+
+    def record_success(self) -> None:
+        """Record a successful send."""
+        self.failures = 0
+
+    def record_failure(self) -> None:
+        """Record a failed send and open the breaker if over threshold."""
+        if self.threshold <= 0:
+            return
+        self.failures += 1
+        if self.failures >= self.threshold and self.opened_at is None:
+            self.opened_at = time.monotonic()
+            self.trips += 1
+            logger.warning(
+                f"Circuit breaker opened after {self.failures} consecutive "
+                f"failures, cooling down for {self.cooldown}s"
+            )
+
+
+class ForwarderStats:
+    """Per-outcome counters of a forwarder."""
+
+    OUTCOMES = (
+        "sent",
+        "retry_queued",
+        "retry_sent",
+        "retry_overflow",
+        "retry_expired",
+        "retry_spilled",
+        "refused",
+        "dropped",
+        "reconnects",
+        "circuit_rejected",
+    )
+
+    def __init__(self) -> None:
+        self.sent = 0
+        self.retry_queued = 0
+        self.retry_sent = 0
+        self.retry_overflow = 0
+        self.retry_expired = 0
+        self.retry_spilled = 0
+        self.refused = 0
+        self.dropped = 0
+        self.reconnects = 0
+        self.circuit_rejected = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        """Return all counters keyed by outcome name."""
+        return {name: getattr(self, name) for name in self.OUTCOMES}
+
+
+class UdpForwarder:
+    """Forward payloads through a non-blocking connected UDP socket.
+
+    Send failures are classified by errno instead of tearing the socket down
+    on every error: transient conditions (``EAGAIN``, ``ENOBUFS``, a pending
+    ICMP port unreachable) park the payload in a short retry queue that is
+    drained before the next send, undeliverable payloads are dropped, and only
+    a broken socket is rebuilt. A circuit breaker stops hammering a destination
+    that keeps failing; a closed collector port counts as failing even though
+    the individual sends appear to succeed. With a ``spill`` callback, parked
+    payloads that expire or are still parked at shutdown are handed to it
+    (usually :meth:`SpillQueue.append`) instead of being lost.
+    """
+
+    def __init__(
+        self,
+        destination: Tuple[str, int],
+        send_buffer_size: int = 1048576,
+        retry_queue_size: int = 1024,
+        retry_timeout: float = 5.0,
+        breaker_threshold: int = 50,
+        breaker_cooldown: float = 5.0,
+        spill: Optional[Callable[[bytes], bool]] = None,
+    ):
+        self.destination = destination
+        self.spill = spill
+        self.send_buffer_size = send_buffer_size
+        self.retry_timeout = retry_timeout
+        self.stats = ForwarderStats()
+        self.breaker = CircuitBreaker(breaker_threshold, breaker_cooldown)
+        self.socket: Optional[socket.socket] = None
+
+        self._retry: Deque[Tuple[bytes, float]] = deque()
+        self._retry_size = retry_queue_size
+        self._refused_at: Optional[float] = None  # last ECONNREFUSED
+        self.closed = False  # set by shutdown(); no socket is opened afterwards
+
+    @property
+    def pending(self) -> int:
+        """Number of payloads waiting in the retry queue."""
+        return len(self._retry)
+
+    def _create_socket(self) -> socket.socket:
+        """Create a non-blocking UDP socket connected to the destination."""
+        family = socket.AF_INET6 if ":" in self.destination[0] else socket.AF_INET
+        sock = socket.socket(family, socket.SOCK_DGRAM)
+        sock.setblocking(False)
+        if self.send_buffer_size > 0:
+            try:
+                sock.setsockopt(
+                    socket.SOL_SOCKET, socket.SO_SNDBUF, self.send_buffer_size
+                )
+            except OSError as e:
+                logger.warning(
+                    f"Could not set SO_SNDBUF to {self.send_buffer_size}: {e}"
+                )
+        sock.connect(self.destination)
+        return sock
+
+    def _open_socket(self) -> Optional[socket.socket]:
+        """Create the socket, unless the forwarder was shut down meanwhile."""
+        sock = self._create_socket()
+        self.socket = sock
+        if self.closed:
+            # shutdown() ran concurrently and may have missed this socket
+            sock.close()
+            self.socket = None
+            return None
+        return sock
+
+    def _reconnect(self) -> None:
+        """Rebuild the socket after it became unusable."""
+        self.stats.reconnects += 1
+        self.close()
+        try:
+            if self._open_socket() is None:
+                return
+            logger.info(
+                f"Forwarding socket to {self.destination[0]}:{self.destination[1]} "
+                "reconnected"
+            )
+        except OSError as e:
+            logger.error(f"Failed to reconnect forwarding socket: {e}")
+            self.socket = None
+
+    def _enqueue(self, payload: Payload) -> bool:
+        if len(self._retry) >= self._retry_size:
+            self.stats.retry_overflow += 1
+            return False
+        self._retry.append((bytes(payload), time.monotonic()))
+        self.stats.retry_queued += 1
+        return True
+
+    def _discard(self, payload: bytes) -> bool:
+        """Hand a parked payload that will not be retried to the spill callback."""
+        if self.spill is not None and self.spill(payload):
+            self.stats.retry_spilled += 1
+            return True
+        return False
+
+    def _record_success(self) -> None:
+        """Count a send towards closing the breaker, unless a refusal is recent."""
+        if self._refused_at is not None:
+            if time.monotonic() - self._refused_at < REFUSED_HOLD:
+                return
+            self._refused_at = None
+        self.breaker.record_success()
+
+    def _handle_error(self, e: OSError) -> str:
+        action = classify_errno(e.errno)
+        self.breaker.record_failure()
+        if e.errno == errno.ECONNREFUSED:
+            self.stats.refused += 1
+            self._refused_at = time.monotonic()
+        if action == DROP:
+            logger.debug(f"Dropping payload for {self.destination}: {e}")
+        elif action == RECONNECT:
+            logger.error(f"Socket error while forwarding: {e}")
+            self._reconnect()
+        return action
+
+    def flush(self) -> None:
+        """Try to send payloads parked in the retry queue, oldest first."""
+        if self.socket is None:
+            return
+        deadline = time.monotonic() - self.retry_timeout
+        while self._retry:
+            payload, queued_at = self._retry[0]
+            if queued_at < deadline:
+                self._retry.popleft()
+                if not self._discard(payload):
+                    self.stats.retry_expired += 1
+                continue
+            try:
+                self.socket.send(payload)
+            except OSError as e:
+                action = self._handle_error(e)
+                if action == RETRY:
+                    return
+                self._retry.popleft()
+                self.stats.dropped += 1
+                if self.socket is None:
+                    return
+                continue
+            self._retry.popleft()
+            self.stats.retry_sent += 1
+            self._record_success()
+
+    def send(self, payload: Payload) -> bool:
+        """Send a payload or park it for retry.
+
+        Args:
+            payload: Datagram payload
+
+        Returns:
+            True if the payload was sent or queued for retry, False if dropped
+        """
+        if self.closed:
+            return False
+        if not self.breaker.allow():
+            self.stats.circuit_rejected += 1
+            return False
+
+        if self.socket is None:
+            try:
+                if self._open_socket() is None:
+                    return False
+            except OSError as e:
+                logger.error(f"Failed to create forwarding socket: {e}")
+                self.breaker.record_failure()
+                self.stats.dropped += 1
+                return False
+
+        if self._retry:
+            self.flush()
+            if self._retry:
+                # Keep ordering: new payloads queue up behind pending ones
+                return self._enqueue(payload)
+
+        sock = self.socket
+        if sock is None:
+            # A retried payload broke the socket and it could not be rebuilt
+            self.stats.dropped += 1
+            return False
+
+        try:
+            sock.send(payload)
+        except OSError as e:
+            if self._handle_error(e) == RETRY:
+                return self._enqueue(payload)
+            self.stats.dropped += 1
+            return False
+
+        self.stats.sent += 1
+        self._record_success()
+        return True
+
+    def close(self) -> None:
+        """Close the socket. Pending retries are kept for the next socket."""
+        if self.socket is not None:
+            try:
+                self.socket.close()
+            except OSError as e:
+                logger.error(f"Error closing socket: {e}")
+            self.socket = None
+
+    def shutdown(self) -> None:
+        """Close the socket for good; later sends are rejected without reopening it.
+
+        Payloads still parked for retry go to the spill callback, if any.
+        """
+        self.closed = True
+        self.close()
+        while True:
+            try:
+                payload, _ = self._retry.popleft()
+            except IndexError:
+                break
+            if not self._discard(payload):
+                self.stats.dropped += 1
+
+
+class LoopForwarder(UdpForwarder):
+    """:class:`UdpForwarder` whose retry queue is drained by an asyncio loop.
+
+    The socket stays non-blocking and connected, with the same errno
+    handling and circuit breaker. While payloads are parked, the socket is
+    watched with ``loop.add_writer`` and the queue is flushed as soon as the
+    kernel accepts data again, instead of on the next send. All methods must
+    be called from the loop's thread.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.loop = loop
+        self._watched: Optional[int] = None
+        self._rewatch: Optional[asyncio.TimerHandle] = None
+
+    def _enqueue(self, payload: Payload) -> bool:
+        queued = super()._enqueue(payload)
+        self._watch()
+        return queued
+
+    def flush(self) -> None:
+        """Send parked payloads; keep watching the socket while any are left."""
+        before = len(self._retry)
+        super().flush()
+        if not self._retry:
+            self._unwatch()
+        elif len(self._retry) == before:
+            # Writable but still failing (ENOBUFS): back off instead of spinning
+            self._unwatch()
+            self._rewatch = self.loop.call_later(RETRY_BACKOFF, self._watch)
+        else:
+            self._watch()
+
+    def _watch(self) -> None:
+        self._rewatch = None
+        if self.socket is None or self._watched is not None:
+            return
+        self._watched = self.socket.fileno()
+        self.loop.add_writer(self._watched, self.flush)
+
+    def _unwatch(self) -> None:
+        if self._rewatch is not None:
+            self._rewatch.cancel()
+            self._rewatch = None
+        if self._watched is not None:
+            self.loop.remove_writer(self._watched)
+            self._watched = None
+
+    def close(self) -> None:
+        """Stop watching and close the socket."""
+        self._unwatch()
+        super().close()
+
+
+class BreakerSummary(NamedTuple):
+    """Combined circuit breaker state of a :class:`ShardedForwarder`."""
+
+    is_open: bool
+    available: bool
+    trips: int
+
+
+class ShardedForwarder:
+    """One :class:`UdpForwarder` per sending thread.
+
+    Parallel capture threads each send through their own socket, retry queue
+    and circuit breaker, so forwarding takes no lock and the threads never
+    share a socket. Counters are summed when read; the destination counts as
+    available while any thread's breaker lets traffic through.
+    """
+
+    def __init__(self, factory: Callable[[], UdpForwarder]):
+        self.shards: Shards[UdpForwarder] = Shards(factory)
+        self.closed = False
+
+    @property
+    def pending(self) -> int:
+        """Payloads waiting in the retry queues of all threads."""
+        return sum(forwarder.pending for forwarder in self.shards.all)
+
+    @property
+    def stats(self) -> ForwarderStats:
+        """Outcome counters summed over all threads."""
+        total = ForwarderStats()
+        for forwarder in self.shards.all:
+            for name, count in forwarder.stats.as_dict().items():
+                setattr(total, name, getattr(total, name) + count)
+        return total
+
+    @property
+    def breaker(self) -> BreakerSummary:
+        """Combined state of the per-thread circuit breakers."""
+        breakers = [forwarder.breaker for forwarder in self.shards.all]
+        return BreakerSummary(
+            any(b.is_open for b in breakers),
+            not breakers or any(b.available for b in breakers),
+            sum(b.trips for b in breakers),
+        )
+
+    def send(self, payload: Payload) -> bool:
+        """Send through the calling thread's forwarder."""
+        forwarder = self.shards.get()
+        if self.closed and not forwarder.closed:
+            # Created by a thread that first sent after shutdown()
+            forwarder.shutdown()
+        return forwarder.send(payload)
+
+    def flush(self) -> None:
+        """Flush the calling thread's retry queue."""
+        self.shards.get().flush()
+
+    def close(self) -> None:
+        """Close the sockets of all threads."""
+        for forwarder in self.shards.all:
+            forwarder.close()
+
+    def shutdown(self) -> None:
+        """Close the sockets of all threads for good."""
+        self.closed = True
+        for forwarder in self.shards.all:
+            forwarder.shutdown()
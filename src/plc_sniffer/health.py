@@ -1,156 +1,1219 @@
 """Health check and monitoring server for PLC Sniffer."""
 
+import gc
+import io
+import ipaddress
 import json
 import logging
 import threading
 import time
 from datetime import datetime
-from http.server import BaseHTTPRequestHandler, HTTPServer
-from typing import Optional, Dict, Any
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple, Union
+from urllib.parse import parse_qs, urlsplit
 
+from .cycles import CycleTracker, ShardedCycleTracker
+from .fanout import DestinationWorker
+from .mirror import MirrorSocket
+from .profiler import StackSampler
+from .runtime import GC_MONITOR
+from .scheduler import ClassScheduler
 from .sniffer import PlcSniffer
-
+from .spill import SpillQueue
 
 logger = logging.getLogger(__name__)
 
 
 class HealthCheckHandler(BaseHTTPRequestHandler):
     """HTTP request handler for health checks and metrics."""
-    
+
     sniffer: Optional[PlcSniffer] = None
     start_time: float = time.time()
-    
+    profile_lock = threading.Lock()  # one profile at a time
+
+    @classmethod
+    def respond(cls, request: bytes, client_address: Tuple[str, int]) -> bytes:
+        """Handle one buffered request and return the raw HTTP response.
+
+        Lets the asyncio runtime serve the same endpoints from its own
+        server without a thread or a socket per handler.
+        """
+        handler = cls.__new__(cls)
+        handler.rfile = io.BytesIO(request)
+        handler.wfile = io.BytesIO()
+        handler.client_address = client_address
+        handler.close_connection = True
+        handler.handle_one_request()
+        return handler.wfile.getvalue()
+
     def do_GET(self) -> None:
         """Handle GET requests."""
-        if self.path == '/health':
+        if self.path == "/health":
             self._handle_health()
-        elif self.path == '/ready':
+        elif self.path == "/ready":
             self._handle_ready()
-        elif self.path == '/metrics':
+        elif self.path == "/metrics":
             self._handle_metrics()
+        elif self.path == "/cycles":
+            self._handle_cycles()
+        elif urlsplit(self.path).path == "/debug/profile":
+            self._handle_profile()
+        else:
+            self.send_error(404)
+
+    def do_POST(self) -> None:
+        """Handle POST requests."""
+        if self.path == "/reload":
+            self._handle_reload()
         else:
             self.send_error(404)
-    
+
+    def _handle_reload(self) -> None:
+        """Re-read configuration and apply it without restarting capture.
+
+        Only answered on the loopback interface: a reload re-attaches the
+        capture filter and swaps the rate limiter.
+        """
+        if not ipaddress.ip_address(self.client_address[0]).is_loopback:
+            self.send_error(403, "Reloading is only available from localhost")
+            return
+        if not self.sniffer:
+            self.send_error(503, "Service not initialized")
+            return
+
+        result = self.sniffer.reload_from_environment()
+        self.send_response(200 if result["result"] == "success" else 422)
+        self.send_header("Content-Type", "application/json")
+        self.end_headers()
+        self.wfile.write(json.dumps(result).encode())
+
     def _handle_health(self) -> None:
         """Liveness probe - is the service running?"""
         self.send_response(200)
-        self.send_header('Content-Type', 'application/json')
+        self.send_header("Content-Type", "application/json")
         self.end_headers()
-        
+
         response = {
-            'status': 'healthy',
-            'timestamp': datetime.utcnow().isoformat(),
-            'uptime': time.time() - self.start_time
+            "status": "healthy",
+            "timestamp": datetime.utcnow().isoformat(),
+            "uptime": time.time() - self.start_time,
         }
-        
+
         self.wfile.write(json.dumps(response).encode())
-    
+
     def _handle_ready(self) -> None:
         """Readiness probe - is the service ready to accept traffic?"""
+        if (
+            self.sniffer
+            and self.sniffer.running
+            and self.sniffer.config.max_capture_loss
+        ):
+            self.sniffer.poll_capture_stats()
+            if self.sniffer.capture_loss_exceeded:
+                self.send_error(503, "Capture loss above threshold")
+                return
+
         if self.sniffer and self.sniffer.running:
             self.send_response(200)
-            self.send_header('Content-Type', 'application/json')
+            self.send_header("Content-Type", "application/json")
             self.end_headers()
-            
-            response = {
-                'status': 'ready',
-                'timestamp': datetime.utcnow().isoformat()
-            }
-            
+
+            response = {"status": "ready", "timestamp": datetime.utcnow().isoformat()}
+
             self.wfile.write(json.dumps(response).encode())
         else:
-            self.send_error(503, 'Service not ready')
-    
+            self.send_error(503, "Service not ready")
+
+    def _handle_profile(self) -> None:
+        """Sample the capture threads for ``seconds`` and return their stacks.
+
+        Disabled unless ``PROFILE_MAX_SECONDS`` is set, and only answered on
+        the loopback interface.
+        """
+        if not self.sniffer or not self.sniffer.config.profile_max_seconds:
+            self.send_error(404)
+            return
+        if not ipaddress.ip_address(self.client_address[0]).is_loopback:
+            self.send_error(403, "Profiling is only available from localhost")
+            return
+
+        limit = self.sniffer.config.profile_max_seconds
+        query = parse_qs(urlsplit(self.path).query)
+        try:
+            seconds = float(query.get("seconds", ["10"])[0])
+        except ValueError:
+            seconds = 0
+        if not 0 < seconds <= limit:
+            self.send_error(400, f"seconds must be between 0 and {limit}")
+            return
+        if not self.sniffer.capture_thread_ids:
+            self.send_error(503, "Capture is not running")
+            return
+        if not self.profile_lock.acquire(blocking=False):
+            self.send_error(409, "A profile is already running")
+            return
+
+        try:
+            logger.info(f"Profiling capture threads for {seconds:g}s")
+            sampler = StackSampler(self.sniffer.capture_thread_ids)
+            sampler.run(seconds)
+        finally:
+            self.profile_lock.release()
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.end_headers()
+
+        response = {
+            "seconds": round(sampler.duration, 3),
+            "samples": sampler.samples,
+            "collapsed": sampler.collapsed(),
+            "summary": sampler.summary(),
+        }
+
+        self.wfile.write(json.dumps(response).encode())
+
+    def _handle_cycles(self) -> None:
+        """Per-flow cycle time and jitter, highest jitter first."""
+        if not self.sniffer:
+            self.send_error(503, "Service not initialized")
+            return
+        cycles = self.sniffer.cycles
+        if cycles is None:
+            self.send_error(404, "Cycle tracking disabled")
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.end_headers()
+
+        response = {
+            "timestamp": datetime.utcnow().isoformat(),
+            "buckets": list(cycles.buckets),
+            "tracked": cycles.tracked,
+            "evicted": cycles.evicted,
+            "untracked": cycles.untracked,
+            "flows": [
+                {
+                    "flow": flow.flow,
+                    "packets": flow.packets,
+                    "mean_seconds": flow.mean,
+                    "stddev_seconds": flow.stddev,
+                    "max_seconds": flow.max,
+                    "histogram": flow.histogram,
+                }
+                for flow in cycles.flows()
+            ],
+        }
+
+        self.wfile.write(json.dumps(response).encode())
+
     def _handle_metrics(self) -> None:
         """Prometheus-style metrics endpoint."""
         if not self.sniffer:
-            self.send_error(503, 'Service not initialized')
+            self.send_error(503, "Service not initialized")
             return
-        
+
         self.send_response(200)
-        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
         self.end_headers()
-        
+
+        self.sniffer.poll_capture_stats()
         stats = self.sniffer.stats
         uptime = time.time() - self.start_time
-        
+
         metrics = [
-            '# HELP plc_sniffer_uptime_seconds Time since service started',
-            '# TYPE plc_sniffer_uptime_seconds gauge',
-            f'plc_sniffer_uptime_seconds {uptime:.2f}',
-            '',
-            '# HELP plc_sniffer_packets_processed_total Total packets processed',
-            '# TYPE plc_sniffer_packets_processed_total counter',
-            f'plc_sniffer_packets_processed_total {stats.packets_processed}',
-            '',
-            '# HELP plc_sniffer_packets_forwarded_total Total packets forwarded',
-            '# TYPE plc_sniffer_packets_forwarded_total counter',
-            f'plc_sniffer_packets_forwarded_total {stats.packets_forwarded}',
-            '',
-            '# HELP plc_sniffer_packets_dropped_total Total packets dropped',
-            '# TYPE plc_sniffer_packets_dropped_total counter',
-            f'plc_sniffer_packets_dropped_total {stats.packets_dropped}',
-            '',
-            '# HELP plc_sniffer_packets_rate_limited_total Packets dropped due to rate limit',
-            '# TYPE plc_sniffer_packets_rate_limited_total counter',
-            f'plc_sniffer_packets_rate_limited_total {stats.rate_limited}',
-            '',
-            '# HELP plc_sniffer_packets_oversized_total Packets dropped due to size',
-            '# TYPE plc_sniffer_packets_oversized_total counter',
-            f'plc_sniffer_packets_oversized_total {stats.oversized}',
-            '',
-            '# HELP plc_sniffer_errors_total Total errors encountered',
-            '# TYPE plc_sniffer_errors_total counter',
-            f'plc_sniffer_errors_total {stats.errors}',
-            '',
-            '# HELP plc_sniffer_bytes_forwarded_total Total bytes forwarded',
-            '# TYPE plc_sniffer_bytes_forwarded_total counter',
-            f'plc_sniffer_bytes_forwarded_total {stats.bytes_forwarded}',
-            '',
-            '# HELP plc_sniffer_current_packet_rate Current packets per second',
-            '# TYPE plc_sniffer_current_packet_rate gauge',
-            f'plc_sniffer_current_packet_rate {stats.get_current_rate():.2f}',
+            "# HELP plc_sniffer_uptime_seconds Time since service started",
+            "# TYPE plc_sniffer_uptime_seconds gauge",
+            f"plc_sniffer_uptime_seconds {uptime:.2f}",
+            "",
+            "# HELP plc_sniffer_packets_processed_total Total packets processed",
+            "# TYPE plc_sniffer_packets_processed_total counter",
+            f"plc_sniffer_packets_processed_total {stats.packets_processed}",
+            "",
+            "# HELP plc_sniffer_packets_forwarded_total Total packets forwarded",
+            "# TYPE plc_sniffer_packets_forwarded_total counter",
+            f"plc_sniffer_packets_forwarded_total {stats.packets_forwarded}",
+            "",
+            "# HELP plc_sniffer_packets_dropped_total Total packets dropped",
+            "# TYPE plc_sniffer_packets_dropped_total counter",
+            f"plc_sniffer_packets_dropped_total {stats.packets_dropped}",
+            "",
+            (
+                "# HELP plc_sniffer_packets_rate_limited_total Packets dropped due to "
+                "rate limit"
+            ),
+            "# TYPE plc_sniffer_packets_rate_limited_total counter",
+            f"plc_sniffer_packets_rate_limited_total {stats.rate_limited}",
+            "",
+            "# HELP plc_sniffer_packets_oversized_total Packets dropped due to size",
+            "# TYPE plc_sniffer_packets_oversized_total counter",
+            f"plc_sniffer_packets_oversized_total {stats.oversized}",
+            "",
+            (
+                "# HELP plc_sniffer_packets_sampled_out_total Packets left out by "
+                "flow sampling"
+            ),
+            "# TYPE plc_sniffer_packets_sampled_out_total counter",
+            f"plc_sniffer_packets_sampled_out_total {stats.sampled_out}",
+            "",
+            (
+                "# HELP plc_sniffer_sampling_rate Expected share of packets kept by "
+                "sampling; scale counts by its inverse"
+            ),
+            "# TYPE plc_sniffer_sampling_rate gauge",
+            f"plc_sniffer_sampling_rate {self.sniffer.config.sample_rate:g}",
+            "",
+            "# HELP plc_sniffer_errors_total Total errors encountered",
+            "# TYPE plc_sniffer_errors_total counter",
+            f"plc_sniffer_errors_total {stats.errors}",
+            "",
+            "# HELP plc_sniffer_bytes_forwarded_total Total bytes forwarded",
+            "# TYPE plc_sniffer_bytes_forwarded_total counter",
+            f"plc_sniffer_bytes_forwarded_total {stats.bytes_forwarded}",
+            "",
+            "# HELP plc_sniffer_current_packet_rate Current packets per second",
+            "# TYPE plc_sniffer_current_packet_rate gauge",
+            f"plc_sniffer_current_packet_rate {stats.get_current_rate():.2f}",
+        ]
+
+        capture = stats.capture
+        if capture.available:
+            metrics.extend(
+                [
+                    "",
+                    (
+                        "# HELP plc_sniffer_kernel_packets_received_total Frames seen "
+                        "by the kernel capture socket, including drops"
+                    ),
+                    "# TYPE plc_sniffer_kernel_packets_received_total counter",
+                    f"plc_sniffer_kernel_packets_received_total {capture.received}",
+                    "",
+                    (
+                        "# HELP plc_sniffer_kernel_packets_dropped_total Frames "
+                        "dropped by the kernel before reaching the sniffer"
+                    ),
+                    "# TYPE plc_sniffer_kernel_packets_dropped_total counter",
+                    f"plc_sniffer_kernel_packets_dropped_total {capture.dropped}",
+                    "",
+                    (
+                        "# HELP plc_sniffer_kernel_freeze_queue_total Times the "
+                        "TPACKET_V3 ring queue was frozen"
+                    ),
+                    "# TYPE plc_sniffer_kernel_freeze_queue_total counter",
+                    f"plc_sniffer_kernel_freeze_queue_total {capture.freeze_queue}",
+                    "",
+                    (
+                        "# HELP plc_sniffer_capture_loss_ratio Fraction of captured "
+                        "frames dropped by the kernel"
+                    ),
+                    "# TYPE plc_sniffer_capture_loss_ratio gauge",
+                    f"plc_sniffer_capture_loss_ratio {capture.loss_ratio:.6f}",
+                    "",
+                    (
+                        "# HELP plc_sniffer_capture_loss_ratio_recent Capture loss "
+                        "between the last two polls"
+                    ),
+                    "# TYPE plc_sniffer_capture_loss_ratio_recent gauge",
+                    (
+                        "plc_sniffer_capture_loss_ratio_recent "
+                        f"{capture.recent_loss_ratio:.6f}"
+                    ),
+                ]
+            )
+
+        metrics.extend(
+            [
+                "",
+                (
+                    "# HELP plc_sniffer_config_reloads_total Configuration reloads by "
+                    "result"
+                ),
+                "# TYPE plc_sniffer_config_reloads_total counter",
+            ]
+        )
+        metrics.extend(
+            f'plc_sniffer_config_reloads_total{{result="{result}"}} {count}'
+            for result, count in self.sniffer.reloads.items()
+        )
+        last_reload = self.sniffer.last_reload
+        if last_reload is not None:
+            metrics.extend(
+                [
+                    "",
+                    (
+                        "# HELP plc_sniffer_config_reload_duration_seconds Duration "
+                        "of the last configuration reload"
+                    ),
+                    "# TYPE plc_sniffer_config_reload_duration_seconds gauge",
+                    (
+                        "plc_sniffer_config_reload_duration_seconds "
+                        f'{last_reload["duration_seconds"]:.6f}'
+                    ),
+                    "",
+                    (
+                        "# HELP plc_sniffer_config_reload_success Whether the last "
+                        "configuration reload succeeded"
+                    ),
+                    "# TYPE plc_sniffer_config_reload_success gauge",
+                    (
+                        "plc_sniffer_config_reload_success "
+                        f'{int(last_reload["result"] == "success")}'
+                    ),
+                ]
+            )
+
+        metrics.extend(
+            [
+                "",
+                "# HELP plc_sniffer_gc_pause_seconds Duration of garbage collections",
+                "# TYPE plc_sniffer_gc_pause_seconds histogram",
+            ]
+        )
+        for generation, pauses in enumerate(GC_MONITOR.pauses):
+            metrics.extend(
+                pauses.render(
+                    "plc_sniffer_gc_pause_seconds", {"generation": str(generation)}
+                )
+            )
+        metrics.extend(
+            [
+                "",
+                (
+                    "# HELP plc_sniffer_gc_frozen_objects Objects excluded from "
+                    "collection by gc.freeze()"
+                ),
+                "# TYPE plc_sniffer_gc_frozen_objects gauge",
+                f"plc_sniffer_gc_frozen_objects {gc.get_freeze_count()}",
+            ]
+        )
+        collector = self.sniffer.gc_collector
+        if collector is not None:
+            metrics.extend(
+                [
+                    "",
+                    (
+                        "# HELP plc_sniffer_gc_scheduled_collections_total "
+                        "Collections run by the idle collector"
+                    ),
+                    "# TYPE plc_sniffer_gc_scheduled_collections_total counter",
+                    (
+                        f'plc_sniffer_gc_scheduled_collections_total{{trigger="idle"}} '
+                        f"{collector.idle_collections}"
+                    ),
+                    (
+                        "plc_sniffer_gc_scheduled_collections_total"
+                        f'{{trigger="forced"}} {collector.forced_collections}'
+                    ),
+                ]
+            )
+
+        reassembler = self.sniffer.reassembler
+        if reassembler is not None:
+            metrics.extend(
+                [
+                    "",
+                    (
+                        "# HELP plc_sniffer_reassembly_fragments_total IP fragments "
+                        "received for reassembly"
+                    ),
+                    "# TYPE plc_sniffer_reassembly_fragments_total counter",
+                    f"plc_sniffer_reassembly_fragments_total {reassembler.fragments}",
+                    "",
+                    (
+                        "# HELP plc_sniffer_reassembly_datagrams_total Datagrams "
+                        "reassembled from fragments"
+                    ),
+                    "# TYPE plc_sniffer_reassembly_datagrams_total counter",
+                    f"plc_sniffer_reassembly_datagrams_total {reassembler.reassembled}",
+                    "",
+                    (
+                        "# HELP plc_sniffer_reassembly_timeouts_total Incomplete "
+                        "datagrams expired by the reassembly timeout"
+                    ),
+                    "# TYPE plc_sniffer_reassembly_timeouts_total counter",
+                    f"plc_sniffer_reassembly_timeouts_total {reassembler.timeouts}",
+                    "",
+                    (
+                        "# HELP plc_sniffer_reassembly_evictions_total Incomplete "
+                        "datagrams evicted to free a buffer"
+                    ),
+                    "# TYPE plc_sniffer_reassembly_evictions_total counter",
+                    f"plc_sniffer_reassembly_evictions_total {reassembler.evictions}",
+                    "",
+                    (
+                        "# HELP plc_sniffer_reassembly_dropped_total Fragmented "
+                        "datagrams discarded"
+                    ),
+                    "# TYPE plc_sniffer_reassembly_dropped_total counter",
+                ]
+            )
+            metrics.extend(
+                f'plc_sniffer_reassembly_dropped_total{{reason="{reason}"}} {count}'
+                for reason, count in reassembler.dropped.items()
+            )
+            metrics.extend(
+                [
+                    "",
+                    (
+                        "# HELP plc_sniffer_reassembly_pending Datagrams waiting for "
+                        "fragments"
+                    ),
+                    "# TYPE plc_sniffer_reassembly_pending gauge",
+                    f"plc_sniffer_reassembly_pending {reassembler.pending}",
+                    "",
+                    (
+                        "# HELP plc_sniffer_reassembly_buffered_bytes Fragment bytes "
+                        "held for incomplete datagrams"
+                    ),
+                    "# TYPE plc_sniffer_reassembly_buffered_bytes gauge",
+                    (
+                        "plc_sniffer_reassembly_buffered_bytes "
+                        f"{reassembler.buffered_bytes}"
+                    ),
+                ]
+            )
+
+        pool = self.sniffer.buffer_pool
+        if pool is not None:
+            metrics.extend(
+                [
+                    "",
+                    (
+                        "# HELP plc_sniffer_buffer_pool_acquired_total Receive "
+                        "buffers checked out of the pool"
+                    ),
+                    "# TYPE plc_sniffer_buffer_pool_acquired_total counter",
+                    f"plc_sniffer_buffer_pool_acquired_total {pool.acquired}",
+                    "",
+                    (
+                        "# HELP plc_sniffer_buffer_pool_reused_total Receive buffers "
+                        "reused after being returned"
+                    ),
+                    "# TYPE plc_sniffer_buffer_pool_reused_total counter",
+                    f"plc_sniffer_buffer_pool_reused_total {pool.reused}",
+                    "",
+                    (
+                        "# HELP plc_sniffer_buffer_pool_exhausted_total Receives that "
+                        "found the pool empty and allocated"
+                    ),
+                    "# TYPE plc_sniffer_buffer_pool_exhausted_total counter",
+                    f"plc_sniffer_buffer_pool_exhausted_total {pool.exhausted}",
+                    "",
+                    (
+                        "# HELP plc_sniffer_buffer_pool_in_use Receive buffers held "
+                        "by capture or send queues"
+                    ),
+                    "# TYPE plc_sniffer_buffer_pool_in_use gauge",
+                    f"plc_sniffer_buffer_pool_in_use {pool.in_use}",
+                    "",
+                    (
+                        "# HELP plc_sniffer_buffer_pool_available Receive buffers "
+                        "ready for reuse"
+                    ),
+                    "# TYPE plc_sniffer_buffer_pool_available gauge",
+                    f"plc_sniffer_buffer_pool_available {pool.available}",
+                ]
+            )
+            capture_sockets = self.sniffer.capture_sockets
+            if capture_sockets:
+                truncated = sum(
+                    capture_socket.truncated for capture_socket in capture_sockets
+                )
+                metrics.extend(
+                    [
+                        "",
+                        (
+                            "# HELP plc_sniffer_capture_truncated_total Frames larger "
+                            "than a receive buffer"
+                        ),
+                        "# TYPE plc_sniffer_capture_truncated_total counter",
+                        f"plc_sniffer_capture_truncated_total {truncated}",
+                    ]
+                )
+            if (
+                self.sniffer.config.capture_engine == "mirror"
+                and self.sniffer.capture_socket is not None
+            ):
+                metrics.extend(self._mirror_metrics(self.sniffer.capture_socket))
+
+        counters = self.sniffer.pipeline.counters()
+        for counter, help_text in (
+            ("batches", "Batches a pipeline stage processed"),
+            ("packets", "Datagrams passed to a pipeline stage"),
+            ("dropped", "Datagrams a pipeline stage dropped"),
+            ("errors", "Batches lost to an exception in a pipeline stage"),
+        ):
+            metrics.extend(
+                [
+                    "",
+                    f"# HELP plc_sniffer_pipeline_{counter}_total {help_text}",
+                    f"# TYPE plc_sniffer_pipeline_{counter}_total counter",
+                ]
+            )
+            metrics.extend(
+                (
+                    f'plc_sniffer_pipeline_{counter}_total{{stage="{stage}"}} '
+                    f"{values[counter]}"
+                )
+                for stage, values in counters.items()
+            )
+
+        stage_timer = self.sniffer.stage_timer
+        if stage_timer is not None:
+            metrics.extend(
+                [
+                    "",
+                    (
+                        "# HELP plc_sniffer_stage_seconds Time spent per pipeline "
+                        f"stage, 1 in {stage_timer.every} batches"
+                    ),
+                    "# TYPE plc_sniffer_stage_seconds histogram",
+                ]
+            )
+            for stage, histogram in stage_timer.histograms().items():
+                metrics.extend(
+                    histogram.render("plc_sniffer_stage_seconds", {"stage": stage})
+                )
+
+        scheduler = self.sniffer.scheduler
+        if scheduler is not None:
+            metrics.extend(self._class_metrics(scheduler))
+
+        if self.sniffer.spills:
+            metrics.extend(self._spill_metrics(self.sniffer.spills))
+
+        adaptive = self.sniffer.adaptive
+        if adaptive is not None:
+            metrics.extend(
+                [
+                    "",
+                    (
+                        "# HELP plc_sniffer_adaptive_rate Forwarding rate currently "
+                        "permitted by the adaptive limit"
+                    ),
+                    "# TYPE plc_sniffer_adaptive_rate gauge",
+                    f"plc_sniffer_adaptive_rate {adaptive.rate:.0f}",
+                    "",
+                    (
+                        "# HELP plc_sniffer_adaptive_rate_increases_total Additive "
+                        "rate increases"
+                    ),
+                    "# TYPE plc_sniffer_adaptive_rate_increases_total counter",
+                    f"plc_sniffer_adaptive_rate_increases_total {adaptive.increases}",
+                    "",
+                    (
+                        "# HELP plc_sniffer_adaptive_rate_decreases_total "
+                        "Multiplicative rate cuts by congestion signal"
+                    ),
+                    "# TYPE plc_sniffer_adaptive_rate_decreases_total counter",
+                ]
+            )
+            metrics.extend(
+                (
+                    f'plc_sniffer_adaptive_rate_decreases_total{{reason="{reason}"}} '
+                    f"{count}"
+                )
+                for reason, count in adaptive.decreases.items()
+            )
+
+        cycles = self.sniffer.cycles
+        if cycles is not None:
+            metrics.extend(
+                self._cycle_metrics(cycles, self.sniffer.config.cycle_metrics_flows)
+            )
+
+        ring = self.sniffer.ring
+        if ring is not None:
+            metrics.extend(
+                [
+                    "",
+                    (
+                        "# HELP plc_sniffer_ring_records_written_total Records "
+                        "published to the shared-memory ring"
+                    ),
+                    "# TYPE plc_sniffer_ring_records_written_total counter",
+                    f"plc_sniffer_ring_records_written_total {ring.records_written}",
+                    "",
+                    (
+                        "# HELP plc_sniffer_ring_dropped_total Payloads too large for "
+                        "a ring slot"
+                    ),
+                    "# TYPE plc_sniffer_ring_dropped_total counter",
+                    f"plc_sniffer_ring_dropped_total {ring.dropped}",
+                    "",
+                    (
+                        "# HELP plc_sniffer_ring_write_sequence Sequence number of "
+                        "the last published record"
+                    ),
+                    "# TYPE plc_sniffer_ring_write_sequence gauge",
+                    f"plc_sniffer_ring_write_sequence {ring.write_seq}",
+                ]
+            )
+
+        injector = self.sniffer.injector
+        if injector is not None:
+            metrics.extend(
+                [
+                    "",
+                    (
+                        "# HELP plc_sniffer_inject_frames_total Frames written to the "
+                        "TX rings for re-injection"
+                    ),
+                    "# TYPE plc_sniffer_inject_frames_total counter",
+                    f"plc_sniffer_inject_frames_total {injector.frames}",
+                    "",
+                    (
+                        "# HELP plc_sniffer_inject_kicks_total Sends that handed "
+                        "queued TX ring frames to the kernel"
+                    ),
+                    "# TYPE plc_sniffer_inject_kicks_total counter",
+                    f"plc_sniffer_inject_kicks_total {injector.kicks}",
+                    "",
+                    "# HELP plc_sniffer_inject_dropped_total Datagrams not re-injected",
+                    "# TYPE plc_sniffer_inject_dropped_total counter",
+                    (
+                        f'plc_sniffer_inject_dropped_total{{reason="ring_full"}} '
+                        f"{injector.ring_full}"
+                    ),
+                    (
+                        f'plc_sniffer_inject_dropped_total{{reason="too_large"}} '
+                        f"{injector.too_large}"
+                    ),
+                    "",
+                    (
+                        "# HELP plc_sniffer_inject_send_errors_total TX ring sends "
+                        "that failed"
+                    ),
+                    "# TYPE plc_sniffer_inject_send_errors_total counter",
+                    f"plc_sniffer_inject_send_errors_total {injector.send_errors}",
+                ]
+            )
+
+        router = self.sniffer.router
+        if router is not None:
+            metrics.extend(self._destination_metrics(router.workers))
+            if router.balanced:
+                metrics.extend(
+                    [
+                        "",
+                        (
+                            "# HELP plc_sniffer_balancer_no_destination_total "
+                            "Payloads dropped because no destination was healthy"
+                        ),
+                        "# TYPE plc_sniffer_balancer_no_destination_total counter",
+                        (
+                            "plc_sniffer_balancer_no_destination_total "
+                            f"{router.no_destination}"
+                        ),
+                    ]
+                )
+            if router.table is not None:
+                metrics.extend(
+                    [
+                        "",
+                        (
+                            "# HELP plc_sniffer_route_packets_total Packets matched "
+                            "per route"
+                        ),
+                        "# TYPE plc_sniffer_route_packets_total counter",
+                    ]
+                )
+                metrics.extend(
+                    f'plc_sniffer_route_packets_total{{route="{name}"}} {count}'
+                    for name, count in zip(router.names, router.routed)
+                )
+                metrics.extend(
+                    [
+                        "",
+                        (
+                            "# HELP plc_sniffer_unrouted_packets_total Packets that "
+                            "matched no route"
+                        ),
+                        "# TYPE plc_sniffer_unrouted_packets_total counter",
+                        f"plc_sniffer_unrouted_packets_total {router.unrouted}",
+                    ]
+                )
+
+        self.wfile.write("\n".join(metrics).encode())
+
+    def _cycle_metrics(
+        self, cycles: Union[CycleTracker, ShardedCycleTracker], limit: int
+    ) -> List[str]:
+        """Cycle tracking metrics, per flow for only the ``limit`` most jittery."""
+        lines = [
+            "",
+            "# HELP plc_sniffer_cycle_flows_tracked Flows in the cycle tracking table",
+            "# TYPE plc_sniffer_cycle_flows_tracked gauge",
+            f"plc_sniffer_cycle_flows_tracked {cycles.tracked}",
+            "",
+            (
+                "# HELP plc_sniffer_cycle_flows_evicted_total Flows removed from the "
+                "table after going idle"
+            ),
+            "# TYPE plc_sniffer_cycle_flows_evicted_total counter",
+            f"plc_sniffer_cycle_flows_evicted_total {cycles.evicted}",
+            "",
+            (
+                "# HELP plc_sniffer_cycle_untracked_packets_total Packets of new "
+                "flows seen while the table was full"
+            ),
+            "# TYPE plc_sniffer_cycle_untracked_packets_total counter",
+            f"plc_sniffer_cycle_untracked_packets_total {cycles.untracked}",
+        ]
+        top = cycles.flows()[:limit]
+        if not top:
+            return lines
+
+        for field, help_text in (
+            ("mean", "Mean inter-arrival time"),
+            ("stddev", "Standard deviation of the inter-arrival time (jitter)"),
+            ("max", "Longest inter-arrival time"),
+        ):
+            lines.extend(
+                [
+                    "",
+                    (
+                        f"# HELP plc_sniffer_flow_cycle_{field}_seconds {help_text} of "
+                        "the most jittery flows"
+                    ),
+                    f"# TYPE plc_sniffer_flow_cycle_{field}_seconds gauge",
+                ]
+            )
+            lines.extend(
+                (
+                    f'plc_sniffer_flow_cycle_{field}_seconds{{flow="{flow.flow}"}} '
+                    f"{getattr(flow, field):.6f}"
+                )
+                for flow in top
+            )
+        return lines
+
+    def _class_metrics(self, scheduler: ClassScheduler) -> List[str]:
+        """Per-traffic-class queueing metrics."""
+        queues = scheduler.queues
+        lines = [
+            "",
+            "# HELP plc_sniffer_class_queued_total Payloads queued per traffic class",
+            "# TYPE plc_sniffer_class_queued_total counter",
+        ]
+        lines.extend(
+            f'plc_sniffer_class_queued_total{{class="{q.name}"}} {q.stats.queued}'
+            for q in queues
+        )
+        lines.extend(
+            [
+                "",
+                (
+                    "# HELP plc_sniffer_class_forwarded_total Payloads forwarded per "
+                    "traffic class"
+                ),
+                "# TYPE plc_sniffer_class_forwarded_total counter",
+            ]
+        )
+        lines.extend(
+            f'plc_sniffer_class_forwarded_total{{class="{q.name}"}} {q.stats.forwarded}'
+            for q in queues
+        )
+        lines.extend(
+            [
+                "",
+                (
+                    "# HELP plc_sniffer_class_dropped_total Payloads shed per traffic "
+                    "class"
+                ),
+                "# TYPE plc_sniffer_class_dropped_total counter",
+            ]
+        )
+        for q in queues:
+            lines.extend(
+                f'plc_sniffer_class_dropped_total{{class="{q.name}",'
+                f'reason="{reason}"}} {getattr(q.stats, reason)}'
+                for reason in q.stats.DROP_REASONS
+            )
+        lines.extend(
+            [
+                "",
+                (
+                    "# HELP plc_sniffer_class_queue_depth Payloads waiting per "
+                    "traffic class"
+                ),
+                "# TYPE plc_sniffer_class_queue_depth gauge",
+            ]
+        )
+        lines.extend(
+            f'plc_sniffer_class_queue_depth{{class="{q.name}"}} {q.depth}'
+            for q in queues
+        )
+        lines.extend(
+            [
+                "",
+                (
+                    "# HELP plc_sniffer_class_queue_delay_seconds Time from capture "
+                    "to dequeue of forwarded payloads"
+                ),
+                "# TYPE plc_sniffer_class_queue_delay_seconds histogram",
+            ]
+        )
+        for q in queues:
+            lines.extend(
+                q.delay.render(
+                    "plc_sniffer_class_queue_delay_seconds", {"class": q.name}
+                )
+            )
+        return lines
+
+    def _mirror_metrics(self, mirror: MirrorSocket) -> List[str]:
+        """Per-session metrics of tunnelled mirror traffic."""
+        sessions = list(mirror.sessions.items())
+        lines = []
+        for name, help_text, value in (
+            (
+                "packets_total",
+                "Tunnel packets received per mirror session",
+                lambda s: s.packets,
+            ),
+            (
+                "bytes_total",
+                "Tunnel packet bytes received per mirror session",
+                lambda s: s.bytes,
+            ),
+            (
+                "lost_total",
+                "Packets missing from the GRE sequence of a mirror session",
+                lambda s: s.lost,
+            ),
+        ):
+            lines.extend(
+                [
+                    "",
+                    f"# HELP plc_sniffer_mirror_{name} {help_text}",
+                    f"# TYPE plc_sniffer_mirror_{name} counter",
+                ]
+            )
+            lines.extend(
+                (
+                    f'plc_sniffer_mirror_{name}{{source="{source}",'
+                    f'session="{session}"}} {value(stats)}'
+                )
+                for (source, session), stats in sessions
+            )
+        lines.extend(
+            [
+                "",
+                (
+                    "# HELP plc_sniffer_mirror_undecodable_total Tunnel packets "
+                    "without a recognized mirror encapsulation"
+                ),
+                "# TYPE plc_sniffer_mirror_undecodable_total counter",
+                f"plc_sniffer_mirror_undecodable_total {mirror.undecodable}",
+            ]
+        )
+        return lines
+
+    def _spill_metrics(self, spills: Dict[str, SpillQueue]) -> List[str]:
+        """Per-destination disk spill queue metrics."""
+        now = time.time()
+        lines = []
+        for name, kind, help_text, value in (
+            ("segments", "gauge", "Spill segment files on disk", lambda q: q.segments),
+            (
+                "disk_bytes",
+                "gauge",
+                "Bytes allocated to spill segment files",
+                lambda q: q.disk_bytes,
+            ),
+            (
+                "pending",
+                "gauge",
+                "Spilled payloads waiting to be replayed",
+                lambda q: q.pending,
+            ),
+            (
+                "replay_lag_seconds",
+                "gauge",
+                "Age of the oldest spilled payload not yet replayed",
+                lambda q: f"{q.replay_lag(now):.3f}",
+            ),
+            (
+                "spilled_total",
+                "counter",
+                "Payloads written to the spill queue",
+                lambda q: q.spilled,
+            ),
+            (
+                "replayed_total",
+                "counter",
+                "Spilled payloads sent after the outage",
+                lambda q: q.replayed,
+            ),
+        ):
+            lines.extend(
+                [
+                    "",
+                    f"# HELP plc_sniffer_spill_{name} {help_text}",
+                    f"# TYPE plc_sniffer_spill_{name} {kind}",
+                ]
+            )
+            lines.extend(
+                f'plc_sniffer_spill_{name}{{destination="{label}"}} {value(spill)}'
+                for label, spill in spills.items()
+            )
+        lines.extend(
+            [
+                "",
+                (
+                    "# HELP plc_sniffer_spill_dropped_total Spilled payloads lost to "
+                    "the size cap or write errors"
+                ),
+                "# TYPE plc_sniffer_spill_dropped_total counter",
+            ]
+        )
+        for label, spill in spills.items():
+            lines.append(
+                (
+                    f'plc_sniffer_spill_dropped_total{{destination="{label}",'
+                    f'reason="evicted"}} {spill.evicted}'
+                )
+            )
+            lines.append(
+                (
+                    f'plc_sniffer_spill_dropped_total{{destination="{label}",'
+                    f'reason="error"}} {spill.errors}'
+                )
+            )
+        return lines
+
+    def _destination_metrics(self, workers: List[DestinationWorker]) -> List[str]:
+        """Per-destination forwarding metrics."""
+        lines = [
+            "",
+            "# HELP plc_sniffer_destination_sent_total Payloads sent per destination",
+            "# TYPE plc_sniffer_destination_sent_total counter",
         ]
-        
-        self.wfile.write('\n'.join(metrics).encode())
-    
+        lines.extend(
+            (
+                f'plc_sniffer_destination_sent_total{{destination="{w.name}"}} '
+                f"{w.stats.sent}"
+            )
+            for w in workers
+        )
+        lines.extend(
+            [
+                "",
+                (
+                    "# HELP plc_sniffer_destination_bytes_total Payload bytes sent "
+                    "per destination"
+                ),
+                "# TYPE plc_sniffer_destination_bytes_total counter",
+            ]
+        )
+        lines.extend(
+            (
+                f'plc_sniffer_destination_bytes_total{{destination="{w.name}"}} '
+                f"{w.stats.bytes_sent}"
+            )
+            for w in workers
+        )
+        lines.extend(
+            [
+                "",
+                (
+                    "# HELP plc_sniffer_destination_healthy Whether the destination "
+                    "receives traffic"
+                ),
+                "# TYPE plc_sniffer_destination_healthy gauge",
+            ]
+        )
+        lines.extend(
+            (
+                f'plc_sniffer_destination_healthy{{destination="{w.name}"}} '
+                f"{int(w.healthy)}"
+            )
+            for w in workers
+        )
+        lines.extend(
+            [
+                "",
+                (
+                    "# HELP plc_sniffer_destination_weight Load-balancing weight of "
+                    "the destination"
+                ),
+                "# TYPE plc_sniffer_destination_weight gauge",
+            ]
+        )
+        lines.extend(
+            (
+                f'plc_sniffer_destination_weight{{destination="{w.name}"}} '
+                f"{w.destination.weight:g}"
+            )
+            for w in workers
+        )
+        lines.extend(
+            [
+                "",
+                (
+                    "# HELP plc_sniffer_destination_dropped_total Payloads dropped "
+                    "per destination"
+                ),
+                "# TYPE plc_sniffer_destination_dropped_total counter",
+            ]
+        )
+        for w in workers:
+            lines.append(
+                f'plc_sniffer_destination_dropped_total{{destination="{w.name}",'
+                f'reason="queue_full"}} {w.stats.queue_full}'
+            )
+            lines.append(
+                f'plc_sniffer_destination_dropped_total{{destination="{w.name}",'
+                f'reason="send_failed"}} {w.stats.send_failed}'
+            )
+        lines.extend(
+            [
+                "",
+                (
+                    "# HELP plc_sniffer_destination_queue_depth Payloads waiting per "
+                    "destination"
+                ),
+                "# TYPE plc_sniffer_destination_queue_depth gauge",
+            ]
+        )
+        lines.extend(
+            (
+                f'plc_sniffer_destination_queue_depth{{destination="{w.name}"}} '
+                f"{w.queue_depth}"
+            )
+            for w in workers
+        )
+        lines.extend(
+            [
+                "",
+                (
+                    "# HELP plc_sniffer_destination_latency_seconds Time from "
+                    "hand-off to send completion"
+                ),
+                "# TYPE plc_sniffer_destination_latency_seconds histogram",
+            ]
+        )
+        for w in workers:
+            lines.extend(
+                w.stats.latency.render(
+                    "plc_sniffer_destination_latency_seconds", {"destination": w.name}
+                )
+            )
+        lines.extend(
+            [
+                "",
+                (
+                    "# HELP plc_sniffer_forward_outcomes_total Forwarding attempts by "
+                    "outcome"
+                ),
+                "# TYPE plc_sniffer_forward_outcomes_total counter",
+            ]
+        )
+        for w in workers:
+            lines.extend(
+                (
+                    f'plc_sniffer_forward_outcomes_total{{destination="{w.name}",'
+                    f'outcome="{outcome}"}} {count}'
+                )
+                for outcome, count in w.forwarder.stats.as_dict().items()
+            )
+        lines.extend(
+            [
+                "",
+                (
+                    "# HELP plc_sniffer_forward_retry_queue_depth Payloads waiting to "
+                    "be retried"
+                ),
+                "# TYPE plc_sniffer_forward_retry_queue_depth gauge",
+            ]
+        )
+        lines.extend(
+            (
+                f'plc_sniffer_forward_retry_queue_depth{{destination="{w.name}"}} '
+                f"{w.forwarder.pending}"
+            )
+            for w in workers
+        )
+        lines.extend(
+            [
+                "",
+                (
+                    "# HELP plc_sniffer_circuit_breaker_open Whether the forwarding "
+                    "circuit breaker is open"
+                ),
+                "# TYPE plc_sniffer_circuit_breaker_open gauge",
+            ]
+        )
+        lines.extend(
+            (
+                f'plc_sniffer_circuit_breaker_open{{destination="{w.name}"}} '
+                f"{int(w.forwarder.breaker.is_open)}"
+            )
+            for w in workers
+        )
+        lines.extend(
+            [
+                "",
+                (
+                    "# HELP plc_sniffer_circuit_breaker_trips_total Times the circuit "
+                    "breaker opened"
+                ),
+                "# TYPE plc_sniffer_circuit_breaker_trips_total counter",
+            ]
+        )
+        lines.extend(
+            (
+                f'plc_sniffer_circuit_breaker_trips_total{{destination="{w.name}"}} '
+                f"{w.forwarder.breaker.trips}"
+            )
+            for w in workers
+        )
+        return lines
+
     def log_message(self, format: str, *args: Any) -> None:
         """Suppress default HTTP logging."""
         pass  # Health checks are noisy, only log errors
 
 
 class HealthCheckServer:
-    """HTTP server for health checks and metrics."""
-    
+    """HTTP server for health checks and metrics.
+
+    Each request is handled on a thread of its own, so a running
+    ``/debug/profile`` does not hold up the liveness probes.
+    """
+
     def __init__(self, port: int = 8080):
         self.port = port
-        self.server: Optional[HTTPServer] = None
+        self.server: Optional[ThreadingHTTPServer] = None
         self.thread: Optional[threading.Thread] = None
         self.running = False
-    
+
     def start(self, sniffer: PlcSniffer) -> None:
         """Start the health check server."""
         HealthCheckHandler.sniffer = sniffer
         HealthCheckHandler.start_time = time.time()
-        
-        self.server = HTTPServer(('', self.port), HealthCheckHandler)
+
+        self.server = ThreadingHTTPServer(("", self.port), HealthCheckHandler)
         self.running = True
-        
+
         self.thread = threading.Thread(target=self._run, daemon=True)
         self.thread.start()
-        
+
         logger.info(f"Health check server started on port {self.port}")
-    
+
     def _run(self) -> None:
         """Run the server in a thread."""
-        while self.running and self.server is not None:
-            self.server.handle_request()
-    
+        if self.server is not None:
+            self.server.serve_forever()
+
     def stop(self) -> None:
         """Stop the health check server."""
         self.running = False
         if self.server:
-            self.server.shutdown()
+            self.server.shutdown()  # returns once serve_forever() has
+            self.server.server_close()
         if self.thread:
             self.thread.join(timeout=5)
-        logger.info("Health check server stopped")
\ No newline at end of file
+        logger.info("Health check server stopped")
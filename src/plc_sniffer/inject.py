@@ -0,0 +1,321 @@
+"""Re-injection of captured datagrams as frames through an ``AF_PACKET`` TX ring.
+
+Instead of re-sending the payload from our own socket, the datagram is
+rebuilt as an Ethernet/IPv4/UDP frame that keeps the original source
+address and port and carries the configured destination MAC, IP and port.
+Frames are written into a memory-mapped ``PACKET_TX_RING`` and handed to
+the kernel with one ``send`` per batch, so forwarding costs no system call
+per packet.
+
+TX ring frame layout (``TPACKET_V2``)::
+
+    0    tp_status (u32) | tp_len (u32) | tp_snaplen (u32) | tp_mac (u16) | tp_net (u16)
+    16   tp_sec (u32) | tp_nsec (u32) | tp_vlan_tci (u16) | tp_vlan_tpid (u16) | padding
+    32   frame data (frame_size - 32 bytes)
+
+A frame belongs to the writer while its status is ``TP_STATUS_AVAILABLE``;
+setting ``TP_STATUS_SEND_REQUEST`` (after the data and length) hands it to
+the kernel, which sets it back once the frame has been sent.
+"""
+
+import fcntl
+import logging
+import mmap
+import socket
+import struct
+from typing import Optional, Tuple
+
+from .capture import SOL_PACKET
+from .metrics import Shards, summed
+from .packet import PacketMeta, Payload
+from .raw_capture import ETH_P_IP
+
+logger = logging.getLogger(__name__)
+
+PACKET_VERSION = 10
+PACKET_TX_RING = 13
+PACKET_LOSS = 14
+PACKET_QDISC_BYPASS = 20
+TPACKET_V2 = 1
+
+TP_STATUS_AVAILABLE = 0
+TP_STATUS_SEND_REQUEST = 1
+TP_STATUS_SENDING = 2
+
+SIOCGIFMTU = 0x8921
+
+# Frame data starts after the aligned tpacket2_hdr
+TX_DATA_OFFSET = 32
+
+# struct tpacket_req: block_size, block_nr, frame_size, frame_nr
+_TPACKET_REQ = struct.Struct("IIII")
+_U32 = struct.Struct("I")
+_IFREQ_MTU = struct.Struct("16si12x")
+
+_ETH = struct.Struct("!6s6sH")
+_IPV4 = struct.Struct("!BBHHHBBH4s4s")
+_UDP = struct.Struct("!HHHH")
+ETH_HEADER_SIZE = 14
+HEADERS_SIZE = ETH_HEADER_SIZE + 20 + 8
+
+# Fixed IPv4 header words: version/IHL, DF flag, TTL 64 and protocol UDP
+_IPV4_FIXED_SUM = 0x4500 + 0x4000 + 0x4011
+
+
+def fold(total: int) -> int:
+    """Fold a sum of 16-bit words to 16 bits with end-around carry."""
+    while total >> 16:
+        total = (total & 0xFFFF) + (total >> 16)
+    return total
+
+
+def address_sum(address: bytes) -> int:
+    """Sum of the two 16-bit words of an IPv4 address."""
+    value = int.from_bytes(address, "big")
+    return (value >> 16) + (value & 0xFFFF)
+
+
+def adjust_checksum(checksum: int, old_sum: int, new_sum: int, words: int) -> int:
+    """Update a ones' complement checksum for changed header words (RFC 1624, eqn. 3).
+
+    Args:
+        checksum: Checksum before the change
+        old_sum: Sum of the ``words`` 16-bit words that were replaced
+        new_sum: Sum of the words replacing them
+        words: Number of words replaced
+
+    Returns:
+        Checksum after the change
+    """
+    # ~m summed over the old words equals words * 0xFFFF - old_sum
+    total = (~checksum & 0xFFFF) + words * 0xFFFF - old_sum + new_sum
+    return ~fold(total) & 0xFFFF
+
+
+def parse_mac(mac: str) -> bytes:
+    """Six bytes of a MAC address written as ``aa:bb:cc:dd:ee:ff``."""
+    return bytes(int(part, 16) for part in mac.split(":"))
+
+
+def interface_mtu(sock: socket.socket, interface: str) -> int:
+    """MTU of an interface, read through any socket."""
+    request = _IFREQ_MTU.pack(interface.encode(), 0)
+    return int(_IFREQ_MTU.unpack(fcntl.ioctl(sock.fileno(), SIOCGIFMTU, request))[1])
+
+
+class TxRing:
+    """``PACKET_TX_RING`` on one interface, written by a single thread.
+
+    ``queued`` frames have been handed to the kernel but not kicked yet;
+    :meth:`kick` makes it send them with one non-blocking ``sendto``.
+    """
+
+    def __init__(self, interface: str, frame_count: int, frame_size: int):
+        self.interface = interface
+        self.frame_count = frame_count
+        self.frame_size = frame_size
+        self.head = 0
+        self.queued = 0
+        self.frames = 0
+        self.kicks = 0
+        self.ring_full = 0
+        self.too_large = 0
+        self.send_errors = 0
+        self._mask = frame_count - 1
+
+        # Protocol 0: the socket only transmits and receives nothing
+        sock = socket.socket(socket.AF_PACKET, socket.SOCK_RAW, 0)
+        try:
+            sock.setsockopt(SOL_PACKET, PACKET_VERSION, TPACKET_V2)
+            # Discard malformed frames instead of stopping the ring at them
+            sock.setsockopt(SOL_PACKET, PACKET_LOSS, 1)
+            try:
+                sock.setsockopt(SOL_PACKET, PACKET_QDISC_BYPASS, 1)
+            except OSError:
+                pass  # kernels before 3.14 always go through the qdisc
+            block_size = max(frame_size, mmap.PAGESIZE)
+            size = frame_count * frame_size
+            sock.setsockopt(
+                SOL_PACKET,
+                PACKET_TX_RING,
+                _TPACKET_REQ.pack(
+                    block_size, size // block_size, frame_size, frame_count
+                ),
+            )
+            sock.bind((interface, 0))
+            self.mtu = interface_mtu(sock, interface)
+            self.src_mac: bytes = sock.getsockname()[4].ljust(6, b"\0")[:6]
+            self._mmap = mmap.mmap(
+                sock.fileno(), size, mmap.MAP_SHARED, mmap.PROT_READ | mmap.PROT_WRITE
+            )
+        except Exception:
+            sock.close()
+            raise
+        self.sock = sock
+        self.buf = memoryview(self._mmap)
+        # Largest frame the ring slot and the link both take
+        self.max_frame = min(frame_size - TX_DATA_OFFSET, ETH_HEADER_SIZE + self.mtu)
+
+    def reserve(self) -> int:
+        """Offset of the next free frame's data, or -1 while the kernel owns it."""
+        offset = self.head * self.frame_size
+        if _U32.unpack_from(self.buf, offset)[0] & (
+            TP_STATUS_SEND_REQUEST | TP_STATUS_SENDING
+        ):
+            return -1
+        return offset + TX_DATA_OFFSET
+
+    def commit(self, length: int) -> None:
+        """Hand the reserved frame of ``length`` bytes to the kernel."""
+        offset = self.head * self.frame_size
+        _U32.pack_into(self.buf, offset + 4, length)
+        # Status last: the kernel may take the frame as soon as it changes
+        _U32.pack_into(self.buf, offset, TP_STATUS_SEND_REQUEST)
+        self.head = (self.head + 1) & self._mask
+        self.queued += 1
+        self.frames += 1
+
+    def kick(self) -> None:
+        """Have the kernel send the queued frames, without waiting for them."""
+        if not self.queued:
+            return
+        self.queued = 0
+        self.kicks += 1
+        try:
+            self.sock.sendto(b"", socket.MSG_DONTWAIT, (self.interface, ETH_P_IP))
+        except BlockingIOError:
+            pass  # still queued in the ring; the next kick sends them
+        except OSError as e:
+            self.send_errors += 1
+            logger.warning(f"TX ring send on {self.interface} failed: {e}")
+
+    def close(self) -> None:
+        """Send what is queued, then unmap the ring and close the socket."""
+        self.kick()
+        self.buf.release()
+        self._mmap.close()
+        self.sock.close()
+
+
+class Injector:
+    """Rebuild datagrams as frames to a new destination and send them through TX rings.
+
+    The IPv4 header is written from scratch (checksum included); the UDP
+    checksum captured with the datagram is adjusted incrementally for the
+    new destination address and port, so the payload is never read. Each
+    thread forwarding through the injector gets a TX ring of its own.
+    """
+
+    frames = summed("frames")
+    kicks = summed("kicks")
+    ring_full = summed("ring_full")
+    too_large = summed("too_large")
+    send_errors = summed("send_errors")
+
+    def __init__(
+        self,
+        interface: str,
+        dst_mac: str,
+        dst_ip: str,
+        dst_port: int,
+        frame_count: int = 4096,
+        frame_size: int = 2048,
+    ):
+        self.interface = interface
+        self.dst_mac = parse_mac(dst_mac)
+        self.frame_count = frame_count
+        self.frame_size = frame_size
+        # Kick at the end of each batch, and earlier if a quarter of the ring is waiting
+        self.kick_threshold = max(1, frame_count // 4)
+        self.retarget(dst_ip, dst_port)
+        self.shards: Shards[TxRing] = Shards(
+            lambda: TxRing(self.interface, self.frame_count, self.frame_size)
+        )
+
+    def retarget(self, dst_ip: str, dst_port: int) -> None:
+        """Change the destination address and port frames are rewritten to."""
+        address = socket.inet_aton(dst_ip)
+        # Swapped as one tuple, so a forwarding thread sees the old or the new target
+        self._target: Tuple[bytes, int, int] = (
+            address,
+            dst_port,
+            address_sum(address) + dst_port,
+        )
+
+    def open(self) -> TxRing:
+        """Create the calling thread's ring now rather than on its first frame."""
+        return self.shards.get()
+
+    def send(self, payload: Payload, meta: Optional[PacketMeta]) -> bool:
+        """Write a datagram into the calling thread's ring.
+
+        Returns:
+            True if the frame was queued, False if it was dropped
+        """
+        ring = self.shards.get()
+        length = HEADERS_SIZE + len(payload)
+        if meta is None or length > ring.max_frame:
+            ring.too_large += 1
+            return False
+        offset = ring.reserve()
+        if offset < 0:
+            # The kernel may only be waiting for a kick
+            ring.kick()
+            offset = ring.reserve()
+            if offset < 0:
+                ring.ring_full += 1
+                return False
+
+        dst_ip, dst_port, target_sum = self._target
+        src_ip = socket.inet_aton(meta.src_ip)
+        ip_length = length - ETH_HEADER_SIZE
+        ip_checksum = (
+            ~fold(
+                _IPV4_FIXED_SUM + ip_length + address_sum(src_ip) + address_sum(dst_ip)
+            )
+            & 0xFFFF
+        )
+        udp_checksum = meta.udp_checksum
+        if udp_checksum:
+            # Only the destination address and port change; 0 means no checksum
+            old_sum = address_sum(socket.inet_aton(meta.dst_ip)) + meta.dst_port
+            udp_checksum = (
+                adjust_checksum(udp_checksum, old_sum, target_sum, 3) or 0xFFFF
+            )
+
+        buf = ring.buf
+        _ETH.pack_into(buf, offset, self.dst_mac, ring.src_mac, ETH_P_IP)
+        _IPV4.pack_into(
+            buf,
+            offset + ETH_HEADER_SIZE,
+            0x45,
+            0,
+            ip_length,
+            0,
+            0x4000,
+            64,
+            socket.IPPROTO_UDP,
+            ip_checksum,
+            src_ip,
+            dst_ip,
+        )
+        _UDP.pack_into(
+            buf, offset + 34, meta.src_port, dst_port, ip_length - 20, udp_checksum
+        )
+        buf[offset + HEADERS_SIZE : offset + length] = payload
+        ring.commit(length)
+        if ring.queued >= self.kick_threshold:
+            ring.kick()
+        return True
+
+    def flush(self) -> None:
+        """Kick the calling thread's ring, at the end of a batch."""
+        self.shards.get().kick()
+
+    def close(self) -> None:
+        """Close every thread's ring."""
+        for ring in self.shards.all:
+            try:
+                ring.close()
+            except Exception as e:
+                logger.error(f"Error closing TX ring on {ring.interface}: {e}")
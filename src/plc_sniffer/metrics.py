@@ -0,0 +1,117 @@
+"""Helpers for Prometheus-style metric exposition."""
+
+import threading
+from bisect import bisect_left
+from typing import Callable, Dict, Generic, Iterable, List, Sequence, TypeVar
+
+T = TypeVar("T")
+
+
+# Upper bounds in seconds, from 10us to 1s
+LATENCY_BUCKETS = (
+    0.00001,
+    0.000025,
+    0.00005,
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+)
+
+
+def format_labels(labels: Dict[str, str]) -> str:
+    """Format a label set as ``{name="value",...}`` (empty if no labels)."""
+    if not labels:
+        return ""
+    inner = ",".join(f'{key}="{value}"' for key, value in labels.items())
+    return "{" + inner + "}"
+
+
+class Histogram:
+    """Fixed-bucket histogram with preallocated counters."""
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        """Record a single observation."""
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    @classmethod
+    def merge(cls, histograms: Iterable["Histogram"]) -> "Histogram":
+        """Combine histograms with identical buckets into a new one."""
+        histograms = list(histograms)
+        merged = cls(histograms[0].buckets) if histograms else cls()
+        for histogram in histograms:
+            merged.counts = [a + b for a, b in zip(merged.counts, histogram.counts)]
+            merged.sum += histogram.sum
+            merged.count += histogram.count
+        return merged
+
+    def render(self, name: str, labels: Dict[str, str]) -> List[str]:
+        """Render the histogram samples (without HELP/TYPE lines)."""
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            bucket_labels = format_labels({**labels, "le": repr(bound)})
+            lines.append(f"{name}_bucket{bucket_labels} {cumulative}")
+        cumulative += self.counts[-1]
+        lines.append(
+            f'{name}_bucket{format_labels({**labels, "le": "+Inf"})} {cumulative}'
+        )
+        lines.append(f"{name}_sum{format_labels(labels)} {self.sum:.9f}")
+        lines.append(f"{name}_count{format_labels(labels)} {self.count}")
+        return lines
+
+
+class Shards(Generic[T]):
+    """One instance of a mutable stats object per thread.
+
+    Each thread only ever updates its own shard, so hot-path counters need
+    no lock and never lose increments, also on the free-threaded build where
+    ``x += 1`` on shared state is a race. Readers combine ``all``; the list
+    is replaced rather than appended to, so iterating it is always safe.
+    """
+
+    def __init__(self, factory: Callable[[], T]):
+        self._factory = factory
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.all: List[T] = []
+
+    def get(self) -> T:
+        """The calling thread's shard, created on first use."""
+        try:
+            return self._local.shard  # type: ignore[no-any-return]
+        except AttributeError:
+            shard = self._factory()
+            with self._lock:
+                self.all = self.all + [shard]
+            self._local.shard = shard
+            return shard
+
+    def total(self, name: str) -> int:
+        """Sum of an integer attribute over all shards."""
+        return sum(getattr(shard, name) for shard in self.all)
+
+
+def summed(name: str) -> property:
+    """Read-only property summing attribute ``name`` over ``self.shards``."""
+    return property(
+        lambda self: self.shards.total(name), doc=f"{name} summed over all threads"
+    )
@@ -0,0 +1,385 @@
+"""Capture engine for traffic switches mirror to a remote collector through a tunnel.
+
+Instead of a local SPAN port, switches can send copies of their ports'
+traffic to a central host: in VXLAN (UDP, port 4789 by default), in GRE as
+ERSPAN type I, II or III, or as plain GRE transparent Ethernet bridging.
+:class:`MirrorSocket` receives the tunnel packets in batches with
+``recvmmsg`` into pooled buffers and strips the encapsulation by offset, so
+the inner Ethernet frames go through the same in-place decoding as frames
+of the raw engine.
+
+Packets are counted per mirror session: the sending switch and the session
+ID (the VNI for VXLAN, the ERSPAN session ID, or the GRE key).
+"""
+
+import ctypes
+import errno
+import logging
+import os
+import socket
+import struct
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+from .buffers import BufferLease, BufferPool
+from .mmsg import MSG_WAITFORONE, Iovec, Mmsghdr, load_recvmmsg
+from .raw_capture import SO_TIMESTAMPNS
+
+logger = logging.getLogger(__name__)
+
+VXLAN_PORT = 4789
+VXLAN_HEADER_SIZE = 8
+VXLAN_FLAG_VNI = 0x08
+
+GRE_PROTOCOL = 47
+GRE_FLAG_CHECKSUM = 0x8000
+GRE_FLAG_KEY = 0x2000
+GRE_FLAG_SEQUENCE = 0x1000
+GRE_VERSION_MASK = 0x0007
+
+# GRE protocol types; ERSPAN type I uses the type II protocol without a sequence number
+GRE_ERSPAN_II = 0x88BE
+GRE_ERSPAN_III = 0x22EB
+GRE_TRANSPARENT_ETHERNET = 0x6558
+
+ERSPAN_II_HEADER_SIZE = 8
+ERSPAN_III_HEADER_SIZE = 12
+ERSPAN_III_SUBHEADER_SIZE = 8
+
+ETH_HEADER_SIZE = 14
+
+# Sessions counted individually; packets of further sessions are counted together
+MIRROR_MAX_SESSIONS = 1024
+OTHER_SESSION = ("other", 0)
+
+# Sequence gaps larger than this are a restarted switch rather than loss
+SEQUENCE_WINDOW = 65536
+
+# Offset of the inner frame, session ID and GRE sequence number (-1 if absent)
+Decapsulated = Tuple[int, int, int]
+NOT_MIRRORED: Decapsulated = (-1, 0, -1)
+
+_U16 = struct.Struct("!H")
+_U32 = struct.Struct("!I")
+_GRE_HEADER = struct.Struct("!HH")
+# struct cmsghdr on 64-bit Linux, followed by a struct timespec
+_CMSG_HEADER = struct.Struct("@Qii")
+_TIMESPEC = struct.Struct("@qq")
+_CONTROL_SIZE = socket.CMSG_SPACE(_TIMESPEC.size)
+_SOCKADDR_IN_SIZE = 16
+
+
+def decapsulate_vxlan(packet: memoryview) -> Decapsulated:
+    """Find the inner frame of a VXLAN datagram (UDP payload).
+
+    Returns:
+        Inner frame offset, VNI and no sequence number, or ``NOT_MIRRORED``
+    """
+    if (
+        len(packet) < VXLAN_HEADER_SIZE + ETH_HEADER_SIZE
+        or not packet[0] & VXLAN_FLAG_VNI
+    ):
+        return NOT_MIRRORED
+    return VXLAN_HEADER_SIZE, _U32.unpack_from(packet, 4)[0] >> 8, -1
+
+
+def decapsulate_gre(packet: memoryview) -> Decapsulated:
+    """Find the inner frame of a GRE packet, received with its outer IPv4 header.
+
+    Handles ERSPAN type I, II and III and transparent Ethernet bridging;
+    ERSPAN type III frames that are not Ethernet are not decoded.
+
+    Returns:
+        Inner frame offset, session ID and GRE sequence number (-1 without
+        one), or ``NOT_MIRRORED``
+    """
+    length = len(packet)
+    if length < 20:
+        return NOT_MIRRORED
+    offset = (packet[0] & 0x0F) * 4
+    if length < offset + 4:
+        return NOT_MIRRORED
+    flags, protocol = _GRE_HEADER.unpack_from(packet, offset)
+    if flags & GRE_VERSION_MASK:
+        return NOT_MIRRORED
+    offset += 4
+    if flags & GRE_FLAG_CHECKSUM:
+        offset += 4
+    key = 0
+    if flags & GRE_FLAG_KEY:
+        if length < offset + 4:
+            return NOT_MIRRORED
+        key = _U32.unpack_from(packet, offset)[0]
+        offset += 4
+    sequence = -1
+    if flags & GRE_FLAG_SEQUENCE:
+        if length < offset + 4:
+            return NOT_MIRRORED
+        sequence = _U32.unpack_from(packet, offset)[0]
+        offset += 4
+
+    if protocol == GRE_ERSPAN_II and sequence < 0:
+        # Type I: the frame follows the GRE header directly
+        inner, session = offset, 0
+    elif protocol == GRE_ERSPAN_II:
+        if length < offset + ERSPAN_II_HEADER_SIZE or packet[offset] >> 4 != 1:
+            return NOT_MIRRORED
+        session = _U16.unpack_from(packet, offset + 2)[0] & 0x03FF
+        inner = offset + ERSPAN_II_HEADER_SIZE
+    elif protocol == GRE_ERSPAN_III:
+        if length < offset + ERSPAN_III_HEADER_SIZE or packet[offset] >> 4 != 2:
+            return NOT_MIRRORED
+        session = _U16.unpack_from(packet, offset + 2)[0] & 0x03FF
+        # P (1 bit), frame type (5), hardware ID (6), D (1), granularity (2), O (1)
+        word = _U16.unpack_from(packet, offset + 10)[0]
+        if (word >> 10) & 0x1F:
+            return NOT_MIRRORED
+        inner = offset + ERSPAN_III_HEADER_SIZE
+        if word & 0x0001:
+            inner += ERSPAN_III_SUBHEADER_SIZE
+    elif protocol == GRE_TRANSPARENT_ETHERNET:
+        inner, session = offset, key
+    else:
+        return NOT_MIRRORED
+
+    if length < inner + ETH_HEADER_SIZE:
+        return NOT_MIRRORED
+    return inner, session, sequence
+
+
+class SessionStats:
+    """Counters of one mirror session."""
+
+    __slots__ = ("packets", "bytes", "lost", "next_sequence")
+
+    def __init__(self) -> None:
+        self.packets = 0
+        self.bytes = 0
+        self.lost = 0
+        self.next_sequence = -1
+
+    def observe(self, size: int, sequence: int) -> None:
+        """Count a packet, and the packets its GRE sequence number skipped."""
+        self.packets += 1
+        self.bytes += size
+        if sequence < 0:
+            return
+        if self.next_sequence >= 0:
+            gap = (sequence - self.next_sequence) & 0xFFFFFFFF
+            if gap >= SEQUENCE_WINDOW:
+                # Late, duplicated, or the sender started over: resynchronize
+                # forward only, so a late packet does not count as a gap again
+                if gap < 0x80000000:
+                    self.next_sequence = (sequence + 1) & 0xFFFFFFFF
+                return
+            self.lost += gap
+        self.next_sequence = (sequence + 1) & 0xFFFFFFFF
+
+
+class MirrorSocket:
+    """Socket receiving tunnelled mirror traffic as inner Ethernet frames.
+
+    ``encap`` is ``vxlan`` (a UDP socket bound to ``bind:port``) or ``gre``
+    (a raw IPv4 socket for protocol 47, which sees every GRE packet sent to
+    the host). ``ins`` is the underlying socket, as on the other capture
+    sockets. The socket blocks with a kernel receive timeout rather than
+    through Python, so ``recvmmsg`` can wait on it.
+
+    Receive buffers are taken from a :class:`BufferPool`; the socket keeps a
+    batch of them between calls and hands the caller only those that hold a
+    decoded frame.
+    """
+
+    def __init__(
+        self,
+        encap: str,
+        bind: str = "0.0.0.0",
+        port: int = VXLAN_PORT,
+        batch: int = 64,
+        timeout: float = 0.5,
+        use_recvmmsg: bool = True,
+    ):
+        self.encap = encap
+        self.batch = batch
+        self.decapsulate: Callable[[memoryview], Decapsulated]
+        if encap == "vxlan":
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.decapsulate = decapsulate_vxlan
+        else:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_RAW, GRE_PROTOCOL)
+            self.decapsulate = decapsulate_gre
+            port = 0
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, SO_TIMESTAMPNS, 1)
+            seconds = int(timeout)
+            sock.setsockopt(
+                socket.SOL_SOCKET,
+                socket.SO_RCVTIMEO,
+                struct.pack("ll", seconds, int((timeout - seconds) * 1e6)),
+            )
+            sock.bind((bind, port))
+        except Exception:
+            sock.close()
+            raise
+        self.ins = sock
+        self.sessions: Dict[Tuple[str, int], SessionStats] = {}
+        self.undecodable = 0
+        self.truncated = 0
+        self._spare: List[BufferLease] = []
+        self._slab_addresses: Dict[int, Any] = {}  # ctypes views of pooled slabs, by id
+
+        self._recvmmsg = load_recvmmsg() if use_recvmmsg else None
+        if self._recvmmsg is not None:
+            self._iovecs = (Iovec * batch)()
+            self._msgs = (Mmsghdr * batch)()
+            self._names = ctypes.create_string_buffer(batch * _SOCKADDR_IN_SIZE)
+            self._control = ctypes.create_string_buffer(batch * _CONTROL_SIZE)
+            for i in range(batch):
+                header = self._msgs[i].msg_hdr
+                header.msg_iov = ctypes.pointer(self._iovecs[i])
+                header.msg_iovlen = 1
+                header.msg_name = ctypes.addressof(self._names) + i * _SOCKADDR_IN_SIZE
+                header.msg_control = ctypes.addressof(self._control) + i * _CONTROL_SIZE
+
+    @property
+    def uses_recvmmsg(self) -> bool:
+        return self._recvmmsg is not None
+
+    def receive(
+        self, pool: BufferPool, limit: int = 0, wait: bool = True
+    ) -> List[Tuple[memoryview, float, BufferLease]]:
+        """Receive up to ``limit`` tunnel packets and strip their encapsulation.
+
+        Args:
+            pool: Pool the receive buffers come from
+            limit: Most packets to take, at most (and by default) ``batch``
+            wait: Wait up to the receive timeout for the first packet
+
+        Returns:
+            Inner frames with their receive time and the lease of the buffer
+            holding them, which the caller releases; packets that could not
+            be decapsulated are counted and left out
+        """
+        limit = min(limit or self.batch, self.batch)
+        spare = self._spare
+        while len(spare) < limit:
+            spare.append(pool.acquire())
+        flags = 0 if wait else socket.MSG_DONTWAIT
+        if self._recvmmsg is not None:
+            received = self._receive_batch(spare, limit, flags)
+        else:
+            received = self._receive_each(spare, limit, flags)
+
+        frames = []
+        kept = []
+        for lease, (length, timestamp, source) in zip(spare, received):
+            if not length:
+                kept.append(lease)
+                continue
+            packet = lease.view[:length]
+            offset, session, sequence = self.decapsulate(packet)
+            if offset < 0:
+                self.undecodable += 1
+                kept.append(lease)
+                continue
+            self._session(source, session).observe(length, sequence)
+            frames.append((packet[offset:], timestamp, lease))
+        kept.extend(spare[len(received) :])
+        self._spare = kept
+        return frames
+
+    def _session(self, source: str, session: int) -> SessionStats:
+        key = (source, session)
+        stats = self.sessions.get(key)
+        if stats is None:
+            if len(self.sessions) >= MIRROR_MAX_SESSIONS:
+                key = OTHER_SESSION
+            stats = self.sessions.setdefault(key, SessionStats())
+        return stats
+
+    def _slab_address(self, lease: BufferLease) -> int:
+        """Address of a lease's slab; pooled slabs are looked up only once."""
+        view = self._slab_addresses.get(id(lease.slab)) if lease.pooled else None
+        if view is None:
+            # The view keeps the slab alive, so its id is not reused while cached
+            view = (ctypes.c_char * len(lease.slab)).from_buffer(lease.slab)
+            if lease.pooled:
+                self._slab_addresses[id(lease.slab)] = view
+        return ctypes.addressof(view)
+
+    def _receive_batch(
+        self, leases: List[BufferLease], count: int, flags: int
+    ) -> List[Tuple[int, float, str]]:
+        """One ``recvmmsg`` call: length (0 if truncated), time and sender of each."""
+        assert self._recvmmsg is not None
+        msgs = self._msgs
+        for i in range(count):
+            slab = leases[i].slab
+            self._iovecs[i].iov_base = self._slab_address(leases[i])
+            self._iovecs[i].iov_len = len(slab)
+            header = msgs[i].msg_hdr
+            header.msg_namelen = _SOCKADDR_IN_SIZE
+            header.msg_controllen = _CONTROL_SIZE
+
+        received = self._recvmmsg(
+            self.ins.fileno(), msgs, count, flags | MSG_WAITFORONE, None
+        )
+        if received < 0:
+            err = ctypes.get_errno()
+            if err in (errno.EAGAIN, errno.EWOULDBLOCK, errno.EINTR):
+                return []
+            raise OSError(err, os.strerror(err))
+
+        packets = []
+        for i in range(received):
+            header = msgs[i].msg_hdr
+            name = i * _SOCKADDR_IN_SIZE
+            source = socket.inet_ntoa(self._names[name + 4 : name + 8])
+            length = msgs[i].msg_len
+            if header.msg_flags & socket.MSG_TRUNC:
+                self.truncated += 1
+                length = 0
+            timestamp = 0.0
+            if header.msg_controllen >= _CMSG_HEADER.size + _TIMESPEC.size:
+                control = i * _CONTROL_SIZE
+                _, level, kind = _CMSG_HEADER.unpack_from(self._control, control)
+                if level == socket.SOL_SOCKET and kind == SO_TIMESTAMPNS:
+                    seconds, nanoseconds = _TIMESPEC.unpack_from(
+                        self._control, control + _CMSG_HEADER.size
+                    )
+                    timestamp = seconds + nanoseconds * 1e-9
+            packets.append((length, timestamp or time.time(), source))
+        return packets
+
+    def _receive_each(
+        self, leases: List[BufferLease], count: int, flags: int
+    ) -> List[Tuple[int, float, str]]:
+        """``recvmsg_into`` per packet, with the results of :meth:`_receive_batch`."""
+        packets = []
+        for lease in leases[:count]:
+            try:
+                nbytes, ancdata, msg_flags, address = self.ins.recvmsg_into(
+                    [lease.slab], _CONTROL_SIZE, flags
+                )
+            except (BlockingIOError, InterruptedError, socket.timeout):
+                break
+            # Like MSG_WAITFORONE: only the first packet is waited for
+            flags = socket.MSG_DONTWAIT
+            if msg_flags & socket.MSG_TRUNC:
+                self.truncated += 1
+                nbytes = 0
+            timestamp = 0.0
+            for level, kind, data in ancdata:
+                if level == socket.SOL_SOCKET and kind == SO_TIMESTAMPNS:
+                    seconds, nanoseconds = _TIMESPEC.unpack_from(data)
+                    timestamp = seconds + nanoseconds * 1e-9
+            packets.append((nbytes, timestamp or time.time(), address[0]))
+        return packets
+
+    def close(self) -> None:
+        """Return the spare buffers and close the socket."""
+        for lease in self._spare:
+            lease.release()
+        self._spare = []
+        self._slab_addresses = {}
+        self.ins.close()
@@ -0,0 +1,50 @@
+"""``recvmmsg(2)`` through ctypes, for receiving batches of datagrams in one call.
+
+The structures follow the 64-bit Linux ABI. Callers fill ``msg_iov`` (and
+``msg_name``/``msg_control`` if wanted) once and reset the lengths the
+kernel overwrites before every call.
+"""
+
+import ctypes
+import ctypes.util
+from typing import Callable, Optional
+
+MSG_WAITFORONE = 0x10000
+
+
+class Iovec(ctypes.Structure):
+    _fields_ = [("iov_base", ctypes.c_void_p), ("iov_len", ctypes.c_size_t)]
+
+
+class Msghdr(ctypes.Structure):
+    _fields_ = [
+        ("msg_name", ctypes.c_void_p),
+        ("msg_namelen", ctypes.c_uint32),
+        ("msg_iov", ctypes.POINTER(Iovec)),
+        ("msg_iovlen", ctypes.c_size_t),
+        ("msg_control", ctypes.c_void_p),
+        ("msg_controllen", ctypes.c_size_t),
+        ("msg_flags", ctypes.c_int),
+    ]
+
+
+class Mmsghdr(ctypes.Structure):
+    _fields_ = [("msg_hdr", Msghdr), ("msg_len", ctypes.c_uint)]
+
+
+def load_recvmmsg() -> Optional[Callable[..., int]]:
+    """``recvmmsg(2)`` from the C library, or None where it is not available."""
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        recvmmsg = libc.recvmmsg
+    except (OSError, AttributeError, TypeError):
+        return None
+    recvmmsg.argtypes = [
+        ctypes.c_int,
+        ctypes.c_void_p,
+        ctypes.c_uint,
+        ctypes.c_int,
+        ctypes.c_void_p,
+    ]
+    recvmmsg.restype = ctypes.c_int
+    return recvmmsg
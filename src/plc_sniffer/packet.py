@@ -0,0 +1,17 @@
+"""Packet metadata shared between capture and output stages."""
+
+from typing import NamedTuple, Union
+
+# Payloads are bytes, or views into pooled receive buffers on the raw engine
+Payload = Union[bytes, bytearray, memoryview]
+
+
+class PacketMeta(NamedTuple):
+    """Addressing and timing information of a captured UDP datagram."""
+
+    src_ip: str
+    dst_ip: str
+    src_port: int
+    dst_port: int
+    timestamp: float  # capture time, seconds since the epoch
+    udp_checksum: int = 0  # as captured, 0 if the sender left it out
@@ -0,0 +1,413 @@
+"""Batch packet pipeline assembled from built-in and plugin stages."""
+
+import abc
+import hashlib
+import logging
+import time
+from importlib.metadata import entry_points
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from .buffers import BufferLease
+from .metrics import Histogram, Shards
+from .packet import PacketMeta, Payload
+from .validators import ValidationError
+
+if TYPE_CHECKING:
+    from .sniffer import PlcSniffer
+
+
+logger = logging.getLogger(__name__)
+
+# Entry point group third-party stages are registered under
+ENTRY_POINT_GROUP = "plc_sniffer.stages"
+
+# Stages run when PIPELINE_STAGES is not set; cycles sees every datagram
+DEFAULT_STAGES = ("cycles", "sample", "rate_limit", "size", "forward")
+
+# Built-in stages that drop datagrams; cycles must run before all of them
+DROPPING_STAGES = ("sample", "rate_limit", "size", "forward")
+
+# Flows remembered per thread by the sample stage before its table is cleared
+SAMPLE_MAX_FLOWS = 65536
+
+# Per-stage counters, kept per thread and summed when read
+COUNTERS = ("batches", "packets", "dropped", "errors")
+
+Mask = Sequence[bool]
+
+
+class Batch:
+    """Datagrams decoded together and passed through the stages as one unit.
+
+    Entry ``i`` of ``payloads``, ``metas`` and ``leases`` describes one
+    datagram; with the raw engine the payload is a view into its receive
+    buffer. Stages read the lists and return a keep-mask; the pipeline
+    removes the dropped entries before the next stage runs.
+    """
+
+    __slots__ = ("payloads", "metas", "leases")
+
+    def __init__(self) -> None:
+        self.payloads: List[Payload] = []
+        self.metas: List[PacketMeta] = []
+        self.leases: List[Optional[BufferLease]] = []
+
+    def __len__(self) -> int:
+        return len(self.payloads)
+
+    def append(
+        self, payload: Payload, meta: PacketMeta, lease: Optional[BufferLease] = None
+    ) -> None:
+        """Add a decoded datagram."""
+        self.payloads.append(payload)
+        self.metas.append(meta)
+        self.leases.append(lease)
+
+    def sizes(self) -> List[int]:
+        """Payload lengths."""
+        return [len(payload) for payload in self.payloads]
+
+    def column(self, field: str) -> List[Any]:
+        """One header field of every datagram, e.g. ``column('dst_port')``."""
+        return [getattr(meta, field) for meta in self.metas]
+
+    def keep(self, mask: Mask) -> int:
+        """Remove the datagrams whose mask entry is false.
+
+        Returns:
+            Number of datagrams removed
+        """
+        before = len(self.payloads)
+        self.payloads = [p for p, kept in zip(self.payloads, mask) if kept]
+        self.metas = [m for m, kept in zip(self.metas, mask) if kept]
+        self.leases = [lease for lease, kept in zip(self.leases, mask) if kept]
+        return before - len(self.payloads)
+
+
+class Stage(abc.ABC):
+    """One step of the pipeline.
+
+    Subclasses set ``name`` and implement :meth:`process`. Dropped datagrams
+    are counted as ``packets_dropped``, under ``drop_reason`` if set. A
+    stage is created once at startup by a factory called with the sniffer
+    (usually the class itself); plugins register the factory as an entry
+    point in the ``plc_sniffer.stages`` group.
+    """
+
+    name = ""
+    drop_reason: Optional[str] = None
+
+    @abc.abstractmethod
+    def process(self, batch: Batch) -> Optional[Mask]:
+        """Handle a batch.
+
+        Returns:
+            Keep-mask with one entry per datagram, or None to keep them all
+        """
+
+    def close(self) -> None:
+        """Release resources when the sniffer stops."""
+
+
+class RateLimitStage(Stage):
+    """Drop datagrams above the token bucket rate."""
+
+    name = "rate_limit"
+    drop_reason = "rate_limited"
+
+    def __init__(self, sniffer: "PlcSniffer"):
+        self.sniffer = sniffer
+
+    def process(self, batch: Batch) -> Optional[Mask]:
+        limiter = self.sniffer.rate_limiter  # swapped on reload
+        if not limiter.rate:
+            return None
+        allow = limiter.allow
+        return [allow() for _ in batch.payloads]
+
+
+def flow_hash(meta: PacketMeta) -> int:
+    """32-bit hash of a flow's endpoints, the same for both directions.
+
+    Stable across threads, restarts and hosts, unlike the built-in ``hash``.
+    """
+    ends = sorted(((meta.src_ip, meta.src_port), (meta.dst_ip, meta.dst_port)))
+    key = f"{ends[0][0]}:{ends[0][1]}-{ends[1][0]}:{ends[1][1]}".encode()
+    return int.from_bytes(hashlib.blake2b(key, digest_size=4).digest(), "big")
+
+
+class FlowSampleTable:
+    """Sampling decisions of one thread's flows, for one setting."""
+
+    __slots__ = ("settings", "flows")
+
+    def __init__(self) -> None:
+        self.settings = (1.0, 1)
+        # Packets seen modulo SAMPLE_EVERY per kept flow, -1 for flows left out
+        self.flows: Dict[Tuple[str, int, str, int], int] = {}
+
+
+class SampleStage(Stage):
+    """Keep whole flows at ``SAMPLE_FRACTION``, 1 in ``SAMPLE_EVERY`` of their packets.
+
+    A flow is kept when its :func:`flow_hash` falls below the fraction of
+    the hash space, so every packet of a kept flow (in both directions)
+    passes and several sniffers sample the same flows. Within a kept flow
+    the first packet and every Nth after it pass. Capture threads receive
+    flow-hashed traffic, so each keeps its own table without locking.
+    """
+
+    name = "sample"
+    drop_reason = "sampled_out"
+
+    def __init__(self, sniffer: "PlcSniffer"):
+        self.sniffer = sniffer
+        self.tables: Shards[FlowSampleTable] = Shards(FlowSampleTable)
+
+    def process(self, batch: Batch) -> Optional[Mask]:
+        config = self.sniffer.config  # swapped on reload
+        fraction, every = config.sample_fraction, config.sample_every
+        if fraction >= 1.0 and every == 1:
+            return None
+        table = self.tables.get()
+        if table.settings != (fraction, every):
+            table.settings = (fraction, every)
+            table.flows = {}
+        flows = table.flows
+        threshold = fraction * 2**32
+        mask = []
+        for meta in batch.metas:
+            key = (meta.src_ip, meta.src_port, meta.dst_ip, meta.dst_port)
+            seen = flows.get(key)
+            if seen is None:
+                if len(flows) >= SAMPLE_MAX_FLOWS:
+                    flows.clear()
+                seen = 0 if flow_hash(meta) < threshold else -1
+            if seen < 0:
+                flows[key] = seen
+                mask.append(False)
+                continue
+            flows[key] = (seen + 1) % every
+            mask.append(seen == 0)
+        return mask
+
+
+class CycleStage(Stage):
+    """Feed every datagram to the per-flow cycle tracker."""
+
+    name = "cycles"
+
+    def __init__(self, sniffer: "PlcSniffer"):
+        self.sniffer = sniffer
+
+    def process(self, batch: Batch) -> Optional[Mask]:
+        cycles = self.sniffer.cycles
+        if cycles is not None:
+            for meta in batch.metas:
+                cycles.observe(meta)
+        return None
+
+
+class SizeStage(Stage):
+    """Drop payloads larger than ``MAX_PACKET_SIZE``."""
+
+    name = "size"
+    drop_reason = "oversized"
+
+    def __init__(self, sniffer: "PlcSniffer"):
+        self.sniffer = sniffer
+
+    def process(self, batch: Batch) -> Optional[Mask]:
+        limit = self.sniffer.config.max_packet_size
+        mask = [len(payload) <= limit for payload in batch.payloads]
+        if all(mask):
+            return None
+        for payload, kept in zip(batch.payloads, mask):
+            if not kept:
+                logger.warning(
+                    f"Packet dropped: size {len(payload)} exceeds limit {limit}"
+                )
+        return mask
+
+
+class ForwardStage(Stage):
+    """Hand datagrams to the output, or to the traffic class scheduler.
+
+    An exception while handing over one datagram drops only that datagram
+    and counts it as an error; the others of the batch are still sent.
+    """
+
+    name = "forward"
+
+    def __init__(self, sniffer: "PlcSniffer"):
+        self.sniffer = sniffer
+
+    def _failed(self, e: Exception) -> bool:
+        """Count a datagram lost to an exception; the pipeline counts the drop."""
+        self.sniffer.stats.record_error()
+        logger.error(f"Error forwarding packet: {e}")
+        return False
+
+    def process(self, batch: Batch) -> Optional[Mask]:
+        sniffer = self.sniffer
+        if sniffer.scheduler is not None:
+            # Forwarded (or shed) later, in class priority order
+            offer = sniffer.scheduler.offer
+            mask = []
+            for payload, meta, lease in zip(batch.payloads, batch.metas, batch.leases):
+                try:
+                    offer(payload, meta, lease)
+                except Exception as e:
+                    mask.append(self._failed(e))
+                    continue
+                mask.append(True)
+            return None if all(mask) else mask
+
+        forward = sniffer._forward_packet
+        record = sniffer.stats.record_packet
+        debug = logger.isEnabledFor(logging.DEBUG)
+        mask = []
+        for payload, meta, lease in zip(batch.payloads, batch.metas, batch.leases):
+            try:
+                forwarded = forward(payload, meta, lease)
+            except Exception as e:
+                mask.append(self._failed(e))
+                continue
+            if forwarded:
+                record(forwarded=True, size=len(payload))
+                # Formatting the message costs more than forwarding; skip unless needed
+                if debug:
+                    logger.debug(
+                        f"Forwarded packet from {meta.src_ip}:{meta.src_port} "
+                        f"to {meta.dst_ip}:{meta.dst_port}, size: {len(payload)} bytes"
+                    )
+            mask.append(forwarded)
+        try:
+            sniffer._flush_output()
+        except Exception as e:
+            # The datagrams are already counted; whatever was buffered is lost
+            logger.error(f"Error flushing output: {e}")
+        return mask
+
+
+BUILTIN_STAGES: Dict[str, Callable[["PlcSniffer"], Stage]] = {
+    stage.name: stage
+    for stage in (SampleStage, RateLimitStage, CycleStage, SizeStage, ForwardStage)
+}
+
+
+def load_stage(name: str, sniffer: "PlcSniffer") -> Stage:
+    """Create a built-in stage or one registered in the ``plc_sniffer.stages`` group.
+
+    Raises:
+        ValidationError: If no stage has that name or the plugin fails to load
+    """
+    factory = BUILTIN_STAGES.get(name)
+    if factory is None:
+        found = entry_points(group=ENTRY_POINT_GROUP, name=name)
+        if not found:
+            raise ValidationError(f"Unknown pipeline stage '{name}'")
+        try:
+            factory = next(iter(found)).load()
+        except Exception as e:
+            raise ValidationError(f"Cannot load pipeline stage '{name}': {e}")
+    stage = factory(sniffer)
+    if not stage.name:
+        stage.name = name
+    return stage
+
+
+class StageCountersShard:
+    """Per-stage counters of one capture thread, indexed by stage position."""
+
+    __slots__ = COUNTERS
+
+    def __init__(self, stages: int):
+        self.batches = [0] * stages
+        self.packets = [0] * stages
+        self.dropped = [0] * stages
+        self.errors = [0] * stages
+
+
+class Pipeline:
+    """Run batches through a fixed list of stages.
+
+    Each stage sees only the datagrams kept by the stages before it; an
+    empty batch stops early. Batches, datagrams in, datagrams dropped and
+    exceptions are counted per stage without the stages doing anything.
+    ``record_drop`` is called with the number of datagrams a stage dropped
+    (or that were lost to an exception) and the reason, for the packet
+    counters.
+    """
+
+    def __init__(
+        self, stages: Sequence[Stage], record_drop: Callable[[int, Optional[str]], None]
+    ):
+        self.stages = list(stages)
+        self.names = tuple(stage.name for stage in self.stages)
+        self.record_drop = record_drop
+        self.shards: Shards[StageCountersShard] = Shards(
+            lambda: StageCountersShard(len(self.stages))
+        )
+
+    def _step(self, counters: StageCountersShard, index: int, batch: Batch) -> bool:
+        """Run stage ``index`` over a non-empty batch.
+
+        Returns:
+            False if the stage raised; the batch is then lost
+        """
+        stage = self.stages[index]
+        count = len(batch)
+        counters.batches[index] += 1
+        counters.packets[index] += count
+        try:
+            mask = stage.process(batch)
+        except Exception as e:
+            counters.errors[index] += 1
+            self.record_drop(count, "errors")
+            logger.error(f"Error in pipeline stage {stage.name}: {e}")
+            return False
+        if mask is not None:
+            dropped = batch.keep(mask)
+            if dropped:
+                counters.dropped[index] += dropped
+                self.record_drop(dropped, stage.drop_reason)
+        return True
+
+    def run(self, batch: Batch) -> None:
+        """Pass a batch through the stages."""
+        counters = self.shards.get()
+        for index in range(len(self.stages)):
+            if not batch or not self._step(counters, index, batch):
+                return
+
+    def run_timed(self, batch: Batch, histograms: Sequence[Histogram]) -> None:
+        """:meth:`run`, observing the time each stage takes in ``histograms``."""
+        counters = self.shards.get()
+        clock = time.perf_counter_ns
+        for index in range(len(self.stages)):
+            if not batch:
+                return
+            started = clock()
+            if not self._step(counters, index, batch):
+                return
+            histograms[index].observe((clock() - started) * 1e-9)
+
+    def counters(self) -> Dict[str, Dict[str, int]]:
+        """Counters of every stage summed over all threads, keyed by stage name."""
+        shards = self.shards.all
+        return {
+            name: {
+                counter: sum(getattr(shard, counter)[index] for shard in shards)
+                for counter in COUNTERS
+            }
+            for index, name in enumerate(self.names)
+        }
+
+    def close(self) -> None:
+        """Close every stage."""
+        for stage in self.stages:
+            try:
+                stage.close()
+            except Exception as e:
+                logger.error(f"Error closing pipeline stage {stage.name}: {e}")
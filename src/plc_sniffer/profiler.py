@@ -0,0 +1,109 @@
+"""Statistical sampling profiler for the live capture threads."""
+
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from types import FrameType
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Seconds between two stack samples (100 Hz)
+SAMPLE_INTERVAL = 0.01
+
+# Deepest stack recorded per sample
+MAX_DEPTH = 128
+
+Stack = Tuple[str, ...]
+
+
+def frame_label(frame: FrameType) -> str:
+    """``file:line(function)`` label of a frame, as printed by pstats."""
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_firstlineno}({code.co_name})"
+
+
+def walk_stack(frame: Optional[FrameType]) -> Stack:
+    """Labels of a stack from the outermost frame to ``frame``."""
+    labels: List[str] = []
+    while frame is not None and len(labels) < MAX_DEPTH:
+        labels.append(frame_label(frame))
+        frame = frame.f_back
+    return tuple(reversed(labels))
+
+
+class StackSampler:
+    """Sample the stacks of running threads with ``sys._current_frames``.
+
+    Sampling happens on the calling thread, so the profiled threads run
+    unmodified: no tracing hook is installed and the overhead is one stack
+    walk per thread every ``interval``.
+    """
+
+    def __init__(self, thread_ids: Iterable[int], interval: float = SAMPLE_INTERVAL):
+        self.thread_ids = set(thread_ids)
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.duration = 0.0
+
+    def run(self, seconds: float, stop: Optional[threading.Event] = None) -> None:
+        """Sample for ``seconds`` (or until ``stop`` is set)."""
+        stop = stop or threading.Event()
+        started = time.monotonic()
+        deadline = started + seconds
+        while not stop.is_set():
+            self.sample()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or stop.wait(min(self.interval, remaining)):
+                break
+        self.duration = time.monotonic() - started
+
+    def sample(self) -> None:
+        """Record the current stack of every profiled thread."""
+        frames = sys._current_frames()
+        for thread_id in self.thread_ids:
+            frame = frames.get(thread_id)
+            if frame is not None:
+                self.stacks[walk_stack(frame)] += 1
+                self.samples += 1
+
+    def collapsed(self) -> str:
+        """Stacks in the folded format read by ``flamegraph.pl`` and speedscope."""
+        return "\n".join(
+            f'{";".join(stack)} {count}' for stack, count in sorted(self.stacks.items())
+        )
+
+    def summary(self, limit: int = 30) -> str:
+        """pstats-style table of the functions with the most samples.
+
+        ``self`` counts samples where the function was running, ``cumulative``
+        samples where it was anywhere on the stack.
+        """
+        own: Dict[str, int] = Counter()
+        cumulative: Dict[str, int] = Counter()
+        for stack, count in self.stacks.items():
+            if stack:
+                own[stack[-1]] += count
+            for label in set(stack):
+                cumulative[label] += count
+
+        total = self.samples or 1
+        lines = [
+            f"{self.samples} samples in {self.duration:.3f} seconds "
+            f"from {len(self.thread_ids)} thread(s)",
+            "",
+            "   Ordered by: cumulative samples",
+            "",
+            "  self  self%  cumulative   cum%  filename:lineno(function)",
+        ]
+        ranked = sorted(
+            cumulative, key=lambda label: (-cumulative[label], -own[label], label)
+        )
+        for label in ranked[:limit]:
+            lines.append(
+                f"{own[label]:6d} {100 * own[label] / total:6.1f} "
+                f"{cumulative[label]:11d} {100 * cumulative[label] / total:6.1f}  "
+                f"{label}"
+            )
+        return "\n".join(lines)
@@ -0,0 +1,105 @@
+"""Raw ``AF_PACKET`` capture engine receiving into pooled buffers."""
+
+import logging
+import socket
+import struct
+import time
+from typing import Optional, Tuple
+
+from scapy.arch.linux import attach_filter
+
+logger = logging.getLogger(__name__)
+
+ETH_P_ALL = 0x0003
+ETH_P_IP = 0x0800
+VLAN_ETHERTYPES = (0x8100, 0x88A8)
+SO_TIMESTAMPNS = getattr(socket, "SO_TIMESTAMPNS", 35)
+
+# struct timespec on 64-bit Linux
+_TIMESPEC = struct.Struct("@qq")
+_ANCILLARY_SIZE = socket.CMSG_SPACE(_TIMESPEC.size)
+_ETHERTYPE = struct.Struct("!H")
+
+
+def ipv4_offset(frame: memoryview) -> int:
+    """Offset of the IPv4 header in an Ethernet frame, or -1 if not IPv4.
+
+    802.1Q and 802.1ad tags are skipped.
+    """
+    offset = 12
+    if len(frame) < offset + 2:
+        return -1
+    ethertype = _ETHERTYPE.unpack_from(frame, offset)[0]
+    while ethertype in VLAN_ETHERTYPES and len(frame) >= offset + 6:
+        offset += 4
+        ethertype = _ETHERTYPE.unpack_from(frame, offset)[0]
+    return offset + 2 if ethertype == ETH_P_IP else -1
+
+
+class RawCaptureSocket:
+    """``AF_PACKET`` socket bound to an interface, with a BPF filter attached.
+
+    Frames are received straight into caller-provided buffers with
+    ``recvmsg_into``, together with their kernel ``SO_TIMESTAMPNS``
+    timestamp. ``ins`` is the underlying socket, as on scapy sockets, so the
+    filter can be replaced and kernel statistics read the same way.
+
+    Reads that must not wait go through a non-blocking duplicate of the
+    socket: with a timeout set, Python polls before every receive, even one
+    flagged ``MSG_DONTWAIT``.
+    """
+
+    def __init__(self, interface: str, bpf_filter: str, timeout: float = 0.5):
+        sock = socket.socket(socket.AF_PACKET, socket.SOCK_RAW, socket.htons(ETH_P_ALL))
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, SO_TIMESTAMPNS, 1)
+            attach_filter(sock, bpf_filter, interface)
+            sock.bind((interface, 0))
+            sock.settimeout(timeout)
+        except Exception:
+            sock.close()
+            raise
+        self.ins = sock
+        self.truncated = 0
+        self._nowait: Optional[socket.socket] = None
+
+    def recv_into(self, buffer: bytearray, wait: bool = True) -> Tuple[int, float]:
+        """Receive one frame into ``buffer``.
+
+        Args:
+            buffer: Buffer to receive into
+            wait: Wait up to the socket timeout for a frame; otherwise return
+                at once if none is queued
+
+        Returns:
+            Frame length and capture timestamp; length is 0 on timeout, when
+            a non-blocking socket has nothing queued, or when the frame did
+            not fit into the buffer
+        """
+        sock = self.ins
+        if not wait:
+            if self._nowait is None:
+                self._nowait = self.ins.dup()
+                self._nowait.setblocking(False)
+            sock = self._nowait
+        try:
+            nbytes, ancdata, flags, _ = sock.recvmsg_into([buffer], _ANCILLARY_SIZE)
+        except (socket.timeout, BlockingIOError):
+            return 0, 0.0
+
+        if flags & socket.MSG_TRUNC:
+            self.truncated += 1
+            return 0, 0.0
+
+        for level, kind, data in ancdata:
+            if level == socket.SOL_SOCKET and kind == SO_TIMESTAMPNS:
+                seconds, nanoseconds = _TIMESPEC.unpack_from(data)
+                return nbytes, seconds + nanoseconds * 1e-9
+        return nbytes, time.time()
+
+    def close(self) -> None:
+        """Close the socket."""
+        if self._nowait is not None:
+            self._nowait.close()
+            self._nowait = None
+        self.ins.close()
@@ -0,0 +1,192 @@
+"""Bounded-memory IPv4 fragment reassembly."""
+
+import logging
+from typing import Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (src, dst, IP ID, protocol), as in RFC 791
+FragmentKey = Tuple[str, str, int, int]
+
+# Fragments accepted per datagram before it is considered an attack
+MAX_FRAGMENTS = 64
+
+# Number of timeout wheel slots covering one reassembly timeout
+WHEEL_SLOTS = 64
+
+# BPF expression for non-first UDP fragments, which port filters never match
+NON_FIRST_FRAGMENT_FILTER = "ip proto 17 and ip[6:2] & 0x1fff != 0"
+
+
+class PendingDatagram:
+    """A datagram being reassembled into a pooled buffer."""
+
+    __slots__ = ("buffer", "extents", "received", "total_length", "slot")
+
+    def __init__(self, buffer: bytearray, slot: int):
+        self.buffer = buffer
+        self.extents: List[Tuple[int, int]] = []
+        self.received = 0
+        self.total_length = -1  # unknown until the last fragment arrives
+        self.slot = slot
+
+
+class FragmentReassembler:
+    """Reassemble IPv4 fragments with fixed memory and timeout-based eviction.
+
+    Each datagram in progress borrows one of ``max_datagrams`` buffers of
+    ``max_datagram_size`` bytes allocated up front, so memory use never
+    grows with traffic. When all buffers are taken, the oldest datagram is
+    evicted. Datagrams not completed within ``timeout`` seconds of their
+    first fragment are expired by a timing wheel, which costs O(1) per
+    fragment instead of a scan over everything pending.
+
+    Overlapping fragments (teardrop and similar attacks) discard the whole
+    datagram rather than picking which copy of the bytes to trust; exact
+    duplicates are ignored.
+    """
+
+    DROP_REASONS = ("overlap", "oversize", "malformed", "too_many_fragments")
+
+    def __init__(
+        self,
+        max_datagrams: int = 64,
+        max_datagram_size: int = 65535,
+        timeout: float = 30.0,
+    ):
+        self.max_datagram_size = max_datagram_size
+        self.timeout = timeout
+        self._free = [bytearray(max_datagram_size) for _ in range(max_datagrams)]
+        self._pending: Dict[FragmentKey, PendingDatagram] = {}
+
+        self._resolution = timeout / WHEEL_SLOTS
+        self._wheel: List[Set[FragmentKey]] = [set() for _ in range(WHEEL_SLOTS + 1)]
+        self._tick: Optional[int] = None
+
+        self.fragments = 0
+        self.reassembled = 0
+        self.timeouts = 0
+        self.evictions = 0
+        self.dropped: Dict[str, int] = {reason: 0 for reason in self.DROP_REASONS}
+
+    @property
+    def pending(self) -> int:
+        """Datagrams currently being reassembled."""
+        return len(self._pending)
+
+    @property
+    def buffered_bytes(self) -> int:
+        """Fragment bytes held for incomplete datagrams."""
+        return sum(datagram.received for datagram in self._pending.values())
+
+    def add(
+        self,
+        key: FragmentKey,
+        offset: int,
+        more_fragments: bool,
+        data: bytes,
+        now: float,
+    ) -> Optional[bytes]:
+        """Add a fragment and return the datagram payload once it is complete.
+
+        Args:
+            key: (src, dst, IP ID, protocol) of the fragment
+            offset: Fragment offset in bytes
+            more_fragments: Value of the MF flag
+            data: Fragment payload (without the IP header)
+            now: Monotonic time in seconds
+
+        Returns:
+            The reassembled IP payload, or None while fragments are missing
+        """
+        self.fragments += 1
+        self.expire(now)
+
+        end = offset + len(data)
+        datagram = self._pending.get(key)
+
+        if end > self.max_datagram_size:
+            self._drop(key, datagram, "oversize")
+            return None
+        if more_fragments and (not data or len(data) % 8):
+            self._drop(key, datagram, "malformed")
+            return None
+
+        if datagram is None:
+            datagram = self._open(key)
+
+        if (datagram.total_length >= 0 and end > datagram.total_length) or (
+            not more_fragments
+            and datagram.extents
+            and max(e for _, e in datagram.extents) > end
+        ):
+            self._drop(key, datagram, "malformed")
+            return None
+
+        for start, stop in datagram.extents:
+            if start == offset and stop == end:
+                return None  # retransmitted duplicate
+            if offset < stop and start < end:
+                self._drop(key, datagram, "overlap")
+                return None
+
+        if len(datagram.extents) >= MAX_FRAGMENTS:
+            self._drop(key, datagram, "too_many_fragments")
+            return None
+
+        datagram.buffer[offset:end] = data
+        datagram.extents.append((offset, end))
+        datagram.received += len(data)
+        if not more_fragments:
+            datagram.total_length = end
+
+        if datagram.received != datagram.total_length:
+            return None
+
+        payload = bytes(datagram.buffer[: datagram.total_length])
+        self._release(key, datagram)
+        self.reassembled += 1
+        return payload
+
+    def expire(self, now: float) -> None:
+        """Drop datagrams whose reassembly timeout has passed."""
+        tick = int(now / self._resolution)
+        if self._tick is None:
+            self._tick = tick
+            return
+
+        steps = min(tick - self._tick, len(self._wheel))
+        for step in range(1, steps + 1):
+            slot = self._wheel[(self._tick + step) % len(self._wheel)]
+            for key in list(slot):
+                self.timeouts += 1
+                self._release(key, self._pending[key])
+        self._tick = max(self._tick, tick)
+
+    def _open(self, key: FragmentKey) -> PendingDatagram:
+        """Start a datagram, evicting the oldest one if no buffer is free."""
+        if not self._free:
+            oldest = next(iter(self._pending))
+            logger.debug(f"Evicting incomplete datagram {oldest}")
+            self.evictions += 1
+            self._release(oldest, self._pending[oldest])
+
+        assert self._tick is not None
+        slot = (self._tick + WHEEL_SLOTS) % len(self._wheel)
+        datagram = PendingDatagram(self._free.pop(), slot)
+        self._pending[key] = datagram
+        self._wheel[slot].add(key)
+        return datagram
+
+    def _drop(
+        self, key: FragmentKey, datagram: Optional[PendingDatagram], reason: str
+    ) -> None:
+        self.dropped[reason] += 1
+        logger.debug(f"Dropping fragmented datagram {key}: {reason}")
+        if datagram is not None:
+            self._release(key, datagram)
+
+    def _release(self, key: FragmentKey, datagram: PendingDatagram) -> None:
+        del self._pending[key]
+        self._wheel[datagram.slot].discard(key)
+        self._free.append(datagram.buffer)
@@ -0,0 +1,218 @@
+"""Route packets to per-route destination pools through a precomputed index."""
+
+import asyncio
+import logging
+import socket
+from array import array
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+from .buffers import BufferLease
+from .config import Destination, Route, SnifferConfig, TrafficClass
+from .fanout import DestinationPool, DestinationWorker, create_forwarder
+from .metrics import Shards
+from .packet import PacketMeta, Payload
+from .spill import SpillQueue
+
+logger = logging.getLogger(__name__)
+
+NO_ROUTE = -1
+
+
+class RoutingTable:
+    """Index routes by destination port and source subnet.
+
+    Exact ports and port ranges are expanded into a dense 65536-entry table,
+    so a port lookup is a single array access whatever the number of rules.
+    Exact ports take precedence over ranges. Subnet routes live in one dict
+    per prefix length, probed from the longest prefix down, and are only
+    consulted when no port route matched. Traffic classes use the same
+    rules and are indexed the same way.
+    """
+
+    def __init__(self, routes: Sequence[Union[Route, TrafficClass]]):
+        self.routes = list(routes)
+        self._by_port = array("i", [NO_ROUTE]) * 65536
+
+        for index, route in enumerate(self.routes):
+            if route.port_range is not None:
+                low, high = route.port_range
+                self._by_port[low : high + 1] = array("i", [index]) * (high - low + 1)
+        for index, route in enumerate(self.routes):
+            if route.port is not None:
+                self._by_port[route.port] = index
+
+        by_prefix: Dict[int, Dict[int, int]] = {}
+        for index, route in enumerate(self.routes):
+            if route.src_net is not None:
+                network, prefix = route.src_net.split("/")
+                prefix_len = int(prefix)
+                key = int.from_bytes(socket.inet_aton(network), "big") >> (
+                    32 - prefix_len
+                )
+                by_prefix.setdefault(prefix_len, {})[key] = index
+        self._subnets: List[Tuple[int, Dict[int, int]]] = sorted(
+            by_prefix.items(), reverse=True
+        )
+
+    def lookup(self, src_ip: str, dst_port: int) -> int:
+        """Return the index of the matching route, or ``NO_ROUTE``."""
+        index = self._by_port[dst_port]
+        if index != NO_ROUTE or not self._subnets:
+            return index
+
+        address = int.from_bytes(socket.inet_aton(src_ip), "big")
+        for prefix_len, networks in self._subnets:
+            index = networks.get(address >> (32 - prefix_len), NO_ROUTE)
+            if index != NO_ROUTE:
+                return index
+        return NO_ROUTE
+
+
+class Router:
+    """Dispatch payloads to the destination pool of their route.
+
+    Without routes every payload goes to the pool built from the top-level
+    destinations. Destinations shared by several routes share one worker, so
+    each collector still has exactly one socket and queue.
+    """
+
+    def __init__(
+        self,
+        pools: Sequence[DestinationPool],
+        table: Optional[RoutingTable] = None,
+        names: Sequence[str] = (),
+    ):
+        self.pools = list(pools)
+        self.table = table
+        self.names = list(names) or ["default"]
+        # Per-thread match counts, one slot per route plus one for unrouted
+        self._counts: Shards[List[int]] = Shards(lambda: [0] * (len(self.pools) + 1))
+
+        unique: Dict[int, DestinationWorker] = {}
+        for pool in self.pools:
+            for worker in pool.workers:
+                unique[id(worker)] = worker
+        self.workers = list(unique.values())
+
+    @classmethod
+    def from_config(
+        cls,
+        config: SnifferConfig,
+        loop: Optional[asyncio.AbstractEventLoop] = None,
+        spills: Optional[Dict[str, SpillQueue]] = None,
+    ) -> "Router":
+        """Build pools for the configured routes or the default destinations.
+
+        With an event loop every destination is sent to inline from the loop
+        instead of from a worker thread. ``spills`` maps destination labels
+        to the spill queues their workers store undeliverable payloads in.
+        """
+        if config.routes:
+            labels = {
+                dest.label for route in config.routes for dest in route.destinations
+            }
+        else:
+            labels = {dest.label for dest in config.forward_destinations}
+        # Parallel capture threads and the event loop send inline, each
+        # capture thread through sockets of its own
+        threaded = len(labels) > 1 and loop is None and config.capture_threads == 1
+        workers: Dict[str, DestinationWorker] = {}
+
+        def pool_for(
+            destinations: Sequence[Destination], distribution: str
+        ) -> DestinationPool:
+            members = []
+            for dest in destinations:
+                if dest.label not in workers:
+                    spill = spills.get(dest.label) if spills else None
+                    workers[dest.label] = DestinationWorker(
+                        dest,
+                        create_forwarder(config, dest, loop, spill),
+                        config.destination_queue_size,
+                        config.forwarder_cpus,
+                        config.realtime_priority,
+                        spill,
+                    )
+                members.append(workers[dest.label])
+            return DestinationPool(
+                members,
+                distribution,
+                threaded=threaded,
+                weights=[dest.weight for dest in destinations],
+            )
+
+        if not config.routes:
+            return cls([pool_for(config.forward_destinations, config.distribution)])
+
+        pools = [
+            pool_for(route.destinations, route.distribution or config.distribution)
+            for route in config.routes
+        ]
+        return cls(
+            pools, RoutingTable(config.routes), [route.name for route in config.routes]
+        )
+
+    @property
+    def routed(self) -> List[int]:
+        """Payloads matched per route."""
+        totals = [0] * len(self.pools)
+        for counts in self._counts.all:
+            for index in range(len(totals)):
+                totals[index] += counts[index]
+        return totals
+
+    @property
+    def unrouted(self) -> int:
+        """Payloads that matched no route."""
+        return sum(counts[-1] for counts in self._counts.all)
+
+    @property
+    def no_destination(self) -> int:
+        """Payloads dropped because no healthy destination was available."""
+        return sum(pool.no_destination for pool in self.pools)
+
+    @property
+    def balanced(self) -> bool:
+        """Whether any pool load-balances by flow hash."""
+        return any(pool.balancer is not None for pool in self.pools)
+
+    def send(
+        self,
+        payload: Payload,
+        meta: Optional[PacketMeta] = None,
+        lease: Optional[BufferLease] = None,
+    ) -> bool:
+        """Forward a payload through the pool of its route.
+
+        Args:
+            payload: Datagram payload
+            meta: Addressing used for route lookup and flow hashing
+            lease: Pooled buffer the payload is a view of, if any
+
+        Returns:
+            True if the payload was accepted by at least one destination
+        """
+        counts = self._counts.get()
+        if self.table is None:
+            index = 0
+        elif meta is None:
+            counts[-1] += 1
+            return False
+        else:
+            index = self.table.lookup(meta.src_ip, meta.dst_port)
+            if index == NO_ROUTE:
+                counts[-1] += 1
+                return False
+
+        counts[index] += 1
+        return self.pools[index].send(payload, meta, lease)
+
+    def start(self) -> None:
+        """Start all destination workers."""
+        for pool in self.pools:
+            pool.start()
+
+    def stop(self) -> None:
+        """Stop all destination workers and close their sockets."""
+        for worker in self.workers:
+            worker.stop()
@@ -0,0 +1,168 @@
+"""Low-jitter runtime: CPU pinning, real-time scheduling and GC control."""
+
+import asyncio
+import gc
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Sequence
+
+from .metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+# How often the idle collector checks whether a collection is due
+GC_CHECK_INTERVAL = 0.05
+
+# Time without packets after which the capture loop counts as idle
+GC_IDLE_GAP = 0.002
+
+# Collect even without an idle gap once this many thresholds are pending
+GC_FORCE_FACTOR = 10
+
+
+def pin_current_thread(
+    cpus: Sequence[int], priority: int = 0, name: str = "thread"
+) -> None:
+    """Pin the calling thread to CPUs and optionally switch it to ``SCHED_FIFO``.
+
+    On Linux both calls with pid 0 apply to the calling thread only, so the
+    capture loop and each forwarder thread can be placed independently.
+    Failures (missing ``CAP_SYS_NICE``, CPUs outside the cpuset) are logged
+    and the thread keeps running with its previous settings.
+    """
+    if cpus:
+        try:
+            os.sched_setaffinity(0, cpus)
+            logger.info(f"Pinned {name} to CPUs {','.join(map(str, cpus))}")
+        except OSError as e:
+            logger.warning(f"Cannot pin {name} to CPUs {list(cpus)}: {e}")
+
+    if priority:
+        try:
+            os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(priority))
+            logger.info(f"Running {name} with SCHED_FIFO priority {priority}")
+        except (OSError, AttributeError) as e:
+            logger.warning(f"Cannot set SCHED_FIFO priority {priority} for {name}: {e}")
+
+
+def freeze_heap() -> None:
+    """Move everything allocated so far out of reach of the collector.
+
+    Objects created during startup (scapy layers, config, sockets) live for
+    the whole run; freezing them keeps later full collections short.
+    """
+    gc.collect()
+    gc.freeze()
+    logger.info(f"Froze {gc.get_freeze_count()} objects after startup")
+
+
+class GcMonitor:
+    """Measure every garbage collection through ``gc.callbacks``."""
+
+    def __init__(self) -> None:
+        self.pauses = [Histogram() for _ in range(3)]
+        self._started = 0.0
+        self._installed = False
+
+    def install(self) -> None:
+        """Register the callback (once per process)."""
+        if not self._installed:
+            gc.callbacks.append(self._callback)
+            self._installed = True
+
+    def _callback(self, phase: str, info: Dict[str, Any]) -> None:
+        if phase == "start":
+            self._started = time.perf_counter()
+        else:
+            self.pauses[info["generation"]].observe(time.perf_counter() - self._started)
+
+
+GC_MONITOR = GcMonitor()
+
+
+class IdleCollector:
+    """Run garbage collection when the capture loop is idle.
+
+    Automatic collection is disabled while the collector runs. A background
+    thread checks the allocation counters every ``GC_CHECK_INTERVAL`` and,
+    once a generation is due, collects it as soon as no packet has arrived
+    for ``GC_IDLE_GAP`` seconds; with cyclic PLC traffic that is the gap
+    between two cycles. If the capture loop never goes idle, collection is
+    forced once ``GC_FORCE_FACTOR`` thresholds are pending, so memory stays
+    bounded. Under the asyncio runtime the checks run as loop timers, so
+    collection never races with packet processing.
+    """
+
+    def __init__(
+        self, last_activity: Callable[[], float], idle_gap: float = GC_IDLE_GAP
+    ):
+        self.last_activity = last_activity
+        self.idle_gap = idle_gap
+        self.idle_collections = 0
+        self.forced_collections = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    def start(self, loop: Optional[asyncio.AbstractEventLoop] = None) -> None:
+        """Disable automatic collection and start checking.
+
+        Checks run on ``loop`` when one is given, otherwise on a thread.
+        """
+        gc.disable()
+        self._stop.clear()
+        if loop is not None:
+            self._timer = loop.call_later(GC_CHECK_INTERVAL, self._tick, loop)
+            return
+        self._thread = threading.Thread(target=self._run, name="gc-idle", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop checking and re-enable automatic collection."""
+        self._stop.set()
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+        gc.enable()
+
+    def _run(self) -> None:
+        while not self._stop.wait(GC_CHECK_INTERVAL):
+            self.collect_if_due()
+
+    def _tick(self, loop: asyncio.AbstractEventLoop) -> None:
+        self.collect_if_due()
+        self._timer = loop.call_later(GC_CHECK_INTERVAL, self._tick, loop)
+
+    def collect_if_due(self) -> Optional[int]:
+        """Collect the oldest due generation if the capture loop is idle.
+
+        Returns:
+            The collected generation, or None if nothing was collected
+        """
+        counts = gc.get_count()
+        thresholds = gc.get_threshold()
+        if counts[0] < thresholds[0]:
+            return None
+
+        idle = time.time() - self.last_activity() >= self.idle_gap
+        if not idle and counts[0] < thresholds[0] * GC_FORCE_FACTOR:
+            return None
+
+        if counts[2] >= thresholds[2]:
+            generation = 2
+        elif counts[1] >= thresholds[1]:
+            generation = 1
+        else:
+            generation = 0
+        gc.collect(generation)
+
+        if idle:
+            self.idle_collections += 1
+        else:
+            self.forced_collections += 1
+        return generation
@@ -0,0 +1,276 @@
+"""Traffic classes with bounded queues, priority scheduling and deadline shedding."""
+
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, List, Optional, Sequence, Tuple
+
+from .buffers import BufferLease
+from .config import DEFAULT_CLASS, TrafficClass
+from .metrics import Histogram, Shards, summed
+from .packet import PacketMeta, Payload
+from .routing import RoutingTable
+
+logger = logging.getLogger(__name__)
+
+# Packets handled per scheduling round before yielding
+SERVE_BATCH = 64
+
+# Seconds to wait for rate limit tokens once the output is throttled
+THROTTLE_WAIT = 0.001
+
+Item = Tuple[Payload, PacketMeta, Optional[BufferLease]]
+
+
+class ClassStatsShard:
+    """Class counters updated by a single thread."""
+
+    __slots__ = ("queued", "forwarded", "queue_full", "deadline")
+
+    def __init__(self) -> None:
+        self.queued = 0
+        self.forwarded = 0
+        self.queue_full = 0
+        self.deadline = 0
+
+
+class ClassStats:
+    """Counters of one traffic class, kept per thread and summed when read."""
+
+    DROP_REASONS = ("queue_full", "deadline")
+
+    queued = summed("queued")
+    forwarded = summed("forwarded")
+    queue_full = summed("queue_full")
+    deadline = summed("deadline")
+
+    def __init__(self) -> None:
+        self.shards: Shards[ClassStatsShard] = Shards(ClassStatsShard)
+
+
+class ClassQueue:
+    """Bounded FIFO of one traffic class.
+
+    Capture threads append and only the scheduler pops, so a ``deque`` is
+    enough; the bound is checked before appending and may be exceeded by
+    one packet per concurrent capture thread.
+    """
+
+    def __init__(self, traffic_class: TrafficClass):
+        self.traffic_class = traffic_class
+        self.name = traffic_class.name
+        self.limit = traffic_class.queue_size
+        self.items: Deque[Item] = deque()
+        self.stats = ClassStats()
+        self.delay = Histogram()  # capture to dequeue, observed by the scheduler only
+        self.credit = 0  # smooth weighted round-robin state
+
+    @property
+    def depth(self) -> int:
+        """Packets waiting in the queue."""
+        return len(self.items)
+
+
+class ClassScheduler:
+    """Queue payloads per traffic class and forward them in priority order.
+
+    Capture threads classify each payload by destination port or source
+    subnet and append it to its class queue; a full queue drops the new
+    payload. The scheduler (a thread, or loop callbacks under the asyncio
+    runtime) takes the next payload by class priority (``strict``) or by
+    class weight (``weighted``, smooth weighted round-robin), sheds it if
+    it is older than the class deadline, and hands it to ``deliver``.
+
+    When ``allow`` is given it shapes the output: a payload the rate limit
+    does not allow yet stays at the head of its queue, so overload fills the
+    queues of the lower classes instead of dropping whatever arrives next.
+    ``flush`` is called after every round that delivered payloads, for
+    outputs that send in batches.
+    """
+
+    def __init__(
+        self,
+        classes: Sequence[TrafficClass],
+        deliver: Callable[[Payload, PacketMeta, Optional[BufferLease]], None],
+        shed: Callable[[], None],
+        scheduling: str = "strict",
+        allow: Optional[Callable[[], bool]] = None,
+        default_queue_size: int = 1024,
+        flush: Optional[Callable[[], None]] = None,
+    ):
+        self.deliver = deliver
+        self.flush = flush
+        self.shed = shed
+        self.scheduling = scheduling
+        self.allow = allow
+        self.table = RoutingTable(classes)
+
+        default = TrafficClass(
+            DEFAULT_CLASS,
+            priority=max((c.priority for c in classes), default=0) + 1,
+            queue_size=default_queue_size,
+        )
+        # Indexed by RoutingTable result; NO_ROUTE (-1) selects the default class
+        self._by_rule = [ClassQueue(c) for c in classes] + [ClassQueue(default)]
+        self.queues: List[ClassQueue] = sorted(
+            self._by_rule, key=lambda q: q.traffic_class.priority
+        )
+
+        self.running = False
+        self.throttled = False
+        self._ready = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._drain_handle: Optional[asyncio.Handle] = None
+
+    @property
+    def pending(self) -> int:
+        """Packets waiting in all class queues."""
+        return sum(q.depth for q in self.queues)
+
+    def classify(self, meta: PacketMeta) -> ClassQueue:
+        """Queue of the class a datagram belongs to."""
+        return self._by_rule[self.table.lookup(meta.src_ip, meta.dst_port)]
+
+    def offer(
+        self, payload: Payload, meta: PacketMeta, lease: Optional[BufferLease] = None
+    ) -> bool:
+        """Queue a payload without blocking.
+
+        Returns:
+            False if the class queue was full and the payload was dropped
+        """
+        class_queue = self.classify(meta)
+        stats = class_queue.stats.shards.get()
+        if len(class_queue.items) >= class_queue.limit:
+            stats.queue_full += 1
+            self.shed()
+            return False
+
+        if lease is not None:
+            lease.retain()
+        class_queue.items.append((payload, meta, lease))
+        stats.queued += 1
+
+        if self._loop is not None:
+            if self._drain_handle is None:
+                self._drain_handle = self._loop.call_soon(self._drain)
+        elif not self._ready.is_set():
+            self._ready.set()
+        return True
+
+    def next_item(self) -> Optional[Tuple[ClassQueue, Item]]:
+        """Remove the payload to serve next, with its class queue."""
+        if self.scheduling == "strict":
+            for class_queue in self.queues:
+                if class_queue.items:
+                    return class_queue, class_queue.items.popleft()
+            return None
+
+        best: Optional[ClassQueue] = None
+        total = 0
+        for class_queue in self.queues:
+            if class_queue.items:
+                weight = class_queue.traffic_class.weight
+                class_queue.credit += weight
+                total += weight
+                if best is None or class_queue.credit > best.credit:
+                    best = class_queue
+        if best is None:
+            return None
+        best.credit -= total
+        return best, best.items.popleft()
+
+    def serve(self, budget: int = SERVE_BATCH) -> int:
+        """Forward or shed up to ``budget`` queued payloads.
+
+        Stops early when the queues are empty or the rate limit is reached
+        (``throttled`` is then set).
+
+        Returns:
+            Number of payloads taken off the queues
+        """
+        self.throttled = False
+        handled = 0
+        while handled < budget:
+            picked = self.next_item()
+            if picked is None:
+                break
+            class_queue, (payload, meta, lease) = picked
+            stats = class_queue.stats.shards.get()
+            age = time.time() - meta.timestamp
+            deadline = class_queue.traffic_class.deadline
+
+            if deadline and age > deadline:
+                stats.deadline += 1
+                self.shed()
+            elif self.allow is not None and not self.allow():
+                class_queue.items.appendleft((payload, meta, lease))
+                self.throttled = True
+                break
+            else:
+                class_queue.delay.observe(max(age, 0.0))
+                stats.forwarded += 1
+                try:
+                    self.deliver(payload, meta, lease)
+                except Exception as e:
+                    logger.error(f"Error forwarding {class_queue.name} packet: {e}")
+
+            if lease is not None:
+                lease.release()
+            handled += 1
+        if handled and self.flush is not None:
+            self.flush()
+        return handled
+
+    def start(self, loop: Optional[asyncio.AbstractEventLoop] = None) -> None:
+        """Start serving, on ``loop`` if given, otherwise on a thread."""
+        self.running = True
+        if loop is not None:
+            self._loop = loop
+            return
+        self._thread = threading.Thread(
+            target=self._run, name="class-scheduler", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self) -> None:
+        while self.running:
+            if self.serve():
+                continue
+            if self.throttled:
+                time.sleep(THROTTLE_WAIT)
+                continue
+            # Clear before re-checking, so an offer in between is not missed
+            self._ready.clear()
+            if not self.pending:
+                self._ready.wait(0.5)
+
+    def _drain(self) -> None:
+        self._drain_handle = None
+        if not self.running or self._loop is None:
+            return
+        self.serve()
+        if self.throttled:
+            self._drain_handle = self._loop.call_later(THROTTLE_WAIT, self._drain)
+        elif self.pending:
+            self._drain_handle = self._loop.call_soon(self._drain)
+
+    def stop(self) -> None:
+        """Stop serving and return the buffers of payloads still queued."""
+        self.running = False
+        self._ready.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+        if self._drain_handle is not None:
+            self._drain_handle.cancel()
+            self._drain_handle = None
+        self._loop = None
+        for class_queue in self.queues:
+            while class_queue.items:
+                _, _, lease = class_queue.items.popleft()
+                if lease is not None:
+                    lease.release()
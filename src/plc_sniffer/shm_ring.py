@@ -0,0 +1,298 @@
+"""Shared-memory ring output for co-located consumers.
+
+The ring is a memory-mapped file (by default under ``/dev/shm``) written by a
+single producer, the sniffer, and read by any number of local consumers.
+Records live in fixed-size slots and carry a monotonically increasing sequence
+number, so readers never block the writer and detect overruns on their own by
+comparing sequence numbers.
+
+File layout::
+
+    0    magic (8 bytes) | version (u32) | slot_count (u32) | slot_size (u32)
+    24   sample_rate (f64) - share of packets kept by sampling, 0 in older rings
+    64   write_seq (u64) - sequence number of the last published record
+    128  slot 0 | slot 1 | ... | slot slot_count - 1
+
+Slot layout::
+
+    0    seq (u64) | timestamp_ns (u64) | src_ip (4s) | dst_ip (4s)
+    24   src_port (u16) | dst_port (u16) | length (u32)
+    32   payload (slot_size - 32 bytes)
+
+The writer zeroes a slot's sequence number before overwriting it and stores
+the new number last, so a reader that sees the same sequence number before
+and after copying a slot knows the copy is consistent.
+"""
+
+import logging
+import mmap
+import os
+import socket
+import struct
+from typing import List, NamedTuple, Optional
+
+from .packet import PacketMeta, Payload
+
+logger = logging.getLogger(__name__)
+
+RING_MAGIC = b"PLCRING\x01"
+RING_VERSION = 1
+
+HEADER_SIZE = 128
+WRITE_SEQ_OFFSET = 64
+SAMPLE_RATE_OFFSET = 24
+SLOT_HEADER_SIZE = 32
+
+_HEADER = struct.Struct("<8sIII")
+_SEQ = struct.Struct("<Q")
+_SAMPLE_RATE = struct.Struct("<d")
+_SLOT_META = struct.Struct("<Q4s4sHHI")  # everything after seq
+_EMPTY_ADDR = b"\x00\x00\x00\x00"
+
+
+class RingRecord(NamedTuple):
+    """A record read back from the ring."""
+
+    seq: int
+    timestamp: float
+    src_ip: str
+    dst_ip: str
+    src_port: int
+    dst_port: int
+    payload: bytes
+
+
+class RingBatch(NamedTuple):
+    """Result of a single :meth:`ShmRingReader.read_batch` call."""
+
+    records: List[RingRecord]
+    lost: int  # records overwritten before the reader got to them
+
+
+def ring_file_size(slot_count: int, slot_size: int) -> int:
+    """Return the size in bytes of a ring file with the given geometry."""
+    return HEADER_SIZE + slot_count * slot_size
+
+
+class ShmRingWriter:
+    """Single-producer writer for the shared-memory ring."""
+
+    def __init__(
+        self, path: str, slot_count: int, slot_size: int, sample_rate: float = 1.0
+    ):
+        if slot_count <= 0 or slot_count & (slot_count - 1):
+            raise ValueError("Ring slot count must be a power of two")
+        if slot_size <= SLOT_HEADER_SIZE:
+            raise ValueError(f"Ring slot size must exceed {SLOT_HEADER_SIZE} bytes")
+
+        self.path = path
+        self.slot_count = slot_count
+        self.slot_size = slot_size
+        self.capacity = slot_size - SLOT_HEADER_SIZE
+        self.records_written = 0
+        self.dropped = 0
+
+        self._mask = slot_count - 1
+        self._seq = 0
+
+        size = ring_file_size(slot_count, slot_size)
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            os.ftruncate(fd, size)
+            self._mmap = mmap.mmap(
+                fd, size, mmap.MAP_SHARED, mmap.PROT_READ | mmap.PROT_WRITE
+            )
+        finally:
+            os.close(fd)
+        self._buf = memoryview(self._mmap)
+
+        # Reset any previous contents so readers see a fresh ring
+        _SEQ.pack_into(self._buf, WRITE_SEQ_OFFSET, 0)
+        for slot in range(slot_count):
+            _SEQ.pack_into(self._buf, HEADER_SIZE + slot * slot_size, 0)
+        _HEADER.pack_into(self._buf, 0, RING_MAGIC, RING_VERSION, slot_count, slot_size)
+        self.sample_rate = sample_rate
+
+        logger.info(
+            f"Shared-memory ring ready at {path} "
+            f"({slot_count} slots x {slot_size} bytes)"
+        )
+
+    @property
+    def write_seq(self) -> int:
+        """Sequence number of the last published record."""
+        return self._seq
+
+    @property
+    def sample_rate(self) -> float:
+        """Share of packets kept by sampling, published in the ring header."""
+        return float(_SAMPLE_RATE.unpack_from(self._buf, SAMPLE_RATE_OFFSET)[0])
+
+    @sample_rate.setter
+    def sample_rate(self, rate: float) -> None:
+        _SAMPLE_RATE.pack_into(self._buf, SAMPLE_RATE_OFFSET, rate)
+
+    def write(self, payload: Payload, meta: Optional[PacketMeta] = None) -> int:
+        """Publish a payload into the next slot.
+
+        Args:
+            payload: Datagram payload
+            meta: Optional addressing and timing of the captured datagram
+
+        Returns:
+            Sequence number of the record, or 0 if the payload did not fit
+        """
+        length = len(payload)
+        if length > self.capacity:
+            self.dropped += 1
+            return 0
+
+        seq = self._seq + 1
+        offset = HEADER_SIZE + (seq & self._mask) * self.slot_size
+        buf = self._buf
+
+        _SEQ.pack_into(buf, offset, 0)
+        buf[offset + SLOT_HEADER_SIZE : offset + SLOT_HEADER_SIZE + length] = payload
+        if meta is not None:
+            _SLOT_META.pack_into(
+                buf,
+                offset + 8,
+                int(meta.timestamp * 1e9),
+                socket.inet_aton(meta.src_ip),
+                socket.inet_aton(meta.dst_ip),
+                meta.src_port,
+                meta.dst_port,
+                length,
+            )
+        else:
+            _SLOT_META.pack_into(
+                buf, offset + 8, 0, _EMPTY_ADDR, _EMPTY_ADDR, 0, 0, length
+            )
+        _SEQ.pack_into(buf, offset, seq)
+        _SEQ.pack_into(buf, WRITE_SEQ_OFFSET, seq)
+
+        self._seq = seq
+        self.records_written += 1
+        return seq
+
+    def close(self) -> None:
+        """Unmap the ring. The file is left in place for late readers."""
+        self._buf.release()
+        self._mmap.close()
+
+
+class ShmRingReader:
+    """Consumer side of the shared-memory ring.
+
+    Reading never issues a system call: records are copied straight out of
+    the shared mapping. Records that the writer overwrote before they were
+    read are reported through :attr:`RingBatch.lost` and :attr:`lost_total`.
+    """
+
+    def __init__(self, path: str, from_start: bool = False):
+        """Attach to an existing ring.
+
+        Args:
+            path: Path of the ring file created by the sniffer
+            from_start: Start at the oldest record still in the ring instead
+                of only returning records published after attaching
+
+        Raises:
+            ValueError: If the file is not a compatible ring
+        """
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            size = os.fstat(fd).st_size
+            if size < HEADER_SIZE:
+                raise ValueError(f"{path} is too small to be a ring file")
+            self._mmap = mmap.mmap(fd, size, mmap.MAP_SHARED, mmap.PROT_READ)
+        finally:
+            os.close(fd)
+        self._buf = memoryview(self._mmap)
+
+        magic, version, slot_count, slot_size = _HEADER.unpack_from(self._buf, 0)
+        if magic != RING_MAGIC or version != RING_VERSION:
+            self.close()
+            raise ValueError(
+                f"{path} is not a plc_sniffer ring (version {RING_VERSION})"
+            )
+        if size < ring_file_size(slot_count, slot_size):
+            self.close()
+            raise ValueError(f"{path} is truncated")
+
+        self.path = path
+        self.slot_count = slot_count
+        self.slot_size = slot_size
+        self.lost_total = 0
+        self.restarts = 0
+        self._mask = slot_count - 1
+
+        head = self._head()
+        if from_start:
+            self.next_seq = max(1, head - slot_count + 1)
+        else:
+            self.next_seq = head + 1
+
+    @property
+    def sample_rate(self) -> float:
+        """Share of packets the sniffer keeps; divide counts by it to scale up."""
+        rate = _SAMPLE_RATE.unpack_from(self._buf, SAMPLE_RATE_OFFSET)[0]
+        return rate if rate > 0 else 1.0
+
+    def _head(self) -> int:
+        return int(_SEQ.unpack_from(self._buf, WRITE_SEQ_OFFSET)[0])
+
+    def read_batch(self, max_records: int = 256) -> RingBatch:
+        """Read up to ``max_records`` records published since the last call."""
+        buf = self._buf
+        head = self._head()
+        lost = 0
+
+        if head < self.next_seq - 1:
+            # Sequence went backwards: the writer restarted and reset the ring
+            self.restarts += 1
+            self.next_seq = 1
+
+        oldest = head - self.slot_count + 1
+        if self.next_seq < oldest:
+            lost += oldest - self.next_seq
+            self.next_seq = oldest
+
+        records: List[RingRecord] = []
+        while self.next_seq <= head and len(records) < max_records:
+            seq = self.next_seq
+            self.next_seq += 1
+            offset = HEADER_SIZE + (seq & self._mask) * self.slot_size
+
+            if _SEQ.unpack_from(buf, offset)[0] != seq:
+                lost += 1
+                continue
+            ts_ns, src, dst, sport, dport, length = _SLOT_META.unpack_from(
+                buf, offset + 8
+            )
+            start = offset + SLOT_HEADER_SIZE
+            payload = bytes(buf[start : start + length])
+            if _SEQ.unpack_from(buf, offset)[0] != seq:
+                # Overwritten while we were copying it
+                lost += 1
+                continue
+
+            records.append(
+                RingRecord(
+                    seq=seq,
+                    timestamp=ts_ns / 1e9,
+                    src_ip=socket.inet_ntoa(src),
+                    dst_ip=socket.inet_ntoa(dst),
+                    src_port=sport,
+                    dst_port=dport,
+                    payload=payload,
+                )
+            )
+
+        self.lost_total += lost
+        return RingBatch(records, lost)
+
+    def close(self) -> None:
+        """Detach from the ring."""
+        self._buf.release()
+        self._mmap.close()
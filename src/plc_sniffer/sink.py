@@ -0,0 +1,521 @@
+"""Benchmark sink and probe generator for loopback measurements.
+
+``plc-sniffer-sink`` binds the destination port and counts what the sniffer
+forwards. Datagrams sent by ``plc-sniffer-sink --generate`` carry a probe
+header (stream id, sequence number and send time), from which the sink
+derives loss, reordering and one-way latency; other payloads are only
+counted. Sniffer, generator and sink together form a complete benchmark on
+one host without external services.
+"""
+
+import argparse
+import ctypes
+import errno
+import json
+import os
+import random
+import socket
+import struct
+import sys
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Sequence, TextIO, Tuple
+
+from .mmsg import MSG_WAITFORONE, Iovec, Mmsghdr, load_recvmmsg
+from .validators import ValidationError, validate_destination
+
+# Probe header: magic, stream id, sequence number, send time (ns since the epoch)
+PROBE = struct.Struct("!4sIQQ")
+PROBE_MAGIC = b"PLCB"
+
+# Latency histogram resolution: linear sub-buckets per power of two (~3% error)
+SUB_BUCKET_BITS = 5
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+
+# Percentiles shown in reports
+PERCENTILES = (50.0, 90.0, 99.0, 99.9)
+
+
+def encode_probe(
+    stream: int, sequence: int, size: int = PROBE.size, sent_ns: Optional[int] = None
+) -> bytes:
+    """Probe payload of ``size`` bytes (at least the header) stamped with send time."""
+    if sent_ns is None:
+        sent_ns = time.time_ns()
+    header = PROBE.pack(PROBE_MAGIC, stream, sequence, sent_ns)
+    return header.ljust(size, b"\0")
+
+
+def decode_probe(payload: bytes) -> Optional[Tuple[int, int, int]]:
+    """Decode a probe header.
+
+    Returns:
+        (stream, sequence, send time in ns), or None if the payload is not a probe
+    """
+    if len(payload) < PROBE.size:
+        return None
+    magic, stream, sequence, sent_ns = PROBE.unpack_from(payload)
+    if magic != PROBE_MAGIC:
+        return None
+    return stream, sequence, sent_ns
+
+
+class LatencyHistogram:
+    """Log-linear histogram of latencies in microseconds with bounded memory.
+
+    Values below ``2 * SUB_BUCKETS`` are exact; above, every power of two
+    is split into ``SUB_BUCKETS`` linear buckets, so a percentile is within
+    about 3% of the true value whatever the range.
+    """
+
+    def __init__(self) -> None:
+        self.counts: Counter = Counter()
+        self.count = 0
+        self.max = 0
+
+    @staticmethod
+    def bucket(value: int) -> int:
+        """Bucket index of a non-negative value."""
+        shift = value.bit_length() - SUB_BUCKET_BITS - 1
+        if shift <= 0:
+            return value
+        return (shift << SUB_BUCKET_BITS) + (value >> shift)
+
+    @staticmethod
+    def upper_bound(index: int) -> int:
+        """Largest value that falls into bucket ``index``."""
+        shift = (index >> SUB_BUCKET_BITS) - 1
+        if shift <= 0:
+            return index
+        return ((index - (shift << SUB_BUCKET_BITS) + 1) << shift) - 1
+
+    def observe(self, value: int) -> None:
+        """Record one latency; negative values (clock skew) count as zero."""
+        value = max(value, 0)
+        self.counts[self.bucket(value)] += 1
+        self.count += 1
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        """Add the observations of another histogram."""
+        self.counts.update(other.counts)
+        self.count += other.count
+        self.max = max(self.max, other.max)
+
+    def percentiles(self, quantiles: Sequence[float] = PERCENTILES) -> Dict[str, int]:
+        """Upper bound of the bucket holding each percentile, capped at the maximum."""
+        result: Dict[str, int] = {}
+        if not self.count:
+            return result
+        buckets = sorted(self.counts.items())
+        for quantile in quantiles:
+            rank = max(1, -(-self.count * quantile // 100))
+            seen = 0
+            for index, count in buckets:
+                seen += count
+                if seen >= rank:
+                    result[f"p{quantile:g}"] = min(self.upper_bound(index), self.max)
+                    break
+        return result
+
+
+class StreamState:
+    """Sequence tracking for one generator stream."""
+
+    __slots__ = ("first", "highest", "received", "reordered")
+
+    def __init__(self, sequence: int):
+        self.first = sequence
+        self.highest = sequence - 1
+        self.received = 0
+        self.reordered = 0
+
+    @property
+    def lost(self) -> int:
+        """Sequence numbers up to the highest seen that have not arrived."""
+        return max(0, self.highest - self.first + 1 - self.received)
+
+
+class SinkStats:
+    """Counters of received datagrams, per-stream loss and latency.
+
+    Loss is the gap between the sequence numbers a stream has reached and
+    the probes that arrived, so a probe arriving late first counts as lost
+    and then as reordered. Probes older than the first one seen from a
+    stream (sent before the sink started) are ignored.
+    """
+
+    def __init__(self) -> None:
+        self.received = 0
+        self.bytes = 0
+        self.untagged = 0
+        self.streams: Dict[int, StreamState] = {}
+        self.latency = LatencyHistogram()
+        self.interval_latency = LatencyHistogram()
+        self._reported_received = 0
+        self._reported_lost = 0
+        self._reported_at = 0.0
+
+    @property
+    def lost(self) -> int:
+        return sum(state.lost for state in self.streams.values())
+
+    @property
+    def reordered(self) -> int:
+        return sum(state.reordered for state in self.streams.values())
+
+    def observe(self, payload: bytes, received_ns: int) -> None:
+        """Account for one received datagram."""
+        self.received += 1
+        self.bytes += len(payload)
+        probe = decode_probe(payload)
+        if probe is None:
+            self.untagged += 1
+            return
+        stream, sequence, sent_ns = probe
+        state = self.streams.get(stream)
+        if state is None:
+            state = self.streams[stream] = StreamState(sequence)
+        elif sequence < state.first:
+            return
+        state.received += 1
+        if sequence > state.highest:
+            state.highest = sequence
+        else:
+            state.reordered += 1
+        self.interval_latency.observe((received_ns - sent_ns) // 1000)
+
+    def report(self, elapsed: float) -> Dict[str, Any]:
+        """Figures since the previous report, ``elapsed`` seconds into the run."""
+        interval = elapsed - self._reported_at
+        received = self.received - self._reported_received
+        lost = self.lost
+        report = {
+            "elapsed": round(elapsed, 3),
+            "received": received,
+            "pps": received / interval if interval > 0 else 0.0,
+            "lost": max(0, lost - self._reported_lost),
+            "latency_us": self.interval_latency.percentiles(),
+        }
+        self.latency.merge(self.interval_latency)
+        self.interval_latency = LatencyHistogram()
+        self._reported_received = self.received
+        self._reported_lost = lost
+        self._reported_at = elapsed
+        return report
+
+    def summary(self, elapsed: float) -> Dict[str, Any]:
+        """Totals for the whole run."""
+        self.latency.merge(self.interval_latency)
+        self.interval_latency = LatencyHistogram()
+        lost = self.lost
+        expected = lost + sum(state.received for state in self.streams.values())
+        latency = self.latency.percentiles()
+        if self.latency.count:
+            latency["max"] = self.latency.max
+        return {
+            "elapsed": round(elapsed, 3),
+            "received": self.received,
+            "bytes": self.bytes,
+            "pps": self.received / elapsed if elapsed > 0 else 0.0,
+            "untagged": self.untagged,
+            "streams": len(self.streams),
+            "lost": lost,
+            "loss_ratio": lost / expected if expected else 0.0,
+            "reordered": self.reordered,
+            "latency_us": latency,
+        }
+
+
+class BatchReceiver:
+    """Receive up to ``batch`` datagrams per call into preallocated slots.
+
+    Uses ``recvmmsg`` with ``MSG_WAITFORONE`` where the C library has it:
+    one system call waits for the first datagram and collects whatever else
+    is queued. Elsewhere it falls back to ``recv_into`` with the same
+    semantics. Returned views are valid until the next call.
+    """
+
+    def __init__(
+        self,
+        sock: socket.socket,
+        batch: int = 64,
+        slot_size: int = 65535,
+        use_recvmmsg: bool = True,
+    ):
+        self.sock = sock
+        self.batch = batch
+        self.slot_size = slot_size
+        self.buffer = bytearray(batch * slot_size)
+        self.view = memoryview(self.buffer)
+        self._recvmmsg = load_recvmmsg() if use_recvmmsg else None
+        if self._recvmmsg is not None:
+            self._storage = (ctypes.c_char * len(self.buffer)).from_buffer(self.buffer)
+            base = ctypes.addressof(self._storage)
+            self._iovecs = (Iovec * batch)()
+            self._msgs = (Mmsghdr * batch)()
+            for i in range(batch):
+                self._iovecs[i].iov_base = base + i * slot_size
+                self._iovecs[i].iov_len = slot_size
+                self._msgs[i].msg_hdr.msg_iov = ctypes.pointer(self._iovecs[i])
+                self._msgs[i].msg_hdr.msg_iovlen = 1
+
+    @property
+    def uses_recvmmsg(self) -> bool:
+        return self._recvmmsg is not None
+
+    def receive(self) -> List[memoryview]:
+        """Datagrams received, or an empty list if the receive timeout expired."""
+        if self._recvmmsg is not None:
+            count = self._recvmmsg(
+                self.sock.fileno(), self._msgs, self.batch, MSG_WAITFORONE, None
+            )
+            if count < 0:
+                err = ctypes.get_errno()
+                if err in (errno.EAGAIN, errno.EWOULDBLOCK, errno.EINTR):
+                    return []
+                raise OSError(err, os.strerror(err))
+            return [
+                self.view[
+                    i * self.slot_size : i * self.slot_size + self._msgs[i].msg_len
+                ]
+                for i in range(count)
+            ]
+
+        views = []
+        flags = 0
+        for i in range(self.batch):
+            slot = self.view[i * self.slot_size : (i + 1) * self.slot_size]
+            try:
+                size = self.sock.recv_into(slot, 0, flags)
+            except (BlockingIOError, InterruptedError, socket.timeout):
+                break
+            views.append(slot[:size])
+            flags = socket.MSG_DONTWAIT
+        return views
+
+
+def open_sink_socket(
+    host: str, port: int, rcvbuf: int, timeout: float
+) -> socket.socket:
+    """UDP socket bound to the destination port, blocking with a receive timeout."""
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if rcvbuf:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, rcvbuf)
+    # SO_RCVTIMEO rather than settimeout(): the latter makes the descriptor
+    # non-blocking, which recvmmsg would then spin on
+    seconds = int(timeout)
+    sock.setsockopt(
+        socket.SOL_SOCKET,
+        socket.SO_RCVTIMEO,
+        struct.pack("ll", seconds, int((timeout - seconds) * 1e6)),
+    )
+    sock.bind((host, port))
+    return sock
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    """One human-readable report line."""
+    latency = " ".join(
+        f"{name} {value}us" for name, value in report["latency_us"].items()
+    )
+    line = (
+        f"{report['elapsed']:8.1f}s {report['pps']:12,.0f} pps  lost {report['lost']}"
+    )
+    if "loss_ratio" in report:
+        line += f" ({report['loss_ratio']:.3%})  reordered {report['reordered']}"
+    if latency:
+        line += f"  latency {latency}"
+    return line
+
+
+def run_sink(
+    receiver: BatchReceiver,
+    stats: SinkStats,
+    duration: float = 0.0,
+    interval: float = 1.0,
+    output: Optional[TextIO] = None,
+    should_stop: Callable[[], bool] = lambda: False,
+) -> Dict[str, Any]:
+    """Receive until ``duration`` seconds have passed (0 runs until stopped).
+
+    Returns:
+        The run summary
+    """
+    started = time.monotonic()
+    next_report = started + interval
+    observe = stats.observe
+    clock = time.time_ns
+    try:
+        while not should_stop():
+            views = receiver.receive()
+            if views:
+                received_ns = clock()
+                for view in views:
+                    observe(view, received_ns)
+            now = time.monotonic()
+            if interval and now >= next_report:
+                if output is not None:
+                    print(
+                        format_report(stats.report(now - started)),
+                        file=output,
+                        flush=True,
+                    )
+                next_report += interval
+            if duration and now - started >= duration:
+                break
+    except KeyboardInterrupt:
+        pass
+    return stats.summary(time.monotonic() - started)
+
+
+def generate(
+    target: Tuple[str, int],
+    rate: int,
+    size: int,
+    duration: float,
+    stream: Optional[int] = None,
+) -> int:
+    """Send probes to ``target`` at ``rate`` per second (0 for as fast as possible).
+
+    Returns:
+        Number of probes sent
+    """
+    if stream is None:
+        stream = random.getrandbits(32)
+    family = socket.AF_INET6 if ":" in target[0] else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_DGRAM)
+    sequence = 0
+    started = time.monotonic()
+    try:
+        while True:
+            elapsed = time.monotonic() - started
+            if elapsed >= duration:
+                break
+            due = int(elapsed * rate) - sequence if rate else 64
+            if due <= 0:
+                time.sleep(0.0005)
+                continue
+            for _ in range(min(due, 1024)):
+                try:
+                    sock.sendto(encode_probe(stream, sequence, size), target)
+                except OSError:
+                    pass  # a dropped probe shows up as loss at the sink
+                sequence += 1
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sock.close()
+    return sequence
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="plc-sniffer-sink",
+        description=(
+            "Receive forwarded datagrams and report rate, loss, reordering "
+            "and latency."
+        ),
+    )
+    parser.add_argument("--bind", default="0.0.0.0", help="address to listen on")
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=int(os.environ.get("DESTINATION_PORT", "8514")),
+        help="port to listen on (default: DESTINATION_PORT or 8514)",
+    )
+    parser.add_argument(
+        "--duration",
+        type=float,
+        default=0.0,
+        help="seconds to run, 0 until interrupted",
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=1.0,
+        help="seconds between reports, 0 for none",
+    )
+    parser.add_argument(
+        "--batch", type=int, default=64, help="datagrams per receive call"
+    )
+    parser.add_argument(
+        "--rcvbuf",
+        type=int,
+        default=8 * 1024 * 1024,
+        help="socket receive buffer in bytes",
+    )
+    parser.add_argument("--json", action="store_true", help="print the summary as JSON")
+    parser.add_argument(
+        "--generate",
+        metavar="IP:PORT",
+        help=(
+            "send probes to IP:PORT (a port the sniffer captures) "
+            "instead of receiving"
+        ),
+    )
+    parser.add_argument(
+        "--rate", type=int, default=10000, help="probes per second, 0 for unpaced"
+    )
+    parser.add_argument(
+        "--size",
+        type=int,
+        default=64,
+        help=f"probe payload size (at least {PROBE.size})",
+    )
+    args = parser.parse_args(argv)
+    if args.size < PROBE.size:
+        parser.error(f"--size must be at least {PROBE.size}")
+    if args.batch < 1:
+        parser.error("--batch must be at least 1")
+    return args
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    """Entry point of ``plc-sniffer-sink``."""
+    args = parse_args(argv)
+
+    if args.generate:
+        try:
+            target = validate_destination(args.generate)
+        except ValidationError as e:
+            sys.exit(f"plc-sniffer-sink: {e}")
+        duration = args.duration or 10.0
+        sent = generate(target, args.rate, args.size, duration)
+        print(
+            f"Sent {sent} probes of {args.size} bytes to {args.generate} "
+            f"in {duration:g}s"
+        )
+        return
+
+    sock = open_sink_socket(
+        args.bind, args.port, args.rcvbuf, timeout=min(args.interval or 1.0, 1.0)
+    )
+    receiver = BatchReceiver(sock, args.batch)
+    mode = "recvmmsg" if receiver.uses_recvmmsg else "recv_into"
+    print(
+        f"Listening on {args.bind}:{args.port} ({mode}, batch {args.batch})",
+        file=sys.stderr,
+    )
+    try:
+        summary = run_sink(
+            receiver, SinkStats(), args.duration, args.interval, output=sys.stdout
+        )
+    finally:
+        sock.close()
+
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        print(format_report(summary))
+        print(
+            f"Received {summary['received']} datagrams "
+            f"({summary['untagged']} untagged) from {summary['streams']} stream(s)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,108 +1,285 @@
 """Core packet sniffer implementation with security features."""
 
+import asyncio
 import logging
+import math
+import os
 import socket
+import struct
+import threading
 import time
 from collections import deque
-from dataclasses import dataclass
-from datetime import datetime
-from typing import Optional, Deque, Any
+from dataclasses import dataclass, fields, replace
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple, Union
 
-from scapy.all import sniff, IP, UDP, Raw  # type: ignore[attr-defined]
-
-from .config import SnifferConfig
+from scapy.all import IP, UDP, Raw, sniff  # type: ignore[attr-defined]
 
+from .adaptive import AdaptiveRate, Feedback
+from .buffers import BufferLease, BufferPool
+from .capture import (
+    CaptureStats,
+    join_fanout_group,
+    open_capture_socket,
+    set_capture_filter,
+)
+from .config import ConfigManager, SnifferConfig, ValidationError
+from .cycles import CycleTracker, ShardedCycleTracker
+from .fanout import create_forwarder, describe_destinations
+from .inject import Injector
+from .metrics import Histogram, Shards, summed
+from .mirror import MirrorSocket
+from .packet import PacketMeta, Payload
+from .pipeline import Batch, Pipeline, load_stage
+from .raw_capture import RawCaptureSocket, ipv4_offset
+from .reassembly import FragmentReassembler
+from .routing import Router
+from .runtime import GC_MONITOR, IdleCollector, freeze_heap, pin_current_thread
+from .scheduler import ClassScheduler
+from .shm_ring import ShmRingWriter
+from .spill import SpillQueue, SpillReplayer, spill_directory
+from .timing import StageTimer
 
 logger = logging.getLogger(__name__)
 
+UDP_PROTOCOL = 17
+
+# version/IHL, total length, identification, flags/fragment offset, protocol
+_IPV4_HEADER = struct.Struct("!BxHHHxB")
+_UDP_HEADER = struct.Struct("!HHHH")
+
+# Decoded payload, its metadata and the pooled buffer it is a view of (if any)
+Datagram = Tuple[Payload, PacketMeta, Optional[BufferLease]]
+
+# Settings bound to the capture socket or the output that cannot be swapped live
+RESTART_REQUIRED = (
+    "interface",
+    "output_mode",
+    "shm_ring_path",
+    "shm_ring_slots",
+    "shm_ring_slot_size",
+    "capture_cpus",
+    "realtime_priority",
+    "gc_mode",
+    "capture_engine",
+    "buffer_pool_slabs",
+    "buffer_slab_size",
+    "runtime",
+    "capture_threads",
+    "statsd_host",
+    "statsd_port",
+    "statsd_interval",
+    "statsd_format",
+    "statsd_prefix",
+    "statsd_max_datagram",
+    "traffic_classes",
+    "class_scheduling",
+    "rate_control",
+    "adaptive_rate_min",
+    "adaptive_rate_step",
+    "adaptive_rate_backoff",
+    "adaptive_rate_interval",
+    "adaptive_ack_port",
+    "pipeline_stages",
+    "spill_dir",
+    "spill_segment_size",
+    "spill_max_bytes",
+    "spill_replay_rate",
+    "inject_interface",
+    "inject_dst_mac",
+    "inject_ring_frames",
+    "inject_frame_size",
+    "mirror_encap",
+    "mirror_bind",
+    "mirror_port",
+    "calibrate",
+    "calibration_cache",
+)
+
 
 @dataclass
 class RateLimiter:
     """Token bucket rate limiter implementation."""
-    
+
     rate: int  # packets per second
     bucket_size: int
     tokens: float
     last_update: float
-    
+
     def __init__(self, rate: int):
         self.rate = rate
         self.bucket_size = rate  # 1 second worth of tokens
         self.tokens = float(rate)
         self.last_update = time.time()
-    
+
     def allow(self) -> bool:
         """Check if packet is allowed under rate limit."""
         if self.rate == 0:  # No limit
             return True
-        
+
         now = time.time()
         elapsed = now - self.last_update
-        
+
         # Add tokens based on elapsed time
-        self.tokens = min(
-            self.bucket_size,
-            self.tokens + elapsed * self.rate
-        )
+        self.tokens = min(self.bucket_size, self.tokens + elapsed * self.rate)
         self.last_update = now
-        
+
         if self.tokens >= 1:
             self.tokens -= 1
             return True
-        
+
         return False
 
+    def set_rate(self, rate: int) -> None:
+        """Change the rate; tokens already earned are kept up to the new bucket size."""
+        self.rate = rate
+        self.bucket_size = rate
+        self.tokens = min(self.tokens, float(rate))
+
+
+class ShardedRateLimiter:
+    """Token bucket split into one bucket per thread.
+
+    Each of ``shards`` threads gets an equal share of the rate and refills
+    only its own bucket, so the limiter needs no lock. With flow-hashed
+    capture threads the share matches each thread's share of the traffic.
+    """
+
+    def __init__(self, rate: int, shards: int):
+        self.rate = rate
+        self.shards = shards
+        self.buckets: Shards[RateLimiter] = Shards(lambda: RateLimiter(self.share))
+
+    @property
+    def share(self) -> int:
+        """Rate of one thread's bucket."""
+        return max(1, math.ceil(self.rate / self.shards)) if self.rate else 0
+
+    def allow(self) -> bool:
+        """Check if packet is allowed under the calling thread's share."""
+        return self.buckets.get().allow()
+
+    def set_rate(self, rate: int) -> None:
+        """Change the total rate; every thread's bucket gets its new share."""
+        self.rate = rate
+        for bucket in self.buckets.all:
+            bucket.set_rate(self.share)
+
+
+def configure_logging(log_level: str) -> None:
+    """Set up the root logger, unless the application already did."""
+    logging.basicConfig(
+        level=getattr(logging, log_level),
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    )
+
+
+class StatsShard:
+    """Packet counters updated by a single thread."""
+
+    __slots__ = (
+        "packets_processed",
+        "packets_dropped",
+        "packets_forwarded",
+        "bytes_forwarded",
+        "errors",
+        "rate_limited",
+        "oversized",
+        "sampled_out",
+        "recent_packets",
+    )
+
+    def __init__(self, window_size: int):
+        self.packets_processed = 0
+        self.packets_dropped = 0
+        self.packets_forwarded = 0
+        self.bytes_forwarded = 0
+        self.errors = 0
+        self.rate_limited = 0
+        self.oversized = 0
+        self.sampled_out = 0
+        self.recent_packets: Deque[float] = deque(maxlen=window_size)
+
 
 class PacketStats:
-    """Track packet statistics."""
-    
+    """Track packet statistics.
+
+    Counters are kept per capture thread and summed when read, so parallel
+    capture threads never contend on (or lose) an increment.
+    """
+
+    packets_processed = summed("packets_processed")
+    packets_dropped = summed("packets_dropped")
+    packets_forwarded = summed("packets_forwarded")
+    bytes_forwarded = summed("bytes_forwarded")
+    errors = summed("errors")
+    rate_limited = summed("rate_limited")
+    oversized = summed("oversized")
+    sampled_out = summed("sampled_out")
+
+    # Counters a dropped packet can be recorded under
+    DROP_REASONS = ("rate_limited", "oversized", "sampled_out", "errors")
+
     def __init__(self, window_size: int = 60):
         self.window_size = window_size
-        self.packets_processed: int = 0
-        self.packets_dropped: int = 0
-        self.packets_forwarded: int = 0
-        self.bytes_forwarded: int = 0
-        self.errors: int = 0
-        self.rate_limited: int = 0
-        self.oversized: int = 0
-        
-        # Sliding window for rate calculation
-        self.recent_packets: Deque[float] = deque(maxlen=window_size)
-    
-    def record_packet(self, forwarded: bool, size: int = 0) -> None:
-        """Record packet processing."""
-        self.packets_processed += 1
-        self.recent_packets.append(time.time())
-        
+        self.shards: Shards[StatsShard] = Shards(lambda: StatsShard(window_size))
+        self.capture = CaptureStats()
+
+    def record_packet(
+        self, forwarded: bool, size: int = 0, reason: Optional[str] = None
+    ) -> None:
+        """Record packet processing.
+
+        Args:
+            forwarded: Whether the payload was handed to the output
+            size: Payload size of a forwarded packet
+            reason: Counter to increment for a dropped packet
+                (``rate_limited``, ``oversized``, ``sampled_out`` or ``errors``)
+        """
+        shard = self.shards.get()
+        shard.packets_processed += 1
+        shard.recent_packets.append(time.time())
+
         if forwarded:
-            self.packets_forwarded += 1
-            self.bytes_forwarded += size
+            shard.packets_forwarded += 1
+            shard.bytes_forwarded += size
         else:
-            self.packets_dropped += 1
-    
+            shard.packets_dropped += 1
+            if reason is not None:
+                setattr(shard, reason, getattr(shard, reason) + 1)
+
+    def record_error(self) -> None:
+        """Count an error for a packet that is recorded as dropped separately."""
+        self.shards.get().errors += 1
+
+    @property
+    def last_packet_time(self) -> float:
+        """Wall-clock time of the last processed packet (0 if none yet)."""
+        return max(
+            (
+                shard.recent_packets[-1]
+                for shard in self.shards.all
+                if shard.recent_packets
+            ),
+            default=0.0,
+        )
+
     def get_current_rate(self) -> float:
-        """Calculate current packet rate."""
-        if len(self.recent_packets) < 2:
-            return 0.0
-        
+        """Calculate current packet rate, summed over capture threads."""
         now = time.time()
-        # Remove old entries
         cutoff = now - self.window_size
-        while self.recent_packets and self.recent_packets[0] < cutoff:
-            self.recent_packets.popleft()
-        
-        if not self.recent_packets:
-            return 0.0
-        
-        time_span = now - self.recent_packets[0]
-        if time_span > 0:
-            return len(self.recent_packets) / time_span
-        
-        return 0.0
-    
+        rate = 0.0
+        for shard in self.shards.all:
+            recent = [t for t in list(shard.recent_packets) if t >= cutoff]
+            if len(recent) < 2:
+                continue
+            time_span = now - recent[0]
+            if time_span > 0:
+                rate += len(recent) / time_span
+        return rate
+
     def log_stats(self) -> None:
         """Log current statistics."""
-        logger.info(
+        message = (
             f"Stats - Processed: {self.packets_processed}, "
             f"Forwarded: {self.packets_forwarded}, "
             f"Dropped: {self.packets_dropped}, "
@@ -111,139 +288,618 @@ class PacketStats:
             f"Errors: {self.errors}, "
             f"Current Rate: {self.get_current_rate():.2f} pps"
         )
+        if self.capture.available:
+            message += (
+                f", Kernel Received: {self.capture.received}, "
+                f"Kernel Dropped: {self.capture.dropped}, "
+                f"Capture Loss: {self.capture.loss_ratio:.2%}"
+            )
+        logger.info(message)
 
 
 class PlcSniffer:
     """PLC packet sniffer with security features."""
-    
+
     def __init__(self, config: SnifferConfig):
         self.config = config
-        self.socket: Optional[socket.socket] = None
-        self.rate_limiter = RateLimiter(config.rate_limit)
+        self.router: Optional[Router] = None
+        self.ring: Optional[ShmRingWriter] = None
+        self.injector: Optional[Injector] = None
+        self.scheduler: Optional[ClassScheduler] = None
+        self.output_limiter: Optional[RateLimiter] = None
+        self.adaptive: Optional[AdaptiveRate] = None
+        self.spills: Dict[
+            str, SpillQueue
+        ] = {}  # by destination label, kept across reloads
+        self.spill_replayer: Optional[SpillReplayer] = None
+        self.capture_socket: Any = None
+        self.lane_sockets: List[Any] = []  # sockets of the additional capture threads
+        self.capture_threads: List[threading.Thread] = []
+        self.capture_thread_ids: List[
+            int
+        ] = []  # threads receiving packets, for the profiler
+        self.loop: Optional[
+            asyncio.AbstractEventLoop
+        ] = None  # set by the asyncio runtime
+        self.rate_limiter = self._create_rate_limiter(config)
+        self.reassembler = self._create_reassembler(config)
+        self._reassembly_lock = threading.Lock()
+        self.cycles = self._create_cycle_tracker(config)
+        self.buffer_pool = (
+            BufferPool(config.buffer_pool_slabs, config.buffer_slab_size)
+            if config.capture_engine != "scapy"
+            else None
+        )
         self.stats = PacketStats()
         self.running = False
         self.last_stats_log = time.time()
-        
-        # Configure logging
-        logging.basicConfig(
-            level=getattr(logging, config.log_level),
-            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+        self.gc_collector: Optional[IdleCollector] = None
+        self.reloads: Dict[str, int] = {"success": 0, "failure": 0}
+        self.calibrated: Dict[str, int] = {}  # settings chosen by startup calibration
+        self.last_reload: Optional[Dict[str, Any]] = None
+        self._reload_lock = threading.Lock()
+        GC_MONITOR.install()
+
+        # Assembled once; plugin stages may look at the attributes set above
+        self.pipeline = Pipeline(
+            [load_stage(name, self) for name in config.pipeline_stages],
+            self._record_drops,
         )
-    
-    def _create_socket(self) -> socket.socket:
-        """Create and configure UDP socket."""
-        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        sock.settimeout(self.config.socket_timeout)
-        return sock
-    
+        self.stage_timer = self._create_stage_timer(config)
+
+        configure_logging(config.log_level)
+
     def _process_packet(self, packet: Any) -> None:
-        """Process captured packet with security checks."""
+        """Process a packet captured by scapy as a batch of one."""
+        self._process(self._parse_packet, packet)
+
+    def _process_frame(
+        self, frame: memoryview, timestamp: float, lease: BufferLease
+    ) -> None:
+        """Process an Ethernet frame received by the raw engine as a batch of one.
+
+        Headers are decoded in place and the UDP payload is passed on as a
+        view into the pooled buffer, so nothing is copied before the send.
+        """
+        self._process(self._parse_frame, frame, timestamp, lease)
+
+    def _process(self, parse: Callable[..., Optional[Datagram]], *args: Any) -> None:
+        """Decode one packet with ``parse`` and run it through the pipeline."""
+        histograms = self._sample_stages()
+        if histograms is not None:
+            self._process_timed(histograms, parse, *args)
+            return
+        batch = Batch()
+        self._parse_into(batch, parse, *args)
+        if batch:
+            self.pipeline.run(batch)
+
+    def _process_timed(
+        self,
+        histograms: List[Histogram],
+        parse: Callable[..., Optional[Datagram]],
+        *args: Any,
+    ) -> None:
+        """:meth:`_process` with every stage timed, for 1 in ``STAGE_TIMING_SAMPLE``."""
+        batch = Batch()
+        started = time.perf_counter_ns()
+        if not self._parse_into(batch, parse, *args):
+            return
+        histograms[0].observe((time.perf_counter_ns() - started) * 1e-9)
+        if batch:
+            self.pipeline.run_timed(batch, histograms[1:])
+
+    def _sample_stages(self) -> Optional[List[Histogram]]:
+        """Stage histograms if the calling thread's next batch is timed, else None."""
+        if self.stage_timer is None:
+            return None
+        return self.stage_timer.sample()
+
+    def _parse_into(
+        self, batch: Batch, parse: Callable[..., Optional[Datagram]], *args: Any
+    ) -> bool:
+        """Decode one packet with ``parse`` and append it to ``batch``.
+
+        Returns:
+            False if decoding failed with an error (it is counted)
+        """
         try:
-            # Check rate limit
-            if not self.rate_limiter.allow():
-                self.stats.rate_limited += 1
-                self.stats.record_packet(forwarded=False)
-                logger.debug("Packet dropped due to rate limit")
-                return
-            
-            # Extract UDP payload
-            if IP in packet and UDP in packet and Raw in packet:
-                payload = bytes(packet[Raw])
-                
-                # Check packet size
-                if len(payload) > self.config.max_packet_size:
-                    self.stats.oversized += 1
-                    self.stats.record_packet(forwarded=False)
-                    logger.warning(
-                        f"Packet dropped: size {len(payload)} exceeds "
-                        f"limit {self.config.max_packet_size}"
-                    )
-                    return
-                
-                # Forward packet
-                self._forward_packet(payload)
-                self.stats.record_packet(forwarded=True, size=len(payload))
-                
-                logger.debug(
-                    f"Forwarded packet from {packet[IP].src}:{packet[UDP].sport} "
-                    f"to {packet[IP].dst}:{packet[UDP].dport}, "
-                    f"size: {len(payload)} bytes"
-                )
-            else:
-                self.stats.record_packet(forwarded=False)
-                logger.debug("Packet dropped: not UDP or no payload")
-                
+            datagram = parse(*args)
         except Exception as e:
-            self.stats.errors += 1
-            self.stats.record_packet(forwarded=False)
+            self.stats.record_packet(forwarded=False, reason="errors")
             logger.error(f"Error processing packet: {e}")
-    
-    def _forward_packet(self, payload: bytes) -> None:
-        """Forward packet payload to destination."""
-        try:
-            if self.socket is None:
-                self.socket = self._create_socket()
-            
-            self.socket.sendto(
-                payload,
-                (self.config.destination_ip, self.config.destination_port)
+            return False
+        if datagram is not None:
+            batch.append(*datagram)
+        return True
+
+    def _record_drops(self, count: int, reason: Optional[str]) -> None:
+        """Count datagrams dropped by a pipeline stage."""
+        if reason not in PacketStats.DROP_REASONS:
+            reason = None
+        for _ in range(count):
+            self.stats.record_packet(forwarded=False, reason=reason)
+
+    def _parse_packet(self, packet: Any) -> Optional[Datagram]:
+        """Extract the UDP payload of a scapy packet, reassembling fragments first.
+
+        Returns:
+            Payload, metadata and lease (always None here), or None if the
+            packet was dropped or is a fragment of an incomplete datagram
+        """
+        ip = packet[IP] if IP in packet else None
+        if (
+            ip is not None
+            and self.reassembler is not None
+            and ip.proto == UDP_PROTOCOL
+            and (ip.frag or ip.flags.MF)
+        ):
+            raw = bytes(ip)
+            header_length = (raw[0] & 0x0F) * 4
+            total_length = struct.unpack_from("!H", raw, 2)[0]
+            return self._reassemble(
+                ip.src,
+                ip.dst,
+                ip.id,
+                ip.frag * 8,
+                bool(ip.flags.MF),
+                raw[header_length:total_length],
+                float(packet.time),
             )
-            
-        except socket.timeout:
-            logger.error("Socket timeout while forwarding packet")
-            self._recreate_socket()
-        except socket.error as e:
-            logger.error(f"Socket error while forwarding: {e}")
-            self._recreate_socket()
-        except Exception as e:
-            logger.error(f"Unexpected error while forwarding: {e}")
-            self._recreate_socket()
-    
-    def _recreate_socket(self) -> None:
-        """Recreate socket after error."""
-        try:
-            if self.socket:
-                self.socket.close()
-            self.socket = self._create_socket()
-            logger.info("Socket recreated successfully")
-        except Exception as e:
-            logger.error(f"Failed to recreate socket: {e}")
-            self.socket = None
-    
+        if ip is not None and UDP in packet and Raw in packet:
+            meta = PacketMeta(
+                ip.src,
+                ip.dst,
+                packet[UDP].sport,
+                packet[UDP].dport,
+                float(packet.time),
+                packet[UDP].chksum or 0,
+            )
+            return packet[Raw].load, meta, None
+
+        self.stats.record_packet(forwarded=False)
+        logger.debug("Packet dropped: not UDP or no payload")
+        return None
+
+    def _parse_frame(
+        self, frame: memoryview, timestamp: float, lease: BufferLease
+    ) -> Optional[Datagram]:
+        """Decode Ethernet, IPv4 and UDP headers of a raw frame in place.
+
+        Returns:
+            Payload view, metadata and lease (None for a reassembled
+            datagram, which is a copy), or None if the frame was dropped or is
+            a fragment of an incomplete datagram
+        """
+        ip_offset = ipv4_offset(frame)
+        if ip_offset < 0 or len(frame) < ip_offset + 20:
+            self.stats.record_packet(forwarded=False)
+            return None
+        (
+            version_ihl,
+            total_length,
+            ident,
+            flags_fragment,
+            protocol,
+        ) = _IPV4_HEADER.unpack_from(frame, ip_offset)
+        header_end = ip_offset + (version_ihl & 0x0F) * 4
+        ip_end = min(ip_offset + total_length, len(frame))
+        fragment_offset = (flags_fragment & 0x1FFF) * 8
+        more_fragments = bool(flags_fragment & 0x2000)
+        if protocol != UDP_PROTOCOL:
+            self.stats.record_packet(forwarded=False)
+            return None
+
+        src_ip = socket.inet_ntoa(frame[ip_offset + 12 : ip_offset + 16])
+        dst_ip = socket.inet_ntoa(frame[ip_offset + 16 : ip_offset + 20])
+
+        if self.reassembler is not None and (fragment_offset or more_fragments):
+            return self._reassemble(
+                src_ip,
+                dst_ip,
+                ident,
+                fragment_offset,
+                more_fragments,
+                frame[header_end:ip_end],
+                timestamp,
+            )
+
+        if fragment_offset or ip_end < header_end + 8:
+            self.stats.record_packet(forwarded=False)
+            return None
+        src_port, dst_port, udp_length, checksum = _UDP_HEADER.unpack_from(
+            frame, header_end
+        )
+        payload = frame[header_end + 8 : min(header_end + udp_length, ip_end)]
+        if not payload:
+            self.stats.record_packet(forwarded=False)
+            return None
+
+        return (
+            payload,
+            PacketMeta(src_ip, dst_ip, src_port, dst_port, timestamp, checksum),
+            lease,
+        )
+
+    def _reassemble(
+        self,
+        src_ip: str,
+        dst_ip: str,
+        ident: int,
+        offset: int,
+        more_fragments: bool,
+        data: Payload,
+        timestamp: float,
+    ) -> Optional[Datagram]:
+        """Feed a UDP fragment to the reassembler.
+
+        Args:
+            src_ip: Source address of the fragment
+            dst_ip: Destination address of the fragment
+            ident: IP identification field
+            offset: Fragment offset in bytes
+            more_fragments: Value of the MF flag
+            data: Fragment payload (without the IP header)
+            timestamp: Capture time of the fragment
+
+        Returns:
+            Payload and metadata of the completed datagram (without a
+            lease, it is a copy), or None while fragments are still missing
+            (or the datagram was discarded)
+        """
+        assert self.reassembler is not None
+        # Fragments are rare and may arrive on any capture thread
+        with self._reassembly_lock:
+            datagram = self.reassembler.add(
+                (src_ip, dst_ip, ident, UDP_PROTOCOL),
+                offset,
+                more_fragments,
+                data,
+                time.monotonic(),
+            )
+        if datagram is None:
+            return None
+
+        src_port, dst_port, length, checksum = _UDP_HEADER.unpack_from(datagram)
+        if not 8 < length <= len(datagram):
+            self.stats.record_packet(forwarded=False)
+            logger.debug("Reassembled datagram dropped: bad UDP length")
+            return None
+
+        meta = PacketMeta(src_ip, dst_ip, src_port, dst_port, timestamp, checksum)
+        return datagram[8:length], meta, None
+
+    @staticmethod
+    def _create_rate_limiter(
+        config: SnifferConfig,
+    ) -> Union[RateLimiter, ShardedRateLimiter]:
+        """Create the rate limiter, with one bucket per capture thread if parallel.
+
+        With traffic classes the rate limit shapes the class scheduler's
+        output instead, so capture does not limit.
+        """
+        if config.traffic_classes:
+            return RateLimiter(0)
+        if config.capture_threads > 1:
+            return ShardedRateLimiter(config.rate_limit, config.capture_threads)
+        return RateLimiter(config.rate_limit)
+
+    @staticmethod
+    def _create_reassembler(config: SnifferConfig) -> Optional[FragmentReassembler]:
+        """Create the fragment reassembler, or None if reassembly is disabled."""
+        if not config.reassembly_max_datagrams:
+            return None
+        # Room for the UDP header in front of the largest accepted payload
+        return FragmentReassembler(
+            config.reassembly_max_datagrams,
+            config.max_packet_size + 8,
+            config.reassembly_timeout,
+        )
+
+    @staticmethod
+    def _create_cycle_tracker(
+        config: SnifferConfig,
+    ) -> Optional[Union[CycleTracker, ShardedCycleTracker]]:
+        """Create the per-flow cycle tracker, or None if tracking is disabled."""
+        if not config.cycle_flows:
+            return None
+        if config.capture_threads > 1:
+            return ShardedCycleTracker(config.cycle_flows, config.cycle_idle_timeout)
+        return CycleTracker(config.cycle_flows, config.cycle_idle_timeout)
+
+    def _create_stage_timer(self, config: SnifferConfig) -> Optional[StageTimer]:
+        """Create the timer of decoding and each stage, or None if disabled."""
+        if not config.stage_timing_sample:
+            return None
+        return StageTimer(config.stage_timing_sample, ("parse",) + self.pipeline.names)
+
+    def _create_spills(self, config: SnifferConfig) -> None:
+        """Open a spill queue for every configured destination that has none yet.
+
+        Queues outlive reloads, so payloads spilled for a destination are
+        still replayed to it if a reload drops it from the configuration.
+        """
+        if config.routes:
+            destinations = [
+                dest for route in config.routes for dest in route.destinations
+            ]
+        else:
+            destinations = config.forward_destinations
+        for dest in destinations:
+            if dest.label in self.spills:
+                continue
+            self.spills[dest.label] = SpillQueue(
+                spill_directory(config.spill_dir, dest.label),
+                create_forwarder(config, dest, self.loop),
+                config.spill_segment_size,
+                config.spill_max_bytes,
+                config.spill_replay_rate,
+            )
+
+    @staticmethod
+    def _create_output_limiter(config: SnifferConfig) -> Optional[RateLimiter]:
+        """Rate limiter of the class scheduler's output, or None if unlimited."""
+        if not config.rate_limit:
+            return None
+        return RateLimiter(config.rate_limit)
+
+    def _create_scheduler(self) -> ClassScheduler:
+        """Create the traffic class scheduler, shaped by the rate limit if set."""
+        self.output_limiter = self._create_output_limiter(self.config)
+        return ClassScheduler(
+            self.config.traffic_classes,
+            self._deliver,
+            self._record_shed,
+            self.config.class_scheduling,
+            self.output_limiter.allow if self.output_limiter is not None else None,
+            self.config.destination_queue_size,
+            self._flush_output,
+        )
+
+    def _feedback(self) -> Feedback:
+        """Downstream state for the adaptive rate controller."""
+        send_errors = queue_full = queue_depth = queue_capacity = sent = 0
+        router = self.router
+        if router is not None:
+            for worker in router.workers:
+                outcomes = worker.forwarder.stats
+                send_errors += (
+                    outcomes.retry_queued
+                    + outcomes.dropped
+                    + outcomes.reconnects
+                    + outcomes.circuit_rejected
+                )
+                queue_full += worker.stats.queue_full
+                queue_depth += worker.queue_depth + worker.forwarder.pending
+                queue_capacity += worker.queue_size
+                sent += worker.stats.sent
+        scheduler = self.scheduler
+        return Feedback(
+            send_errors,
+            queue_full,
+            queue_depth,
+            queue_capacity,
+            sent,
+            self.stats.rate_limited,
+            scheduler.pending if scheduler is not None else 0,
+        )
+
+    def _set_rate(self, rate: int) -> None:
+        """Set the adaptive rate on the limiter in use."""
+        limiter = (
+            self.output_limiter if self.scheduler is not None else self.rate_limiter
+        )
+        if limiter is not None:
+            limiter.set_rate(rate)
+
+    def _deliver(
+        self, payload: Payload, meta: PacketMeta, lease: Optional[BufferLease]
+    ) -> None:
+        """Forward a payload released by the class scheduler and account it."""
+        forwarded = self._forward_packet(payload, meta, lease)
+        self.stats.record_packet(forwarded=forwarded, size=len(payload))
+
+    def _record_shed(self) -> None:
+        """Count a packet the class scheduler shed as dropped."""
+        self.stats.record_packet(forwarded=False)
+
+    def _forward_packet(
+        self,
+        payload: Payload,
+        meta: Optional[PacketMeta] = None,
+        lease: Optional[BufferLease] = None,
+    ) -> bool:
+        """Forward packet payload to destination.
+
+        Args:
+            payload: UDP payload
+            meta: Addressing and timing of the datagram
+            lease: Pooled buffer the payload is a view of; destinations that
+                queue the payload keep it until the send completes
+
+        Returns:
+            True if the payload was handed to the output, False if dropped
+        """
+        if self.ring is not None:
+            return self.ring.write(payload, meta) != 0
+        if self.injector is not None:
+            return self.injector.send(payload, meta)
+
+        if self.router is None:
+            self.router = Router.from_config(self.config, spills=self.spills)
+            self.router.start()
+
+        return self.router.send(payload, meta, lease)
+
+    def _flush_output(self) -> None:
+        """Send what the output batched up, at the end of a batch of forwards."""
+        if self.injector is not None:
+            self.injector.flush()
+
     def _log_stats_periodically(self) -> None:
         """Log statistics periodically."""
         now = time.time()
         if now - self.last_stats_log >= 60:  # Log every minute
+            self.poll_capture_stats()
             self.stats.log_stats()
             self.last_stats_log = now
-    
-    def start(self) -> None:
-        """Start packet sniffing."""
-        logger.info(f"Starting PLC Sniffer on interface {self.config.interface}")
-        logger.info(f"Filter: {self.config.filter}")
-        logger.info(
-            f"Forwarding to: {self.config.destination_ip}:"
-            f"{self.config.destination_port}"
+
+    def _apply_runtime_profile(self) -> None:
+        """Pin the capture thread and take control of garbage collection."""
+        pin_current_thread(
+            self._lane_cpus(0), self.config.realtime_priority, "capture thread"
         )
-        
+        if self.config.gc_mode != "auto":
+            freeze_heap()
+        if self.config.gc_mode == "idle":
+            self.gc_collector = IdleCollector(lambda: self.stats.last_packet_time)
+            self.gc_collector.start(self.loop)
+
+    @property
+    def capture_sockets(self) -> List[Any]:
+        """Capture sockets of all capture threads, ``capture_socket`` first."""
+        if self.capture_socket is None:
+            return []
+        return [self.capture_socket] + self.lane_sockets
+
+    def poll_capture_stats(self) -> None:
+        """Update the kernel capture counters from the capture socket."""
+        if self.capture_sockets:
+            self.stats.capture.poll(*self.capture_sockets)
+
+    @property
+    def capture_loss_exceeded(self) -> bool:
+        """Whether recent capture loss is above ``MAX_CAPTURE_LOSS``."""
+        threshold = self.config.max_capture_loss
+        return threshold > 0 and self.stats.capture.recent_loss_ratio > threshold
+
+    def open_output(self) -> None:
+        """Create the configured output: the shm ring, the injector or the router."""
+        if self.config.output_mode == "shm":
+            self.ring = ShmRingWriter(
+                self.config.shm_ring_path,
+                self.config.shm_ring_slots,
+                self.config.shm_ring_slot_size,
+                self.config.sample_rate,
+            )
+        elif self.config.output_mode == "inject":
+            self.injector = Injector(
+                self.config.inject_interface,
+                self.config.inject_dst_mac,
+                self.config.destination_ip,
+                self.config.destination_port,
+                self.config.inject_ring_frames,
+                self.config.inject_frame_size,
+            )
+            # Open this thread's ring now, so missing privileges fail at startup
+            self.injector.open()
+        else:
+            if self.config.spill_dir:
+                self._create_spills(self.config)
+                self.spill_replayer = SpillReplayer(self.spills)
+                self.spill_replayer.start(self.loop)
+                logger.info(
+                    f"Spilling undeliverable payloads to {self.config.spill_dir}"
+                )
+            self.router = Router.from_config(self.config, self.loop, self.spills)
+            self.router.start()
+
+    def open(self) -> None:
+        """Create the output and the capture socket, ready to receive."""
+        if self.config.capture_engine == "mirror":
+            logger.info(
+                f"Starting PLC Sniffer on {self.config.mirror_encap} mirror traffic to "
+                f"{self.config.mirror_bind}"
+                + (
+                    f":{self.config.mirror_port}"
+                    if self.config.mirror_encap == "vxlan"
+                    else ""
+                )
+            )
+        else:
+            logger.info(f"Starting PLC Sniffer on interface {self.config.interface}")
+            logger.info(f"Filter: {self.config.capture_filter}")
+        if self.config.output_mode == "shm":
+            logger.info(f"Writing to shared-memory ring: {self.config.shm_ring_path}")
+        elif self.config.output_mode == "inject":
+            logger.info(
+                f"Re-injecting frames on {self.config.inject_interface} to "
+                f"{self.config.inject_dst_mac} "
+                f"{self.config.destination_ip}:{self.config.destination_port}"
+            )
+        elif self.config.routes:
+            for route in self.config.routes:
+                logger.info(
+                    f"Route {route.name} ({route.bpf_term}) -> "
+                    f"{describe_destinations(route.destinations)}"
+                )
+        else:
+            destinations = describe_destinations(self.config.forward_destinations)
+            logger.info(f"Forwarding to: {destinations}")
+
         if self.config.rate_limit > 0:
             logger.info(f"Rate limit: {self.config.rate_limit} pps")
-        
+
         self.running = True
-        
-        try:
-            # Create initial socket
-            self.socket = self._create_socket()
-            
-            # Start sniffing
-            sniff(
-                iface=self.config.interface,
-                filter=self.config.filter,
-                prn=self._process_packet,
-                store=False,
-                stop_filter=lambda x: not self.running
+        self.open_output()
+        if self.config.traffic_classes:
+            self.scheduler = self._create_scheduler()
+            self.scheduler.start(self.loop)
+            logger.info(
+                f"Scheduling {len(self.config.traffic_classes)} traffic classes "
+                f"({self.config.class_scheduling})"
             )
-            
+        if self.config.rate_control == "aimd":
+            self.adaptive = AdaptiveRate.from_config(
+                self.config, self._feedback, self._set_rate
+            )
+            self.adaptive.start(self.loop)
+            logger.info(
+                f"Adapting the rate between {self.config.adaptive_rate_min} "
+                f"and {self.config.rate_limit} pps"
+            )
+
+        # Capture on sockets we own, so reloads can swap their filter
+        self.capture_socket = self._open_capture_socket()
+        if self.config.capture_threads > 1:
+            group_id = os.getpid()
+            join_fanout_group(self.capture_socket, group_id)
+            for _ in range(1, self.config.capture_threads):
+                self.lane_sockets.append(self._open_capture_socket())
+                join_fanout_group(self.lane_sockets[-1], group_id)
+            logger.info(f"Capturing on {self.config.capture_threads} threads")
+        self._apply_runtime_profile()
+
+    def _open_capture_socket(self) -> Any:
+        """Open a capture socket for the configured capture engine."""
+        if self.config.capture_engine == "mirror":
+            return MirrorSocket(
+                self.config.mirror_encap,
+                self.config.mirror_bind,
+                self.config.mirror_port,
+                self.config.pipeline_batch,
+            )
+        if self.config.capture_engine == "raw":
+            return RawCaptureSocket(self.config.interface, self.config.capture_filter)
+        return open_capture_socket(self.config.interface, self.config.capture_filter)
+
+    def start(self) -> None:
+        """Start packet sniffing."""
+        try:
+            self.open()
+            self.capture_thread_ids = [threading.get_ident()]
+            for lane, capture_socket in enumerate(self.lane_sockets, start=1):
+                thread = threading.Thread(
+                    target=self._run_capture_thread,
+                    args=(lane, capture_socket),
+                    name=f"capture-{lane}",
+                    daemon=True,
+                )
+                thread.start()
+                self.capture_threads.append(thread)
+                self.capture_thread_ids.append(thread.ident or 0)
+            self._capture(self.capture_socket)
+
         except KeyboardInterrupt:
             logger.info("Sniffer stopped by user")
         except Exception as e:
@@ -251,19 +907,343 @@ class PlcSniffer:
             raise
         finally:
             self.stop()
-    
+
+    def _capture(self, capture_socket: Any) -> None:
+        """Process packets from one capture socket until stopped."""
+        if self.config.capture_engine != "scapy":
+            self._capture_raw(capture_socket)
+        else:
+            sniff(
+                opened_socket=capture_socket,
+                prn=self._process_packet,
+                store=False,
+                stop_filter=lambda x: not self.running,
+            )
+
+    def _run_capture_thread(self, lane: int, capture_socket: Any) -> None:
+        """Pin a parallel capture thread and capture from its socket until stopped."""
+        pin_current_thread(
+            self._lane_cpus(lane),
+            self.config.realtime_priority,
+            f"capture thread {lane}",
+        )
+        try:
+            self._capture(capture_socket)
+        except Exception as e:
+            if self.running:
+                logger.error(f"Capture thread {lane} failed: {e}")
+
+    def _lane_cpus(self, lane: int) -> List[int]:
+        """CPUs of a capture thread: one each, round-robin, when running several."""
+        cpus = self.config.capture_cpus
+        if self.config.capture_threads > 1 and cpus:
+            return [cpus[lane % len(cpus)]]
+        return cpus
+
+    def _capture_raw(self, capture_socket: Any) -> None:
+        """Receive frames into pooled buffers until stopped."""
+        while self.running:
+            try:
+                self.receive_frames(capture_socket)
+            except OSError:
+                if self.running:
+                    raise
+
+    def receive_packet(self) -> bool:
+        """Receive and process one packet from the scapy capture socket.
+
+        Returns:
+            True; a non-blocking socket with nothing queued raises
+            ``BlockingIOError`` instead
+        """
+        packet = self.capture_socket.recv()
+        if packet is not None:
+            self._process_packet(packet)
+        return True
+
+    def receive_frames(self, capture_socket: Any = None, limit: int = 0) -> int:
+        """Receive a batch of frames with the raw engine and run it through the stages.
+
+        Waits for the first frame, then takes whatever else is already
+        queued, up to ``limit`` frames, without waiting again.
+
+        Args:
+            capture_socket: Socket to read from, ``capture_socket`` by default
+            limit: Largest batch, ``PIPELINE_BATCH`` by default
+
+        Returns:
+            Number of frames received
+        """
+        assert self.buffer_pool is not None
+        capture_socket = capture_socket or self.capture_socket
+        if self.config.capture_engine == "mirror":
+            return self._receive_mirrored(capture_socket, limit)
+        histograms = self._sample_stages()
+        if histograms is not None:
+            return self._receive_frames_timed(capture_socket, limit, histograms)
+        batch = Batch()
+        leases = []
+        received = 0
+        try:
+            while received < (limit or self.config.pipeline_batch):
+                lease = self.buffer_pool.acquire()
+                leases.append(lease)
+                length, timestamp = capture_socket.recv_into(
+                    lease.slab, wait=not received
+                )
+                if not length:
+                    break
+                received += 1
+                self._parse_into(
+                    batch, self._parse_frame, lease.view[:length], timestamp, lease
+                )
+
+            if batch:
+                self.pipeline.run(batch)
+            return received
+        finally:
+            for lease in leases:
+                lease.release()
+
+    def _receive_frames_timed(
+        self, capture_socket: Any, limit: int, histograms: List[Histogram]
+    ) -> int:
+        """:meth:`receive_frames` with decoding and every stage timed."""
+        assert self.buffer_pool is not None
+        clock = time.perf_counter_ns
+        parse_ns = 0
+        batch = Batch()
+        leases = []
+        received = 0
+        try:
+            while received < (limit or self.config.pipeline_batch):
+                lease = self.buffer_pool.acquire()
+                leases.append(lease)
+                length, timestamp = capture_socket.recv_into(
+                    lease.slab, wait=not received
+                )
+                if not length:
+                    break
+                received += 1
+                started = clock()
+                self._parse_into(
+                    batch, self._parse_frame, lease.view[:length], timestamp, lease
+                )
+                parse_ns += clock() - started
+
+            if received:
+                histograms[0].observe(parse_ns * 1e-9)
+            if batch:
+                self.pipeline.run_timed(batch, histograms[1:])
+            return received
+        finally:
+            for lease in leases:
+                lease.release()
+
+    def _receive_mirrored(self, capture_socket: MirrorSocket, limit: int) -> int:
+        """Receive a batch of tunnelled mirror packets and run their inner frames.
+
+        Returns:
+            Number of inner frames received
+        """
+        assert self.buffer_pool is not None
+        histograms = self._sample_stages()
+        frames = capture_socket.receive(
+            self.buffer_pool, limit or self.config.pipeline_batch
+        )
+        batch = Batch()
+        try:
+            if histograms is None:
+                for frame, timestamp, lease in frames:
+                    self._parse_into(batch, self._parse_frame, frame, timestamp, lease)
+                if batch:
+                    self.pipeline.run(batch)
+                return len(frames)
+
+            started = time.perf_counter_ns()
+            for frame, timestamp, lease in frames:
+                self._parse_into(batch, self._parse_frame, frame, timestamp, lease)
+            if frames:
+                histograms[0].observe((time.perf_counter_ns() - started) * 1e-9)
+            if batch:
+                self.pipeline.run_timed(batch, histograms[1:])
+            return len(frames)
+        finally:
+            for _, _, lease in frames:
+                lease.release()
+
     def stop(self) -> None:
         """Stop packet sniffing and cleanup."""
         self.running = False
-        
+
         # Final stats
+        self.poll_capture_stats()
         self.stats.log_stats()
-        
+
+        # Stop capturing before the outputs go away
+        for capture_socket in self.capture_sockets:
+            capture_socket.close()
+        self.capture_socket = None
+        self.lane_sockets = []
+        for thread in self.capture_threads:
+            thread.join(timeout=2)
+        self.capture_threads = []
+        self.capture_thread_ids = []
+
+        # Drain nothing more into the outputs
+        if self.adaptive is not None:
+            self.adaptive.stop()
+            self.adaptive = None
+        if self.scheduler is not None:
+            self.scheduler.stop()
+            self.scheduler = None
+        self.pipeline.close()
+
         # Cleanup socket
-        if self.socket:
+        if self.spill_replayer is not None:
+            self.spill_replayer.stop()
+            self.spill_replayer = None
+        if self.router:
+            self.router.stop()
+            self.router = None
+        for spill in self.spills.values():
+            spill.close()
+        self.spills = {}
+
+        if self.ring:
+            self.ring.close()
+            self.ring = None
+        if self.injector is not None:
+            self.injector.close()
+            self.injector = None
+
+        if self.gc_collector is not None:
+            self.gc_collector.stop()
+            self.gc_collector = None
+
+        logger.info("PLC Sniffer stopped")
+
+    def reload(self, config: SnifferConfig) -> Dict[str, Any]:
+        """Apply a new configuration without interrupting capture.
+
+        The rate limiter and the router (routes, destination sockets and
+        worker threads) are rebuilt and swapped in with single attribute
+        assignments, so the capture loop sees either the old or the new set.
+        A changed capture filter is compiled and attached to the live socket.
+        Settings listed in ``RESTART_REQUIRED`` are rejected.
+
+        Args:
+            config: Validated configuration to apply
+
+        Returns:
+            Reload report with ``result``, ``changed``, ``duration_seconds``
+            and, on failure, ``error``
+        """
+        with self._reload_lock:
+            started = time.perf_counter()
+            changed = [
+                f.name
+                for f in fields(SnifferConfig)
+                if getattr(config, f.name) != getattr(self.config, f.name)
+            ]
             try:
-                self.socket.close()
+                self._apply_config(config, changed)
+                result: Dict[str, Any] = {"result": "success", "changed": changed}
             except Exception as e:
-                logger.error(f"Error closing socket: {e}")
-        
-        logger.info("PLC Sniffer stopped")
\ No newline at end of file
+                result = {"result": "failure", "changed": changed, "error": str(e)}
+            result["duration_seconds"] = time.perf_counter() - started
+
+            self.reloads[result["result"]] += 1
+            self.last_reload = result
+            if result["result"] == "success":
+                logger.info(
+                    "Configuration reloaded in "
+                    f"{result['duration_seconds'] * 1000:.1f} ms, "
+                    f"changed: {', '.join(changed) or 'nothing'}"
+                )
+            else:
+                logger.error(f"Configuration reload failed: {result['error']}")
+            return result
+
+    def reload_from_environment(self) -> Dict[str, Any]:
+        """Re-read the configuration through ``ConfigManager`` and apply it.
+
+        Settings chosen by startup calibration are kept over the values
+        from the environment.
+        """
+        try:
+            config = ConfigManager.from_environment()
+            if self.calibrated and config.calibrate == "auto":
+                config = replace(config, **self.calibrated)
+        except ValidationError as e:
+            with self._reload_lock:
+                result: Dict[str, Any] = {
+                    "result": "failure",
+                    "changed": [],
+                    "error": str(e),
+                    "duration_seconds": 0.0,
+                }
+                self.reloads["failure"] += 1
+                self.last_reload = result
+            logger.error(f"Configuration reload failed: {e}")
+            return result
+        return self.reload(config)
+
+    def _apply_config(self, config: SnifferConfig, changed: List[str]) -> None:
+        """Build the new runtime objects, then swap them in."""
+        blocked = [name for name in changed if name in RESTART_REQUIRED]
+        if blocked:
+            raise ValidationError(f"Changing {', '.join(blocked)} requires a restart")
+
+        router = None
+        if self.router is not None:
+            if self.spill_replayer is not None:
+                self._create_spills(config)
+            router = Router.from_config(config, self.loop, self.spills)
+            router.start()
+
+        try:
+            # Mirrored traffic arrives through a tunnel socket the filter ignores
+            if (
+                config.capture_filter != self.config.capture_filter
+                and config.capture_engine != "mirror"
+            ):
+                for capture_socket in self.capture_sockets:
+                    set_capture_filter(
+                        capture_socket, config.capture_filter, config.interface
+                    )
+        except Exception:
+            if router is not None:
+                router.stop()
+            raise
+
+        old_router = self.router
+        if router is not None:
+            self.router = router
+        if "rate_limit" in changed:
+            # Rebuilt only on a change, so a reload does not refill the buckets
+            self.rate_limiter = self._create_rate_limiter(config)
+            if self.scheduler is not None:
+                limiter = self._create_output_limiter(config)
+                self.output_limiter = limiter
+                self.scheduler.allow = limiter.allow if limiter is not None else None
+            if self.adaptive is not None:
+                # The limiters were rebuilt at RATE_LIMIT; keep the adapted rate
+                self.adaptive.set_ceiling(config.rate_limit)
+        if {"max_packet_size", "reassembly_max_datagrams", "reassembly_timeout"} & set(
+            changed
+        ):
+            self.reassembler = self._create_reassembler(config)
+        if {"cycle_flows", "cycle_idle_timeout"} & set(changed):
+            self.cycles = self._create_cycle_tracker(config)
+        if "stage_timing_sample" in changed:
+            self.stage_timer = self._create_stage_timer(config)
+        self.config = config
+        if self.ring is not None:
+            self.ring.sample_rate = config.sample_rate
+        if self.injector is not None:
+            self.injector.retarget(config.destination_ip, config.destination_port)
+        logging.getLogger().setLevel(getattr(logging, config.log_level))
+
+        if router is not None and old_router is not None:
+            old_router.stop()
@@ -0,0 +1,421 @@
+"""Disk-backed store-and-forward queue for destination outages.
+
+Payloads a destination cannot take (its circuit breaker is open, sends fail
+or its queue is full) are appended to memory-mapped segment files in a
+directory of their own and sent again, at a limited rate, once the
+destination has recovered. Segments are preallocated to a fixed size; when
+the queue reaches its size cap the oldest segment is discarded.
+
+Segment layout::
+
+    0    magic (4 bytes) | read_offset (u32) - first record not yet replayed
+    8    record | record | ... | zero length marks the end
+
+Record layout::
+
+    0    length (u32) | timestamp_ns (u64) | src_ip (4s) | dst_ip (4s)
+    20   src_port (u16) | dst_port (u16)
+    24   payload (length bytes)
+
+The length is stored last, so a record cut short by a crash reads as the
+end of the segment. The read offset is updated as records are replayed, so
+after a restart replay resumes where it stopped.
+"""
+
+import asyncio
+import logging
+import mmap
+import os
+import re
+import socket
+import struct
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from .forwarder import ShardedForwarder, UdpForwarder
+from .packet import PacketMeta, Payload
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_MAGIC = b"PLCS"
+SEGMENT_HEADER_SIZE = 8
+RECORD_HEADER_SIZE = 24
+SEGMENT_NAME = re.compile(r"^(\d+)\.seg$")
+
+# Seconds without a new spill before the destination counts as recovered
+REPLAY_QUIET_PERIOD = 1.0
+
+# Seconds between replay rounds
+REPLAY_INTERVAL = 0.01
+
+_READ_OFFSET = struct.Struct("<I")
+_LENGTH = struct.Struct("<I")
+_RECORD_META = struct.Struct("<Q4s4sHH")  # everything after the length
+_EMPTY_ADDR = b"\x00\x00\x00\x00"
+
+
+def spill_directory(root: str, label: str) -> str:
+    """Directory holding the spill segments of the destination ``label``."""
+    return os.path.join(root, re.sub(r"[^0-9A-Za-z.-]", "_", label))
+
+
+class SpillSegment:
+    """One preallocated, memory-mapped segment file."""
+
+    def __init__(self, path: str, size: int, create: bool = False):
+        fd = os.open(path, os.O_RDWR | (os.O_CREAT | os.O_EXCL if create else 0), 0o600)
+        try:
+            if create:
+                os.ftruncate(fd, size)
+            else:
+                size = os.fstat(fd).st_size
+            self._mmap = mmap.mmap(
+                fd, size, mmap.MAP_SHARED, mmap.PROT_READ | mmap.PROT_WRITE
+            )
+        finally:
+            os.close(fd)
+
+        self.path = path
+        self.size = size
+        self.records = 0  # records not yet replayed
+        if create:
+            self._mmap[0:4] = SEGMENT_MAGIC
+            self.read_offset = self.write_offset = SEGMENT_HEADER_SIZE
+            _READ_OFFSET.pack_into(self._mmap, 4, self.read_offset)
+            return
+
+        if size < SEGMENT_HEADER_SIZE or self._mmap[0:4] != SEGMENT_MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a spill segment")
+        self.read_offset = _READ_OFFSET.unpack_from(self._mmap, 4)[0]
+        self.write_offset = self.read_offset
+        while True:
+            length = self._length_at(self.write_offset)
+            if not length:
+                break
+            self.write_offset += RECORD_HEADER_SIZE + length
+            self.records += 1
+
+    def _length_at(self, offset: int) -> int:
+        if offset + RECORD_HEADER_SIZE > self.size:
+            return 0
+        length = int(_LENGTH.unpack_from(self._mmap, offset)[0])
+        if offset + RECORD_HEADER_SIZE + length > self.size:
+            return 0
+        return length
+
+    def append(self, payload: Payload, meta: Optional[PacketMeta]) -> bool:
+        """Write a record after the last one.
+
+        Returns:
+            False if the segment has no room left for it
+        """
+        length = len(payload)
+        offset = self.write_offset
+        end = offset + RECORD_HEADER_SIZE + length
+        if end > self.size:
+            return False
+        start = offset + RECORD_HEADER_SIZE
+        self._mmap[start:end] = payload
+        if meta is not None:
+            _RECORD_META.pack_into(
+                self._mmap,
+                offset + 4,
+                int(meta.timestamp * 1e9),
+                socket.inet_aton(meta.src_ip),
+                socket.inet_aton(meta.dst_ip),
+                meta.src_port,
+                meta.dst_port,
+            )
+        else:
+            _RECORD_META.pack_into(
+                self._mmap, offset + 4, time.time_ns(), _EMPTY_ADDR, _EMPTY_ADDR, 0, 0
+            )
+        _LENGTH.pack_into(self._mmap, offset, length)
+        self.write_offset = end
+        self.records += 1
+        return True
+
+    def peek(self) -> Optional[Tuple[bytes, float, int]]:
+        """Oldest record not yet replayed.
+
+        Returns:
+            Payload, capture timestamp and the offset after the record, or
+            None if every record has been replayed
+        """
+        offset = self.read_offset
+        if offset >= self.write_offset:
+            return None
+        length = self._length_at(offset)
+        timestamp_ns = _RECORD_META.unpack_from(self._mmap, offset + 4)[0]
+        start = offset + RECORD_HEADER_SIZE
+        return self._mmap[start : start + length], timestamp_ns / 1e9, start + length
+
+    def advance(self, offset: int) -> None:
+        """Mark the records before ``offset`` as replayed."""
+        self.read_offset = offset
+        self.records -= 1
+        _READ_OFFSET.pack_into(self._mmap, 4, offset)
+
+    def close(self) -> None:
+        """Flush and unmap the segment."""
+        try:
+            self._mmap.flush()
+        finally:
+            self._mmap.close()
+
+
+class SpillQueue:
+    """Store-and-forward queue of one destination.
+
+    :meth:`append` is called from the sending threads with payloads the
+    destination could not take. :meth:`replay` sends them again, oldest
+    first and at most ``replay_rate`` per second, through a forwarder of
+    its own once nothing was spilled for ``REPLAY_QUIET_PERIOD`` seconds
+    and that forwarder's circuit breaker lets traffic through. Segments
+    left by a previous run are picked up when the queue is created.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        forwarder: Union[UdpForwarder, ShardedForwarder],
+        segment_size: int = 16777216,
+        max_bytes: int = 1073741824,
+        replay_rate: int = 1000,
+    ):
+        self.directory = directory
+        self.forwarder = forwarder
+        self.segment_size = segment_size
+        self.max_segments = max(2, max_bytes // segment_size)
+        self.replay_rate = replay_rate
+
+        self.spilled = 0
+        self.replayed = 0
+        self.evicted = 0  # records discarded with the oldest segment at the size cap
+        self.errors = 0  # records that could not be written
+        self.last_spilled = 0.0
+
+        self._segments: List[SpillSegment] = []
+        self._writable = False  # whether the newest segment takes appends
+        self._next_index = 0
+        self._allowance = 0.0
+        self._replayed_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+        os.makedirs(directory, exist_ok=True)
+        self._recover()
+
+    def _recover(self) -> None:
+        names = sorted(
+            name for name in os.listdir(self.directory) if SEGMENT_NAME.match(name)
+        )
+        for name in names:
+            path = os.path.join(self.directory, name)
+            try:
+                segment = SpillSegment(path, self.segment_size)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Skipping spill segment {path}: {e}")
+                continue
+            if segment.records:
+                self._segments.append(segment)
+            else:
+                self._remove(segment)
+        if names:
+            self._next_index = int(names[-1].split(".")[0]) + 1
+        if self._segments:
+            logger.info(
+                f"Recovered {self.pending} spilled payloads in {len(self._segments)} "
+                f"segments from {self.directory}"
+            )
+
+    @property
+    def segments(self) -> int:
+        """Segment files on disk."""
+        return len(self._segments)
+
+    @property
+    def disk_bytes(self) -> int:
+        """Bytes allocated to segment files."""
+        return sum(segment.size for segment in self._segments)
+
+    @property
+    def pending(self) -> int:
+        """Payloads waiting to be replayed."""
+        return sum(segment.records for segment in self._segments)
+
+    def replay_lag(self, now: Optional[float] = None) -> float:
+        """Age in seconds of the oldest payload waiting to be replayed, 0 if none."""
+        with self._lock:
+            for segment in self._segments:
+                record = segment.peek()
+                if record is not None:
+                    return max(0.0, (now or time.time()) - record[1])
+        return 0.0
+
+    def append(self, payload: Payload, meta: Optional[PacketMeta] = None) -> bool:
+        """Store a payload for replay.
+
+        Returns:
+            False if it could not be written
+        """
+        with self._lock:
+            self.last_spilled = time.monotonic()
+            try:
+                if self._writable and self._segments[-1].append(payload, meta):
+                    self.spilled += 1
+                    return True
+                segment = self._new_segment()
+                if not segment.append(payload, meta):
+                    raise ValueError(
+                        f"payload of {len(payload)} bytes exceeds the segment size"
+                    )
+            except (OSError, ValueError) as e:
+                self.errors += 1
+                logger.error(f"Cannot spill payload to {self.directory}: {e}")
+                return False
+            self.spilled += 1
+            return True
+
+    def _new_segment(self) -> SpillSegment:
+        while len(self._segments) >= self.max_segments:
+            oldest = self._segments.pop(0)
+            self.evicted += oldest.records
+            logger.warning(
+                f"Spill queue {self.directory} full, "
+                f"discarded {oldest.records} payloads"
+            )
+            self._remove(oldest)
+        path = os.path.join(self.directory, f"{self._next_index:012d}.seg")
+        self._next_index += 1
+        segment = SpillSegment(path, self.segment_size, create=True)
+        self._segments.append(segment)
+        self._writable = True
+        return segment
+
+    def _remove(self, segment: SpillSegment) -> None:
+        segment.close()
+        try:
+            os.unlink(segment.path)
+        except OSError as e:
+            logger.error(f"Cannot remove spill segment {segment.path}: {e}")
+
+    @property
+    def ready(self) -> bool:
+        """Whether the destination looks recovered enough to replay to."""
+        return (
+            time.monotonic() - self.last_spilled >= REPLAY_QUIET_PERIOD
+            and self.forwarder.breaker.available
+            and not self.forwarder.pending
+        )
+
+    def replay(self, now: Optional[float] = None) -> int:
+        """Send spilled payloads within the rate allowance since the last call.
+
+        Returns:
+            Number of payloads replayed
+        """
+        now = time.monotonic() if now is None else now
+        elapsed = now - self._replayed_at if self._replayed_at is not None else 0.0
+        self._replayed_at = now
+        if not self._segments or not self.ready:
+            self._allowance = 0.0
+            return 0
+        # A stalled replay thread does not turn into a burst
+        burst = max(1.0, self.replay_rate * 0.1)
+        self._allowance = min(self._allowance + elapsed * self.replay_rate, burst)
+
+        replayed = 0
+        while self._allowance >= 1:
+            with self._lock:
+                if not self._segments:
+                    break
+                segment = self._segments[0]
+                record = segment.peek()
+                if record is None:
+                    self._drop_replayed(segment)
+                    continue
+            payload, _, offset = record
+            if not self.forwarder.send(payload):
+                break
+            with self._lock:
+                # The segment may have been evicted while sending
+                if self._segments and self._segments[0] is segment:
+                    segment.advance(offset)
+                    if segment.read_offset >= segment.write_offset:
+                        self._drop_replayed(segment)
+            self._allowance -= 1
+            replayed += 1
+        self.replayed += replayed
+        return replayed
+
+    def _drop_replayed(self, segment: SpillSegment) -> None:
+        """Delete a fully replayed segment; the next spill starts a new one."""
+        if segment is self._segments[-1]:
+            self._writable = False
+        self._segments.remove(segment)
+        self._remove(segment)
+
+    def close(self) -> None:
+        """Flush and unmap the segments, kept for the next run; close the forwarder."""
+        with self._lock:
+            for segment in self._segments:
+                segment.close()
+            self._segments = []
+            self._writable = False
+        self.forwarder.close()
+
+
+class SpillReplayer:
+    """Drive :meth:`SpillQueue.replay` of a set of queues on a thread or event loop."""
+
+    def __init__(
+        self, spills: Dict[str, SpillQueue], interval: float = REPLAY_INTERVAL
+    ):
+        self.spills = spills  # shared with the sniffer, which adds queues on reload
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    def start(self, loop: Optional[asyncio.AbstractEventLoop] = None) -> None:
+        """Start replaying, on ``loop`` if given, otherwise on a thread."""
+        self._stop.clear()
+        if loop is not None:
+            self._timer = loop.call_later(self.interval, self._tick, loop)
+            return
+        self._thread = threading.Thread(
+            target=self._run, name="spill-replay", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop replaying."""
+        self._stop.set()
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def replay(self, spills: Optional[Iterable[SpillQueue]] = None) -> int:
+        """Run one replay round over every queue."""
+        replayed = 0
+        for spill in list(spills if spills is not None else self.spills.values()):
+            try:
+                replayed += spill.replay()
+            except Exception as e:
+                logger.error(
+                    f"Error replaying spilled payloads from {spill.directory}: {e}"
+                )
+        return replayed
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.replay()
+
+    def _tick(self, loop: asyncio.AbstractEventLoop) -> None:
+        self.replay()
+        self._timer = loop.call_later(self.interval, self._tick, loop)
@@ -0,0 +1,261 @@
+"""Push exporter sending metrics to a StatsD or DogStatsD agent over UDP."""
+
+import asyncio
+import logging
+import re
+import socket
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from .config import SnifferConfig
+from .metrics import Histogram
+from .runtime import GC_MONITOR
+from .sniffer import PlcSniffer
+
+logger = logging.getLogger(__name__)
+
+# Characters allowed in a plain StatsD name segment
+_SEGMENT_UNSAFE = re.compile(r"[^A-Za-z0-9_-]")
+
+Tags = Tuple[Tuple[str, str], ...]
+
+
+class StatsdExporter:
+    """Aggregate sniffer metrics over an interval and push them as StatsD lines.
+
+    Counters are sent as the increase since the previous push, gauges as
+    their current value and histograms as the increase of their count and
+    sum. Lines are packed into as few datagrams as possible, each at most
+    ``max_datagram`` bytes so they are not fragmented on the way to the
+    agent. Metrics are read the same way ``/metrics`` reads them, from a
+    background thread or loop timer, so the capture path is not involved.
+
+    With ``dogstatsd`` every line carries ``interface`` (and ``destination``)
+    tags; plain ``statsd`` has no tags, so their values become name segments.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int = 8125,
+        interval: float = 10.0,
+        prefix: str = "plc_sniffer",
+        statsd_format: str = "dogstatsd",
+        max_datagram: int = 1432,
+    ):
+        self.address = (host, port)
+        self.interval = interval
+        self.prefix = f"{prefix}." if prefix else ""
+        self.statsd_format = statsd_format
+        self.max_datagram = max_datagram
+        self.sniffer: Optional[PlcSniffer] = None
+
+        family = socket.AF_INET6 if ":" in host else socket.AF_INET
+        self.socket = socket.socket(family, socket.SOCK_DGRAM)
+        self.socket.setblocking(False)
+
+        self.datagrams_sent = 0
+        self.send_failed = 0
+        self._previous: Dict[Tuple[str, Tags], float] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    @classmethod
+    def from_config(cls, config: SnifferConfig) -> "StatsdExporter":
+        """Create the exporter described by the ``STATSD_*`` settings."""
+        return cls(
+            config.statsd_host,
+            config.statsd_port,
+            config.statsd_interval,
+            config.statsd_prefix,
+            config.statsd_format,
+            config.statsd_max_datagram,
+        )
+
+    def start(
+        self, sniffer: PlcSniffer, loop: Optional[asyncio.AbstractEventLoop] = None
+    ) -> None:
+        """Start pushing every ``interval`` seconds.
+
+        Pushes run on ``loop`` when one is given, otherwise on a thread.
+        """
+        self.sniffer = sniffer
+        self._stop.clear()
+        if loop is not None:
+            self._timer = loop.call_later(self.interval, self._tick, loop)
+        else:
+            self._thread = threading.Thread(
+                target=self._run, name="statsd", daemon=True
+            )
+            self._thread.start()
+        logger.info(
+            f"Pushing {self.statsd_format} metrics to "
+            f"{self.address[0]}:{self.address[1]} every {self.interval:g}s"
+        )
+
+    def stop(self) -> None:
+        """Stop pushing; the last interval is flushed before the socket closes."""
+        self._stop.set()
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+        if self.sniffer is not None:
+            self.flush()
+            self.sniffer = None
+        self.socket.close()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.flush()
+
+    def _tick(self, loop: asyncio.AbstractEventLoop) -> None:
+        self.flush()
+        self._timer = loop.call_later(self.interval, self._tick, loop)
+
+    def flush(self) -> int:
+        """Send everything that changed since the last push.
+
+        Returns:
+            Number of datagrams sent
+        """
+        sent = 0
+        for datagram in self.pack(self.collect()):
+            try:
+                self.socket.sendto(datagram, self.address)
+                sent += 1
+            except OSError as e:
+                self.send_failed += 1
+                logger.debug(
+                    f"StatsD push to {self.address[0]}:{self.address[1]} failed: {e}"
+                )
+        self.datagrams_sent += sent
+        return sent
+
+    def pack(self, lines: List[str]) -> List[bytes]:
+        """Join lines into newline-separated datagrams of up to ``max_datagram`` bytes.
+
+        A single line longer than the limit is sent on its own.
+        """
+        datagrams = []
+        current = b""
+        for line in lines:
+            encoded = line.encode()
+            if current and len(current) + 1 + len(encoded) > self.max_datagram:
+                datagrams.append(current)
+                current = b""
+            current = current + b"\n" + encoded if current else encoded
+        if current:
+            datagrams.append(current)
+        return datagrams
+
+    def collect(self) -> List[str]:
+        """StatsD lines for the interval since the previous call."""
+        sniffer = self.sniffer
+        if sniffer is None:
+            return []
+
+        sniffer.poll_capture_stats()
+        stats = sniffer.stats
+        base: Tags = (("interface", sniffer.config.interface),)
+        lines: List[str] = []
+
+        for name, value in (
+            ("packets_processed", stats.packets_processed),
+            ("packets_forwarded", stats.packets_forwarded),
+            ("packets_dropped", stats.packets_dropped),
+            ("packets_rate_limited", stats.rate_limited),
+            ("packets_oversized", stats.oversized),
+            ("packets_sampled_out", stats.sampled_out),
+            ("errors", stats.errors),
+            ("bytes_forwarded", stats.bytes_forwarded),
+        ):
+            self._counter(lines, name, value, base)
+        self._gauge(lines, "current_packet_rate", stats.get_current_rate(), base)
+        self._gauge(lines, "sampling_rate", sniffer.config.sample_rate, base)
+
+        capture = stats.capture
+        if capture.available:
+            self._counter(lines, "kernel_packets_received", capture.received, base)
+            self._counter(lines, "kernel_packets_dropped", capture.dropped, base)
+            self._gauge(lines, "capture_loss_ratio", capture.loss_ratio, base)
+
+        for generation, pauses in enumerate(GC_MONITOR.pauses):
+            self._histogram(
+                lines,
+                "gc_pause_seconds",
+                pauses,
+                base + (("generation", str(generation)),),
+            )
+
+        router = sniffer.router
+        if router is not None:
+            for worker in router.workers:
+                tags = base + (("destination", worker.name),)
+                self._counter(lines, "destination_sent", worker.stats.sent, tags)
+                self._counter(lines, "destination_bytes", worker.stats.bytes_sent, tags)
+                self._counter(
+                    lines,
+                    "destination_dropped",
+                    worker.stats.queue_full,
+                    tags + (("reason", "queue_full"),),
+                )
+                self._counter(
+                    lines,
+                    "destination_dropped",
+                    worker.stats.send_failed,
+                    tags + (("reason", "send_failed"),),
+                )
+                self._gauge(lines, "destination_queue_depth", worker.queue_depth, tags)
+                self._gauge(lines, "destination_healthy", int(worker.healthy), tags)
+                self._gauge(
+                    lines, "forward_retry_queue_depth", worker.forwarder.pending, tags
+                )
+                self._gauge(
+                    lines,
+                    "circuit_breaker_open",
+                    int(worker.forwarder.breaker.is_open),
+                    tags,
+                )
+                self._histogram(
+                    lines, "destination_latency_seconds", worker.stats.latency, tags
+                )
+        return lines
+
+    def _delta(self, name: str, value: float, tags: Tags) -> float:
+        """Increase of a cumulative value since the previous push.
+
+        A value below the previous one means the counter was recreated (by a
+        configuration reload), so all of it is new.
+        """
+        previous = self._previous.get((name, tags), 0)
+        self._previous[(name, tags)] = value
+        return value - previous if value >= previous else value
+
+    def _counter(self, lines: List[str], name: str, value: int, tags: Tags) -> None:
+        delta = self._delta(name, value, tags)
+        if delta:
+            # Exact: ``:g`` would turn large byte counts into 6-digit exponents
+            lines.append(self._line(name, f"{int(delta)}", "c", tags))
+
+    def _gauge(self, lines: List[str], name: str, value: float, tags: Tags) -> None:
+        lines.append(self._line(name, f"{value:g}", "g", tags))
+
+    def _histogram(
+        self, lines: List[str], name: str, histogram: Histogram, tags: Tags
+    ) -> None:
+        count = self._delta(f"{name}.count", histogram.count, tags)
+        total = self._delta(f"{name}.sum", histogram.sum, tags)
+        if count:
+            lines.append(self._line(f"{name}.count", f"{int(count)}", "c", tags))
+            lines.append(self._line(f"{name}.sum", f"{total:.9g}", "c", tags))
+
+    def _line(self, name: str, value: str, kind: str, tags: Tags) -> str:
+        if self.statsd_format == "dogstatsd":
+            tag_list = ",".join(f"{key}:{tag}" for key, tag in tags)
+            return f"{self.prefix}{name}:{value}|{kind}|#{tag_list}"
+        segments = "".join(f'{_SEGMENT_UNSAFE.sub("_", tag)}.' for _, tag in tags)
+        return f"{self.prefix}{segments}{name}:{value}|{kind}"
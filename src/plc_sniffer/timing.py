@@ -0,0 +1,65 @@
+"""Sampled per-stage timing of the packet pipeline."""
+
+from typing import Dict, List, Optional, Sequence
+
+from .metrics import Histogram, Shards
+
+# Upper bounds in seconds, from 250ns to 10ms; stages are far shorter than a send
+STAGE_BUCKETS = (
+    0.00000025,
+    0.0000005,
+    0.000001,
+    0.0000025,
+    0.000005,
+    0.00001,
+    0.000025,
+    0.00005,
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.01,
+)
+
+
+class StageShard:
+    """Sampling countdown and stage histograms of one capture thread."""
+
+    __slots__ = ("countdown", "histograms")
+
+    def __init__(self, stages: int):
+        self.countdown = 0
+        self.histograms = [Histogram(STAGE_BUCKETS) for _ in range(stages)]
+
+
+class StageTimer:
+    """Decide which batches are timed and collect their stage durations.
+
+    One batch in ``every`` is timed, counted per capture thread so threads
+    never share the countdown. Histograms are preallocated per thread and
+    indexed by the position of the stage in ``stages``.
+    """
+
+    def __init__(self, every: int, stages: Sequence[str]):
+        self.every = every
+        self.stages = tuple(stages)
+        self.shards: Shards[StageShard] = Shards(lambda: StageShard(len(self.stages)))
+
+    def sample(self) -> Optional[List[Histogram]]:
+        """Stage histograms if the calling thread's next batch is timed, else None."""
+        shard = self.shards.get()
+        if shard.countdown:
+            shard.countdown -= 1
+            return None
+        shard.countdown = self.every - 1
+        return shard.histograms
+
+    def histograms(self) -> Dict[str, Histogram]:
+        """Stage histograms merged over all threads."""
+        shards = self.shards.all
+        return {
+            stage: Histogram.merge([shard.histograms[index] for shard in shards])
+            if shards
+            else Histogram(STAGE_BUCKETS)
+            for index, stage in enumerate(self.stages)
+        }
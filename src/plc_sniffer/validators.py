@@ -2,23 +2,24 @@
 
 import ipaddress
 import re
-from typing import Any, Union
+from typing import List, Sequence, Tuple, Union
 
 
 class ValidationError(Exception):
     """Raised when validation fails."""
+
     pass
 
 
 def validate_ip_address(ip: str) -> str:
     """Validate IP address format.
-    
+
     Args:
         ip: IP address string to validate
-        
+
     Returns:
         Validated IP address string
-        
+
     Raises:
         ValidationError: If IP address format is invalid
     """
@@ -31,13 +32,13 @@ def validate_ip_address(ip: str) -> str:
 
 def validate_port(port: Union[str, int]) -> int:
     """Validate port number is in valid range.
-    
+
     Args:
         port: Port number to validate
-        
+
     Returns:
         Validated port number as integer
-        
+
     Raises:
         ValidationError: If port is not in valid range (1-65535)
     """
@@ -52,130 +53,145 @@ def validate_port(port: Union[str, int]) -> int:
 
 def validate_interface(interface: str) -> str:
     """Validate network interface name.
-    
+
     Args:
         interface: Network interface name
-        
+
     Returns:
         Validated interface name
-        
+
     Raises:
         ValidationError: If interface name contains invalid characters
     """
     # Interface names should be alphanumeric with some special chars
-    pattern = r'^[a-zA-Z0-9\-_.]+$'
+    pattern = r"^[a-zA-Z0-9\-_.]+$"
     if not re.match(pattern, interface):
         raise ValidationError(
             f"Invalid interface name '{interface}': "
             "must contain only alphanumeric characters, hyphens, dots, and underscores"
         )
-    
+
     # Check length constraints
     if len(interface) > 15:  # Linux interface name limit
-        raise ValidationError(f"Interface name '{interface}' too long (max 15 characters)")
-    
+        raise ValidationError(
+            f"Interface name '{interface}' too long (max 15 characters)"
+        )
+
     return interface
 
 
 def validate_bpf_filter(filter_str: str) -> str:
     """Basic validation of BPF filter syntax.
-    
+
     Args:
         filter_str: BPF filter string
-        
+
     Returns:
         Validated filter string
-        
+
     Raises:
         ValidationError: If filter contains obvious syntax errors
     """
     if not filter_str.strip():
         raise ValidationError("BPF filter cannot be empty")
-    
+
     # Check for balanced parentheses
     paren_count = 0
     for char in filter_str:
-        if char == '(':
+        if char == "(":
             paren_count += 1
-        elif char == ')':
+        elif char == ")":
             paren_count -= 1
         if paren_count < 0:
             raise ValidationError("Unbalanced parentheses in BPF filter")
-    
+
     if paren_count != 0:
         raise ValidationError("Unbalanced parentheses in BPF filter")
-    
+
     # Check for common BPF keywords to ensure it's likely a valid filter
-    bpf_keywords = ['udp', 'tcp', 'icmp', 'ip', 'host', 'port', 'net', 'src', 'dst', 'and', 'or', 'not']
+    bpf_keywords = [
+        "udp",
+        "tcp",
+        "icmp",
+        "ip",
+        "host",
+        "port",
+        "net",
+        "src",
+        "dst",
+        "and",
+        "or",
+        "not",
+    ]
     filter_words = filter_str.lower().split()
-    
+
     if not any(keyword in filter_words for keyword in bpf_keywords):
         raise ValidationError(
             f"BPF filter '{filter_str}' doesn't contain any recognized keywords"
         )
-    
+
     return filter_str
 
 
 def validate_log_level(level: str) -> str:
     """Validate logging level.
-    
+
     Args:
         level: Logging level string
-        
+
     Returns:
         Validated and uppercased log level
-        
+
     Raises:
         ValidationError: If log level is not valid
     """
-    valid_levels = {'DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL'}
+    valid_levels = {"DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"}
     level_upper = level.upper()
-    
+
     if level_upper not in valid_levels:
         raise ValidationError(
             f"Invalid log level '{level}'. "
             f"Must be one of: {', '.join(sorted(valid_levels))}"
         )
-    
+
     return level_upper
 
 
 def validate_packet_size(size: int) -> int:
     """Validate packet size limit.
-    
+
     Args:
         size: Maximum packet size in bytes
-        
+
     Returns:
         Validated packet size
-        
+
     Raises:
         ValidationError: If size is invalid
     """
     min_size = 64  # Minimum Ethernet frame size
     max_size = 65535  # Maximum UDP packet size
-    
+
     if not isinstance(size, int):
         raise ValidationError(f"Packet size must be an integer, got {type(size)}")
-    
+
     if not min_size <= size <= max_size:
         raise ValidationError(
             f"Packet size {size} is not in valid range ({min_size}-{max_size})"
         )
-    
+
     return size
 
 
 def validate_rate_limit(rate: Union[str, int]) -> int:
     """Validate rate limit (packets per second).
-    
+
     Args:
         rate: Rate limit value
-        
+
     Returns:
         Validated rate limit as integer
-        
+
     Raises:
         ValidationError: If rate is invalid
     """
@@ -187,4 +203,472 @@ def validate_rate_limit(rate: Union[str, int]) -> int:
             raise ValidationError("Rate limit too high (max 1000000 pps)")
         return rate_int
     except ValueError:
-        raise ValidationError(f"Invalid rate limit '{rate}'")
\ No newline at end of file
+        raise ValidationError(f"Invalid rate limit '{rate}'")
+
+
+def validate_output_mode(mode: str) -> str:
+    """Validate packet output mode.
+
+    Args:
+        mode: Output mode name
+
+    Returns:
+        Validated and lowercased output mode
+
+    Raises:
+        ValidationError: If output mode is not supported
+    """
+    valid_modes = {"udp", "shm", "inject"}
+    mode_lower = mode.lower()
+
+    if mode_lower not in valid_modes:
+        raise ValidationError(
+            f"Invalid output mode '{mode}'. "
+            f"Must be one of: {', '.join(sorted(valid_modes))}"
+        )
+
+    return mode_lower
+
+
+def validate_ring_slots(slots: Union[str, int]) -> int:
+    """Validate the number of slots of the shared-memory ring.
+
+    Args:
+        slots: Number of ring slots
+
+    Returns:
+        Validated slot count as integer
+
+    Raises:
+        ValidationError: If slot count is not a power of two in range
+    """
+    try:
+        slots_int = int(slots)
+    except ValueError:
+        raise ValidationError(f"Invalid ring slot count '{slots}'")
+
+    if not 16 <= slots_int <= 16777216:
+        raise ValidationError(
+            f"Ring slot count {slots_int} is not in valid range (16-16777216)"
+        )
+    if slots_int & (slots_int - 1):
+        raise ValidationError(f"Ring slot count {slots_int} must be a power of two")
+
+    return slots_int
+
+
+def validate_ring_slot_size(size: Union[str, int]) -> int:
+    """Validate the size in bytes of a shared-memory ring slot.
+
+    Args:
+        size: Slot size including the 32-byte record header
+
+    Returns:
+        Validated slot size as integer
+
+    Raises:
+        ValidationError: If slot size is out of range or not 8-byte aligned
+    """
+    try:
+        size_int = int(size)
+    except ValueError:
+        raise ValidationError(f"Invalid ring slot size '{size}'")
+
+    if not 64 <= size_int <= 65568:
+        raise ValidationError(
+            f"Ring slot size {size_int} is not in valid range (64-65568)"
+        )
+    if size_int % 8:
+        raise ValidationError(f"Ring slot size {size_int} must be a multiple of 8")
+
+    return size_int
+
+
+def validate_destination(spec: str) -> Tuple[str, int]:
+    """Validate a destination given as ``ip:port`` or ``[ipv6]:port``.
+
+    Args:
+        spec: Destination specification
+
+    Returns:
+        Tuple of validated IP address and port
+
+    Raises:
+        ValidationError: If the specification is malformed
+    """
+    spec = spec.strip()
+    if spec.startswith("["):
+        host, sep, port = spec[1:].partition("]:")
+    else:
+        host, sep, port = spec.rpartition(":")
+        if ":" in host:
+            raise ValidationError(
+                f"Invalid destination '{spec}': IPv6 addresses must be bracketed"
+            )
+
+    if not sep or not host:
+        raise ValidationError(f"Invalid destination '{spec}': expected ip:port")
+
+    return validate_ip_address(host), validate_port(port)
+
+
+def validate_weight(weight: Union[str, float]) -> float:
+    """Validate a load-balancing weight.
+
+    Args:
+        weight: Relative weight of a destination
+
+    Returns:
+        Validated weight as float
+
+    Raises:
+        ValidationError: If weight is not a positive number
+    """
+    try:
+        weight_float = float(weight)
+    except ValueError:
+        raise ValidationError(f"Invalid weight '{weight}'")
+
+    if not 0 < weight_float <= 1000:
+        raise ValidationError(f"Weight {weight_float} is not in valid range (0-1000]")
+
+    return weight_float
+
+
+def validate_distribution(mode: str) -> str:
+    """Validate how payloads are distributed across destinations.
+
+    Args:
+        mode: Distribution mode name
+
+    Returns:
+        Validated and lowercased distribution mode
+
+    Raises:
+        ValidationError: If distribution mode is not supported
+    """
+    valid_modes = {"fanout", "hash"}
+    mode_lower = mode.lower()
+
+    if mode_lower not in valid_modes:
+        raise ValidationError(
+            f"Invalid distribution mode '{mode}'. "
+            f"Must be one of: {', '.join(sorted(valid_modes))}"
+        )
+
+    return mode_lower
+
+
+def validate_port_range(port_range: str) -> Tuple[int, int]:
+    """Validate an inclusive port range given as ``low-high``.
+
+    Args:
+        port_range: Port range string
+
+    Returns:
+        Tuple of validated low and high ports
+
+    Raises:
+        ValidationError: If the range is malformed or empty
+    """
+    low, sep, high = str(port_range).partition("-")
+    if not sep:
+        raise ValidationError(f"Invalid port range '{port_range}': expected low-high")
+
+    low_int = validate_port(low.strip())
+    high_int = validate_port(high.strip())
+    if low_int > high_int:
+        raise ValidationError(
+            f"Invalid port range '{port_range}': low port exceeds high port"
+        )
+
+    return low_int, high_int
+
+
+def validate_subnet(subnet: str) -> str:
+    """Validate an IPv4 subnet in CIDR notation.
+
+    Args:
+        subnet: Subnet string such as ``192.168.1.0/24``
+
+    Returns:
+        Normalized subnet string
+
+    Raises:
+        ValidationError: If the subnet is not a valid IPv4 network
+    """
+    try:
+        return str(ipaddress.IPv4Network(subnet, strict=False))
+    except ValueError as e:
+        raise ValidationError(f"Invalid subnet '{subnet}': {e}")
+
+
+def validate_cpu_list(cpus: Union[str, Sequence[int]]) -> List[int]:
+    """Validate a CPU list such as ``2,3`` or ``2-3,6`` (Linux cpuset syntax).
+
+    Args:
+        cpus: CPU list string, or a sequence of CPU numbers
+
+    Returns:
+        Sorted list of unique CPU numbers (empty if none given)
+
+    Raises:
+        ValidationError: If the list is malformed
+    """
+    if not isinstance(cpus, str):
+        cpus = ",".join(str(cpu) for cpu in cpus)
+
+    result = set()
+    for part in cpus.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        low, sep, high = part.partition("-")
+        try:
+            first = int(low)
+            last = int(high) if sep else first
+        except ValueError:
+            raise ValidationError(f"Invalid CPU list entry '{part}'")
+        if first < 0 or last < first:
+            raise ValidationError(f"Invalid CPU range '{part}'")
+        result.update(range(first, last + 1))
+
+    return sorted(result)
+
+
+def validate_realtime_priority(priority: Union[str, int]) -> int:
+    """Validate a ``SCHED_FIFO`` priority.
+
+    Args:
+        priority: Priority, 0 to keep the default scheduler
+
+    Returns:
+        Validated priority as integer
+
+    Raises:
+        ValidationError: If priority is outside 0-99
+    """
+    try:
+        priority_int = int(priority)
+    except ValueError:
+        raise ValidationError(f"Invalid realtime priority '{priority}'")
+
+    if not 0 <= priority_int <= 99:
+        raise ValidationError(
+            f"Realtime priority {priority_int} is not in valid range (0-99)"
+        )
+
+    return priority_int
+
+
+def validate_gc_mode(mode: str) -> str:
+    """Validate the garbage collection mode.
+
+    Args:
+        mode: GC mode name
+
+    Returns:
+        Validated and lowercased GC mode
+
+    Raises:
+        ValidationError: If GC mode is not supported
+    """
+    valid_modes = {"auto", "freeze", "idle"}
+    mode_lower = mode.lower()
+
+    if mode_lower not in valid_modes:
+        raise ValidationError(
+            f"Invalid GC mode '{mode}'. "
+            f"Must be one of: {', '.join(sorted(valid_modes))}"
+        )
+
+    return mode_lower
+
+
+def validate_capture_engine(engine: str) -> str:
+    """Validate the packet capture engine.
+
+    Args:
+        engine: Capture engine name
+
+    Returns:
+        Validated and lowercased engine name
+
+    Raises:
+        ValidationError: If the engine is not supported
+    """
+    valid_engines = {"scapy", "raw", "mirror"}
+    engine_lower = engine.lower()
+
+    if engine_lower not in valid_engines:
+        raise ValidationError(
+            f"Invalid capture engine '{engine}'. "
+            f"Must be one of: {', '.join(sorted(valid_engines))}"
+        )
+
+    return engine_lower
+
+
+def validate_runtime(runtime: str) -> str:
+    """Validate the process runtime.
+
+    Args:
+        runtime: Runtime name
+
+    Returns:
+        Validated and lowercased runtime name
+
+    Raises:
+        ValidationError: If the runtime is not supported
+    """
+    valid_runtimes = {"threads", "asyncio"}
+    runtime_lower = runtime.lower()
+
+    if runtime_lower not in valid_runtimes:
+        raise ValidationError(
+            f"Invalid runtime '{runtime}'. "
+            f"Must be one of: {', '.join(sorted(valid_runtimes))}"
+        )
+
+    return runtime_lower
+
+
+def validate_class_scheduling(scheduling: str) -> str:
+    """Validate how traffic classes share the output.
+
+    Args:
+        scheduling: Scheduling policy name
+
+    Returns:
+        Validated and lowercased policy name
+
+    Raises:
+        ValidationError: If the policy is not supported
+    """
+    valid_policies = {"strict", "weighted"}
+    scheduling_lower = scheduling.lower()
+
+    if scheduling_lower not in valid_policies:
+        raise ValidationError(
+            f"Invalid class scheduling '{scheduling}'. "
+            f"Must be one of: {', '.join(sorted(valid_policies))}"
+        )
+
+    return scheduling_lower
+
+
+def validate_statsd_format(statsd_format: str) -> str:
+    """Validate the StatsD line format.
+
+    Args:
+        statsd_format: Format name
+
+    Returns:
+        Validated and lowercased format name
+
+    Raises:
+        ValidationError: If the format is not supported
+    """
+    valid_formats = {"statsd", "dogstatsd"}
+    format_lower = statsd_format.lower()
+
+    if format_lower not in valid_formats:
+        raise ValidationError(
+            f"Invalid StatsD format '{statsd_format}'. "
+            f"Must be one of: {', '.join(sorted(valid_formats))}"
+        )
+
+    return format_lower
+
+
+def validate_rate_control(mode: str) -> str:
+    """Validate how the forwarding rate limit is set.
+
+    Args:
+        mode: Rate control mode name
+
+    Returns:
+        Validated and lowercased mode name
+
+    Raises:
+        ValidationError: If the mode is not supported
+    """
+    valid_modes = {"static", "aimd"}
+    mode_lower = mode.lower()
+
+    if mode_lower not in valid_modes:
+        raise ValidationError(
+            f"Invalid rate control '{mode}'. "
+            f"Must be one of: {', '.join(sorted(valid_modes))}"
+        )
+
+    return mode_lower
+
+
+def validate_mac_address(mac: str) -> str:
+    """Validate a MAC address written as six colon-separated hex octets.
+
+    Args:
+        mac: MAC address string
+
+    Returns:
+        Validated MAC address in lowercase
+
+    Raises:
+        ValidationError: If the address is malformed
+    """
+    mac_lower = mac.strip().lower()
+    if not re.fullmatch(r"[0-9a-f]{2}(:[0-9a-f]{2}){5}", mac_lower):
+        raise ValidationError(
+            f"Invalid MAC address '{mac}': expected aa:bb:cc:dd:ee:ff"
+        )
+
+    return mac_lower
+
+
+def validate_mirror_encap(encap: str) -> str:
+    """Validate the tunnel encapsulation of mirrored traffic.
+
+    Args:
+        encap: Encapsulation name
+
+    Returns:
+        Validated and lowercased encapsulation name
+
+    Raises:
+        ValidationError: If the encapsulation is not supported
+    """
+    valid_encaps = {"vxlan", "gre"}
+    encap_lower = encap.lower()
+
+    if encap_lower not in valid_encaps:
+        raise ValidationError(
+            f"Invalid mirror encapsulation '{encap}'. "
+            f"Must be one of: {', '.join(sorted(valid_encaps))}"
+        )
+
+    return encap_lower
+
+
+def validate_calibration_mode(mode: str) -> str:
+    """Validate the startup calibration mode.
+
+    Args:
+        mode: Calibration mode
+
+    Returns:
+        Validated and lowercased calibration mode
+
+    Raises:
+        ValidationError: If the mode is not supported
+    """
+    valid_modes = {"off", "auto"}
+    mode_lower = mode.lower()
+
+    if mode_lower not in valid_modes:
+        raise ValidationError(
+            f"Invalid calibration mode '{mode}'. "
+            f"Must be one of: {', '.join(sorted(valid_modes))}"
+        )
+
+    return mode_lower
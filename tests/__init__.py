@@ -1 +1 @@
-"""Test package for PLC Sniffer."""
\ No newline at end of file
+"""Test package for PLC Sniffer."""
@@ -1,8 +1,9 @@
 """Pytest configuration and fixtures."""
 
-import pytest
 from unittest.mock import Mock, patch
 
+import pytest
+
 from plc_sniffer.config import SnifferConfig
 
 
@@ -17,14 +18,14 @@ def valid_config():
         log_level="INFO",
         max_packet_size=65535,
         rate_limit=1000,
-        socket_timeout=5.0
+        socket_timeout=5.0,
     )
 
 
 @pytest.fixture
 def mock_socket():
     """Mock socket for testing."""
-    with patch('socket.socket') as mock:
+    with patch("socket.socket") as mock:
         socket_instance = Mock()
         mock.return_value = socket_instance
         yield socket_instance
@@ -33,15 +34,27 @@ def mock_socket():
 @pytest.fixture
 def mock_scapy_sniff():
     """Mock scapy sniff function."""
-    with patch('plc_sniffer.sniffer.sniff') as mock:
+    with patch("plc_sniffer.sniffer.sniff") as mock:
         yield mock
 
 
+@pytest.fixture
+def mock_capture_socket():
+    """Mock the capture socket opened by the sniffer."""
+    with patch("plc_sniffer.sniffer.open_capture_socket") as mock:
+        mock.return_value.ins.getsockopt.return_value = bytes(12)  # PACKET_STATISTICS
+        yield mock.return_value
+
+
 @pytest.fixture
 def sample_packet():
     """Create a sample packet for testing."""
-    from scapy.all import IP, UDP, Raw, Ether
-    
-    packet = Ether() / IP(src="192.168.1.100", dst="192.168.1.200") / \
-             UDP(sport=1234, dport=5678) / Raw(load=b"test payload")
-    return packet
\ No newline at end of file
+    from scapy.all import IP, UDP, Ether, Raw
+
+    packet = (
+        Ether()
+        / IP(src="192.168.1.100", dst="192.168.1.200")
+        / UDP(sport=1234, dport=5678)
+        / Raw(load=b"test payload")
+    )
+    return packet
@@ -1 +1 @@
-"""Unit tests package."""
\ No newline at end of file
+"""Unit tests package."""
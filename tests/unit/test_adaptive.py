@@ -0,0 +1,151 @@
+"""Unit tests for adaptive module."""
+
+import asyncio
+import socket
+import time
+from unittest.mock import Mock
+
+import pytest
+
+from plc_sniffer.adaptive import AckListener, AdaptiveRate, Feedback
+
+
+def feedback(send_errors=0, queue_full=0, queue_depth=0, sent=0, limited=0, backlog=0):
+    return Feedback(send_errors, queue_full, queue_depth, 100, sent, limited, backlog)
+
+
+@pytest.fixture
+def samples():
+    """Feedback returned by successive controller samples."""
+    return [feedback()]
+
+
+@pytest.fixture
+def controller(samples):
+    controller = AdaptiveRate(
+        lambda: samples[-1], Mock(), ceiling=1000, floor=100, step=50
+    )
+    controller.update()  # first sample is the baseline
+    controller.apply.reset_mock()
+    return controller
+
+
+class TestAdaptiveRate:
+    """Test AdaptiveRate functionality."""
+
+    def test_additive_increase_while_limited(self, controller, samples):
+        controller.rate = 800
+        samples.append(feedback(limited=10))
+        assert controller.update() == 850
+
+        samples.append(feedback(limited=10))  # limit no longer reached
+        assert controller.update() == 850
+
+        samples.append(feedback(limited=10, backlog=5))
+        controller.update()
+        samples.append(feedback(limited=30))
+        controller.update()
+        samples.append(feedback(limited=40))
+
+        assert controller.update() == 1000  # capped at the ceiling
+        assert controller.increases == 4
+        controller.apply.assert_called_with(1000)
+
+    def test_multiplicative_decrease(self, controller, samples):
+        samples.append(feedback(send_errors=3, limited=10))
+        assert controller.update() == 500
+
+        samples.append(feedback(send_errors=3, queue_full=1))
+        assert controller.update() == 250
+
+        samples.append(feedback(send_errors=9))
+        controller.update()
+
+        assert controller.rate == 125
+        samples.append(feedback(send_errors=10))
+        assert controller.update() == 100  # floor
+        assert controller.decreases == {
+            "send_error": 3,
+            "queue_growth": 1,
+            "ack_loss": 0,
+        }
+        assert controller.increases == 0
+
+    def test_queue_growth_above_high_water(self, controller, samples):
+        samples.append(feedback(queue_depth=40))
+        controller.update()
+        assert controller.rate == 1000  # growing but under half full
+
+        samples.append(feedback(queue_depth=60))
+        controller.update()
+        samples.append(feedback(queue_depth=55))
+        controller.update()
+
+        assert controller.rate == 500
+        assert controller.decreases["queue_growth"] == 1
+
+    def test_set_ceiling(self, controller):
+        controller.rate = 800
+        controller.set_ceiling(500)
+
+        assert controller.rate == 500
+        controller.apply.assert_called_once_with(500)
+        controller.set_ceiling(2000)
+        assert controller.rate == 500
+
+    def test_ack_loss(self, samples):
+        acks = AckListener(0, "127.0.0.1")
+        collector = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        controller = AdaptiveRate(lambda: samples[-1], Mock(), ceiling=1000, acks=acks)
+
+        def report(count, sent):
+            collector.sendto(str(count).encode(), acks.socket.getsockname())
+            time.sleep(0.01)
+            samples.append(feedback(sent=sent))
+            return controller.update()
+
+        try:
+            assert report(100, 100) == 1000  # baseline
+            assert report(199, 200) == 1000  # within tolerance
+            assert report(250, 300) == 500
+            assert report(10, 400) == 500  # collector restarted
+            collector.sendto(b"garbage", acks.socket.getsockname())
+            assert report(110, 500) == 500
+        finally:
+            collector.close()
+            controller.stop()
+
+        assert controller.decreases["ack_loss"] == 1
+        assert acks.malformed == 1
+        assert acks.socket.fileno() == -1
+
+    def test_thread(self, samples):
+        apply = Mock()
+        controller = AdaptiveRate(
+            lambda: samples[-1], apply, ceiling=1000, interval=0.01
+        )
+        samples.append(feedback(send_errors=1))
+
+        controller.start()
+        samples.append(feedback(send_errors=2))
+        time.sleep(0.05)
+        controller.stop()
+
+        assert controller.rate < 1000
+        apply.assert_called()
+
+    def test_loop(self, samples):
+        controller = AdaptiveRate(
+            lambda: samples[-1], Mock(), ceiling=1000, interval=0.01
+        )
+
+        async def run():
+            controller.start(asyncio.get_running_loop())
+            samples.append(feedback(send_errors=1))
+            await asyncio.sleep(0.05)
+            controller.stop()
+
+        asyncio.run(run())
+
+        assert controller.decreases["send_error"] == 1
+        assert controller._timer is None
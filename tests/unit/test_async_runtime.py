@@ -0,0 +1,182 @@
+"""Unit tests for async_runtime module."""
+
+import asyncio
+import json
+import socket
+import threading
+from unittest.mock import Mock, patch
+
+import pytest
+from scapy.all import IP, UDP, Ether, Raw
+
+from plc_sniffer.async_runtime import AsyncHealthServer, AsyncRuntime
+from plc_sniffer.config import Destination
+from plc_sniffer.sniffer import PlcSniffer
+
+
+class PairCaptureSocket:
+    """Capture socket reading frames written to the other end of a socketpair."""
+
+    def __init__(self):
+        self.ins, self.peer = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+
+    def recv(self):
+        return Ether(self.ins.recv(65535))
+
+    def close(self):
+        self.ins.close()
+        self.peer.close()
+
+
+@pytest.fixture
+def collector():
+    """Local UDP socket standing in for a collector."""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(("127.0.0.1", 0))
+    sock.setblocking(False)
+    yield sock
+    sock.close()
+
+
+async def _until(predicate, timeout=2.0):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not predicate():
+        assert loop.time() < deadline, "condition not met in time"
+        await asyncio.sleep(0.01)
+
+
+class TestAsyncRuntime:
+    """Test AsyncRuntime functionality."""
+
+    def test_capture_and_forward_on_loop(self, valid_config, collector):
+        valid_config.destinations = [
+            Destination("127.0.0.1", collector.getsockname()[1])
+        ]
+        sniffer = PlcSniffer(valid_config)
+        capture_socket = PairCaptureSocket()
+        frame = bytes(
+            Ether() / IP(src="192.168.1.100") / UDP(dport=502) / Raw(b"cycle data")
+        )
+
+        async def scenario():
+            runtime = AsyncRuntime(sniffer)
+            task = asyncio.create_task(runtime.main())
+            await _until(lambda: sniffer.capture_socket is not None)
+            assert sniffer.loop is asyncio.get_running_loop()
+
+            capture_socket.peer.send(frame)
+            capture_socket.peer.send(frame)
+            received = [
+                await asyncio.wait_for(
+                    asyncio.get_running_loop().sock_recv(collector, 2048), 2.0
+                )
+                for _ in range(2)
+            ]
+
+            runtime.stop()
+            await task
+            return received
+
+        with patch(
+            "plc_sniffer.sniffer.open_capture_socket", return_value=capture_socket
+        ):
+            received = asyncio.run(scenario())
+
+        assert received == [b"cycle data", b"cycle data"]
+        assert sniffer.stats.packets_forwarded == 2
+        assert sniffer.running is False
+        assert sniffer.loop is None
+        assert sniffer.capture_socket is None
+
+    def test_multiple_destinations_sent_inline(self, valid_config, mock_capture_socket):
+        valid_config.destinations = [
+            Destination("127.0.0.1", 8514),
+            Destination("127.0.0.1", 8515),
+        ]
+        sniffer = PlcSniffer(valid_config)
+
+        async def scenario():
+            sniffer.loop = asyncio.get_running_loop()
+            sniffer.open()
+            try:
+                assert all(not pool.threaded for pool in sniffer.router.pools)
+                assert all(worker._thread is None for worker in sniffer.router.workers)
+            finally:
+                sniffer.stop()
+
+        asyncio.run(scenario())
+
+    def test_raw_engine_drains_in_batches(self, valid_config):
+        valid_config.capture_engine = "raw"
+        sniffer = PlcSniffer(valid_config)
+        sniffer.running = True
+        sniffer.receive_frames = Mock(side_effect=[32, 20, 0])
+
+        AsyncRuntime(sniffer)._on_readable()
+
+        assert [c.kwargs["limit"] for c in sniffer.receive_frames.call_args_list] == [
+            32,
+            32,
+            12,
+        ]
+
+
+class TestAsyncHealthServer:
+    """Test the asyncio health server."""
+
+    def test_health_endpoint(self, valid_config):
+        sniffer = PlcSniffer(valid_config)
+
+        async def scenario():
+            server = AsyncHealthServer(port=0)
+            await server.start(sniffer)
+            port = server.server.sockets[0].getsockname()[1]
+            try:
+                reader, writer = await asyncio.open_connection("127.0.0.1", port)
+                writer.write(b"GET /health HTTP/1.1\r\nHost: localhost\r\n\r\n")
+                response = await asyncio.wait_for(reader.read(), 2.0)
+                writer.close()
+                return response
+            finally:
+                await server.stop()
+
+        response = asyncio.run(scenario())
+
+        assert response.startswith(b"HTTP/1.0 200")
+        assert b'"status": "healthy"' in response
+
+    def test_profile_does_not_block_loop(self, valid_config):
+        valid_config.profile_max_seconds = 1
+        sniffer = PlcSniffer(valid_config)
+        sniffer.capture_thread_ids = [threading.get_ident()]
+
+        async def scenario():
+            server = AsyncHealthServer(port=0)
+            await server.start(sniffer)
+            port = server.server.sockets[0].getsockname()[1]
+            ticks = 0
+
+            async def tick():
+                nonlocal ticks
+                while True:
+                    ticks += 1
+                    await asyncio.sleep(0.005)
+
+            ticker = asyncio.create_task(tick())
+            try:
+                reader, writer = await asyncio.open_connection("127.0.0.1", port)
+                writer.write(b"GET /debug/profile?seconds=0.2 HTTP/1.1\r\n\r\n")
+                response = await asyncio.wait_for(reader.read(), 2.0)
+                writer.close()
+                return response, ticks
+            finally:
+                ticker.cancel()
+                await server.stop()
+
+        response, ticks = asyncio.run(scenario())
+
+        assert response.startswith(b"HTTP/1.0 200")
+        body = json.loads(response.split(b"\r\n\r\n", 1)[1])
+        assert body["samples"] >= 5
+        assert ticks >= 10
@@ -0,0 +1,72 @@
+"""Unit tests for balancer module."""
+
+from plc_sniffer.balancer import RendezvousHash, flow_key
+from plc_sniffer.packet import PacketMeta
+
+
+def _keys(count):
+    return [
+        (f"192.168.{i // 250}.{i % 250}", 1024 + i, "10.0.0.1", 502)
+        for i in range(count)
+    ]
+
+
+class TestRendezvousHash:
+    """Test RendezvousHash functionality."""
+
+    def test_flow_key(self):
+        meta = PacketMeta("192.168.1.1", "10.0.0.1", 1234, 502, 0.0)
+        assert flow_key(meta) == ("192.168.1.1", 1234, "10.0.0.1", 502)
+
+    def test_same_flow_same_node(self):
+        hrw = RendezvousHash(["a", "b", "c"], [1, 1, 1])
+        key = ("192.168.1.1", 1234, "10.0.0.1", 502)
+
+        first = hrw.choose(key)
+        other = RendezvousHash(["a", "b", "c"], [1, 1, 1])
+
+        assert all(hrw.choose(key) == first for _ in range(10))
+        assert other.choose(key) == first  # stable across instances
+
+    def test_spread_follows_weights(self):
+        hrw = RendezvousHash(["a", "b"], [1, 3])
+        counts = [0, 0]
+        for key in _keys(4000):
+            counts[hrw.choose(key)] += 1
+
+        share = counts[1] / sum(counts)
+        assert 0.70 <= share <= 0.80
+
+    def test_adding_node_moves_few_flows(self):
+        keys = _keys(3000)
+        before = RendezvousHash(["a", "b", "c"], [1, 1, 1])
+        after = RendezvousHash(["a", "b", "c", "d"], [1, 1, 1, 1])
+
+        moved = 0
+        for key in keys:
+            old = before.choose(key)
+            new = after.choose(key)
+            if old != new:
+                assert new == 3  # flows only move to the new node
+                moved += 1
+
+        assert 0.20 <= moved / len(keys) <= 0.30
+
+    def test_ejection_and_recovery(self):
+        hrw = RendezvousHash(["a", "b", "c"], [1, 1, 1])
+        keys = _keys(300)
+        owners = {key: hrw.choose(key) for key in keys}
+        victim = owners[keys[0]]
+        eligible = tuple(i != victim for i in range(3))
+
+        for key in keys:
+            choice = hrw.choose(key, eligible)
+            assert choice != victim
+            if owners[key] != victim:
+                assert choice == owners[key]  # unaffected flows stay put
+
+        assert all(hrw.choose(key, (True, True, True)) == owners[key] for key in keys)
+
+    def test_no_eligible_node(self):
+        hrw = RendezvousHash(["a", "b"], [1, 1])
+        assert hrw.choose(("x", 1, "y", 2), (False, False)) == -1
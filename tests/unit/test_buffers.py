@@ -0,0 +1,49 @@
+"""Unit tests for buffers module."""
+
+from plc_sniffer.buffers import BufferPool
+
+
+class TestBufferPool:
+    """Test BufferPool functionality."""
+
+    def test_acquire_and_reuse(self):
+        pool = BufferPool(2, 64)
+
+        lease = pool.acquire()
+        assert len(lease.slab) == 64
+        assert pool.in_use == 1
+        assert pool.available == 1
+
+        lease.release()
+        again = pool.acquire()
+
+        assert again is lease
+        assert pool.acquired == 2
+        assert pool.reused == 1
+
+    def test_retained_lease_not_reused(self):
+        pool = BufferPool(1, 64)
+        lease = pool.acquire()
+        lease.retain()
+
+        lease.release()
+        assert pool.in_use == 1
+        assert pool.available == 0
+
+        lease.release()
+        assert pool.in_use == 0
+        assert pool.available == 1
+
+    def test_exhausted_pool_allocates(self):
+        pool = BufferPool(1, 64)
+        first = pool.acquire()
+
+        extra = pool.acquire()
+
+        assert extra is not first
+        assert pool.exhausted == 1
+        extra.release()
+        first.release()
+        # temporary slabs are not added to the pool
+        assert pool.available == 1
+        assert pool.in_use == 0
@@ -0,0 +1,251 @@
+"""Unit tests for calibrate module."""
+
+import json
+import os
+from dataclasses import replace
+from unittest.mock import patch
+
+import pytest
+
+from plc_sniffer.calibrate import (
+    CalibrationResult,
+    SyntheticCapture,
+    best_result,
+    calibrated_config,
+    calibration_grid,
+    candidate_config,
+    fingerprint,
+    load_cache,
+    main,
+    run_calibration,
+    save_cache,
+    synthetic_frames,
+)
+from plc_sniffer.config import Destination
+
+
+@pytest.fixture
+def fanout_config(valid_config):
+    """Raw-engine configuration fanning out to two destinations."""
+    return replace(
+        valid_config,
+        capture_engine="raw",
+        destinations=[Destination("127.0.0.1", 9001), Destination("127.0.0.1", 9002)],
+        calibration_cache="",
+    )
+
+
+def result(loss_ratio=0.0, ns_per_packet=1000.0, **settings):
+    return CalibrationResult(
+        settings or {"pipeline_batch": 32}, ns_per_packet, loss_ratio
+    )
+
+
+class TestGrid:
+    """Test which settings are calibrated."""
+
+    def test_fanout(self, fanout_config):
+        assert list(calibration_grid(fanout_config)) == [
+            "pipeline_batch",
+            "destination_queue_size",
+        ]
+        # One destination sends inline, without a queue
+        assert list(calibration_grid(replace(fanout_config, destinations=[]))) == [
+            "pipeline_batch"
+        ]
+
+    def test_shm_and_scapy(self, valid_config):
+        assert calibration_grid(valid_config) == {}
+
+        shm = replace(valid_config, output_mode="shm")
+        assert list(calibration_grid(shm)) == ["shm_ring_slots"]
+
+    def test_candidate_turns_off_limits(self, fanout_config):
+        config = replace(
+            fanout_config, capture_engine="mirror", rate_limit=100, sample_fraction=0.5
+        )
+        sinks = [Destination("127.0.0.1", 1)]
+
+        candidate = candidate_config(
+            config, sinks, "/tmp/x.ring", {"pipeline_batch": 8}
+        )
+
+        assert (
+            candidate.capture_engine,
+            candidate.rate_limit,
+            candidate.sample_rate,
+        ) == ("raw", 0, 1.0)
+        assert (candidate.destinations, candidate.pipeline_batch) == (sinks, 8)
+
+
+class TestMeasurement:
+    """Test running candidates against loopback sinks."""
+
+    def test_synthetic_capture(self):
+        frames = synthetic_frames(flows=2)
+        capture = SyntheticCapture(frames)
+        capture.remaining = 3
+        buffer = bytearray(2048)
+
+        lengths = [capture.recv_into(buffer)[0] for _ in range(4)]
+
+        assert lengths == [len(frames[0])] * 3 + [0]
+        assert bytes(buffer[: len(frames[0])]) == frames[0]
+
+    def test_run_calibration(self, fanout_config):
+        grid = {"pipeline_batch": (8, 64), "destination_queue_size": (4096,)}
+
+        results = run_calibration(fanout_config, packets=200, rounds=1, grid=grid)
+
+        assert [r.settings for r in results] == [
+            {"pipeline_batch": 8, "destination_queue_size": 4096},
+            {"pipeline_batch": 64, "destination_queue_size": 4096},
+        ]
+        assert all(r.ns_per_packet > 0 and r.loss_ratio == 0 for r in results)
+
+    def test_run_calibration_shm(self, valid_config, tmp_path):
+        config = replace(
+            valid_config,
+            capture_engine="raw",
+            output_mode="shm",
+            shm_ring_path=str(tmp_path / "live.ring"),
+        )
+
+        results = run_calibration(
+            config, packets=100, rounds=1, grid={"shm_ring_slots": (1024,)}
+        )
+
+        assert results[0].loss_ratio == 0
+        assert os.listdir(tmp_path) == []
+
+    def test_best_result(self):
+        lossy = result(loss_ratio=0.2, ns_per_packet=100, pipeline_batch=8)
+        slow = result(ns_per_packet=900, pipeline_batch=32)
+        fast = result(ns_per_packet=500, pipeline_batch=128)
+
+        assert best_result([lossy, slow, fast]) is fast
+        assert best_result([lossy, result(loss_ratio=0.5)]) is lossy
+
+
+class TestCache:
+    """Test persisting and reusing the calibration."""
+
+    def test_round_trip(self, fanout_config, tmp_path):
+        path = str(tmp_path / "state" / "calibration.json")
+        best = result(pipeline_batch=128, destination_queue_size=1024)
+
+        save_cache(path, fanout_config, [best], best)
+
+        assert load_cache(path, fanout_config) == {
+            "pipeline_batch": 128,
+            "destination_queue_size": 1024,
+        }
+        with open(path) as f:
+            assert json.load(f)["fingerprint"] == fingerprint(fanout_config)
+        assert os.listdir(tmp_path / "state") == ["calibration.json"]
+
+    def test_mismatch_is_ignored(self, fanout_config, tmp_path):
+        path = str(tmp_path / "calibration.json")
+        best = result(pipeline_batch=128, destination_queue_size=1024)
+        save_cache(path, fanout_config, [best], best)
+
+        assert load_cache(path, replace(fanout_config, distribution="hash")) is None
+        assert load_cache(str(tmp_path / "missing.json"), fanout_config) is None
+
+        with open(path, "w") as f:
+            f.write("{not json")
+        assert load_cache(path, fanout_config) is None
+
+    def test_invalid_settings_are_ignored(self, fanout_config, tmp_path):
+        path = str(tmp_path / "calibration.json")
+        best = result(pipeline_batch=4096, destination_queue_size=1024)
+        save_cache(path, fanout_config, [best], best)
+
+        assert load_cache(path, fanout_config) is None
+
+    def test_calibrated_config_reuses_cache(self, fanout_config, tmp_path):
+        config = replace(
+            fanout_config, calibration_cache=str(tmp_path / "calibration.json")
+        )
+        best = result(pipeline_batch=128, destination_queue_size=1024)
+
+        with patch("plc_sniffer.calibrate.run_calibration", return_value=[best]) as run:
+            first, settings = calibrated_config(config)
+            second, _ = calibrated_config(config)
+
+        assert run.call_count == 1
+        assert settings == best.settings
+        assert (first.pipeline_batch, first.destination_queue_size) == (128, 1024)
+        assert second == first
+
+    @pytest.mark.parametrize(
+        "output, measured_as",
+        [
+            ({"output_mode": "udp"}, "udp"),
+            ({"output_mode": "shm"}, "shm"),
+            (
+                {
+                    "output_mode": "inject",
+                    "inject_interface": "eth1",
+                    "inject_dst_mac": "02:00:5e:10:00:01",
+                },
+                "udp",
+            ),
+        ],
+    )
+    def test_calibrated_config_per_output(
+        self, valid_config, tmp_path, output, measured_as
+    ):
+        config = replace(
+            valid_config,
+            capture_engine="raw",
+            shm_ring_path=str(tmp_path / "live.ring"),
+            calibration_cache=str(tmp_path / "calibration.json"),
+            **output,
+        )
+        grid = calibration_grid(config)
+
+        first, settings = calibrated_config(config, packets=50, rounds=1)
+        second, _ = calibrated_config(config, packets=50, rounds=1)
+
+        candidate = candidate_config(config, [], "/tmp/x.ring", settings)
+        assert candidate.output_mode == measured_as
+        assert set(settings) == set(grid)
+        assert load_cache(config.calibration_cache, config) == settings
+        assert first.output_mode == config.output_mode
+        assert second == first
+
+    def test_nothing_to_calibrate(self, valid_config):
+        assert calibrated_config(valid_config) == (valid_config, {})
+
+
+class TestMain:
+    """Test the calibrate command."""
+
+    def test_writes_cache(self, tmp_path, capsys):
+        path = tmp_path / "calibration.json"
+        env_vars = {
+            "CAPTURE_ENGINE": "raw",
+            "CALIBRATION_CACHE": str(path),
+        }
+
+        with patch.dict(os.environ, env_vars, clear=True):
+            main(["--packets", "50", "--rounds", "1"])
+
+        output = capsys.readouterr()
+        assert "ns/packet" in output.out
+        assert f"Saved to {path}" in output.err
+        assert set(json.loads(path.read_text())["settings"]) == {"pipeline_batch"}
+
+    def test_json_without_saving(self, tmp_path, capsys):
+        env_vars = {
+            "CAPTURE_ENGINE": "raw",
+            "CALIBRATION_CACHE": str(tmp_path / "calibration.json"),
+        }
+
+        with patch.dict(os.environ, env_vars, clear=True):
+            main(["--packets", "50", "--rounds", "1", "--json", "--no-save"])
+
+        report = json.loads(capsys.readouterr().out)
+        assert len(report["results"]) == 4
+        assert os.listdir(tmp_path) == []
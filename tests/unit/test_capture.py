@@ -0,0 +1,134 @@
+"""Unit tests for capture module."""
+
+import socket
+import struct
+from unittest.mock import Mock, patch
+
+from plc_sniffer.capture import (
+    PACKET_FANOUT,
+    PACKET_STATISTICS,
+    SOL_PACKET,
+    CaptureStats,
+    join_fanout_group,
+    open_capture_socket,
+    read_packet_statistics,
+    set_capture_filter,
+)
+
+
+def packet_socket(*readings):
+    """Mock AF_PACKET socket returning successive PACKET_STATISTICS structs."""
+    sock = Mock(spec=socket.socket)
+    sock.getsockopt.side_effect = [struct.pack(f"{len(r)}I", *r) for r in readings]
+    return sock
+
+
+class TestCaptureSocket:
+    """Test capture socket helpers."""
+
+    def test_open_capture_socket(self):
+        with patch("plc_sniffer.capture.conf") as mock_conf:
+            capture_socket = open_capture_socket("eth0", "udp port 502")
+
+        mock_conf.L2listen.assert_called_once_with(iface="eth0", filter="udp port 502")
+        assert capture_socket is mock_conf.L2listen.return_value
+
+    def test_set_capture_filter_uses_live_socket(self):
+        capture_socket = Mock()
+
+        with patch("plc_sniffer.capture.attach_filter") as mock_attach:
+            set_capture_filter(capture_socket, "udp port 44818", "eth0")
+
+        mock_attach.assert_called_once_with(
+            capture_socket.ins, "udp port 44818", "eth0"
+        )
+        capture_socket.close.assert_not_called()
+
+
+class TestFanout:
+    """Test PACKET_FANOUT group membership."""
+
+    def test_join_fanout_group(self):
+        capture_socket = Mock()
+
+        join_fanout_group(capture_socket, 0x12345)
+
+        capture_socket.ins.setsockopt.assert_called_once_with(
+            SOL_PACKET, PACKET_FANOUT, 0x80002345
+        )
+
+
+class TestCaptureStats:
+    """Test kernel capture statistics."""
+
+    def test_read_packet_statistics(self):
+        sock = packet_socket((100, 5, 2), (40, 0))
+
+        assert read_packet_statistics(sock) == (100, 5, 2)
+        # TPACKET_V1/V2 sockets return the struct without tp_freeze_q_cnt
+        assert read_packet_statistics(sock) == (40, 0, 0)
+        sock.getsockopt.assert_called_with(SOL_PACKET, PACKET_STATISTICS, 12)
+
+    def test_poll_accumulates_deltas(self):
+        stats = CaptureStats()
+        capture_socket = Mock(ins=packet_socket((100, 10, 1), (300, 0, 0), (0, 0, 0)))
+
+        stats.poll(capture_socket)
+        assert stats.available is True
+        assert stats.recent_loss_ratio == 0.1
+
+        stats.poll(capture_socket)
+        stats.poll(capture_socket)  # idle interval keeps the last ratio
+
+        assert (stats.received, stats.dropped, stats.freeze_queue) == (400, 10, 1)
+        assert stats.loss_ratio == 0.025
+        assert stats.recent_loss_ratio == 0.0
+
+    def test_poll_sums_sockets(self):
+        stats = CaptureStats()
+        lanes = [
+            Mock(ins=packet_socket((100, 10, 0))),
+            Mock(ins=packet_socket((300, 30, 2))),
+        ]
+
+        stats.poll(*lanes)
+
+        assert (stats.received, stats.dropped, stats.freeze_queue) == (400, 40, 2)
+        assert stats.recent_loss_ratio == 0.1
+
+    def test_poll_pcap_counters(self):
+        stats = CaptureStats()
+        capture_socket = Mock(spec=["pcap_fd"])
+
+        with patch(
+            "plc_sniffer.capture.read_pcap_statistics", side_effect=[(50, 5), (150, 5)]
+        ):
+            stats.poll(capture_socket)
+            stats.poll(capture_socket)
+
+        # libpcap counters are cumulative and are not added twice
+        assert (stats.received, stats.dropped) == (150, 5)
+        assert stats.recent_loss_ratio == 0.0
+
+    def test_poll_pcap_counters_per_socket(self):
+        stats = CaptureStats()
+        lanes = [Mock(spec=["pcap_fd"]), Mock(spec=["pcap_fd"])]
+        readings = [(50, 5), (100, 0), (80, 5), (100, 10)]
+
+        with patch("plc_sniffer.capture.read_pcap_statistics", side_effect=readings):
+            stats.poll(*lanes)
+            stats.poll(*lanes)
+
+        assert (stats.received, stats.dropped) == (180, 15)
+        assert stats.recent_loss_ratio == 10 / 30
+
+    def test_poll_unsupported(self):
+        stats = CaptureStats()
+        failing = Mock(ins=Mock(spec=socket.socket))
+        failing.ins.getsockopt.side_effect = OSError("closed")
+
+        stats.poll(Mock(spec=[]))
+        stats.poll(failing)
+
+        assert stats.available is False
+        assert stats.loss_ratio == 0.0
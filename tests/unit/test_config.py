@@ -1,16 +1,24 @@
 """Unit tests for configuration module."""
 
 import os
-import pytest
+from dataclasses import replace
 from unittest.mock import patch
 
-from plc_sniffer.config import SnifferConfig, ConfigManager
+import pytest
+
+from plc_sniffer.config import (
+    ConfigManager,
+    Destination,
+    Route,
+    SnifferConfig,
+    TrafficClass,
+)
 from plc_sniffer.validators import ValidationError
 
 
 class TestSnifferConfig:
     """Test SnifferConfig dataclass."""
-    
+
     def test_valid_config_creation(self):
         config = SnifferConfig(
             interface="eth0",
@@ -19,9 +27,9 @@ class TestSnifferConfig:
             destination_port=8514,
             log_level="INFO",
             max_packet_size=65535,
-            rate_limit=1000
+            rate_limit=1000,
         )
-        
+
         assert config.interface == "eth0"
         assert config.filter == "udp"
         assert config.destination_ip == "127.0.0.1"
@@ -30,7 +38,7 @@ class TestSnifferConfig:
         assert config.max_packet_size == 65535
         assert config.rate_limit == 1000
         assert config.socket_timeout == 5.0
-    
+
     def test_invalid_config_validation(self):
         with pytest.raises(ValidationError):
             SnifferConfig(
@@ -38,18 +46,18 @@ class TestSnifferConfig:
                 filter="udp",
                 destination_ip="127.0.0.1",
                 destination_port=8514,
-                log_level="INFO"
+                log_level="INFO",
             )
-        
+
         with pytest.raises(ValidationError):
             SnifferConfig(
                 interface="eth0",
                 filter="udp",
                 destination_ip="invalid-ip",
                 destination_port=8514,
-                log_level="INFO"
+                log_level="INFO",
             )
-    
+
     def test_invalid_socket_timeout(self):
         with pytest.raises(ValidationError):
             SnifferConfig(
@@ -58,17 +66,566 @@ class TestSnifferConfig:
                 destination_ip="127.0.0.1",
                 destination_port=8514,
                 log_level="INFO",
-                socket_timeout=-1.0
+                socket_timeout=-1.0,
+            )
+
+    def test_invalid_reassembly_settings(self):
+        base = dict(
+            interface="eth0",
+            filter="udp",
+            destination_ip="127.0.0.1",
+            destination_port=8514,
+            log_level="INFO",
+        )
+
+        with pytest.raises(ValidationError, match="Reassembly datagram limit"):
+            SnifferConfig(**base, reassembly_max_datagrams=-1)
+        with pytest.raises(ValidationError, match="Reassembly timeout"):
+            SnifferConfig(**base, reassembly_timeout=0)
+
+    def test_invalid_forwarding_settings(self):
+        base = dict(
+            interface="eth0",
+            filter="udp",
+            destination_ip="127.0.0.1",
+            destination_port=8514,
+            log_level="INFO",
+        )
+
+        with pytest.raises(ValidationError):
+            SnifferConfig(**base, retry_queue_size=-1)
+        with pytest.raises(ValidationError):
+            SnifferConfig(**base, circuit_breaker_threshold=-1)
+        with pytest.raises(ValidationError):
+            SnifferConfig(**base, circuit_breaker_cooldown=0)
+        with pytest.raises(ValidationError):
+            SnifferConfig(**base, send_buffer_size=-1)
+
+    def test_default_destination(self):
+        config = SnifferConfig(
+            interface="eth0",
+            filter="udp",
+            destination_ip="10.0.0.1",
+            destination_port=514,
+            log_level="INFO",
+        )
+
+        assert config.destinations == []
+        assert config.forward_destinations == [Destination("10.0.0.1", 514)]
+
+    def test_destination_list(self):
+        config = SnifferConfig(
+            interface="eth0",
+            filter="udp",
+            destination_ip="127.0.0.1",
+            destination_port=8514,
+            log_level="INFO",
+            destinations=["10.0.0.1:514", ("10.0.0.2", 515), "[::1]:8514@2.5"],
+        )
+
+        assert config.destinations == [
+            Destination("10.0.0.1", 514),
+            Destination("10.0.0.2", 515),
+            Destination("::1", 8514, 2.5),
+        ]
+
+        with pytest.raises(ValidationError):
+            SnifferConfig(
+                interface="eth0",
+                filter="udp",
+                destination_ip="127.0.0.1",
+                destination_port=8514,
+                log_level="INFO",
+                destinations=["10.0.0.1:514", "10.0.0.1:514@2"],
+            )
+
+        with pytest.raises(ValidationError):
+            SnifferConfig(
+                interface="eth0",
+                filter="udp",
+                destination_ip="127.0.0.1",
+                destination_port=8514,
+                log_level="INFO",
+                destinations=["10.0.0.1:514@0"],
+            )
+
+        with pytest.raises(ValidationError):
+            SnifferConfig(
+                interface="eth0",
+                filter="udp",
+                destination_ip="127.0.0.1",
+                destination_port=8514,
+                log_level="INFO",
+                distribution="random",
+            )
+
+
+class TestRoutes:
+    """Test route configuration."""
+
+    def test_parse_routes(self, valid_config):
+        config = replace(
+            valid_config,
+            routes=[
+                {"name": "modbus", "port": 502, "destinations": ["10.0.0.1:514"]},
+                {
+                    "ports": "2222-2230",
+                    "destinations": "10.0.0.2:514,10.0.0.3:514",
+                    "distribution": "hash",
+                },
+                {"src_net": "192.168.100.7/24", "destinations": ["10.0.0.4:514"]},
+            ],
+        )
+
+        modbus, enip, cell = config.routes
+        assert modbus == Route("modbus", [Destination("10.0.0.1", 514)], port=502)
+        assert enip.name == "route1"
+        assert enip.port_range == (2222, 2230)
+        assert enip.distribution == "hash"
+        assert len(enip.destinations) == 2
+        assert cell.src_net == "192.168.100.0/24"
+
+    def test_capture_filter(self, valid_config):
+        config = replace(
+            valid_config,
+            routes=[
+                {"port": 502, "destinations": ["10.0.0.1:514"]},
+                {"ports": "2222-2230", "destinations": ["10.0.0.1:514"]},
+                {"src_net": "192.168.100.0/24", "destinations": ["10.0.0.1:514"]},
+            ],
+            reassembly_max_datagrams=0,
+        )
+
+        assert config.capture_filter == (
+            "(udp) and (dst port 502 or dst portrange 2222-2230 "
+            "or src net 192.168.100.0/24)"
+        )
+        assert (
+            replace(valid_config, routes=[], reassembly_max_datagrams=0).capture_filter
+            == "udp"
+        )
+
+    def test_capture_filter_with_reassembly(self, valid_config):
+        config = replace(
+            valid_config, routes=[{"port": 502, "destinations": ["10.0.0.1:514"]}]
+        )
+
+        # Non-first fragments have no UDP header for the port filter to match
+        assert config.capture_filter == (
+            "((udp) and (dst port 502)) or (ip proto 17 and ip[6:2] & 0x1fff != 0)"
+        )
+
+    def test_invalid_routes(self, valid_config):
+        dest = ["10.0.0.1:514"]
+        with pytest.raises(ValidationError):
+            replace(valid_config, routes=[{"destinations": dest}])  # No match
+        with pytest.raises(ValidationError):
+            replace(
+                valid_config,
+                routes=[{"port": 502, "src_net": "10.0.0.0/8", "destinations": dest}],
+            )
+        with pytest.raises(ValidationError):
+            replace(valid_config, routes=[{"port": 502, "destinations": []}])
+        with pytest.raises(ValidationError):
+            replace(valid_config, routes=[{"ports": "600-500", "destinations": dest}])
+
+    def test_conflicting_routes(self, valid_config):
+        dest = ["10.0.0.1:514"]
+        with pytest.raises(ValidationError):
+            replace(
+                valid_config,
+                routes=[
+                    {"port": 502, "destinations": dest},
+                    {"port": 502, "destinations": dest},
+                ],
+            )
+        with pytest.raises(ValidationError):
+            replace(
+                valid_config,
+                routes=[
+                    {"ports": "100-200", "destinations": dest},
+                    {"ports": "200-300", "destinations": dest},
+                ],
+            )
+        with pytest.raises(ValidationError):
+            replace(
+                valid_config,
+                routes=[
+                    {"name": "a", "port": 1, "destinations": dest},
+                    {"name": "a", "port": 2, "destinations": dest},
+                ],
+            )
+
+    def test_routes_from_environment(self):
+        env_vars = {"ROUTES": '[{"port": 502, "destinations": ["10.0.0.1:514"]}]'}
+        with patch.dict(os.environ, env_vars, clear=True):
+            config = ConfigManager.from_environment()
+            assert config.routes[0].port == 502
+
+        with patch.dict(os.environ, {"ROUTES": '{"port": 502}'}, clear=True):
+            with pytest.raises(ValidationError):
+                ConfigManager.from_environment()
+
+        with patch.dict(os.environ, {"ROUTES": "[{"}, clear=True):
+            with pytest.raises(ValidationError):
+                ConfigManager.from_environment()
+
+
+class TestTrafficClasses:
+    """Test traffic class configuration."""
+
+    def test_parse_classes(self, valid_config):
+        config = replace(
+            valid_config,
+            traffic_classes=[
+                {"name": "safety", "port": 502, "deadline_ms": 5, "weight": 4},
+                {"ports": "2000-2999", "queue_size": 64},
+                {"name": "panels", "src_net": "10.9.0.0/16", "priority": 7},
+            ],
+            class_scheduling="Weighted",
+        )
+
+        safety, bulk, panels = config.traffic_classes
+        assert safety == TrafficClass(
+            "safety", port=502, priority=0, weight=4, deadline=0.005
+        )
+        assert bulk.name == "class1"
+        assert bulk.priority == 1
+        assert bulk.port_range == (2000, 2999)
+        assert bulk.queue_size == 64
+        assert panels.priority == 7
+        assert config.class_scheduling == "weighted"
+
+    def test_invalid_classes(self, valid_config):
+        with pytest.raises(ValidationError):
+            replace(valid_config, traffic_classes=[{"name": "x"}])  # No match
+        with pytest.raises(ValidationError):
+            replace(valid_config, traffic_classes=[{"name": "default", "port": 502}])
+        with pytest.raises(ValidationError):
+            replace(valid_config, traffic_classes=[{"port": 502, "weight": 0}])
+        with pytest.raises(ValidationError):
+            replace(valid_config, traffic_classes=[{"port": 502, "deadline_ms": -1}])
+        with pytest.raises(ValidationError):
+            replace(valid_config, traffic_classes=[{"port": 502, "queue_size": "many"}])
+        with pytest.raises(ValidationError):
+            replace(
+                valid_config, traffic_classes=[{"port": 502}], class_scheduling="fifo"
+            )
+
+    def test_conflicting_classes(self, valid_config):
+        with pytest.raises(ValidationError, match="more than one traffic class"):
+            replace(valid_config, traffic_classes=[{"port": 502}, {"port": 502}])
+        with pytest.raises(ValidationError, match="overlap"):
+            replace(
+                valid_config,
+                traffic_classes=[{"ports": "100-200"}, {"ports": "150-160"}],
+            )
+
+    def test_classes_from_environment(self):
+        env_vars = {
+            "TRAFFIC_CLASSES": '[{"name": "safety", "port": 502}]',
+            "CLASS_SCHEDULING": "weighted",
+        }
+        with patch.dict(os.environ, env_vars, clear=True):
+            config = ConfigManager.from_environment()
+            assert config.traffic_classes[0].name == "safety"
+            assert config.class_scheduling == "weighted"
+
+        with patch.dict(os.environ, {"TRAFFIC_CLASSES": '{"port": 502}'}, clear=True):
+            with pytest.raises(ValidationError):
+                ConfigManager.from_environment()
+
+
+class TestAdaptiveRate:
+    """Test adaptive rate configuration."""
+
+    def test_aimd(self, valid_config):
+        config = replace(
+            valid_config, rate_control="AIMD", rate_limit=5000, adaptive_ack_port=9999
+        )
+
+        assert config.rate_control == "aimd"
+        assert config.adaptive_rate_min == 100
+        assert config.adaptive_ack_port == 9999
+
+    def test_invalid_aimd(self, valid_config):
+        with pytest.raises(ValidationError, match="RATE_LIMIT"):
+            replace(valid_config, rate_control="aimd", rate_limit=0)
+        with pytest.raises(ValidationError):
+            replace(
+                valid_config, rate_control="aimd", rate_limit=50
+            )  # below the minimum
+        with pytest.raises(ValidationError):
+            replace(
+                valid_config,
+                rate_control="aimd",
+                rate_limit=1000,
+                adaptive_rate_backoff=1.0,
+            )
+        with pytest.raises(ValidationError):
+            replace(
+                valid_config, rate_control="aimd", rate_limit=1000, adaptive_rate_step=0
+            )
+        with pytest.raises(ValidationError):
+            replace(
+                valid_config,
+                rate_control="aimd",
+                rate_limit=1000,
+                adaptive_rate_interval=0,
+            )
+        with pytest.raises(ValidationError):
+            replace(
+                valid_config, rate_control="aimd", rate_limit=1000, output_mode="shm"
+            )
+        with pytest.raises(ValidationError):
+            replace(
+                valid_config,
+                rate_control="aimd",
+                rate_limit=1000,
+                adaptive_ack_port=70000,
+            )
+        with pytest.raises(ValidationError):
+            replace(valid_config, rate_control="pid")
+
+    def test_aimd_from_environment(self):
+        env_vars = {
+            "RATE_LIMIT": "2000",
+            "RATE_CONTROL": "aimd",
+            "ADAPTIVE_RATE_MIN": "200",
+            "ADAPTIVE_RATE_STEP": "25",
+            "ADAPTIVE_RATE_BACKOFF": "0.7",
+            "ADAPTIVE_RATE_INTERVAL": "0.5",
+            "ADAPTIVE_ACK_PORT": "8515",
+        }
+        with patch.dict(os.environ, env_vars, clear=True):
+            config = ConfigManager.from_environment()
+
+        assert config.rate_control == "aimd"
+        assert (config.adaptive_rate_min, config.adaptive_rate_step) == (200, 25)
+        assert (config.adaptive_rate_backoff, config.adaptive_rate_interval) == (
+            0.7,
+            0.5,
+        )
+        assert config.adaptive_ack_port == 8515
+
+
+class TestPipeline:
+    """Test processing pipeline configuration."""
+
+    def test_defaults(self, valid_config):
+        config = valid_config
+
+        assert config.pipeline_stages == [
+            "cycles",
+            "sample",
+            "rate_limit",
+            "size",
+            "forward",
+        ]
+        assert config.pipeline_batch == 32
+
+    def test_invalid_pipeline(self, valid_config):
+        with pytest.raises(ValidationError, match="forward"):
+            replace(valid_config, pipeline_stages=["rate_limit", "size"])
+        with pytest.raises(ValidationError, match="repeat"):
+            replace(valid_config, pipeline_stages=["size", "size", "forward"])
+        with pytest.raises(
+            ValidationError, match="'cycles' must run before 'rate_limit'"
+        ):
+            replace(valid_config, pipeline_stages=["rate_limit", "cycles", "forward"])
+        with pytest.raises(ValidationError):
+            replace(valid_config, pipeline_batch=0)
+        with pytest.raises(ValidationError):
+            replace(valid_config, pipeline_batch=2048)
+
+    def test_pipeline_from_environment(self):
+        env_vars = {
+            "PIPELINE_STAGES": " size, anonymize ,forward",
+            "PIPELINE_BATCH": "64",
+        }
+        with patch.dict(os.environ, env_vars, clear=True):
+            config = ConfigManager.from_environment()
+
+        assert config.pipeline_stages == ["size", "anonymize", "forward"]
+        assert config.pipeline_batch == 64
+
+
+class TestSpill:
+    """Test disk spill queue configuration."""
+
+    def test_invalid_spill(self, valid_config):
+        replace(valid_config, spill_segment_size=0)  # ignored while spilling is off
+        with pytest.raises(ValidationError, match="UDP"):
+            replace(valid_config, spill_dir="/var/spool/plc", output_mode="shm")
+        with pytest.raises(ValidationError):
+            replace(valid_config, spill_dir="/var/spool/plc", spill_segment_size=4096)
+        with pytest.raises(ValidationError, match="two segments"):
+            replace(valid_config, spill_dir="/var/spool/plc", spill_max_bytes=16777216)
+        with pytest.raises(ValidationError):
+            replace(valid_config, spill_dir="/var/spool/plc", spill_replay_rate=0)
+
+    def test_spill_from_environment(self):
+        env_vars = {
+            "SPILL_DIR": "/var/spool/plc",
+            "SPILL_SEGMENT_SIZE": "1048576",
+            "SPILL_MAX_BYTES": "8388608",
+            "SPILL_REPLAY_RATE": "250",
+        }
+        with patch.dict(os.environ, env_vars, clear=True):
+            config = ConfigManager.from_environment()
+
+        assert config.spill_dir == "/var/spool/plc"
+        assert (config.spill_segment_size, config.spill_max_bytes) == (1048576, 8388608)
+        assert config.spill_replay_rate == 250
+
+
+class TestSampling:
+    """Test flow sampling configuration."""
+
+    def test_sample_rate(self, valid_config):
+        assert valid_config.sample_rate == 1.0
+        assert (
+            replace(valid_config, sample_fraction=0.5, sample_every=4).sample_rate
+            == 0.125
+        )
+
+    def test_invalid_sampling(self, valid_config):
+        with pytest.raises(ValidationError):
+            replace(valid_config, sample_fraction=0.0)
+        with pytest.raises(ValidationError):
+            replace(valid_config, sample_fraction=1.5)
+        with pytest.raises(ValidationError):
+            replace(valid_config, sample_every=0)
+        with pytest.raises(ValidationError, match="'sample' pipeline stage"):
+            replace(valid_config, sample_every=10, pipeline_stages=["size", "forward"])
+
+    def test_sampling_from_environment(self):
+        env_vars = {"SAMPLE_FRACTION": "0.25", "SAMPLE_EVERY": "10"}
+        with patch.dict(os.environ, env_vars, clear=True):
+            config = ConfigManager.from_environment()
+
+        assert (config.sample_fraction, config.sample_every) == (0.25, 10)
+
+
+class TestInject:
+    """Test re-injection output configuration."""
+
+    @pytest.fixture
+    def inject_config(self, valid_config):
+        """Build a re-injection variant of ``valid_config``."""
+
+        def build(**changes):
+            return replace(valid_config, output_mode="inject", **changes)
+
+        return build
+
+    def test_valid_inject(self, inject_config):
+        config = inject_config(
+            inject_interface="eth1", inject_dst_mac="02:00:5E:10:00:01"
+        )
+
+        assert config.inject_dst_mac == "02:00:5e:10:00:01"
+        assert (config.inject_ring_frames, config.inject_frame_size) == (4096, 2048)
+
+    def test_replace_inject(self, inject_config):
+        config = inject_config(
+            inject_interface="eth1", inject_dst_mac="02:00:5e:10:00:01"
+        )
+
+        batched = replace(config, pipeline_batch=64)
+        moved = replace(config, destination_ip="10.0.0.9")
+
+        assert (batched.pipeline_batch, batched.destinations) == (64, [])
+        assert moved.forward_destinations == [Destination("10.0.0.9", 8514)]
+
+    def test_invalid_inject(self, inject_config):
+        mac = "02:00:5e:10:00:01"
+        with pytest.raises(ValidationError, match="INJECT_INTERFACE"):
+            inject_config(inject_dst_mac=mac)
+        with pytest.raises(ValidationError):
+            inject_config(inject_interface="eth1", inject_dst_mac="nowhere")
+        with pytest.raises(ValidationError, match="DESTINATION_IP only"):
+            inject_config(
+                inject_interface="eth1",
+                inject_dst_mac=mac,
+                destinations=["10.0.0.1:514"],
+            )
+        with pytest.raises(ValidationError):
+            inject_config(
+                inject_interface="eth1", inject_dst_mac=mac, inject_ring_frames=1000
+            )
+        with pytest.raises(ValidationError):
+            inject_config(
+                inject_interface="eth1", inject_dst_mac=mac, inject_frame_size=1024
+            )
+        with pytest.raises(ValidationError, match="UDP"):
+            inject_config(
+                inject_interface="eth1", inject_dst_mac=mac, spill_dir="/var/spool/plc"
             )
 
+    def test_inject_from_environment(self):
+        env_vars = {
+            "OUTPUT_MODE": "inject",
+            "INJECT_INTERFACE": "eth1",
+            "INJECT_DST_MAC": "02:00:5e:10:00:01",
+            "INJECT_RING_FRAMES": "1024",
+            "INJECT_FRAME_SIZE": "4096",
+        }
+        with patch.dict(os.environ, env_vars, clear=True):
+            config = ConfigManager.from_environment()
+
+        assert (config.output_mode, config.inject_interface) == ("inject", "eth1")
+        assert (config.inject_ring_frames, config.inject_frame_size) == (1024, 4096)
+
+
+class TestMirror:
+    """Test mirror capture configuration."""
+
+    def test_valid_mirror(self, valid_config):
+        config = replace(
+            valid_config,
+            capture_engine="mirror",
+            mirror_encap="GRE",
+            mirror_bind="10.0.0.5",
+        )
+
+        assert (config.mirror_encap, config.mirror_bind, config.mirror_port) == (
+            "gre",
+            "10.0.0.5",
+            4789,
+        )
+
+    def test_invalid_mirror(self, valid_config):
+        with pytest.raises(ValidationError):
+            replace(valid_config, capture_engine="mirror", mirror_encap="geneve")
+        with pytest.raises(ValidationError, match="IPv4"):
+            replace(valid_config, capture_engine="mirror", mirror_bind="::")
+        with pytest.raises(ValidationError):
+            replace(valid_config, capture_engine="mirror", mirror_port=0)
+        with pytest.raises(ValidationError, match="single capture thread"):
+            replace(valid_config, capture_engine="mirror", capture_threads=2)
+
+    def test_mirror_from_environment(self):
+        env_vars = {
+            "CAPTURE_ENGINE": "mirror",
+            "MIRROR_ENCAP": "vxlan",
+            "MIRROR_BIND": "10.0.0.5",
+            "MIRROR_PORT": "4790",
+        }
+        with patch.dict(os.environ, env_vars, clear=True):
+            config = ConfigManager.from_environment()
+
+        assert config.capture_engine == "mirror"
+        assert (config.mirror_bind, config.mirror_port) == ("10.0.0.5", 4790)
+
 
 class TestConfigManager:
     """Test ConfigManager functionality."""
-    
+
     def test_from_environment_defaults(self):
         with patch.dict(os.environ, {}, clear=True):
             config = ConfigManager.from_environment()
-            
+
             assert config.interface == "eth0"
             assert config.filter == "udp"
             assert config.destination_ip == "127.0.0.1"
@@ -76,22 +633,22 @@ class TestConfigManager:
             assert config.log_level == "INFO"
             assert config.max_packet_size == 65535
             assert config.rate_limit == 0
-    
+
     def test_from_environment_custom(self):
         env_vars = {
-            'INTERFACE': 'wlan0',
-            'FILTER': 'tcp port 80',
-            'DESTINATION_IP': '192.168.1.100',
-            'DESTINATION_PORT': '9999',
-            'LOG_LEVEL': 'DEBUG',
-            'MAX_PACKET_SIZE': '1500',
-            'RATE_LIMIT': '5000',
-            'SOCKET_TIMEOUT': '10.0'
+            "INTERFACE": "wlan0",
+            "FILTER": "tcp port 80",
+            "DESTINATION_IP": "192.168.1.100",
+            "DESTINATION_PORT": "9999",
+            "LOG_LEVEL": "DEBUG",
+            "MAX_PACKET_SIZE": "1500",
+            "RATE_LIMIT": "5000",
+            "SOCKET_TIMEOUT": "10.0",
         }
-        
+
         with patch.dict(os.environ, env_vars, clear=True):
             config = ConfigManager.from_environment()
-            
+
             assert config.interface == "wlan0"
             assert config.filter == "tcp port 80"
             assert config.destination_ip == "192.168.1.100"
@@ -100,29 +657,208 @@ class TestConfigManager:
             assert config.max_packet_size == 1500
             assert config.rate_limit == 5000
             assert config.socket_timeout == 10.0
-    
+
     def test_from_environment_invalid(self):
-        with patch.dict(os.environ, {'DESTINATION_PORT': 'not-a-number'}, clear=True):
+        with patch.dict(os.environ, {"DESTINATION_PORT": "not-a-number"}, clear=True):
             with pytest.raises(ValidationError):
                 ConfigManager.from_environment()
-    
+
     def test_from_dict(self):
         config_dict = {
-            'interface': 'eth1',
-            'filter': 'udp port 514',
-            'destination_ip': '10.0.0.1',
-            'destination_port': 514,
-            'log_level': 'ERROR',
-            'max_packet_size': 9000,
-            'rate_limit': 2000
+            "interface": "eth1",
+            "filter": "udp port 514",
+            "destination_ip": "10.0.0.1",
+            "destination_port": 514,
+            "log_level": "ERROR",
+            "max_packet_size": 9000,
+            "rate_limit": 2000,
         }
-        
+
         config = ConfigManager.from_dict(config_dict)
-        
+
         assert config.interface == "eth1"
         assert config.filter == "udp port 514"
         assert config.destination_ip == "10.0.0.1"
         assert config.destination_port == 514
         assert config.log_level == "ERROR"
         assert config.max_packet_size == 9000
-        assert config.rate_limit == 2000
\ No newline at end of file
+        assert config.rate_limit == 2000
+
+    def test_from_environment_destinations(self):
+        env_vars = {"DESTINATIONS": "10.0.0.1:514, 10.0.0.2:9000"}
+
+        with patch.dict(os.environ, env_vars, clear=True):
+            config = ConfigManager.from_environment()
+
+            assert config.destinations == [
+                Destination("10.0.0.1", 514),
+                Destination("10.0.0.2", 9000),
+            ]
+
+    def test_from_environment_invalid_destination(self):
+        with patch.dict(os.environ, {"DESTINATIONS": "10.0.0.1"}, clear=True):
+            with pytest.raises(ValidationError):
+                ConfigManager.from_environment()
+
+    def test_from_environment_config_file(self, tmp_path):
+        config_file = tmp_path / "sniffer.env"
+        config_file.write_text(
+            "# Reloadable settings\n"
+            "RATE_LIMIT=250  # pps\n"
+            "FILTER='udp port 502'\n"
+            "\n"
+            'DESTINATIONS="10.0.0.1:514"\n'
+        )
+        env_vars = {
+            "CONFIG_FILE": str(config_file),
+            "RATE_LIMIT": "10",
+            "INTERFACE": "eth1",
+        }
+
+        with patch.dict(os.environ, env_vars, clear=True):
+            config = ConfigManager.from_environment()
+
+            assert config.rate_limit == 250
+            assert config.filter == "udp port 502"
+            assert config.interface == "eth1"
+            assert config.forward_destinations == [Destination("10.0.0.1", 514)]
+
+    def test_from_environment_invalid_config_file(self, tmp_path):
+        with patch.dict(
+            os.environ, {"CONFIG_FILE": str(tmp_path / "missing.env")}, clear=True
+        ):
+            with pytest.raises(ValidationError, match="Cannot read config file"):
+                ConfigManager.from_environment()
+
+        config_file = tmp_path / "sniffer.env"
+        config_file.write_text("RATE_LIMIT\n")
+        with patch.dict(os.environ, {"CONFIG_FILE": str(config_file)}, clear=True):
+            with pytest.raises(ValidationError, match="expected KEY=VALUE"):
+                ConfigManager.from_environment()
+
+    def test_from_environment_runtime_profile(self):
+        env_vars = {
+            "CAPTURE_CPUS": "2",
+            "FORWARDER_CPUS": "3-4",
+            "REALTIME_PRIORITY": "40",
+            "GC_MODE": "idle",
+            "RUNTIME": "asyncio",
+        }
+
+        with patch.dict(os.environ, env_vars, clear=True):
+            config = ConfigManager.from_environment()
+
+            assert config.capture_cpus == [2]
+            assert config.forwarder_cpus == [3, 4]
+            assert config.realtime_priority == 40
+            assert config.gc_mode == "idle"
+            assert config.runtime == "asyncio"
+
+        with patch.dict(os.environ, {"GC_MODE": "never"}, clear=True):
+            with pytest.raises(ValidationError):
+                ConfigManager.from_environment()
+
+    def test_from_environment_raw_engine(self):
+        env_vars = {
+            "CAPTURE_ENGINE": "raw",
+            "BUFFER_POOL_SLABS": "64",
+            "BUFFER_SLAB_SIZE": "9216",
+        }
+
+        with patch.dict(os.environ, env_vars, clear=True):
+            config = ConfigManager.from_environment()
+
+            assert config.capture_engine == "raw"
+            assert config.buffer_pool_slabs == 64
+            assert config.buffer_slab_size == 9216
+
+        with patch.dict(os.environ, {"BUFFER_SLAB_SIZE": "32"}, clear=True):
+            with pytest.raises(ValidationError, match="slab size"):
+                ConfigManager.from_environment()
+
+    def test_from_environment_statsd(self):
+        env_vars = {
+            "STATSD_HOST": "10.0.0.5",
+            "STATSD_PORT": "9125",
+            "STATSD_INTERVAL": "30",
+            "STATSD_FORMAT": "statsd",
+            "STATSD_PREFIX": "site1",
+            "STATSD_MAX_DATAGRAM": "512",
+        }
+
+        with patch.dict(os.environ, env_vars, clear=True):
+            config = ConfigManager.from_environment()
+
+            assert config.statsd_host == "10.0.0.5"
+            assert config.statsd_port == 9125
+            assert config.statsd_interval == 30.0
+            assert config.statsd_format == "statsd"
+            assert config.statsd_prefix == "site1"
+            assert config.statsd_max_datagram == 512
+
+        for env_vars, message in [
+            ({"STATSD_HOST": "collector"}, "Invalid IP address"),
+            ({"STATSD_INTERVAL": "0"}, "interval must be positive"),
+            ({"STATSD_MAX_DATAGRAM": "70000"}, "datagram size"),
+        ]:
+            with patch.dict(os.environ, env_vars, clear=True):
+                with pytest.raises(ValidationError, match=message):
+                    ConfigManager.from_environment()
+
+    def test_from_environment_stage_timing(self):
+        with patch.dict(
+            os.environ,
+            {"STAGE_TIMING_SAMPLE": "100", "PROFILE_MAX_SECONDS": "30"},
+            clear=True,
+        ):
+            config = ConfigManager.from_environment()
+            assert config.stage_timing_sample == 100
+            assert config.profile_max_seconds == 30
+
+        for env_vars, message in [
+            ({"STAGE_TIMING_SAMPLE": "-1"}, "cannot be negative"),
+            ({"PROFILE_MAX_SECONDS": "301"}, "between 0 and 300"),
+        ]:
+            with patch.dict(os.environ, env_vars, clear=True):
+                with pytest.raises(ValidationError, match=message):
+                    ConfigManager.from_environment()
+
+    def test_from_environment_capture_threads(self):
+        with patch.dict(os.environ, {"CAPTURE_THREADS": "4"}, clear=True):
+            assert ConfigManager.from_environment().capture_threads == 4
+
+        for env_vars, message in [
+            ({"CAPTURE_THREADS": "0"}, "between 1 and 64"),
+            ({"CAPTURE_THREADS": "2", "OUTPUT_MODE": "shm"}, "shared-memory ring"),
+            ({"CAPTURE_THREADS": "2", "RUNTIME": "asyncio"}, "threads runtime"),
+        ]:
+            with patch.dict(os.environ, env_vars, clear=True):
+                with pytest.raises(ValidationError, match=message):
+                    ConfigManager.from_environment()
+
+
+class TestCalibration:
+    """Test startup calibration configuration."""
+
+    def test_defaults(self, valid_config):
+        config = valid_config
+
+        assert config.calibrate == "off"
+        assert config.calibration_cache == "/var/tmp/plc-sniffer-calibration.json"
+
+    def test_invalid_calibration(self, valid_config):
+        with pytest.raises(ValidationError):
+            replace(valid_config, calibrate="always")
+        with pytest.raises(ValidationError, match="CALIBRATION_CACHE"):
+            replace(valid_config, calibrate="auto", calibration_cache="")
+
+    def test_calibration_from_environment(self):
+        env_vars = {
+            "CALIBRATE": "Auto",
+            "CALIBRATION_CACHE": "/var/lib/plc-sniffer/calibration.json",
+        }
+        with patch.dict(os.environ, env_vars, clear=True):
+            config = ConfigManager.from_environment()
+
+        assert config.calibrate == "auto"
+        assert config.calibration_cache == "/var/lib/plc-sniffer/calibration.json"
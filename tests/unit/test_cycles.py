@@ -0,0 +1,101 @@
+"""Unit tests for cycles module."""
+
+import statistics
+import threading
+
+import pytest
+
+from plc_sniffer.cycles import CycleTracker, ShardedCycleTracker, flow_label
+from plc_sniffer.packet import PacketMeta
+
+
+def meta(timestamp, src_port=1234):
+    return PacketMeta("192.168.1.100", "192.168.1.200", src_port, 502, timestamp)
+
+
+class TestCycleTracker:
+    """Test CycleTracker statistics and flow table."""
+
+    def test_welford_statistics(self):
+        tracker = CycleTracker(max_flows=4)
+        arrivals = [0.0, 0.010, 0.021, 0.030, 0.042, 0.050]
+        for t in arrivals:
+            tracker.observe(meta(t))
+
+        intervals = [b - a for a, b in zip(arrivals, arrivals[1:])]
+        (flow,) = tracker.flows()
+
+        assert flow.flow == "192.168.1.100:1234->192.168.1.200:502"
+        assert flow.packets == 6
+        assert flow.mean == pytest.approx(statistics.mean(intervals))
+        assert flow.stddev == pytest.approx(statistics.stdev(intervals))
+        assert flow.max == pytest.approx(0.012)
+        # 8ms, 9ms, 10ms and 11-12ms cycles fall in the 10ms and 20ms buckets
+        assert sum(flow.histogram) == 5
+        assert flow.histogram[tracker.buckets.index(0.01)] == 3
+        assert flow.histogram[tracker.buckets.index(0.02)] == 2
+
+    def test_flows_sorted_by_jitter(self):
+        tracker = CycleTracker(max_flows=4)
+        for i, t in enumerate([0.0, 0.01, 0.02, 0.03]):
+            tracker.observe(meta(t, src_port=1))
+            tracker.observe(meta(t + (0.005 if i % 2 else 0.0), src_port=2))
+
+        assert [f.flow.split("->")[0] for f in tracker.flows()] == [
+            "192.168.1.100:2",
+            "192.168.1.100:1",
+        ]
+
+    def test_full_table_counts_untracked(self):
+        tracker = CycleTracker(max_flows=2)
+        for port in (1, 2, 3):
+            tracker.observe(meta(0.0, src_port=port))
+
+        assert tracker.tracked == 2
+        assert tracker.untracked == 1
+
+    def test_idle_flows_evicted(self):
+        tracker = CycleTracker(max_flows=2, idle_timeout=5.0)
+        tracker.observe(meta(0.0, src_port=1))
+        tracker.observe(meta(1.0, src_port=2))
+
+        # One packet sweeps both slots; flow 2 then restarts from scratch
+        tracker.observe(meta(10.0, src_port=2))
+
+        assert tracker.evicted == 2
+        assert tracker.tracked == 1
+        assert tracker.flows()[0].packets == 1
+        tracker.observe(meta(10.5, src_port=3))
+        assert tracker.tracked == 2
+        assert tracker.untracked == 0
+
+    def test_timestamps_going_backwards(self):
+        tracker = CycleTracker()
+        tracker.observe(meta(1.0))
+        tracker.observe(meta(0.5))
+
+        assert tracker.flows()[0].packets == 1
+
+    def test_flow_label(self):
+        assert flow_label(("10.0.0.1", 1, "10.0.0.2", 2)) == "10.0.0.1:1->10.0.0.2:2"
+
+
+def test_sharded_tracker_merges_threads():
+    tracker = ShardedCycleTracker(max_flows=4)
+
+    def observe(src_port, interval):
+        for i in range(3):
+            tracker.observe(meta(i * interval, src_port=src_port))
+
+    threads = [
+        threading.Thread(target=observe, args=(1000, 0.01)),
+        threading.Thread(target=observe, args=(2000, 0.02)),
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert tracker.tracked == 2
+    assert len(tracker.shards.all) == 2
+    assert sorted(flow.packets for flow in tracker.flows()) == [3, 3]
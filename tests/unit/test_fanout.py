@@ -0,0 +1,275 @@
+"""Unit tests for fanout module."""
+
+import socket
+import threading
+import time
+from dataclasses import replace
+from unittest.mock import Mock, patch
+
+from plc_sniffer.buffers import BufferPool
+from plc_sniffer.config import Destination
+from plc_sniffer.fanout import (
+    DestinationPool,
+    DestinationWorker,
+    create_forwarder,
+    describe_destinations,
+)
+from plc_sniffer.packet import PacketMeta
+from plc_sniffer.spill import SpillQueue
+
+
+def _worker(name, queue_size=16, send_result=True, weight=1.0):
+    ip, port = name.split(":")
+    forwarder = Mock()
+    forwarder.send.return_value = send_result
+    forwarder.breaker.available = True
+    return DestinationWorker(Destination(ip, int(port), weight), forwarder, queue_size)
+
+
+def _wait_for(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+class TestDestinationWorker:
+    """Test DestinationWorker functionality."""
+
+    def test_send_now_records_stats(self):
+        worker = _worker("10.0.0.1:514")
+
+        assert worker.send_now(b"data") is True
+
+        assert worker.stats.sent == 1
+        assert worker.stats.latency.count == 1
+        worker.forwarder.send.assert_called_once_with(b"data")
+
+    def test_send_failure_counted(self):
+        worker = _worker("10.0.0.1:514", send_result=False)
+
+        assert worker.send_now(b"data") is False
+        assert worker.stats.send_failed == 1
+        assert worker.stats.dropped == 1
+
+    def test_offer_queue_full(self):
+        worker = _worker("10.0.0.1:514", queue_size=2)
+
+        assert [worker.offer(b"x") for _ in range(3)] == [True, True, False]
+        assert worker.stats.queue_full == 1
+        assert worker.queue_depth == 2
+
+    def test_failed_send_spilled(self):
+        worker = _worker("10.0.0.1:514", send_result=False)
+        worker.spill = Mock()
+        meta = PacketMeta("10.0.0.1", "10.0.0.2", 1000, 502, time.time())
+
+        assert worker.send_now(b"data", meta=meta) is True
+        worker.spill.append.assert_called_once_with(b"data", meta)
+        assert (worker.stats.spilled, worker.stats.send_failed) == (1, 0)
+
+        worker.spill.append.return_value = False  # disk full or failing
+        assert worker.send_now(b"data") is False
+        assert worker.stats.send_failed == 1
+
+    def test_full_queue_spilled(self):
+        worker = _worker("10.0.0.1:514", queue_size=1)
+        worker.spill = Mock()
+        pool = BufferPool(1, 64)
+        lease = pool.acquire()
+
+        worker.offer(b"x")
+        assert worker.offer(lease.view[:4], lease) is True
+        lease.release()
+
+        # Written to disk, so the buffer is free at once
+        assert bytes(worker.spill.append.call_args[0][0]) == bytes(4)
+        assert pool.in_use == 0
+        assert (worker.stats.spilled, worker.stats.queue_full) == (1, 0)
+
+    def test_worker_thread_sends(self):
+        worker = _worker("10.0.0.1:514")
+        worker.start()
+        try:
+            worker.offer(b"a")
+            worker.offer(b"b")
+            assert _wait_for(lambda: worker.stats.sent == 2)
+        finally:
+            worker.stop()
+        worker.forwarder.shutdown.assert_called_once()
+
+    def test_lease_held_until_sent(self):
+        pool = BufferPool(1, 64)
+        lease = pool.acquire()
+        worker = _worker("10.0.0.1:514")
+
+        assert worker.offer(lease.view[:4], lease) is True
+        lease.release()
+        assert pool.in_use == 1
+
+        worker.start()
+        try:
+            assert _wait_for(lambda: pool.in_use == 0)
+        finally:
+            worker.stop()
+        assert worker.stats.sent == 1
+
+    def test_lease_released_when_queue_full(self):
+        pool = BufferPool(1, 64)
+        lease = pool.acquire()
+        worker = _worker("10.0.0.1:514", queue_size=1)
+
+        worker.offer(b"x")
+        assert worker.offer(lease.view[:4], lease) is False
+        lease.release()
+
+        assert pool.in_use == 0
+
+    def test_stop_releases_queued_leases(self):
+        pool = BufferPool(1, 64)
+        lease = pool.acquire()
+        worker = _worker("10.0.0.1:514")
+        worker.offer(lease.view[:4], lease)
+        lease.release()
+
+        worker.stop()
+
+        assert pool.in_use == 0
+
+    def test_stopped_worker_rejects(self):
+        pool = BufferPool(1, 64)
+        lease = pool.acquire()
+        worker = _worker("10.0.0.1:514")
+        worker.stop()
+
+        assert worker.offer(lease.view[:4], lease) is False
+        lease.release()
+
+        assert pool.in_use == 0
+        worker.forwarder.shutdown.assert_called_once_with()
+
+    def test_offer_racing_stop_releases_lease(self):
+        pool = BufferPool(1, 64)
+        lease = pool.acquire()
+        worker = _worker("10.0.0.1:514")
+        put = worker._queue.put_nowait
+
+        def put_then_stop(item):
+            # The reload stops the worker right after the capture thread queued
+            put(item)
+            worker.stop()
+
+        worker._queue.put_nowait = put_then_stop
+        assert worker.offer(lease.view[:4], lease) is False
+        lease.release()
+
+        assert pool.in_use == 0
+        assert worker.queue_depth == 0
+
+    def test_worker_thread_pinned(self):
+        forwarder = Mock()
+        worker = DestinationWorker(
+            Destination("10.0.0.1", 514), forwarder, 16, cpus=[3], priority=10
+        )
+
+        with patch("plc_sniffer.fanout.pin_current_thread") as mock_pin:
+            worker.start()
+            worker.stop()
+
+        mock_pin.assert_called_once_with([3], 10, "forwarder 10.0.0.1:514")
+
+
+class TestDestinationPool:
+    """Test DestinationPool functionality."""
+
+    def test_single_destination_inline(self):
+        worker = _worker("10.0.0.1:514")
+        pool = DestinationPool([worker])
+
+        assert pool.threaded is False
+        assert pool.send(b"data") is True
+        assert worker.stats.sent == 1
+
+    def test_slow_destination_does_not_block_others(self):
+        release = threading.Event()
+        slow = _worker("10.0.0.1:514", queue_size=4)
+        slow.forwarder.send.side_effect = lambda payload: release.wait(5) or True
+        fast = _worker("10.0.0.2:514", queue_size=64)
+        pool = DestinationPool([slow, fast])
+        pool.start()
+        try:
+            for _ in range(20):
+                assert pool.send(b"data") is True
+
+            assert _wait_for(lambda: fast.stats.sent == 20)
+            assert slow.stats.queue_full > 0
+            assert fast.stats.queue_full == 0
+        finally:
+            release.set()
+            pool.stop()
+
+    def test_hash_mode_pins_flows(self):
+        workers = [_worker(f"10.0.0.{i}:514", queue_size=1000) for i in range(1, 4)]
+        pool = DestinationPool(workers, mode="hash")
+        meta = PacketMeta("192.168.1.10", "10.0.0.1", 1234, 502, 0.0)
+
+        for _ in range(10):
+            assert pool.send(b"data", meta) is True
+
+        depths = sorted(w.queue_depth for w in workers)
+        assert depths == [0, 0, 10]
+
+    def test_hash_mode_ejects_unhealthy(self):
+        workers = [_worker(f"10.0.0.{i}:514", queue_size=1000) for i in range(1, 3)]
+        pool = DestinationPool(workers, mode="hash")
+        meta = PacketMeta("192.168.1.10", "10.0.0.1", 1234, 502, 0.0)
+
+        pool.send(b"data", meta)
+        owner = next(w for w in workers if w.queue_depth == 1)
+        other = next(w for w in workers if w is not owner)
+        owner.forwarder.breaker.available = False
+        pool.send(b"data", meta)
+        assert other.queue_depth == 1
+
+        other.forwarder.breaker.available = False
+        assert pool.send(b"data", meta) is False
+        assert pool.no_destination == 1
+
+
+def test_create_forwarder(valid_config):
+    forwarder = create_forwarder(valid_config, Destination("127.0.0.1", 8514))
+
+    assert forwarder.destination == ("127.0.0.1", 8514)
+    assert forwarder.retry_timeout == 5.0
+    assert forwarder.send_buffer_size == valid_config.send_buffer_size
+
+
+def test_closed_destination_fills_spill(valid_config, tmp_path):
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as listener:
+        listener.bind(("127.0.0.1", 0))
+        dest = Destination("127.0.0.1", listener.getsockname()[1])
+    config = replace(valid_config, circuit_breaker_threshold=20)
+    spill = SpillQueue(
+        str(tmp_path / "dest"), Mock(), 65536, 4 * 65536, replay_rate=100
+    )
+    worker = DestinationWorker(
+        dest, create_forwarder(config, dest, spill=spill), 16, spill=spill
+    )
+
+    for _ in range(200):
+        worker.send_now(b"payload")
+    parked = worker.forwarder.pending
+    worker.stop()
+
+    # Rejected by the open breaker, or still parked for retry when stopped
+    assert worker.forwarder.stats.retry_spilled == parked > 0
+    assert spill.pending == spill.spilled == worker.stats.spilled + parked
+    assert worker.stats.send_failed == 0
+    spill.close()
+
+
+def test_describe_destinations():
+    dests = [Destination("10.0.0.1", 514), Destination("::1", 8514)]
+    assert describe_destinations(dests) == "10.0.0.1:514, [::1]:8514"
@@ -0,0 +1,387 @@
+"""Unit tests for forwarder module."""
+
+import errno
+import socket
+import threading
+from unittest.mock import Mock, patch
+
+import pytest
+
+from plc_sniffer.forwarder import (
+    DROP,
+    RECONNECT,
+    RETRY,
+    RETRY_BACKOFF,
+    CircuitBreaker,
+    LoopForwarder,
+    ShardedForwarder,
+    UdpForwarder,
+    classify_errno,
+)
+
+
+def _oserror(code):
+    return OSError(code, "test error")
+
+
+class TestClassifyErrno:
+    """Test errno classification."""
+
+    def test_transient_errors_retry(self):
+        assert classify_errno(errno.EAGAIN) == RETRY
+        assert classify_errno(errno.ENOBUFS) == RETRY
+        assert classify_errno(errno.ECONNREFUSED) == RETRY
+
+    def test_unreachable_errors_drop(self):
+        assert classify_errno(errno.EHOSTUNREACH) == DROP
+        assert classify_errno(errno.EMSGSIZE) == DROP
+
+    def test_broken_socket_reconnects(self):
+        assert classify_errno(errno.EBADF) == RECONNECT
+        assert classify_errno(None) == RECONNECT
+        assert classify_errno(999999) == RECONNECT
+
+
+class TestCircuitBreaker:
+    """Test CircuitBreaker functionality."""
+
+    @patch("time.monotonic")
+    def test_opens_after_threshold(self, mock_time):
+        mock_time.return_value = 0
+        breaker = CircuitBreaker(threshold=3, cooldown=5.0)
+
+        for _ in range(2):
+            breaker.record_failure()
+        assert breaker.allow() is True
+
+        breaker.record_failure()
+        assert breaker.is_open
+        assert breaker.trips == 1
+        assert breaker.allow() is False
+
+    @patch("time.monotonic")
+    def test_half_open_probe(self, mock_time):
+        mock_time.return_value = 0
+        breaker = CircuitBreaker(threshold=2, cooldown=5.0)
+        breaker.record_failure()
+        breaker.record_failure()
+
+        mock_time.return_value = 5.0
+        assert breaker.allow() is True
+
+        # Failed probe reopens immediately
+        breaker.record_failure()
+        assert breaker.allow() is False
+        assert breaker.trips == 2
+
+        mock_time.return_value = 10.0
+        assert breaker.allow() is True
+        breaker.record_success()
+        breaker.record_failure()
+        assert breaker.allow() is True
+
+    def test_disabled(self):
+        breaker = CircuitBreaker(threshold=0, cooldown=1.0)
+        for _ in range(100):
+            breaker.record_failure()
+        assert breaker.allow() is True
+
+
+class TestUdpForwarder:
+    """Test UdpForwarder functionality."""
+
+    @pytest.fixture
+    def sock(self):
+        with patch("socket.socket") as mock_socket_class:
+            sock = Mock()
+            mock_socket_class.return_value = sock
+            sock.factory = mock_socket_class
+            yield sock
+
+    def test_socket_setup(self, sock):
+        forwarder = UdpForwarder(("10.0.0.1", 514), send_buffer_size=262144)
+
+        assert forwarder.send(b"data") is True
+
+        sock.factory.assert_called_once_with(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.setblocking.assert_called_once_with(False)
+        sock.setsockopt.assert_called_once_with(
+            socket.SOL_SOCKET, socket.SO_SNDBUF, 262144
+        )
+        sock.connect.assert_called_once_with(("10.0.0.1", 514))
+        assert forwarder.stats.sent == 1
+
+    def test_ipv6_destination(self, sock):
+        forwarder = UdpForwarder(("::1", 514))
+        forwarder.send(b"data")
+
+        sock.factory.assert_called_once_with(socket.AF_INET6, socket.SOCK_DGRAM)
+
+    def test_eagain_queues_and_retries(self, sock):
+        forwarder = UdpForwarder(("10.0.0.1", 514))
+        sock.send.side_effect = [_oserror(errno.EAGAIN), None, None]
+
+        assert forwarder.send(b"first") is True
+        assert forwarder.pending == 1
+        assert forwarder.stats.retry_queued == 1
+
+        # Next send drains the queue first, preserving order
+        assert forwarder.send(b"second") is True
+        assert [c.args[0] for c in sock.send.call_args_list] == [
+            b"first",
+            b"first",
+            b"second",
+        ]
+        assert forwarder.pending == 0
+        assert forwarder.stats.retry_sent == 1
+        assert forwarder.stats.sent == 1
+
+    def test_queue_behind_pending(self, sock):
+        forwarder = UdpForwarder(("10.0.0.1", 514))
+        sock.send.side_effect = _oserror(errno.ENOBUFS)
+
+        forwarder.send(b"first")
+        forwarder.send(b"second")
+
+        assert forwarder.pending == 2
+        assert sock.factory.call_count == 1
+
+    def test_retry_queue_overflow(self, sock):
+        forwarder = UdpForwarder(("10.0.0.1", 514), retry_queue_size=2)
+        sock.send.side_effect = _oserror(errno.EAGAIN)
+
+        results = [forwarder.send(b"x") for _ in range(4)]
+
+        assert results == [True, True, False, False]
+        assert forwarder.stats.retry_overflow == 2
+
+    @patch("time.monotonic")
+    def test_retry_expired(self, mock_time, sock):
+        mock_time.return_value = 0
+        forwarder = UdpForwarder(("10.0.0.1", 514), retry_timeout=1.0)
+        sock.send.side_effect = [_oserror(errno.EAGAIN), None]
+
+        forwarder.send(b"stale")
+        mock_time.return_value = 2.0
+        forwarder.send(b"fresh")
+
+        assert forwarder.stats.retry_expired == 1
+        assert sock.send.call_args.args[0] == b"fresh"
+
+    @patch("time.monotonic")
+    def test_expired_payload_spilled(self, mock_time, sock):
+        mock_time.return_value = 0
+        spill = Mock(return_value=True)
+        forwarder = UdpForwarder(("10.0.0.1", 514), retry_timeout=1.0, spill=spill)
+        sock.send.side_effect = [_oserror(errno.EAGAIN), None]
+
+        forwarder.send(b"stale")
+        mock_time.return_value = 2.0
+        forwarder.send(b"fresh")
+
+        spill.assert_called_once_with(b"stale")
+        assert (forwarder.stats.retry_spilled, forwarder.stats.retry_expired) == (1, 0)
+
+    def test_shutdown_spills_parked(self, sock):
+        spill = Mock(side_effect=[True, False])
+        forwarder = UdpForwarder(("10.0.0.1", 514), spill=spill)
+        sock.send.side_effect = _oserror(errno.EAGAIN)
+        forwarder.send(b"first")
+        forwarder.send(b"second")
+
+        forwarder.shutdown()
+
+        assert [c.args[0] for c in spill.call_args_list] == [b"first", b"second"]
+        assert (forwarder.stats.retry_spilled, forwarder.stats.dropped) == (1, 1)
+        assert forwarder.pending == 0
+
+    def test_unreachable_drops_without_reconnect(self, sock):
+        forwarder = UdpForwarder(("10.0.0.1", 514))
+        sock.send.side_effect = _oserror(errno.EHOSTUNREACH)
+
+        assert forwarder.send(b"data") is False
+        assert forwarder.stats.dropped == 1
+        assert forwarder.stats.reconnects == 0
+        sock.close.assert_not_called()
+
+    def test_broken_socket_reconnects(self, sock):
+        forwarder = UdpForwarder(("10.0.0.1", 514))
+        sock.send.side_effect = [_oserror(errno.EBADF), None]
+
+        assert forwarder.send(b"lost") is False
+        assert forwarder.send(b"ok") is True
+        assert forwarder.stats.reconnects == 1
+        assert sock.factory.call_count == 2
+
+    def test_circuit_breaker_rejects(self, sock):
+        forwarder = UdpForwarder(
+            ("10.0.0.1", 514), breaker_threshold=2, breaker_cooldown=60.0
+        )
+        sock.send.side_effect = _oserror(errno.EHOSTUNREACH)
+
+        forwarder.send(b"a")
+        forwarder.send(b"b")
+        assert forwarder.send(b"c") is False
+
+        assert forwarder.stats.circuit_rejected == 1
+        assert sock.send.call_count == 2
+
+    @patch("time.monotonic")
+    def test_refused_holds_back_recovery(self, mock_time, sock):
+        mock_time.return_value = 0
+        forwarder = UdpForwarder(("10.0.0.1", 514), breaker_threshold=3)
+        # Every retried payload goes out and the next send reports its refusal
+        sock.send.side_effect = [None, _oserror(errno.ECONNREFUSED)] * 3
+
+        for payload in (b"a", b"b", b"c", b"d"):
+            forwarder.send(payload)
+
+        assert forwarder.stats.refused == 3
+        assert forwarder.breaker.is_open
+
+        # Clean sends count again once no refusal was seen for a while
+        forwarder.breaker.opened_at = None
+        mock_time.return_value = 2.0
+        sock.send.side_effect = None
+        forwarder.send(b"e")
+        assert forwarder.breaker.failures == 0
+
+
+class TestShutdown:
+    """Test sends racing a forwarder being shut down."""
+
+    def test_send_after_shutdown_keeps_socket_closed(self):
+        with patch("socket.socket") as mock_socket_class:
+            mock_socket_class.side_effect = lambda *args: Mock()
+            forwarder = UdpForwarder(("10.0.0.1", 514))
+            forwarder.send(b"data")
+
+            forwarder.shutdown()
+
+            assert forwarder.send(b"late") is False
+        assert mock_socket_class.call_count == 1
+        assert forwarder.socket is None
+
+    def test_socket_opened_during_shutdown_is_closed(self):
+        forwarder = UdpForwarder(("10.0.0.1", 514))
+        sock = Mock()
+
+        def create_while_shutting_down():
+            forwarder.shutdown()
+            return sock
+
+        with patch.object(forwarder, "_create_socket", create_while_shutting_down):
+            assert forwarder.send(b"data") is False
+
+        sock.close.assert_called_once_with()
+        assert forwarder.socket is None
+
+
+class TestClosedPort:
+    """Test forwarding to a local port nothing listens on."""
+
+    def test_closed_port_opens_breaker(self):
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as listener:
+            listener.bind(("127.0.0.1", 0))
+            port = listener.getsockname()[1]
+        forwarder = UdpForwarder(("127.0.0.1", port), breaker_threshold=20)
+
+        results = [forwarder.send(b"x") for _ in range(200)]
+        forwarder.close()
+
+        assert forwarder.breaker.trips == 1
+        assert forwarder.stats.refused == 20
+        assert forwarder.stats.circuit_rejected > 0
+        assert results[-1] is False
+
+
+class TestLoopForwarder:
+    """Test LoopForwarder functionality."""
+
+    @pytest.fixture
+    def sock(self):
+        with patch("socket.socket") as mock_socket_class:
+            sock = Mock()
+            sock.fileno.return_value = 7
+            mock_socket_class.return_value = sock
+            yield sock
+
+    def test_retry_queue_drained_when_writable(self, sock):
+        loop = Mock()
+        forwarder = LoopForwarder(loop, ("10.0.0.1", 514))
+        sock.send.side_effect = [_oserror(errno.EAGAIN), None]
+
+        assert forwarder.send(b"first") is True
+        loop.add_writer.assert_called_once_with(7, forwarder.flush)
+
+        # The loop calls flush once the socket is writable again
+        forwarder.flush()
+
+        assert forwarder.pending == 0
+        assert forwarder.stats.retry_sent == 1
+        loop.remove_writer.assert_called_once_with(7)
+
+    def test_backs_off_without_progress(self, sock):
+        loop = Mock()
+        forwarder = LoopForwarder(loop, ("10.0.0.1", 514))
+        sock.send.side_effect = _oserror(errno.ENOBUFS)
+        forwarder.send(b"first")
+
+        forwarder.flush()
+
+        assert forwarder.pending == 1
+        loop.remove_writer.assert_called_once_with(7)
+        loop.call_later.assert_called_once_with(RETRY_BACKOFF, forwarder._watch)
+
+    def test_close_stops_watching(self, sock):
+        loop = Mock()
+        forwarder = LoopForwarder(loop, ("10.0.0.1", 514))
+        sock.send.side_effect = _oserror(errno.EAGAIN)
+        forwarder.send(b"first")
+
+        forwarder.close()
+
+        loop.remove_writer.assert_called_once_with(7)
+        sock.close.assert_called_once()
+
+
+class TestShardedForwarder:
+    """Test ShardedForwarder functionality."""
+
+    def test_one_socket_per_thread(self):
+        with patch("socket.socket") as mock_socket_class:
+            mock_socket_class.side_effect = lambda *args: Mock()
+            forwarder = ShardedForwarder(lambda: UdpForwarder(("10.0.0.1", 514)))
+
+            threads = [
+                threading.Thread(target=forwarder.send, args=(b"data",))
+                for _ in range(3)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        assert len(forwarder.shards.all) == 3
+        assert mock_socket_class.call_count == 3
+        assert forwarder.stats.sent == 3
+        assert forwarder.pending == 0
+        assert forwarder.breaker == (False, True, 0)
+
+        forwarder.close()
+        assert all(f.socket is None for f in forwarder.shards.all)
+
+    def test_shutdown_rejects_new_threads(self):
+        with patch("socket.socket") as mock_socket_class:
+            mock_socket_class.side_effect = lambda *args: Mock()
+            forwarder = ShardedForwarder(lambda: UdpForwarder(("10.0.0.1", 514)))
+            forwarder.send(b"data")
+
+            forwarder.shutdown()
+            thread = threading.Thread(target=forwarder.send, args=(b"late",))
+            thread.start()
+            thread.join()
+
+        assert mock_socket_class.call_count == 1
+        assert len(forwarder.shards.all) == 2
+        assert all(f.closed and f.socket is None for f in forwarder.shards.all)
@@ -0,0 +1,483 @@
+"""Unit tests for health module."""
+
+import io
+import json
+import threading
+import time
+from unittest.mock import Mock
+from urllib.request import urlopen
+
+import pytest
+
+from plc_sniffer.config import Destination, TrafficClass
+from plc_sniffer.health import HealthCheckHandler, HealthCheckServer
+from plc_sniffer.mirror import MirrorSocket
+from plc_sniffer.packet import PacketMeta
+from plc_sniffer.routing import Router
+from plc_sniffer.sniffer import PlcSniffer
+from plc_sniffer.spill import SpillQueue
+
+
+def make_handler(sniffer, path):
+    """Build a handler that writes its response into a buffer."""
+    handler = HealthCheckHandler.__new__(HealthCheckHandler)
+    handler.path = path
+    handler.client_address = ("127.0.0.1", 40000)
+    handler.wfile = io.BytesIO()
+    handler.send_response = Mock()
+    handler.send_header = Mock()
+    handler.end_headers = Mock()
+    handler.send_error = Mock()
+    HealthCheckHandler.sniffer = sniffer
+    return handler
+
+
+def get(sniffer, path):
+    handler = make_handler(sniffer, path)
+    handler.do_GET()
+    return handler
+
+
+@pytest.fixture
+def sniffer(valid_config):
+    return PlcSniffer(valid_config)
+
+
+class TestHealthCheckHandler:
+    """Test HealthCheckHandler endpoints."""
+
+    def test_health(self, sniffer):
+        handler = get(sniffer, "/health")
+
+        handler.send_response.assert_called_once_with(200)
+        assert json.loads(handler.wfile.getvalue())["status"] == "healthy"
+
+    def test_ready(self, sniffer):
+        handler = get(sniffer, "/ready")
+        handler.send_error.assert_called_once_with(503, "Service not ready")
+
+        sniffer.running = True
+        handler = get(sniffer, "/ready")
+        handler.send_response.assert_called_once_with(200)
+
+    def test_ready_capture_loss(self, sniffer):
+        sniffer.running = True
+        sniffer.config.max_capture_loss = 0.05
+        sniffer.capture_socket = Mock()
+        sniffer.stats.capture.poll = Mock()
+
+        sniffer.stats.capture.recent_loss_ratio = 0.01
+        get(sniffer, "/ready").send_response.assert_called_once_with(200)
+
+        sniffer.stats.capture.recent_loss_ratio = 0.2
+        handler = get(sniffer, "/ready")
+        handler.send_error.assert_called_once_with(503, "Capture loss above threshold")
+        sniffer.stats.capture.poll.assert_called_with(sniffer.capture_socket)
+
+    def test_unknown_path(self, sniffer):
+        handler = get(sniffer, "/nope")
+        handler.send_error.assert_called_once_with(404)
+
+    def test_metrics_not_initialized(self):
+        handler = get(None, "/metrics")
+        handler.send_error.assert_called_once_with(503, "Service not initialized")
+
+    def test_metrics(self, sniffer):
+        sniffer.stats.record_packet(forwarded=True, size=10)
+
+        body = get(sniffer, "/metrics").wfile.getvalue().decode()
+
+        assert "plc_sniffer_packets_processed_total 1" in body
+        assert "plc_sniffer_bytes_forwarded_total 10" in body
+        assert "plc_sniffer_destination_sent_total" not in body
+        assert "plc_sniffer_kernel_packets_received_total" not in body
+        assert 'plc_sniffer_gc_pause_seconds_count{generation="2"}' in body
+        assert "plc_sniffer_gc_frozen_objects" in body
+        assert "plc_sniffer_gc_scheduled_collections_total" not in body
+        assert "plc_sniffer_sampling_rate 1\n" in body
+
+    def test_capture_metrics(self, sniffer):
+        capture = sniffer.stats.capture
+        capture.available = True
+        capture.received, capture.dropped, capture.recent_loss_ratio = 200, 50, 0.5
+
+        body = get(sniffer, "/metrics").wfile.getvalue().decode()
+
+        assert "plc_sniffer_kernel_packets_received_total 200" in body
+        assert "plc_sniffer_kernel_packets_dropped_total 50" in body
+        assert "plc_sniffer_capture_loss_ratio 0.250000" in body
+        assert "plc_sniffer_capture_loss_ratio_recent 0.500000" in body
+
+    def test_destination_metrics(self, sniffer, mock_socket):
+        sniffer.config.destinations = [Destination("10.0.0.1", 514)]
+        sniffer.router = Router.from_config(sniffer.config)
+        sniffer.router.send(b"data")
+
+        body = get(sniffer, "/metrics").wfile.getvalue().decode()
+
+        assert (
+            'plc_sniffer_destination_sent_total{destination="10.0.0.1:514"} 1' in body
+        )
+        assert (
+            'plc_sniffer_destination_dropped_total{destination="10.0.0.1:514",'
+            'reason="queue_full"} 0' in body
+        )
+        assert (
+            "plc_sniffer_destination_latency_seconds_count"
+            '{destination="10.0.0.1:514"} 1' in body
+        )
+        assert (
+            'plc_sniffer_forward_outcomes_total{destination="10.0.0.1:514",'
+            'outcome="sent"} 1' in body
+        )
+        assert 'plc_sniffer_circuit_breaker_open{destination="10.0.0.1:514"} 0' in body
+
+
+def test_respond_buffered_request(sniffer):
+    HealthCheckHandler.sniffer = sniffer
+
+    response = HealthCheckHandler.respond(
+        b"GET /metrics HTTP/1.1\r\nHost: localhost\r\n\r\n", ("127.0.0.1", 40000)
+    )
+
+    assert response.startswith(b"HTTP/1.0 200")
+    assert b"plc_sniffer_packets_processed_total" in response
+    assert HealthCheckHandler.respond(
+        b"GET /nope HTTP/1.1\r\n\r\n", ("127.0.0.1", 40000)
+    ).startswith(b"HTTP/1.0 404")
+
+
+class TestReloadEndpoint:
+    """Test POST /reload."""
+
+    def post(self, sniffer, path, client="127.0.0.1"):
+        handler = make_handler(sniffer, path)
+        handler.client_address = (client, 40000)
+        handler.do_POST()
+        return handler
+
+    def test_reload(self, sniffer):
+        sniffer.reload_from_environment = Mock(
+            return_value={
+                "result": "success",
+                "changed": ["rate_limit"],
+                "duration_seconds": 0.002,
+            }
+        )
+
+        handler = self.post(sniffer, "/reload")
+
+        handler.send_response.assert_called_once_with(200)
+        assert json.loads(handler.wfile.getvalue())["changed"] == ["rate_limit"]
+
+    def test_reload_failure(self, sniffer):
+        sniffer.reload_from_environment = Mock(
+            return_value={
+                "result": "failure",
+                "changed": [],
+                "error": "bad",
+                "duration_seconds": 0.0,
+            }
+        )
+
+        handler = self.post(sniffer, "/reload")
+
+        handler.send_response.assert_called_once_with(422)
+        assert json.loads(handler.wfile.getvalue())["error"] == "bad"
+
+    def test_reload_unavailable(self, sniffer):
+        self.post(None, "/reload").send_error.assert_called_once_with(
+            503, "Service not initialized"
+        )
+        self.post(sniffer, "/nope").send_error.assert_called_once_with(404)
+
+    def test_localhost_only(self, sniffer):
+        sniffer.reload_from_environment = Mock()
+
+        handler = self.post(sniffer, "/reload", client="10.0.0.9")
+
+        handler.send_error.assert_called_once_with(
+            403, "Reloading is only available from localhost"
+        )
+        sniffer.reload_from_environment.assert_not_called()
+
+    def test_reload_metrics(self, sniffer, valid_config):
+        body = get(sniffer, "/metrics").wfile.getvalue().decode()
+        assert 'plc_sniffer_config_reloads_total{result="success"} 0' in body
+        assert "plc_sniffer_config_reload_duration_seconds" not in body
+
+        sniffer.reload(valid_config)
+        body = get(sniffer, "/metrics").wfile.getvalue().decode()
+
+        assert 'plc_sniffer_config_reloads_total{result="success"} 1' in body
+        assert "plc_sniffer_config_reload_duration_seconds " in body
+        assert "plc_sniffer_config_reload_success 1" in body
+
+    def test_reassembly_metrics(self, sniffer):
+        sniffer.reassembler.add(
+            ("10.0.0.1", "10.0.0.2", 1, 17), 0, True, b"x" * 8, now=0.0
+        )
+
+        body = get(sniffer, "/metrics").wfile.getvalue().decode()
+
+        assert "plc_sniffer_reassembly_fragments_total 1" in body
+        assert "plc_sniffer_reassembly_datagrams_total 0" in body
+        assert 'plc_sniffer_reassembly_dropped_total{reason="overlap"} 0' in body
+        assert "plc_sniffer_reassembly_pending 1" in body
+        assert "plc_sniffer_reassembly_buffered_bytes 8" in body
+
+
+def test_buffer_pool_metrics(valid_config):
+    valid_config.capture_engine = "raw"
+    sniffer = PlcSniffer(valid_config)
+    sniffer.capture_socket = Mock(truncated=3)
+    sniffer.capture_socket.ins.getsockopt.return_value = bytes(12)
+    sniffer.buffer_pool.acquire()
+
+    body = get(sniffer, "/metrics").wfile.getvalue().decode()
+
+    assert "plc_sniffer_buffer_pool_acquired_total 1" in body
+    assert "plc_sniffer_buffer_pool_in_use 1" in body
+    assert (
+        f"plc_sniffer_buffer_pool_available {valid_config.buffer_pool_slabs - 1}"
+        in body
+    )
+    assert "plc_sniffer_capture_truncated_total 3" in body
+
+
+def test_mirror_metrics(valid_config):
+    valid_config.capture_engine = "mirror"
+    sniffer = PlcSniffer(valid_config)
+    sniffer.capture_socket = MirrorSocket("vxlan", "127.0.0.1", 0)
+    session = sniffer.capture_socket._session("10.0.0.1", 7)
+    session.observe(100, 1)
+    session.observe(100, 3)
+    sniffer.capture_socket.undecodable = 2
+
+    body = get(sniffer, "/metrics").wfile.getvalue().decode()
+    sniffer.capture_socket.close()
+
+    assert 'plc_sniffer_mirror_packets_total{source="10.0.0.1",session="7"} 2' in body
+    assert 'plc_sniffer_mirror_bytes_total{source="10.0.0.1",session="7"} 200' in body
+    assert 'plc_sniffer_mirror_lost_total{source="10.0.0.1",session="7"} 1' in body
+    assert "plc_sniffer_mirror_undecodable_total 2" in body
+
+
+def test_stage_metrics(valid_config, sample_packet, mock_socket):
+    body = get(PlcSniffer(valid_config), "/metrics").wfile.getvalue().decode()
+    assert "plc_sniffer_stage_seconds" not in body
+
+    valid_config.stage_timing_sample = 1
+    sniffer = PlcSniffer(valid_config)
+    sniffer._process_packet(sample_packet)
+
+    body = get(sniffer, "/metrics").wfile.getvalue().decode()
+
+    assert "# TYPE plc_sniffer_stage_seconds histogram" in body
+    assert 'plc_sniffer_stage_seconds_count{stage="parse"} 1' in body
+    assert 'plc_sniffer_stage_seconds_count{stage="forward"} 1' in body
+    assert 'plc_sniffer_stage_seconds_bucket{stage="size",le="+Inf"} 1' in body
+
+
+def test_pipeline_metrics(sniffer, sample_packet, mock_socket):
+    sniffer.config.max_packet_size = 4
+    sniffer._process_packet(sample_packet)
+
+    body = get(sniffer, "/metrics").wfile.getvalue().decode()
+
+    assert "# TYPE plc_sniffer_pipeline_packets_total counter" in body
+    assert 'plc_sniffer_pipeline_batches_total{stage="rate_limit"} 1' in body
+    assert 'plc_sniffer_pipeline_dropped_total{stage="size"} 1' in body
+    assert 'plc_sniffer_pipeline_packets_total{stage="forward"} 0' in body
+    assert 'plc_sniffer_pipeline_errors_total{stage="cycles"} 0' in body
+
+
+def test_spill_metrics(sniffer, tmp_path):
+    spill = SpillQueue(str(tmp_path / "dest"), Mock(), segment_size=4096)
+    spill.append(
+        b"data", PacketMeta("10.0.0.1", "10.0.0.2", 1000, 502, time.time() - 5)
+    )
+    sniffer.spills = {"10.0.0.1:514": spill}
+
+    body = get(sniffer, "/metrics").wfile.getvalue().decode()
+    spill.close()
+
+    assert 'plc_sniffer_spill_segments{destination="10.0.0.1:514"} 1' in body
+    assert 'plc_sniffer_spill_disk_bytes{destination="10.0.0.1:514"} 4096' in body
+    assert 'plc_sniffer_spill_pending{destination="10.0.0.1:514"} 1' in body
+    assert 'plc_sniffer_spill_replay_lag_seconds{destination="10.0.0.1:514"} 5.' in body
+    assert (
+        'plc_sniffer_spill_dropped_total{destination="10.0.0.1:514",reason="evicted"} 0'
+        in body
+    )
+
+
+def test_class_metrics(sniffer):
+    sniffer.config.traffic_classes = [TrafficClass("safety", port=502)]
+    sniffer.scheduler = sniffer._create_scheduler()
+    sniffer._forward_packet = Mock(return_value=True)
+    sniffer.scheduler.offer(
+        b"data", PacketMeta("10.0.0.1", "10.0.0.2", 1000, 502, time.time())
+    )
+    sniffer.scheduler.offer(
+        b"data", PacketMeta("10.0.0.1", "10.0.0.2", 1000, 80, time.time())
+    )
+    sniffer.scheduler.queues[0].items.popleft()  # stand-in for a deadline drop
+    sniffer.scheduler.queues[0].stats.shards.get().deadline += 1
+    sniffer.scheduler.serve()
+
+    body = get(sniffer, "/metrics").wfile.getvalue().decode()
+
+    assert 'plc_sniffer_class_queued_total{class="safety"} 1' in body
+    assert 'plc_sniffer_class_forwarded_total{class="default"} 1' in body
+    assert 'plc_sniffer_class_dropped_total{class="safety",reason="deadline"} 1' in body
+    assert (
+        'plc_sniffer_class_dropped_total{class="default",reason="queue_full"} 0' in body
+    )
+    assert 'plc_sniffer_class_queue_depth{class="safety"} 0' in body
+    assert 'plc_sniffer_class_queue_delay_seconds_count{class="default"} 1' in body
+
+
+def test_adaptive_rate_metrics(sniffer):
+    sniffer.adaptive = Mock(
+        rate=750.0, increases=3, decreases={"send_error": 2, "queue_growth": 0}
+    )
+
+    body = get(sniffer, "/metrics").wfile.getvalue().decode()
+
+    assert "plc_sniffer_adaptive_rate 750" in body
+    assert "plc_sniffer_adaptive_rate_increases_total 3" in body
+    assert 'plc_sniffer_adaptive_rate_decreases_total{reason="send_error"} 2' in body
+
+
+def test_inject_metrics(sniffer):
+    sniffer.injector = Mock(frames=10, kicks=2, ring_full=1, too_large=0, send_errors=0)
+
+    body = get(sniffer, "/metrics").wfile.getvalue().decode()
+
+    assert "plc_sniffer_inject_frames_total 10" in body
+    assert "plc_sniffer_inject_kicks_total 2" in body
+    assert 'plc_sniffer_inject_dropped_total{reason="ring_full"} 1' in body
+    assert 'plc_sniffer_inject_dropped_total{reason="too_large"} 0' in body
+
+
+class TestCyclesEndpoint:
+    """Test GET /cycles and cycle metrics."""
+
+    def _observe(self, sniffer):
+        for i in range(4):
+            sniffer.cycles.observe(
+                PacketMeta("10.0.0.1", "10.0.0.2", 1000, 502, i * 0.01)
+            )
+            sniffer.cycles.observe(
+                PacketMeta("10.0.0.3", "10.0.0.2", 1000, 502, i * 0.02)
+            )
+
+    def test_cycles(self, sniffer):
+        self._observe(sniffer)
+
+        handler = get(sniffer, "/cycles")
+
+        handler.send_response.assert_called_once_with(200)
+        body = json.loads(handler.wfile.getvalue())
+        assert body["tracked"] == 2
+        assert len(body["flows"][0]["histogram"]) == len(body["buckets"]) + 1
+        assert {flow["flow"] for flow in body["flows"]} == {
+            "10.0.0.1:1000->10.0.0.2:502",
+            "10.0.0.3:1000->10.0.0.2:502",
+        }
+
+    def test_cycles_disabled(self, sniffer):
+        sniffer.cycles = None
+        get(sniffer, "/cycles").send_error.assert_called_once_with(
+            404, "Cycle tracking disabled"
+        )
+
+    def test_cycle_metrics_capped(self, sniffer):
+        sniffer.config.cycle_metrics_flows = 1
+        self._observe(sniffer)
+
+        body = get(sniffer, "/metrics").wfile.getvalue().decode()
+
+        assert "plc_sniffer_cycle_flows_tracked 2" in body
+        assert body.count("plc_sniffer_flow_cycle_mean_seconds{") == 1
+        assert body.count("plc_sniffer_flow_cycle_stddev_seconds{") == 1
+
+
+class TestProfileEndpoint:
+    """Test the /debug/profile endpoint."""
+
+    @pytest.fixture
+    def profiled(self, sniffer):
+        sniffer.config.profile_max_seconds = 5
+        sniffer.capture_thread_ids = [threading.get_ident()]
+        return sniffer
+
+    @staticmethod
+    def profile(sniffer, path, client="127.0.0.1"):
+        handler = make_handler(sniffer, path)
+        handler.client_address = (client, 40000)
+        handler.do_GET()
+        return handler
+
+    def test_profile(self, profiled):
+        handler = self.profile(profiled, "/debug/profile?seconds=0.05")
+
+        handler.send_response.assert_called_once_with(200)
+        result = json.loads(handler.wfile.getvalue())
+        assert result["samples"] >= 1
+        assert "(_handle_profile)" in result["collapsed"]
+        assert "cumulative" in result["summary"]
+
+    def test_disabled_by_default(self, sniffer):
+        handler = self.profile(sniffer, "/debug/profile?seconds=1")
+        handler.send_error.assert_called_once_with(404)
+
+    def test_localhost_only(self, profiled):
+        handler = self.profile(profiled, "/debug/profile", client="10.0.0.9")
+        handler.send_error.assert_called_once_with(
+            403, "Profiling is only available from localhost"
+        )
+
+        handler = self.profile(profiled, "/debug/profile?seconds=0.01", client="::1")
+        handler.send_response.assert_called_once_with(200)
+
+    def test_invalid_seconds(self, profiled):
+        for path in (
+            "/debug/profile?seconds=abc",
+            "/debug/profile?seconds=0",
+            "/debug/profile?seconds=6",
+        ):
+            handler = self.profile(profiled, path)
+            handler.send_error.assert_called_once_with(
+                400, "seconds must be between 0 and 5"
+            )
+
+    def test_one_profile_at_a_time(self, profiled):
+        with HealthCheckHandler.profile_lock:
+            handler = self.profile(profiled, "/debug/profile?seconds=1")
+        handler.send_error.assert_called_once_with(409, "A profile is already running")
+
+    def test_capture_not_running(self, profiled):
+        profiled.capture_thread_ids = []
+        handler = self.profile(profiled, "/debug/profile?seconds=1")
+        handler.send_error.assert_called_once_with(503, "Capture is not running")
+
+    def test_health_answers_during_profile(self, profiled):
+        server = HealthCheckServer(port=0)
+        server.start(profiled)
+        base = f"http://127.0.0.1:{server.server.server_address[1]}"
+        profile = threading.Thread(
+            target=lambda: urlopen(f"{base}/debug/profile?seconds=1").read()
+        )
+        try:
+            profile.start()
+            time.sleep(0.1)
+            started = time.monotonic()
+            with urlopen(f"{base}/health", timeout=5) as response:
+                assert json.loads(response.read())["status"] == "healthy"
+            assert HealthCheckHandler.profile_lock.locked()
+            assert time.monotonic() - started < 0.5
+        finally:
+            profile.join()
+            server.stop()
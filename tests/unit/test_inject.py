@@ -0,0 +1,181 @@
+"""Unit tests for inject module."""
+
+import socket
+import time
+from unittest.mock import Mock
+
+import pytest
+from scapy.all import IP, UDP, Ether, Raw
+
+from plc_sniffer.inject import (
+    HEADERS_SIZE,
+    TP_STATUS_SEND_REQUEST,
+    Injector,
+    address_sum,
+    adjust_checksum,
+    parse_mac,
+)
+from plc_sniffer.packet import PacketMeta
+from plc_sniffer.raw_capture import ETH_P_IP
+
+DST_MAC = "02:00:5e:10:00:01"
+
+
+def meta(payload, dst_ip="10.0.0.2", dst_port=502):
+    """Metadata of a datagram as captured, with the checksum the sender computed."""
+    datagram = IP(
+        bytes(
+            IP(src="10.0.0.1", dst=dst_ip)
+            / UDP(sport=40000, dport=dst_port)
+            / Raw(payload)
+        )
+    )
+    return PacketMeta(
+        "10.0.0.1", dst_ip, 40000, dst_port, time.time(), datagram[UDP].chksum
+    )
+
+
+@pytest.fixture
+def listener():
+    """Packet socket that sees the frames injected on the loopback interface."""
+    try:
+        sock = socket.socket(socket.AF_PACKET, socket.SOCK_RAW, socket.htons(ETH_P_IP))
+    except PermissionError:
+        pytest.skip("packet sockets need CAP_NET_RAW")
+    sock.bind(("lo", 0))
+    sock.settimeout(1.0)
+    yield sock
+    sock.close()
+
+
+@pytest.fixture
+def injector():
+    injector = Injector("lo", DST_MAC, "127.0.0.1", 9514, frame_count=16)
+    try:
+        injector.open()
+    except PermissionError:
+        pytest.skip("packet sockets need CAP_NET_RAW")
+    yield injector
+    injector.close()
+
+
+def receive(sock, dst_port=9514):
+    """Next injected frame to ``dst_port``, skipping other loopback traffic."""
+    while True:
+        frame = Ether(sock.recv(65535))
+        if UDP in frame and frame[UDP].dport == dst_port:
+            return frame
+
+
+class TestChecksum:
+    """Test incremental checksum updates."""
+
+    @pytest.mark.parametrize(
+        "dst_ip,dst_port",
+        [
+            ("192.168.7.9", 9514),
+            ("255.255.255.255", 65535),
+            ("0.0.0.1", 0),
+        ],
+    )
+    def test_matches_full_checksum(self, dst_ip, dst_port):
+        original = meta(b"payload bytes")
+        rewritten = IP(
+            bytes(
+                IP(dst=dst_ip, src="10.0.0.1")
+                / UDP(sport=40000, dport=dst_port)
+                / b"payload bytes"
+            )
+        )
+
+        old_sum = address_sum(socket.inet_aton(original.dst_ip)) + original.dst_port
+        new_sum = address_sum(socket.inet_aton(dst_ip)) + dst_port
+
+        assert (
+            adjust_checksum(original.udp_checksum, old_sum, new_sum, 3)
+            == rewritten[UDP].chksum
+        )
+
+    def test_parse_mac(self):
+        assert parse_mac(DST_MAC) == b"\x02\x00\x5e\x10\x00\x01"
+
+
+class TestInjector:
+    """Test Injector functionality."""
+
+    def test_rewritten_frame(self, injector, listener):
+        payload = b"sensor reading"
+
+        assert injector.send(payload, meta(payload))
+        injector.flush()
+        frame = receive(listener)
+
+        assert frame.dst == DST_MAC
+        assert (frame[IP].src, frame[IP].dst, frame[IP].ttl) == (
+            "10.0.0.1",
+            "127.0.0.1",
+            64,
+        )
+        assert (frame[UDP].sport, frame[UDP].len) == (40000, 8 + len(payload))
+        assert bytes(frame[UDP].payload) == payload
+        # Recomputing both checksums from scratch gives what was sent
+        header = IP(src="10.0.0.1", dst="127.0.0.1", id=0, flags="DF")
+        expected = IP(bytes(header / UDP(sport=40000, dport=9514) / Raw(payload)))
+        assert (frame[IP].chksum, frame[UDP].chksum) == (
+            expected.chksum,
+            expected[UDP].chksum,
+        )
+        assert (injector.frames, injector.kicks) == (1, 1)
+
+    def test_retarget(self, injector, listener):
+        injector.retarget("127.0.0.2", 9515)
+        injector.send(b"x", meta(b"x"))
+        injector.flush()
+
+        frame = receive(listener, dst_port=9515)
+        assert frame[IP].dst == "127.0.0.2"
+
+    def test_missing_checksum_stays_missing(self, injector, listener):
+        injector.send(b"x", meta(b"x")._replace(udp_checksum=0))
+        injector.flush()
+
+        assert receive(listener)[UDP].chksum == 0
+
+    def test_too_large(self, injector):
+        ring = injector.open()
+
+        assert not injector.send(b"x" * (ring.max_frame - HEADERS_SIZE + 1), meta(b"x"))
+        assert not injector.send(b"x", None)
+        assert (injector.too_large, injector.frames) == (2, 0)
+
+    def test_ring_full(self, injector):
+        ring = injector.open()
+        # The kernel never gets to send, so every frame stays queued
+        ring.kick = Mock()
+
+        for _ in range(16):
+            assert injector.send(b"x", meta(b"x"))
+        assert not injector.send(b"x", meta(b"x"))
+
+        assert (injector.frames, injector.ring_full) == (16, 1)
+        assert ring.reserve() == -1
+        assert int.from_bytes(ring.buf[:4], "little") == TP_STATUS_SEND_REQUEST
+
+    def test_kicks_at_threshold(self, injector):
+        for _ in range(injector.kick_threshold):
+            injector.send(b"x", meta(b"x"))
+
+        assert injector.kicks == 1
+        assert injector.open().queued == 0
+
+    def test_close(self):
+        injector = Injector("lo", DST_MAC, "127.0.0.1", 9514, frame_count=16)
+        try:
+            ring = injector.open()
+        except PermissionError:
+            pytest.skip("packet sockets need CAP_NET_RAW")
+
+        injector.close()
+
+        assert ring.sock.fileno() == -1
+        assert ring._mmap.closed
@@ -0,0 +1,59 @@
+"""Unit tests for metrics module."""
+
+import threading
+
+from plc_sniffer.metrics import Histogram, Shards, format_labels
+
+
+def test_format_labels():
+    assert format_labels({}) == ""
+    assert format_labels({"a": "1", "b": "x"}) == '{a="1",b="x"}'
+
+
+def test_histogram_render():
+    hist = Histogram(buckets=(0.1, 1.0))
+    hist.observe(0.05)
+    hist.observe(0.5)
+    hist.observe(5.0)
+
+    lines = hist.render("latency", {"destination": "d"})
+
+    assert lines == [
+        'latency_bucket{destination="d",le="0.1"} 1',
+        'latency_bucket{destination="d",le="1.0"} 2',
+        'latency_bucket{destination="d",le="+Inf"} 3',
+        'latency_sum{destination="d"} 5.550000000',
+        'latency_count{destination="d"} 3',
+    ]
+
+
+def test_histogram_merge():
+    first, second = Histogram(buckets=(1.0,)), Histogram(buckets=(1.0,))
+    first.observe(0.5)
+    second.observe(2.0)
+    second.observe(0.25)
+
+    merged = Histogram.merge([first, second])
+
+    assert merged.counts == [2, 1]
+    assert merged.count == 3
+    assert merged.sum == 2.75
+    assert Histogram.merge([]).count == 0
+
+
+def test_shards_per_thread():
+    shards = Shards(lambda: [0])
+
+    def count():
+        for _ in range(1000):
+            shards.get()[0] += 1
+
+    threads = [threading.Thread(target=count) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(shards.all) == 4
+    assert sum(shard[0] for shard in shards.all) == 4000
+    assert shards.get() is shards.get()
@@ -0,0 +1,222 @@
+"""Unit tests for mirror module."""
+
+import socket
+
+import pytest
+from scapy.all import IP, UDP, Ether, Raw
+from scapy.contrib.erspan import ERSPAN_II, ERSPAN_III, ERSPAN_PlatformSpecific
+from scapy.layers.l2 import GRE
+from scapy.layers.vxlan import VXLAN
+
+from plc_sniffer.buffers import BufferPool
+from plc_sniffer.mirror import (
+    GRE_PROTOCOL,
+    MIRROR_MAX_SESSIONS,
+    NOT_MIRRORED,
+    OTHER_SESSION,
+    MirrorSocket,
+    SessionStats,
+    decapsulate_gre,
+    decapsulate_vxlan,
+)
+from plc_sniffer.mmsg import load_recvmmsg
+
+INNER = (
+    Ether()
+    / IP(src="10.0.0.1", dst="10.0.0.2")
+    / UDP(sport=40000, dport=502)
+    / Raw(b"payload")
+)
+
+
+def decapsulate(decapsulator, packet):
+    """Decapsulate scapy ``packet``; return the inner frame, session and sequence."""
+    data = memoryview(bytes(packet))
+    offset, session, sequence = decapsulator(data)
+    return bytes(data[offset:]) if offset >= 0 else None, session, sequence
+
+
+@pytest.fixture
+def pool():
+    return BufferPool(16, 2048)
+
+
+@pytest.fixture
+def vxlan_socket():
+    sock = MirrorSocket("vxlan", "127.0.0.1", 0, batch=4, timeout=0.05)
+    yield sock
+    sock.close()
+
+
+def send_vxlan(sock, *packets):
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sender:
+        for packet in packets:
+            sender.sendto(bytes(packet), sock.ins.getsockname())
+
+
+class TestDecapsulation:
+    """Test offset-based decapsulation."""
+
+    def test_vxlan(self):
+        assert decapsulate(decapsulate_vxlan, VXLAN(vni=42) / INNER) == (
+            bytes(INNER),
+            42,
+            -1,
+        )
+        assert (
+            decapsulate_vxlan(memoryview(bytes(VXLAN(flags=0) / INNER))) == NOT_MIRRORED
+        )
+        assert decapsulate_vxlan(memoryview(b"\x08" * 12)) == NOT_MIRRORED
+
+    def test_erspan_ii(self):
+        packet = (
+            IP()
+            / GRE(seqnum_present=1, sequence_number=5)
+            / ERSPAN_II(session_id=7)
+            / INNER
+        )
+
+        assert decapsulate(decapsulate_gre, packet) == (bytes(INNER), 7, 5)
+
+    def test_erspan_i(self):
+        packet = IP() / GRE(proto=0x88BE) / INNER
+
+        assert decapsulate(decapsulate_gre, packet) == (bytes(INNER), 0, -1)
+
+    def test_erspan_iii(self):
+        plain = (
+            IP()
+            / GRE(seqnum_present=1, sequence_number=1)
+            / ERSPAN_III(session_id=9)
+            / INNER
+        )
+        with_subheader = (
+            IP()
+            / GRE()
+            / ERSPAN_III(session_id=9, o=1)
+            / ERSPAN_PlatformSpecific()
+            / INNER
+        )
+        not_ethernet = IP() / GRE() / ERSPAN_III(session_id=9, ft=2) / INNER[IP]
+
+        assert decapsulate(decapsulate_gre, plain) == (bytes(INNER), 9, 1)
+        assert decapsulate(decapsulate_gre, with_subheader) == (bytes(INNER), 9, -1)
+        assert decapsulate_gre(memoryview(bytes(not_ethernet))) == NOT_MIRRORED
+
+    def test_transparent_ethernet_with_key_and_checksum(self):
+        gre = GRE(chksum_present=1, key_present=1, key=77, proto=0x6558)
+        packet = IP(ihl=6, options=b"\x01" * 4) / gre / INNER
+
+        assert decapsulate(decapsulate_gre, packet) == (bytes(INNER), 77, -1)
+
+    def test_not_mirrored(self):
+        assert (
+            decapsulate_gre(memoryview(bytes(IP() / GRE(proto=0x0800) / INNER[IP])))
+            == NOT_MIRRORED
+        )
+        assert (
+            decapsulate_gre(memoryview(bytes(IP() / GRE(version=1) / INNER)))
+            == NOT_MIRRORED
+        )
+        truncated = bytes(IP() / GRE(seqnum_present=1) / ERSPAN_II() / INNER)[:40]
+        assert decapsulate_gre(memoryview(truncated)) == NOT_MIRRORED
+        assert decapsulate_gre(memoryview(b"\x45" * 10)) == NOT_MIRRORED
+
+
+class TestSessionStats:
+    """Test per-session counting."""
+
+    def test_sequence_gaps(self):
+        stats = SessionStats()
+        for sequence in (10, 11, 14, 12, 15, 200000, 200001):
+            stats.observe(100, sequence)
+
+        # 12 and 13 were skipped; 12 arrived late and the jump to 200000 is a restart
+        assert (stats.packets, stats.bytes, stats.lost) == (7, 700, 2)
+
+    def test_wraparound(self):
+        stats = SessionStats()
+        for sequence in (0xFFFFFFFE, 0xFFFFFFFF, 1):
+            stats.observe(1, sequence)
+
+        assert stats.lost == 1
+
+    def test_without_sequence(self):
+        stats = SessionStats()
+        stats.observe(1, -1)
+        stats.observe(1, -1)
+
+        assert (stats.packets, stats.lost) == (2, 0)
+
+
+class TestMirrorSocket:
+    """Test MirrorSocket functionality."""
+
+    @pytest.mark.parametrize("use_recvmmsg", [True, False])
+    def test_receives_vxlan(self, pool, use_recvmmsg):
+        if use_recvmmsg and load_recvmmsg() is None:
+            pytest.skip("recvmmsg not available")
+        sock = MirrorSocket(
+            "vxlan", "127.0.0.1", 0, batch=4, timeout=0.05, use_recvmmsg=use_recvmmsg
+        )
+        send_vxlan(
+            sock,
+            VXLAN(vni=1) / INNER,
+            b"not vxlan",
+            VXLAN(vni=2) / INNER,
+            VXLAN(vni=2) / INNER,
+        )
+
+        frames = sock.receive(pool)
+
+        assert sock.uses_recvmmsg == use_recvmmsg
+        assert [bytes(frame) for frame, _, _ in frames] == [bytes(INNER)] * 3
+        assert all(timestamp > 0 for _, timestamp, _ in frames)
+        assert sock.undecodable == 1
+        assert {key: stats.packets for key, stats in sock.sessions.items()} == {
+            ("127.0.0.1", 1): 1,
+            ("127.0.0.1", 2): 2,
+        }
+        # The buffer of the undecodable datagram stays with the socket
+        assert pool.in_use == 4
+        for _, _, lease in frames:
+            lease.release()
+        sock.close()
+        assert pool.in_use == 0
+
+    def test_timeout_and_limit(self, vxlan_socket, pool):
+        assert vxlan_socket.receive(pool) == []
+
+        send_vxlan(vxlan_socket, *[VXLAN(vni=1) / INNER] * 3)
+        first = vxlan_socket.receive(pool, limit=2)
+        second = vxlan_socket.receive(pool, wait=False)
+
+        assert (len(first), len(second)) == (2, 1)
+        for _, _, lease in first + second:
+            lease.release()
+
+    def test_session_limit(self, vxlan_socket):
+        for session in range(MIRROR_MAX_SESSIONS + 2):
+            vxlan_socket._session("10.0.0.1", session).observe(1, -1)
+
+        assert len(vxlan_socket.sessions) == MIRROR_MAX_SESSIONS + 1
+        assert vxlan_socket.sessions[OTHER_SESSION].packets == 2
+
+    def test_receives_erspan(self, pool):
+        try:
+            sock = MirrorSocket("gre", "127.0.0.1", batch=4, timeout=0.2)
+            sender = socket.socket(socket.AF_INET, socket.SOCK_RAW, GRE_PROTOCOL)
+        except PermissionError:
+            pytest.skip("raw sockets need CAP_NET_RAW")
+        packet = (
+            GRE(seqnum_present=1, sequence_number=3) / ERSPAN_II(session_id=12) / INNER
+        )
+        sender.sendto(bytes(packet), ("127.0.0.1", 0))
+        sender.close()
+
+        frames = sock.receive(pool)
+        sock.close()
+
+        assert [bytes(frame) for frame, _, _ in frames] == [bytes(INNER)]
+        assert sock.sessions[("127.0.0.1", 12)].next_sequence == 4
+        frames[0][2].release()
@@ -0,0 +1,321 @@
+"""Unit tests for pipeline module."""
+
+import time
+from dataclasses import replace
+from unittest.mock import Mock, patch
+
+import pytest
+from scapy.all import IP, UDP, Ether, Raw
+
+from plc_sniffer.metrics import Histogram
+from plc_sniffer.packet import PacketMeta
+from plc_sniffer.pipeline import (
+    SAMPLE_MAX_FLOWS,
+    Batch,
+    ForwardStage,
+    Pipeline,
+    SampleStage,
+    SizeStage,
+    Stage,
+    flow_hash,
+    load_stage,
+)
+from plc_sniffer.sniffer import PlcSniffer
+from plc_sniffer.validators import ValidationError
+
+
+def make_batch(*ports):
+    """Batch of one small datagram per destination port."""
+    batch = Batch()
+    for port in ports:
+        batch.append(
+            b"data", PacketMeta("10.0.0.1", "10.0.0.2", 1000, port, time.time())
+        )
+    return batch
+
+
+class OddPortFilter(Stage):
+    """Plugin stage keeping only datagrams to odd ports."""
+
+    name = "odd_ports"
+
+    def __init__(self, sniffer=None):
+        self.closed = False
+
+    def process(self, batch):
+        return [port % 2 == 1 for port in batch.column("dst_port")]
+
+    def close(self):
+        self.closed = True
+
+
+class Passthrough(Stage):
+    """Plugin stage that leaves its name to the entry point."""
+
+    def __init__(self, sniffer):
+        pass
+
+    def process(self, batch):
+        return None
+
+
+class Collect(Stage):
+    """Stage recording the ports it sees."""
+
+    name = "collect"
+
+    def __init__(self):
+        self.seen = []
+
+    def process(self, batch):
+        self.seen.extend(batch.column("dst_port"))
+        return None
+
+
+class TestBatch:
+    """Test Batch functionality."""
+
+    def test_keep(self):
+        batch = make_batch(1, 2, 3)
+        batch.leases[1] = Mock()
+
+        assert batch.keep([True, False, True]) == 1
+        assert batch.column("dst_port") == [1, 3]
+        assert batch.leases == [None, None]
+        assert batch.sizes() == [4, 4]
+        assert len(batch) == 2
+
+
+class TestPipeline:
+    """Test Pipeline functionality."""
+
+    def test_keep_mask_and_counters(self):
+        collect = Collect()
+        record_drop = Mock()
+        pipeline = Pipeline([OddPortFilter(), collect], record_drop)
+
+        pipeline.run(make_batch(1, 2, 3, 4))
+        pipeline.run(make_batch(2))
+
+        assert collect.seen == [1, 3]
+        assert record_drop.call_args_list == [((2, None),), ((1, None),)]
+        assert pipeline.counters() == {
+            "odd_ports": {"batches": 2, "packets": 5, "dropped": 3, "errors": 0},
+            "collect": {"batches": 1, "packets": 2, "dropped": 0, "errors": 0},
+        }
+
+    def test_stage_exception(self):
+        failing = Mock(spec=Stage, drop_reason=None)
+        failing.name = "failing"
+        failing.process.side_effect = RuntimeError("boom")
+        collect = Collect()
+        record_drop = Mock()
+        pipeline = Pipeline([failing, collect], record_drop)
+
+        pipeline.run(make_batch(1, 3))
+
+        record_drop.assert_called_once_with(2, "errors")
+        assert pipeline.counters()["failing"]["errors"] == 1
+        assert collect.seen == []
+
+    def test_stage_timing(self):
+        pipeline = Pipeline([OddPortFilter(), Collect()], Mock())
+        histograms = [Histogram(), Histogram()]
+
+        pipeline.run_timed(make_batch(1), histograms)
+        pipeline.run_timed(make_batch(2), histograms)
+
+        assert [h.count for h in histograms] == [2, 1]
+
+    def test_stage_must_implement_process(self):
+        class Incomplete(Stage):
+            name = "incomplete"
+
+        with pytest.raises(TypeError):
+            Incomplete()
+
+    def test_close(self):
+        stage = OddPortFilter()
+        failing = Mock(spec=Stage)
+        failing.close.side_effect = RuntimeError("boom")
+
+        Pipeline([failing, stage], Mock()).close()
+
+        assert stage.closed
+
+
+def flow_batch(flows, packets):
+    """Batch of ``packets`` datagrams from each of ``flows`` source ports."""
+    batch = Batch()
+    for _ in range(packets):
+        for port in range(flows):
+            batch.append(
+                b"data", PacketMeta("10.0.0.1", "10.0.0.2", 10000 + port, 502, 0.0)
+            )
+    return batch
+
+
+class TestSampleStage:
+    """Test flow-consistent sampling."""
+
+    def _stage(self, valid_config, **settings):
+        return SampleStage(Mock(config=replace(valid_config, **settings)))
+
+    def test_disabled(self, valid_config):
+        assert self._stage(valid_config).process(flow_batch(4, 2)) is None
+
+    def test_keeps_whole_flows(self, valid_config):
+        stage = self._stage(valid_config, sample_fraction=0.25)
+        batch = flow_batch(400, 3)
+
+        mask = stage.process(batch)
+
+        kept = {meta.src_port for meta, keep in zip(batch.metas, mask) if keep}
+        dropped = {meta.src_port for meta, keep in zip(batch.metas, mask) if not keep}
+        assert not kept & dropped
+        assert 60 < len(kept) < 140
+        # Another instance (or thread, or restart) picks the same flows
+        assert self._stage(valid_config, sample_fraction=0.25).process(batch) == mask
+
+    def test_one_in_n_per_flow(self, valid_config):
+        stage = self._stage(valid_config, sample_every=3)
+
+        mask = stage.process(flow_batch(2, 4))
+        mask += stage.process(flow_batch(2, 2))
+
+        # Flows interleave; each keeps its 1st, 4th and 7th packet
+        assert mask == [
+            True,
+            True,
+            False,
+            False,
+            False,
+            False,
+            True,
+            True,
+            False,
+            False,
+            False,
+            False,
+        ]
+
+    def test_settings_change_resets_flows(self, valid_config):
+        sniffer = Mock(config=replace(valid_config, sample_every=2))
+        stage = SampleStage(sniffer)
+        assert stage.process(flow_batch(1, 1)) == [True]
+
+        sniffer.config = replace(valid_config, sample_every=5)
+        assert stage.process(flow_batch(1, 1)) == [True]
+        assert stage.process(flow_batch(1, 4)) == [False] * 4
+
+    def test_flow_table_is_bounded(self, valid_config):
+        stage = self._stage(valid_config, sample_every=2)
+
+        stage.process(flow_batch(SAMPLE_MAX_FLOWS + 10, 1))
+
+        assert len(stage.tables.get().flows) == 10
+
+    def test_flow_hash_is_symmetric(self):
+        forward = PacketMeta("10.0.0.1", "10.0.0.2", 40000, 502, 0.0)
+        reverse = PacketMeta("10.0.0.2", "10.0.0.1", 502, 40000, 0.0)
+
+        assert flow_hash(forward) == flow_hash(reverse)
+        assert flow_hash(forward) != flow_hash(forward._replace(src_port=40001))
+
+
+class TestLoadStage:
+    """Test built-in and plugin stage loading."""
+
+    def test_builtin(self, valid_config):
+        stage = load_stage("size", PlcSniffer(valid_config))
+        assert isinstance(stage, SizeStage)
+        assert stage.drop_reason == "oversized"
+
+    def test_entry_point(self):
+        entry_point = Mock()
+        entry_point.load.return_value = OddPortFilter
+        with patch(
+            "plc_sniffer.pipeline.entry_points", return_value=[entry_point]
+        ) as mock_entry_points:
+            stage = load_stage("odd_ports", Mock())
+
+        mock_entry_points.assert_called_once_with(
+            group="plc_sniffer.stages", name="odd_ports"
+        )
+        assert isinstance(stage, OddPortFilter)
+
+    def test_unnamed_plugin_takes_its_entry_point_name(self):
+        entry_point = Mock()
+        entry_point.load.return_value = Passthrough
+        with patch("plc_sniffer.pipeline.entry_points", return_value=[entry_point]):
+            assert load_stage("tagger", Mock()).name == "tagger"
+
+    def test_unknown_stage(self):
+        with patch("plc_sniffer.pipeline.entry_points", return_value=[]):
+            with pytest.raises(ValidationError, match="Unknown pipeline stage 'nope'"):
+                load_stage("nope", Mock())
+
+    def test_plugin_import_failure(self):
+        entry_point = Mock()
+        entry_point.load.side_effect = ImportError("missing module")
+        with patch("plc_sniffer.pipeline.entry_points", return_value=[entry_point]):
+            with pytest.raises(ValidationError, match="missing module"):
+                load_stage("broken", Mock())
+
+
+class TestSnifferPipeline:
+    """Test the sniffer's pipeline assembled from configuration."""
+
+    def test_plugin_stage(self, valid_config, mock_socket):
+        entry_point = Mock()
+        entry_point.load.return_value = OddPortFilter
+        config = replace(valid_config, pipeline_stages=["odd_ports", "size", "forward"])
+        with patch("plc_sniffer.pipeline.entry_points", return_value=[entry_point]):
+            sniffer = PlcSniffer(config)
+
+        sniffer._process_packet(Ether() / IP() / UDP(dport=502) / Raw(b"even"))
+        sniffer._process_packet(Ether() / IP() / UDP(dport=503) / Raw(b"odd"))
+
+        assert sniffer.pipeline.names == ("odd_ports", "size", "forward")
+        assert bytes(mock_socket.send.call_args[0][0]) == b"odd"
+        assert sniffer.stats.packets_forwarded == 1
+        assert sniffer.stats.packets_dropped == 1
+
+        sniffer.stop()
+        assert sniffer.pipeline.stages[0].closed
+
+    def test_sampled_out_counted(self, valid_config, mock_socket):
+        sniffer = PlcSniffer(replace(valid_config, sample_every=2))
+
+        for _ in range(3):
+            sniffer._process_packet(
+                Ether() / IP() / UDP(sport=1000, dport=502) / Raw(b"data")
+            )
+
+        assert sniffer.stats.packets_forwarded == 2
+        assert sniffer.stats.sampled_out == 1
+
+    def test_forward_exception_drops_one_packet(self, valid_config, mock_socket):
+        sniffer = PlcSniffer(valid_config)
+        sniffer._forward_packet = Mock(side_effect=[True, RuntimeError("boom"), True])
+
+        sniffer.pipeline.run(make_batch(1, 2, 3))
+
+        assert sniffer.stats.packets_forwarded == 2
+        assert (sniffer.stats.packets_dropped, sniffer.stats.errors) == (1, 1)
+        assert sniffer.stats.packets_processed == 3
+        assert sniffer.pipeline.counters()["forward"] == {
+            "batches": 1,
+            "packets": 3,
+            "dropped": 1,
+            "errors": 0,
+        }
+
+    def test_scheduler_offer_exception(self, valid_config):
+        sniffer = PlcSniffer(valid_config)
+        sniffer.scheduler = Mock()
+        sniffer.scheduler.offer.side_effect = [None, RuntimeError("boom")]
+        stage = ForwardStage(sniffer)
+
+        assert stage.process(make_batch(1, 2)) == [True, False]
+        assert sniffer.stats.errors == 1
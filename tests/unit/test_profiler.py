@@ -0,0 +1,67 @@
+"""Unit tests for profiler module."""
+
+import sys
+import threading
+
+from plc_sniffer.profiler import StackSampler, walk_stack
+
+
+def spin(stop):
+    """Busy loop standing in for the capture thread."""
+    while not stop.is_set():
+        sum(range(100))
+
+
+class TestStackSampler:
+    """Test StackSampler functionality."""
+
+    def test_walk_stack_outermost_first(self):
+        stack = walk_stack(sys._getframe())
+
+        assert stack[-1].endswith("(test_walk_stack_outermost_first)")
+        assert stack[-1].startswith("test_profiler.py:")
+
+    def test_samples_target_thread(self):
+        stop = threading.Event()
+        thread = threading.Thread(target=spin, args=(stop,))
+        thread.start()
+        try:
+            sampler = StackSampler([thread.ident], interval=0.001)
+            sampler.run(0.05)
+        finally:
+            stop.set()
+            thread.join()
+
+        assert sampler.samples >= 5
+        assert 0.05 <= sampler.duration < 1
+        assert all(
+            any("(spin)" in label for label in stack) for stack in sampler.stacks
+        )
+
+        line = sampler.collapsed().splitlines()[0]
+        frames, count = line.rsplit(" ", 1)
+        assert int(count) > 0
+        assert "(spin)" in frames
+
+    def test_summary(self):
+        sampler = StackSampler([1])
+        sampler.stacks.update(
+            {("a.py:1(main)", "b.py:5(work)"): 3, ("a.py:1(main)",): 1}
+        )
+        sampler.samples = 4
+
+        lines = sampler.summary().splitlines()
+
+        assert lines[0].startswith("4 samples")
+        assert lines[5].split() == ["1", "25.0", "4", "100.0", "a.py:1(main)"]
+        assert lines[6].split() == ["3", "75.0", "3", "75.0", "b.py:5(work)"]
+
+    def test_unknown_thread_and_stop(self):
+        stop = threading.Event()
+        stop.set()
+        sampler = StackSampler([0])
+
+        sampler.run(10, stop)
+
+        assert sampler.samples == 0
+        assert sampler.collapsed() == ""
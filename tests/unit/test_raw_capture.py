@@ -0,0 +1,109 @@
+"""Unit tests for raw_capture module."""
+
+import socket
+import struct
+from unittest.mock import Mock, patch
+
+import pytest
+from scapy.layers.inet import IP, UDP
+from scapy.layers.l2 import ARP, Dot1Q, Ether
+
+from plc_sniffer.raw_capture import SO_TIMESTAMPNS, RawCaptureSocket, ipv4_offset
+
+
+def _raw_socket():
+    with patch("plc_sniffer.raw_capture.socket.socket"), patch(
+        "plc_sniffer.raw_capture.attach_filter"
+    ):
+        return RawCaptureSocket("eth0", "udp port 502")
+
+
+class TestIpv4Offset:
+    """Test Ethernet header decoding."""
+
+    def test_untagged(self):
+        frame = bytes(Ether() / IP() / UDP())
+        assert ipv4_offset(memoryview(frame)) == 14
+
+    def test_vlan_tags_skipped(self):
+        frame = bytes(Ether() / Dot1Q(vlan=10) / Dot1Q(vlan=20) / IP() / UDP())
+        assert ipv4_offset(memoryview(frame)) == 22
+
+    def test_not_ipv4(self):
+        assert ipv4_offset(memoryview(bytes(Ether() / ARP()))) == -1
+        assert ipv4_offset(memoryview(b"\x00" * 8)) == -1
+
+
+class TestRawCaptureSocket:
+    """Test RawCaptureSocket functionality."""
+
+    def test_socket_setup(self):
+        with patch("plc_sniffer.raw_capture.socket.socket") as mock_socket, patch(
+            "plc_sniffer.raw_capture.attach_filter"
+        ) as mock_attach:
+            capture_socket = RawCaptureSocket("eth0", "udp port 502")
+
+        sock = mock_socket.return_value
+        assert capture_socket.ins is sock
+        sock.setsockopt.assert_called_once_with(socket.SOL_SOCKET, SO_TIMESTAMPNS, 1)
+        mock_attach.assert_called_once_with(sock, "udp port 502", "eth0")
+        sock.bind.assert_called_once_with(("eth0", 0))
+
+    def test_setup_failure_closes_socket(self):
+        with patch("plc_sniffer.raw_capture.socket.socket") as mock_socket, patch(
+            "plc_sniffer.raw_capture.attach_filter", side_effect=OSError("bad filter")
+        ):
+            with pytest.raises(OSError):
+                RawCaptureSocket("eth0", "udp port 502")
+
+        mock_socket.return_value.close.assert_called_once()
+
+    def test_recv_into_kernel_timestamp(self):
+        capture_socket = _raw_socket()
+        ancillary = [
+            (
+                socket.SOL_SOCKET,
+                SO_TIMESTAMPNS,
+                struct.pack("@qq", 1700000000, 250000000),
+            )
+        ]
+        capture_socket.ins = Mock()
+        capture_socket.ins.recvmsg_into.return_value = (60, ancillary, 0, None)
+
+        buffer = bytearray(128)
+        assert capture_socket.recv_into(buffer) == (60, 1700000000.25)
+        capture_socket.ins.recvmsg_into.assert_called_once()
+        assert capture_socket.ins.recvmsg_into.call_args[0][0] == [buffer]
+
+    def test_recv_into_truncated(self):
+        capture_socket = _raw_socket()
+        capture_socket.ins = Mock()
+        capture_socket.ins.recvmsg_into.return_value = (128, [], socket.MSG_TRUNC, None)
+
+        assert capture_socket.recv_into(bytearray(128)) == (0, 0.0)
+        assert capture_socket.truncated == 1
+
+    def test_recv_into_timeout(self):
+        capture_socket = _raw_socket()
+        capture_socket.ins = Mock()
+        capture_socket.ins.recvmsg_into.side_effect = socket.timeout
+
+        assert capture_socket.recv_into(bytearray(128)) == (0, 0.0)
+
+    def test_recv_into_without_waiting(self):
+        capture_socket = _raw_socket()
+        capture_socket.ins = Mock()
+        nowait = capture_socket.ins.dup.return_value
+        nowait.recvmsg_into.side_effect = BlockingIOError
+
+        assert capture_socket.recv_into(bytearray(128), wait=False) == (0, 0.0)
+        assert capture_socket.recv_into(bytearray(128), wait=False) == (0, 0.0)
+
+        # One non-blocking duplicate, the timeout socket untouched
+        capture_socket.ins.dup.assert_called_once()
+        nowait.setblocking.assert_called_once_with(False)
+        capture_socket.ins.recvmsg_into.assert_not_called()
+
+        capture_socket.close()
+        nowait.close.assert_called_once()
+        capture_socket.ins.close.assert_called_once()
@@ -0,0 +1,117 @@
+"""Unit tests for reassembly module."""
+
+import pytest
+
+from plc_sniffer.reassembly import MAX_FRAGMENTS, FragmentReassembler
+
+KEY = ("192.168.1.100", "192.168.1.200", 4242, 17)
+
+
+@pytest.fixture
+def reassembler():
+    return FragmentReassembler(max_datagrams=2, max_datagram_size=4096, timeout=8.0)
+
+
+def chunks(data, size):
+    """Split data into (offset, more_fragments, chunk) triples."""
+    return [
+        (offset, offset + size < len(data), data[offset : offset + size])
+        for offset in range(0, len(data), size)
+    ]
+
+
+class TestFragmentReassembler:
+    """Test FragmentReassembler."""
+
+    def test_in_order(self, reassembler):
+        data = bytes(range(256)) * 10
+        results = [reassembler.add(KEY, *frag, now=0.0) for frag in chunks(data, 1024)]
+
+        assert results[:-1] == [None, None]
+        assert results[-1] == data
+        assert reassembler.reassembled == 1
+        assert reassembler.fragments == 3
+        assert reassembler.pending == 0
+
+    def test_out_of_order_and_duplicates(self, reassembler):
+        data = b"abcdefgh" * 300
+        frags = chunks(data, 800)
+
+        assert reassembler.add(KEY, *frags[2], now=0.0) is None
+        assert reassembler.add(KEY, *frags[0], now=0.0) is None
+        assert reassembler.add(KEY, *frags[0], now=0.0) is None  # retransmitted
+        assert reassembler.buffered_bytes == len(frags[2][2]) + 800
+        assert reassembler.add(KEY, *frags[1], now=0.0) == data
+
+    def test_buffers_are_reused(self, reassembler):
+        for ident in range(10):
+            key = KEY[:2] + (ident, 17)
+            assert reassembler.add(key, 0, True, b"x" * 8, now=0.0) is None
+            assert reassembler.add(key, 8, False, b"y", now=0.0) == b"x" * 8 + b"y"
+
+        assert reassembler.reassembled == 10
+        assert reassembler.evictions == 0
+
+    def test_overlap_discards_datagram(self, reassembler):
+        reassembler.add(KEY, 0, True, b"a" * 16, now=0.0)
+
+        # Teardrop: second fragment starts inside the first one
+        assert reassembler.add(KEY, 8, False, b"b" * 16, now=0.0) is None
+        assert reassembler.dropped["overlap"] == 1
+        assert reassembler.pending == 0
+
+    def test_malformed_fragments(self, reassembler):
+        assert (
+            reassembler.add(KEY, 0, True, b"a" * 10, now=0.0) is None
+        )  # not 8-aligned
+        assert reassembler.dropped["malformed"] == 1
+
+        reassembler.add(KEY, 0, True, b"a" * 16, now=0.0)
+        reassembler.add(KEY, 32, False, b"c" * 8, now=0.0)
+        assert (
+            reassembler.add(KEY, 40, True, b"d" * 8, now=0.0) is None
+        )  # beyond the end
+        assert reassembler.dropped["malformed"] == 2
+        assert reassembler.pending == 0
+
+    def test_per_datagram_cap(self, reassembler):
+        reassembler.add(KEY, 0, True, b"a" * 8, now=0.0)
+
+        assert reassembler.add(KEY, 4096, False, b"b", now=0.0) is None
+        assert reassembler.dropped["oversize"] == 1
+        assert reassembler.pending == 0
+
+    def test_fragment_count_cap(self):
+        reassembler = FragmentReassembler(max_datagrams=1, max_datagram_size=65535)
+        for index in range(MAX_FRAGMENTS):
+            reassembler.add(KEY, index * 8, True, b"z" * 8, now=0.0)
+
+        assert reassembler.add(KEY, MAX_FRAGMENTS * 8, True, b"z" * 8, now=0.0) is None
+        assert reassembler.dropped["too_many_fragments"] == 1
+
+    def test_global_cap_evicts_oldest(self, reassembler):
+        for ident in range(3):
+            reassembler.add(KEY[:2] + (ident, 17), 0, True, b"x" * 8, now=0.0)
+
+        assert reassembler.evictions == 1
+        assert reassembler.pending == 2
+        # Datagram 0 was evicted; its last fragment starts a new datagram
+        assert reassembler.add(KEY[:2] + (0, 17), 8, False, b"y", now=0.0) is None
+        assert (
+            reassembler.add(KEY[:2] + (2, 17), 8, False, b"y", now=0.0)
+            == b"x" * 8 + b"y"
+        )
+
+    def test_timeout(self, reassembler):
+        reassembler.add(KEY, 0, True, b"x" * 8, now=100.0)
+        reassembler.expire(107.0)
+        assert reassembler.pending == 1
+
+        reassembler.expire(108.5)
+        assert reassembler.pending == 0
+        assert reassembler.timeouts == 1
+
+        # Late fragment of the expired datagram does not complete anything
+        assert reassembler.add(KEY, 8, False, b"y", now=108.5) is None
+        reassembler.expire(1000.0)
+        assert reassembler.timeouts == 2
@@ -0,0 +1,107 @@
+"""Unit tests for routing module."""
+
+from unittest.mock import Mock
+
+import pytest
+
+from plc_sniffer.config import Destination, Route
+from plc_sniffer.forwarder import ShardedForwarder
+from plc_sniffer.packet import PacketMeta
+from plc_sniffer.routing import NO_ROUTE, Router, RoutingTable
+
+
+def _route(name, **match):
+    return Route.parse({"name": name, "destinations": ["10.0.0.1:514"], **match})
+
+
+@pytest.fixture
+def table():
+    return RoutingTable(
+        [
+            _route("modbus", port=502),
+            _route("enip", ports="2222-2230"),
+            _route("override", port=2225),
+            _route("cell", src_net="192.168.100.0/24"),
+            _route("site", src_net="192.168.0.0/16"),
+        ]
+    )
+
+
+class TestRoutingTable:
+    """Test RoutingTable lookups."""
+
+    def test_exact_port(self, table):
+        assert table.lookup("1.2.3.4", 502) == 0
+
+    def test_port_range(self, table):
+        assert table.lookup("1.2.3.4", 2222) == 1
+        assert table.lookup("1.2.3.4", 2230) == 1
+        assert table.lookup("1.2.3.4", 2231) == NO_ROUTE
+
+    def test_exact_port_beats_range(self, table):
+        assert table.lookup("1.2.3.4", 2225) == 2
+
+    def test_longest_prefix_subnet(self, table):
+        assert table.lookup("192.168.100.7", 9999) == 3
+        assert table.lookup("192.168.5.7", 9999) == 4
+        assert table.lookup("10.1.1.1", 9999) == NO_ROUTE
+
+    def test_port_routes_checked_first(self, table):
+        assert table.lookup("192.168.100.7", 502) == 0
+
+
+class TestRouter:
+    """Test Router dispatch."""
+
+    def test_without_routes(self, valid_config):
+        router = Router.from_config(valid_config)
+
+        assert router.table is None
+        assert len(router.pools) == 1
+        assert router.names == ["default"]
+        assert [w.name for w in router.workers] == ["127.0.0.1:8514"]
+        assert router.pools[0].threaded is False
+
+    def test_shared_destinations_share_workers(self, valid_config):
+        valid_config.routes = [
+            Route(
+                "a",
+                [Destination("10.0.0.1", 514), Destination("10.0.0.2", 514)],
+                port=502,
+            ),
+            Route("b", [Destination("10.0.0.2", 514)], port=503),
+        ]
+        router = Router.from_config(valid_config)
+
+        assert len(router.workers) == 2
+        assert router.pools[1].workers[0] is router.pools[0].workers[1]
+        assert all(pool.threaded for pool in router.pools)
+
+    def test_dispatch_and_counters(self):
+        pools = [Mock(), Mock()]
+        pools[0].workers = pools[1].workers = []
+        table = RoutingTable([_route("a", port=502), _route("b", port=503)])
+        router = Router(pools, table, ["a", "b"])
+
+        router.send(b"x", PacketMeta("1.1.1.1", "2.2.2.2", 1000, 503, 0.0))
+        assert (
+            router.send(b"x", PacketMeta("1.1.1.1", "2.2.2.2", 1000, 504, 0.0)) is False
+        )
+        assert router.send(b"x") is False
+
+        pools[1].send.assert_called_once()
+        pools[0].send.assert_not_called()
+        assert router.routed == [0, 1]
+        assert router.unrouted == 2
+
+    def test_parallel_capture_sends_inline(self, valid_config):
+        valid_config.destinations = [
+            Destination("10.0.0.1", 514),
+            Destination("10.0.0.2", 514),
+        ]
+        valid_config.capture_threads = 4
+
+        router = Router.from_config(valid_config)
+
+        assert router.pools[0].threaded is False
+        assert all(isinstance(w.forwarder, ShardedForwarder) for w in router.workers)
@@ -0,0 +1,139 @@
+"""Unit tests for runtime module."""
+
+import asyncio
+import gc
+import os
+from unittest.mock import patch
+
+import pytest
+
+from plc_sniffer.runtime import (
+    GC_CHECK_INTERVAL,
+    GC_FORCE_FACTOR,
+    GcMonitor,
+    IdleCollector,
+    freeze_heap,
+    pin_current_thread,
+)
+
+
+class TestPinCurrentThread:
+    """Test CPU pinning and realtime scheduling."""
+
+    def test_pin_and_priority(self):
+        with patch("os.sched_setaffinity") as mock_affinity, patch(
+            "os.sched_setscheduler"
+        ) as mock_scheduler:
+            pin_current_thread([2, 3], 20, "capture thread")
+
+        mock_affinity.assert_called_once_with(0, [2, 3])
+        assert mock_scheduler.call_args.args[:2] == (0, os.SCHED_FIFO)
+        assert mock_scheduler.call_args.args[2].sched_priority == 20
+
+    def test_defaults_do_nothing(self):
+        with patch("os.sched_setaffinity") as mock_affinity, patch(
+            "os.sched_setscheduler"
+        ) as mock_scheduler:
+            pin_current_thread([], 0)
+
+        mock_affinity.assert_not_called()
+        mock_scheduler.assert_not_called()
+
+    def test_failures_are_not_fatal(self, caplog):
+        with patch(
+            "os.sched_setaffinity", side_effect=OSError(22, "Invalid argument")
+        ), patch(
+            "os.sched_setscheduler",
+            side_effect=PermissionError(1, "Operation not permitted"),
+        ):
+            pin_current_thread([999], 50, "capture thread")
+
+        assert "Cannot pin capture thread" in caplog.text
+        assert "Cannot set SCHED_FIFO priority 50" in caplog.text
+
+
+class TestGcMonitor:
+    """Test GC pause measurement."""
+
+    def test_records_pauses(self):
+        monitor = GcMonitor()
+        monitor.install()
+        monitor.install()
+        try:
+            assert gc.callbacks.count(monitor._callback) == 1
+            gc.collect(1)
+        finally:
+            gc.callbacks.remove(monitor._callback)
+
+        assert monitor.pauses[1].count == 1
+        assert monitor.pauses[1].sum >= 0
+        assert monitor.pauses[0].count == 0
+
+
+class TestIdleCollector:
+    """Test collection at idle points."""
+
+    @pytest.fixture
+    def mock_gc(self):
+        with patch("plc_sniffer.runtime.gc") as mock:
+            mock.get_threshold.return_value = (700, 10, 10)
+            yield mock
+
+    def test_nothing_due(self, mock_gc):
+        mock_gc.get_count.return_value = (10, 0, 0)
+        collector = IdleCollector(lambda: 0.0)
+
+        assert collector.collect_if_due() is None
+        mock_gc.collect.assert_not_called()
+
+    def test_collects_when_idle(self, mock_gc):
+        mock_gc.get_count.return_value = (800, 10, 3)
+        collector = IdleCollector(lambda: 0.0)
+
+        assert collector.collect_if_due() == 1
+        mock_gc.collect.assert_called_once_with(1)
+        assert collector.idle_collections == 1
+
+    def test_waits_while_busy(self, mock_gc):
+        collector = IdleCollector(lambda: float("inf"))
+
+        mock_gc.get_count.return_value = (800, 0, 0)
+        assert collector.collect_if_due() is None
+
+        # Never idle: collection is forced before garbage piles up
+        mock_gc.get_count.return_value = (700 * GC_FORCE_FACTOR, 0, 10)
+        assert collector.collect_if_due() == 2
+        assert collector.forced_collections == 1
+
+    def test_start_stop_toggles_automatic_gc(self):
+        collector = IdleCollector(lambda: 0.0)
+        collector.start()
+        try:
+            assert gc.isenabled() is False
+        finally:
+            collector.stop()
+        assert gc.isenabled() is True
+
+    def test_checks_run_on_event_loop(self, mock_gc):
+        mock_gc.get_count.return_value = (800, 0, 0)
+        collector = IdleCollector(lambda: 0.0)
+
+        async def scenario():
+            collector.start(asyncio.get_running_loop())
+            await asyncio.sleep(GC_CHECK_INTERVAL * 3)
+            collector.stop()
+
+        asyncio.run(scenario())
+
+        assert collector.idle_collections >= 1
+        assert collector._thread is None
+        mock_gc.disable.assert_called_once_with()
+        mock_gc.enable.assert_called_once_with()
+
+
+def test_freeze_heap():
+    with patch("plc_sniffer.runtime.gc") as mock_gc:
+        freeze_heap()
+
+    mock_gc.collect.assert_called_once_with()
+    mock_gc.freeze.assert_called_once_with()
@@ -0,0 +1,177 @@
+"""Unit tests for scheduler module."""
+
+import asyncio
+import time
+from unittest.mock import Mock
+
+import pytest
+
+from plc_sniffer.buffers import BufferPool
+from plc_sniffer.config import TrafficClass
+from plc_sniffer.packet import PacketMeta
+from plc_sniffer.scheduler import ClassScheduler
+
+SAFETY = TrafficClass("safety", port=502, priority=0, weight=3, queue_size=4)
+BULK = TrafficClass(
+    "bulk", port_range=(2000, 2999), priority=1, deadline=0.05, queue_size=4
+)
+PANEL = TrafficClass("panel", src_net="10.9.0.0/16", priority=2)
+
+
+def meta(dst_port, src_ip="10.0.0.1", age=0.0):
+    return PacketMeta(src_ip, "10.0.0.2", 40000, dst_port, time.time() - age)
+
+
+@pytest.fixture
+def delivered():
+    return []
+
+
+@pytest.fixture
+def scheduler(delivered):
+    return ClassScheduler(
+        [BULK, SAFETY, PANEL],
+        lambda payload, meta, lease: delivered.append(payload),
+        Mock(),
+        default_queue_size=4,
+    )
+
+
+class TestClassScheduler:
+    """Test ClassScheduler functionality."""
+
+    def test_classify(self, scheduler):
+        assert scheduler.classify(meta(502)).name == "safety"
+        assert scheduler.classify(meta(2500)).name == "bulk"
+        assert scheduler.classify(meta(9999, src_ip="10.9.1.1")).name == "panel"
+        assert scheduler.classify(meta(9999)).name == "default"
+        assert [q.name for q in scheduler.queues] == [
+            "safety",
+            "bulk",
+            "panel",
+            "default",
+        ]
+
+    def test_strict_priority(self, scheduler, delivered):
+        scheduler.offer(b"bulk", meta(2500))
+        scheduler.offer(b"other", meta(9999))
+        scheduler.offer(b"safety", meta(502))
+
+        assert scheduler.serve() == 3
+        assert delivered == [b"safety", b"bulk", b"other"]
+        assert scheduler.classify(meta(502)).stats.forwarded == 1
+
+    def test_weighted(self, delivered):
+        bulk = BULK._replace(queue_size=100, deadline=0)
+        safety = SAFETY._replace(queue_size=100)
+        scheduler = ClassScheduler(
+            [safety, bulk], lambda p, m, length: delivered.append(p), Mock(), "weighted"
+        )
+        for _ in range(8):
+            scheduler.offer(b"s", meta(502))
+            scheduler.offer(b"b", meta(2500))
+
+        scheduler.serve(budget=8)
+
+        assert delivered.count(b"s") == 6
+        assert delivered.count(b"b") == 2
+        assert delivered[:4] == [b"s", b"s", b"b", b"s"]
+
+    def test_queue_full(self, scheduler):
+        for _ in range(5):
+            scheduler.offer(b"x", meta(502))
+
+        safety = scheduler.classify(meta(502))
+        assert safety.depth == 4
+        assert safety.stats.queue_full == 1
+        assert safety.stats.queued == 4
+        scheduler.shed.assert_called_once()
+
+    def test_deadline_shedding(self, scheduler, delivered):
+        scheduler.offer(b"stale", meta(2500, age=0.2))
+        scheduler.offer(b"fresh", meta(2500))
+        scheduler.offer(b"old safety", meta(502, age=10))  # no deadline
+
+        scheduler.serve()
+
+        bulk = scheduler.classify(meta(2500))
+        assert delivered == [b"old safety", b"fresh"]
+        assert bulk.stats.deadline == 1
+        assert bulk.stats.forwarded == 1
+        assert bulk.delay.count == 1
+        scheduler.shed.assert_called_once()
+
+    def test_rate_limit_shapes_output(self, delivered):
+        allow = Mock(side_effect=[True, False])
+        scheduler = ClassScheduler(
+            [SAFETY], lambda p, m, length: delivered.append(p), Mock(), allow=allow
+        )
+        scheduler.offer(b"a", meta(502))
+        scheduler.offer(b"b", meta(502))
+
+        assert scheduler.serve() == 1
+        assert scheduler.throttled
+        assert delivered == [b"a"]
+        assert scheduler.pending == 1
+        scheduler.shed.assert_not_called()
+
+    def test_flush_after_round(self, delivered):
+        flush = Mock()
+        scheduler = ClassScheduler(
+            [SAFETY], lambda p, m, length: delivered.append(p), Mock(), flush=flush
+        )
+
+        assert scheduler.serve() == 0
+        flush.assert_not_called()
+        scheduler.offer(b"a", meta(502))
+        scheduler.offer(b"b", meta(502))
+        assert scheduler.serve() == 2
+        flush.assert_called_once_with()
+
+    def test_leases(self, scheduler):
+        pool = BufferPool(2, 64)
+        kept, dropped = pool.acquire(), pool.acquire()
+        scheduler.offer(kept.view[:4], meta(502), kept)
+        scheduler.offer(dropped.view[:4], meta(2500, age=1), dropped)
+        kept.release()
+        dropped.release()
+        assert pool.in_use == 2
+
+        scheduler.serve()
+
+        assert pool.in_use == 0
+
+    def test_stop_returns_queued_buffers(self, scheduler):
+        pool = BufferPool(1, 64)
+        lease = pool.acquire()
+        scheduler.offer(lease.view[:4], meta(502), lease)
+        lease.release()
+
+        scheduler.stop()
+
+        assert pool.in_use == 0
+        assert scheduler.pending == 0
+
+    def test_thread(self, scheduler, delivered):
+        scheduler.start()
+        try:
+            scheduler.offer(b"a", meta(502))
+            deadline = time.monotonic() + 2
+            while not delivered and time.monotonic() < deadline:
+                time.sleep(0.005)
+        finally:
+            scheduler.stop()
+
+        assert delivered == [b"a"]
+
+    def test_loop(self, scheduler, delivered):
+        async def scenario():
+            scheduler.start(asyncio.get_running_loop())
+            scheduler.offer(b"a", meta(2500))
+            scheduler.offer(b"b", meta(502))
+            await asyncio.sleep(0)
+            scheduler.stop()
+
+        asyncio.run(scenario())
+
+        assert delivered == [b"b", b"a"]
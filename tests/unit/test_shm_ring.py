@@ -0,0 +1,159 @@
+"""Unit tests for shared-memory ring module."""
+
+import pytest
+
+from plc_sniffer.packet import PacketMeta
+from plc_sniffer.shm_ring import ShmRingReader, ShmRingWriter
+from plc_sniffer.sniffer import PlcSniffer
+
+
+@pytest.fixture
+def ring_path(tmp_path):
+    return str(tmp_path / "test.ring")
+
+
+@pytest.fixture
+def meta():
+    return PacketMeta("192.168.1.100", "192.168.1.200", 1234, 5678, 1700000000.5)
+
+
+class TestShmRing:
+    """Test ShmRingWriter and ShmRingReader."""
+
+    def test_write_and_read(self, ring_path, meta):
+        writer = ShmRingWriter(ring_path, slot_count=16, slot_size=128)
+        reader = ShmRingReader(ring_path)
+
+        assert writer.write(b"first", meta) == 1
+        assert writer.write(b"second") == 2
+
+        batch = reader.read_batch()
+        assert batch.lost == 0
+        assert [r.payload for r in batch.records] == [b"first", b"second"]
+        assert [r.seq for r in batch.records] == [1, 2]
+
+        first = batch.records[0]
+        assert first.src_ip == "192.168.1.100"
+        assert first.dst_ip == "192.168.1.200"
+        assert first.src_port == 1234
+        assert first.dst_port == 5678
+        assert first.timestamp == pytest.approx(1700000000.5)
+
+        # Nothing new since last read
+        assert reader.read_batch().records == []
+
+        reader.close()
+        writer.close()
+
+    def test_reader_detects_overrun(self, ring_path):
+        writer = ShmRingWriter(ring_path, slot_count=16, slot_size=128)
+        reader = ShmRingReader(ring_path)
+
+        for i in range(40):
+            writer.write(str(i).encode())
+
+        batch = reader.read_batch(max_records=100)
+        assert batch.lost == 24
+        assert len(batch.records) == 16
+        assert batch.records[0].payload == b"24"
+        assert reader.lost_total == 24
+
+        reader.close()
+        writer.close()
+
+    def test_read_batch_limit(self, ring_path):
+        writer = ShmRingWriter(ring_path, slot_count=16, slot_size=128)
+        reader = ShmRingReader(ring_path)
+
+        for i in range(10):
+            writer.write(b"x")
+
+        assert len(reader.read_batch(max_records=4).records) == 4
+        assert len(reader.read_batch(max_records=100).records) == 6
+
+        reader.close()
+        writer.close()
+
+    def test_reader_from_start(self, ring_path):
+        writer = ShmRingWriter(ring_path, slot_count=16, slot_size=128)
+        writer.write(b"early")
+
+        late = ShmRingReader(ring_path)
+        from_start = ShmRingReader(ring_path, from_start=True)
+
+        assert late.read_batch().records == []
+        assert [r.payload for r in from_start.read_batch().records] == [b"early"]
+
+        late.close()
+        from_start.close()
+        writer.close()
+
+    def test_oversized_payload_dropped(self, ring_path):
+        writer = ShmRingWriter(ring_path, slot_count=16, slot_size=64)
+
+        assert writer.write(b"x" * 33) == 0
+        assert writer.dropped == 1
+        assert writer.write_seq == 0
+
+        writer.close()
+
+    def test_writer_restart(self, ring_path):
+        writer = ShmRingWriter(ring_path, slot_count=16, slot_size=128)
+        reader = ShmRingReader(ring_path)
+        for _ in range(5):
+            writer.write(b"old")
+        reader.read_batch()
+        writer.close()
+
+        writer = ShmRingWriter(ring_path, slot_count=16, slot_size=128)
+        writer.write(b"new")
+
+        batch = reader.read_batch()
+        assert reader.restarts == 1
+        assert [r.payload for r in batch.records] == [b"new"]
+
+        reader.close()
+        writer.close()
+
+    def test_sample_rate_in_header(self, ring_path):
+        writer = ShmRingWriter(
+            ring_path, slot_count=16, slot_size=128, sample_rate=0.25
+        )
+        reader = ShmRingReader(ring_path)
+
+        assert reader.sample_rate == 0.25
+        writer.sample_rate = 0.5
+        assert reader.sample_rate == 0.5
+        # Rings written before the field existed hold 0
+        writer.sample_rate = 0.0
+        assert reader.sample_rate == 1.0
+
+        reader.close()
+        writer.close()
+
+    def test_invalid_ring_file(self, tmp_path):
+        path = tmp_path / "bogus.ring"
+        path.write_bytes(b"\x00" * 256)
+
+        with pytest.raises(ValueError):
+            ShmRingReader(str(path))
+
+    def test_sniffer_shm_output(self, valid_config, sample_packet, ring_path):
+        valid_config.output_mode = "shm"
+        valid_config.shm_ring_path = ring_path
+        valid_config.shm_ring_slots = 16
+        sniffer = PlcSniffer(valid_config)
+        sniffer.ring = ShmRingWriter(ring_path, 16, 2048)
+        reader = ShmRingReader(ring_path)
+
+        sniffer._process_packet(sample_packet)
+
+        records = reader.read_batch().records
+        assert sniffer.stats.packets_forwarded == 1
+        assert len(records) == 1
+        assert records[0].payload == b"test payload"
+        assert records[0].dst_port == 5678
+
+        reader.close()
+        sniffer.stop()
+        assert sniffer.ring is None
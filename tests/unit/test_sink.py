@@ -0,0 +1,224 @@
+"""Unit tests for the benchmark sink."""
+
+import io
+import json
+import socket
+import threading
+
+import pytest
+
+from plc_sniffer.sink import (
+    PROBE,
+    BatchReceiver,
+    LatencyHistogram,
+    SinkStats,
+    decode_probe,
+    encode_probe,
+    generate,
+    load_recvmmsg,
+    main,
+    open_sink_socket,
+    run_sink,
+)
+
+
+@pytest.fixture
+def sink_socket():
+    sock = open_sink_socket("127.0.0.1", 0, rcvbuf=1 << 20, timeout=0.05)
+    yield sock
+    sock.close()
+
+
+def send(sock, *payloads):
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sender:
+        for payload in payloads:
+            sender.sendto(payload, sock.getsockname())
+
+
+class TestProbe:
+    """Test probe encoding."""
+
+    def test_round_trip(self):
+        payload = encode_probe(7, 42, size=100, sent_ns=123456789)
+
+        assert len(payload) == 100
+        assert decode_probe(payload) == (7, 42, 123456789)
+        assert len(encode_probe(1, 0)) == PROBE.size
+
+    def test_not_a_probe(self):
+        assert decode_probe(b"short") is None
+        assert decode_probe(b"x" * 64) is None
+
+
+class TestLatencyHistogram:
+    """Test LatencyHistogram functionality."""
+
+    def test_bucket_bounds(self):
+        for value in list(range(200)) + [1000, 12345, 10**6, 10**9]:
+            upper = LatencyHistogram.upper_bound(LatencyHistogram.bucket(value))
+            assert value <= upper <= value * 33 / 32 + 1
+        assert LatencyHistogram.bucket(63) == 63
+        assert LatencyHistogram.bucket(64) == LatencyHistogram.bucket(65) == 64
+
+    def test_percentiles(self):
+        histogram = LatencyHistogram()
+        for value in range(1, 61):
+            histogram.observe(value)
+        histogram.observe(-5)  # clock skew
+
+        assert histogram.percentiles((50.0, 99.0)) == {"p50": 30, "p99": 60}
+        assert histogram.max == 60
+        assert LatencyHistogram().percentiles() == {}
+
+    def test_merge(self):
+        first, second = LatencyHistogram(), LatencyHistogram()
+        first.observe(10)
+        second.observe(1000)
+        first.merge(second)
+
+        assert (first.count, first.max) == (2, 1000)
+
+
+class TestSinkStats:
+    """Test loss, reordering and latency accounting."""
+
+    def test_loss_and_reordering(self):
+        stats = SinkStats()
+        for sequence in (5, 6, 8, 7, 11, 4):
+            stats.observe(encode_probe(1, sequence, sent_ns=0), 50_000)
+        stats.observe(b"not a probe", 0)
+
+        summary = stats.summary(elapsed=2.0)
+
+        # 9 and 10 are missing, 7 was late and 4 predates the first probe
+        assert summary["lost"] == 2
+        assert summary["reordered"] == 1
+        assert summary["loss_ratio"] == pytest.approx(2 / 7)
+        assert (summary["received"], summary["untagged"], summary["streams"]) == (
+            7,
+            1,
+            1,
+        )
+        assert summary["pps"] == 3.5
+        assert summary["latency_us"]["p50"] == summary["latency_us"]["max"] == 50
+
+    def test_streams_are_independent(self):
+        stats = SinkStats()
+        for stream in (1, 2):
+            for sequence in range(3):
+                stats.observe(encode_probe(stream, sequence), 0)
+
+        assert (stats.lost, stats.reordered, len(stats.streams)) == (0, 0, 2)
+
+    def test_interval_reports(self):
+        stats = SinkStats()
+        stats.observe(encode_probe(1, 0, sent_ns=0), 10_000)
+        stats.observe(encode_probe(1, 2, sent_ns=0), 10_000)
+        first = stats.report(elapsed=0.5)
+        stats.observe(encode_probe(1, 3, sent_ns=0), 100_000)
+        second = stats.report(elapsed=1.0)
+
+        assert (first["received"], first["pps"], first["lost"]) == (2, 4.0, 1)
+        assert first["latency_us"]["p50"] == 10
+        assert (second["received"], second["lost"]) == (1, 0)
+        assert second["latency_us"]["p50"] == 100
+        assert stats.summary(elapsed=1.0)["latency_us"]["max"] == 100
+
+
+class TestBatchReceiver:
+    """Test batched receiving with and without recvmmsg."""
+
+    @pytest.mark.parametrize("use_recvmmsg", [True, False])
+    def test_receives_queued_datagrams(self, sink_socket, use_recvmmsg):
+        if use_recvmmsg and load_recvmmsg() is None:
+            pytest.skip("recvmmsg not available")
+        receiver = BatchReceiver(
+            sink_socket, batch=4, slot_size=2048, use_recvmmsg=use_recvmmsg
+        )
+        send(sink_socket, *(bytes([i]) * (i + 1) for i in range(6)))
+
+        first = [bytes(view) for view in receiver.receive()]
+        second = [bytes(view) for view in receiver.receive()]
+
+        assert receiver.uses_recvmmsg == use_recvmmsg
+        assert first == [b"\x00", b"\x01" * 2, b"\x02" * 3, b"\x03" * 4]
+        assert second == [b"\x04" * 5, b"\x05" * 6]
+
+    @pytest.mark.parametrize("use_recvmmsg", [True, False])
+    def test_timeout(self, sink_socket, use_recvmmsg):
+        assert (
+            BatchReceiver(
+                sink_socket, batch=2, slot_size=64, use_recvmmsg=use_recvmmsg
+            ).receive()
+            == []
+        )
+
+
+class TestRunSink:
+    """Test the sink loop against the generator."""
+
+    def test_generated_probes(self, sink_socket):
+        receiver = BatchReceiver(sink_socket, batch=16, slot_size=2048)
+        output = io.StringIO()
+        sent = []
+
+        thread = threading.Thread(
+            target=lambda: sent.append(
+                generate(sink_socket.getsockname(), 2000, 100, 0.2, stream=9)
+            )
+        )
+        thread.start()
+        summary = run_sink(
+            receiver, SinkStats(), duration=0.4, interval=0.1, output=output
+        )
+        thread.join()
+
+        assert summary["received"] == sent[0] > 0
+        assert (summary["lost"], summary["streams"], summary["bytes"]) == (
+            0,
+            1,
+            100 * sent[0],
+        )
+        assert "pps" in output.getvalue()
+
+    def test_stops_on_request(self, sink_socket):
+        receiver = BatchReceiver(sink_socket, batch=2, slot_size=64)
+
+        summary = run_sink(receiver, SinkStats(), interval=0, should_stop=lambda: True)
+
+        assert summary["received"] == 0
+
+
+class TestMain:
+    """Test the command line."""
+
+    def test_json_summary(self, capsys):
+        main(
+            [
+                "--bind",
+                "127.0.0.1",
+                "--port",
+                "0",
+                "--duration",
+                "0.1",
+                "--interval",
+                "0",
+                "--json",
+            ]
+        )
+
+        summary = json.loads(capsys.readouterr().out)
+        assert summary["received"] == 0
+
+    def test_generate(self, sink_socket, capsys):
+        host, port = sink_socket.getsockname()
+        main(["--generate", f"{host}:{port}", "--rate", "1000", "--duration", "0.05"])
+
+        assert capsys.readouterr().out.startswith("Sent ")
+        assert decode_probe(sink_socket.recv(2048))[1] == 0
+
+    def test_invalid_arguments(self):
+        with pytest.raises(SystemExit):
+            main(["--size", "8"])
+        with pytest.raises(SystemExit, match="Invalid destination"):
+            main(["--generate", "nowhere"])
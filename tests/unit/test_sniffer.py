@@ -1,181 +1,937 @@
 """Unit tests for sniffer module."""
 
+import errno
+import gc
+import logging
+import os
+import threading
 import time
-import socket
-from unittest.mock import Mock, patch, call
+from dataclasses import replace
+from unittest.mock import Mock, patch
 
 import pytest
+from scapy.all import IP, UDP, Dot1Q, Ether, Raw, fragment
+from scapy.layers.vxlan import VXLAN
 
-from plc_sniffer.sniffer import PlcSniffer, RateLimiter, PacketStats
+from plc_sniffer.adaptive import AdaptiveRate
+from plc_sniffer.config import Destination, TrafficClass
+from plc_sniffer.mirror import MirrorSocket
+from plc_sniffer.routing import Router
+from plc_sniffer.sniffer import PacketStats, PlcSniffer, RateLimiter, ShardedRateLimiter
 
 
 class TestRateLimiter:
     """Test RateLimiter functionality."""
-    
+
     def test_no_limit(self):
         limiter = RateLimiter(0)  # No limit
         for _ in range(100):
             assert limiter.allow() is True
-    
+
     def test_rate_limiting(self):
         limiter = RateLimiter(10)  # 10 pps
-        
+
         # Should allow initial burst
         allowed = 0
         for _ in range(20):
             if limiter.allow():
                 allowed += 1
-        
+
         # Should have allowed around 10 (bucket size)
         assert 8 <= allowed <= 12
-    
-    @patch('time.time')
+
+    @patch("time.time")
     def test_token_refill(self, mock_time):
         mock_time.return_value = 0
         limiter = RateLimiter(10)
-        
+
         # Use all tokens
         for _ in range(10):
             limiter.allow()
-        
+
         # No tokens left
         assert limiter.allow() is False
-        
+
         # Advance time by 0.5 seconds (should get 5 tokens)
         mock_time.return_value = 0.5
-        
+
         allowed = 0
         for _ in range(10):
             if limiter.allow():
                 allowed += 1
-        
+
         assert allowed == 5
 
+    def test_sharded_limiter_splits_rate(self):
+        limiter = ShardedRateLimiter(rate=10, shards=2)
+        allowed = []
+
+        def burst():
+            allowed.append(sum(limiter.allow() for _ in range(20)))
+
+        threads = [threading.Thread(target=burst) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert allowed == [5, 5]
+        assert ShardedRateLimiter(rate=0, shards=4).allow()
+
+    def test_set_rate(self):
+        limiter = RateLimiter(100)
+        limiter.set_rate(10)
+
+        assert limiter.bucket_size == 10
+        assert sum(limiter.allow() for _ in range(20)) == 10
+
+        sharded = ShardedRateLimiter(rate=100, shards=2)
+        sharded.allow()
+        sharded.set_rate(20)
+        assert sharded.buckets.all[0].rate == 10
+        assert sharded.share == 10
+
 
 class TestPacketStats:
     """Test PacketStats functionality."""
-    
+
     def test_record_packet(self):
         stats = PacketStats()
-        
+
         stats.record_packet(forwarded=True, size=100)
         assert stats.packets_processed == 1
         assert stats.packets_forwarded == 1
         assert stats.bytes_forwarded == 100
         assert stats.packets_dropped == 0
-        
+
         stats.record_packet(forwarded=False)
         assert stats.packets_processed == 2
         assert stats.packets_forwarded == 1
         assert stats.packets_dropped == 1
-    
-    @patch('time.time')
+
+    @patch("time.time")
     def test_get_current_rate(self, mock_time):
         mock_time.return_value = 0
         stats = PacketStats(window_size=10)
-        
+
         # Record 10 packets over 1 second
         for i in range(10):
             mock_time.return_value = i * 0.1
             stats.record_packet(forwarded=True)
-        
+
         mock_time.return_value = 1.0
         rate = stats.get_current_rate()
         assert 9.5 <= rate <= 10.5  # ~10 pps
 
+    def test_log_stats_kernel_counters(self, caplog):
+        stats = PacketStats()
+        with caplog.at_level(logging.INFO):
+            stats.log_stats()
+        assert "Kernel" not in caplog.text
+
+        stats.capture.available = True
+        stats.capture.received, stats.capture.dropped = 1000, 20
+        with caplog.at_level(logging.INFO):
+            stats.log_stats()
+        assert (
+            "Kernel Received: 1000, Kernel Dropped: 20, Capture Loss: 2.00%"
+            in caplog.text
+        )
+
+    def test_record_from_threads(self):
+        stats = PacketStats()
+
+        def record():
+            for _ in range(1000):
+                stats.record_packet(forwarded=True, size=10)
+            stats.record_packet(forwarded=False, reason="rate_limited")
+
+        threads = [threading.Thread(target=record) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(stats.shards.all) == 4
+        assert stats.packets_processed == 4004
+        assert stats.packets_forwarded == 4000
+        assert stats.bytes_forwarded == 40000
+        assert stats.rate_limited == 4
+
 
 class TestPlcSniffer:
     """Test PlcSniffer functionality."""
-    
+
     def test_initialization(self, valid_config):
         sniffer = PlcSniffer(valid_config)
-        
+
         assert sniffer.config == valid_config
-        assert sniffer.socket is None
+        assert sniffer.router is None
         assert sniffer.running is False
         assert isinstance(sniffer.rate_limiter, RateLimiter)
         assert isinstance(sniffer.stats, PacketStats)
-    
-    def test_create_socket(self, valid_config):
-        sniffer = PlcSniffer(valid_config)
-        
-        with patch('socket.socket') as mock_socket:
-            sock_instance = Mock()
-            mock_socket.return_value = sock_instance
-            
-            result = sniffer._create_socket()
-            
-            assert result == sock_instance
-            mock_socket.assert_called_once_with(socket.AF_INET, socket.SOCK_DGRAM)
-            sock_instance.settimeout.assert_called_once_with(5.0)
-    
+
     def test_process_packet_rate_limited(self, valid_config, sample_packet):
         config = valid_config
         config.rate_limit = 1  # Very low rate
         sniffer = PlcSniffer(config)
-        
+
         # Mock rate limiter to always deny
         sniffer.rate_limiter.allow = Mock(return_value=False)
-        
+
         sniffer._process_packet(sample_packet)
-        
+
         assert sniffer.stats.rate_limited == 1
         assert sniffer.stats.packets_processed == 1
         assert sniffer.stats.packets_forwarded == 0
-    
+
     def test_process_packet_oversized(self, valid_config, sample_packet):
         config = valid_config
         config.max_packet_size = 10  # Very small limit
         sniffer = PlcSniffer(config)
-        
+
         sniffer._process_packet(sample_packet)
-        
+
         assert sniffer.stats.oversized == 1
         assert sniffer.stats.packets_processed == 1
         assert sniffer.stats.packets_forwarded == 0
-    
+
     def test_process_packet_success(self, valid_config, sample_packet, mock_socket):
         sniffer = PlcSniffer(valid_config)
-        sniffer.socket = mock_socket
-        
+
         sniffer._process_packet(sample_packet)
-        
+
         assert sniffer.stats.packets_processed == 1
         assert sniffer.stats.packets_forwarded == 1
         assert sniffer.stats.bytes_forwarded > 0
-        
-        # Check socket.sendto was called
-        mock_socket.sendto.assert_called_once()
-        args = mock_socket.sendto.call_args[0]
-        assert args[1] == ("127.0.0.1", 8514)
-    
+        assert sniffer.cycles.tracked == 1
+
+        # Connected socket: destination is set once, payload goes out via send
+        mock_socket.connect.assert_called_once_with(("127.0.0.1", 8514))
+        mock_socket.setblocking.assert_called_once_with(False)
+        mock_socket.send.assert_called_once_with(b"test payload")
+
     def test_forward_packet_socket_error(self, valid_config):
         sniffer = PlcSniffer(valid_config)
-        
-        with patch('socket.socket') as mock_socket_class:
+
+        with patch("socket.socket") as mock_socket_class:
             mock_socket = Mock()
-            mock_socket.sendto.side_effect = socket.error("Network error")
+            mock_socket.send.side_effect = OSError(errno.EBADF, "Bad file descriptor")
             mock_socket_class.return_value = mock_socket
-            
-            sniffer._forward_packet(b"test data")
-            
-            # Should recreate socket after error
+
+            assert sniffer._forward_packet(b"test data") is False
+
+            # Should recreate socket after it broke
             assert mock_socket_class.call_count >= 2
-    
-    def test_graceful_shutdown(self, valid_config, mock_scapy_sniff):
+            assert sniffer.router.workers[0].forwarder.stats.reconnects == 1
+
+    def test_forward_packet_unreachable_keeps_socket(self, valid_config, sample_packet):
+        sniffer = PlcSniffer(valid_config)
+
+        with patch("socket.socket") as mock_socket_class:
+            mock_socket = Mock()
+            mock_socket.send.side_effect = OSError(
+                errno.EHOSTUNREACH, "No route to host"
+            )
+            mock_socket_class.return_value = mock_socket
+
+            sniffer._process_packet(sample_packet)
+
+            # Transient downstream errors must not churn the socket
+            assert mock_socket_class.call_count == 1
+            assert sniffer.stats.packets_dropped == 1
+            assert sniffer.router.workers[0].forwarder.stats.dropped == 1
+
+    def test_graceful_shutdown(
+        self, valid_config, mock_scapy_sniff, mock_capture_socket
+    ):
         sniffer = PlcSniffer(valid_config)
-        
+
         # Mock sniff to call stop immediately
         def mock_sniff_impl(**kwargs):
             sniffer.running = False
-            stop_filter = kwargs.get('stop_filter')
+            stop_filter = kwargs.get("stop_filter")
             if stop_filter:
                 assert stop_filter(None) is True
-        
+
         mock_scapy_sniff.side_effect = mock_sniff_impl
-        
-        with patch.object(sniffer, '_create_socket'):
+
+        with patch("plc_sniffer.sniffer.Router"):
             sniffer.start()
-        
+
         assert sniffer.running is False
-        mock_scapy_sniff.assert_called_once()
\ No newline at end of file
+        mock_scapy_sniff.assert_called_once()
+        assert mock_scapy_sniff.call_args.kwargs["opened_socket"] is mock_capture_socket
+        mock_capture_socket.close.assert_called_once()
+        assert sniffer.capture_socket is None
+
+    def test_low_jitter_runtime(
+        self, valid_config, mock_scapy_sniff, mock_capture_socket
+    ):
+        valid_config.capture_cpus = [1]
+        valid_config.realtime_priority = 10
+        valid_config.gc_mode = "idle"
+        sniffer = PlcSniffer(valid_config)
+
+        def mock_sniff_impl(**kwargs):
+            assert sniffer.gc_collector is not None
+            assert gc.isenabled() is False
+
+        mock_scapy_sniff.side_effect = mock_sniff_impl
+
+        with patch("plc_sniffer.sniffer.Router"), patch(
+            "plc_sniffer.sniffer.pin_current_thread"
+        ) as mock_pin, patch("plc_sniffer.sniffer.freeze_heap") as mock_freeze:
+            sniffer.start()
+
+        mock_pin.assert_called_once_with([1], 10, "capture thread")
+        mock_freeze.assert_called_once()
+        assert sniffer.gc_collector is None
+        assert gc.isenabled() is True
+
+    def test_spill_and_replay(
+        self, valid_config, mock_socket, mock_capture_socket, sample_packet, tmp_path
+    ):
+        sniffer = PlcSniffer(replace(valid_config, spill_dir=str(tmp_path)))
+        sniffer.open()
+        sniffer.spill_replayer.stop()  # replayed by hand below
+        spill = sniffer.spills["127.0.0.1:8514"]
+        assert sniffer.router.workers[0].spill is spill
+        assert spill.directory == str(tmp_path / "127.0.0.1_8514")
+
+        mock_socket.send.side_effect = OSError(errno.EHOSTUNREACH, "unreachable")
+        sniffer._process_packet(sample_packet)
+        assert sniffer.router.workers[0].stats.spilled == 1
+        assert sniffer.stats.packets_forwarded == 1
+
+        mock_socket.send.side_effect = None
+        mock_socket.send.reset_mock()
+        spill.last_spilled -= 60
+        spill.replay()
+        time.sleep(0.02)
+        assert sniffer.spill_replayer.replay() == 1
+        mock_socket.send.assert_called_once_with(b"test payload")
+
+        # Queues survive reloads, so the dropped destination still gets its backlog
+        sniffer.reload(
+            replace(sniffer.config, destinations=[Destination("10.0.0.9", 514)])
+        )
+        assert sorted(sniffer.spills) == ["10.0.0.9:514", "127.0.0.1:8514"]
+        assert sniffer.router.workers[0].spill is sniffer.spills["10.0.0.9:514"]
+
+        sniffer.stop()
+        assert sniffer.spills == {}
+
+    def test_process_fragmented_packet(self, valid_config, mock_socket):
+        sniffer = PlcSniffer(valid_config)
+        data = bytes(range(256)) * 12
+        datagram = (
+            IP(src="192.168.1.100", dst="192.168.1.200", id=7)
+            / UDP(sport=1234, dport=502)
+            / Raw(data)
+        )
+        fragments = [
+            Ether(bytes(Ether() / f)) for f in fragment(datagram, fragsize=1024)
+        ]
+
+        for packet in reversed(fragments):
+            sniffer._process_packet(packet)
+
+        # Held fragments are not counted; the datagram is forwarded whole, once
+        mock_socket.send.assert_called_once_with(data)
+        assert sniffer.stats.packets_processed == 1
+        assert sniffer.stats.bytes_forwarded == len(data)
+        assert sniffer.reassembler.reassembled == 1
+        assert sniffer.reassembler.fragments == len(fragments)
+
+    def test_fragments_without_reassembly(self, valid_config, mock_socket):
+        valid_config.reassembly_max_datagrams = 0
+        sniffer = PlcSniffer(valid_config)
+        datagram = IP(dst="192.168.1.200") / UDP(dport=502) / Raw(b"x" * 3000)
+
+        for f in fragment(datagram, fragsize=1480):
+            sniffer._process_packet(Ether(bytes(Ether() / f)))
+
+        assert sniffer.reassembler is None
+        assert sniffer.stats.packets_forwarded == 1
+        assert sniffer.stats.packets_dropped == 2
+
+
+class TestRawEngine:
+    """Test the raw capture engine and its zero-copy frame path."""
+
+    @pytest.fixture
+    def sniffer(self, valid_config):
+        valid_config.capture_engine = "raw"
+        valid_config.buffer_pool_slabs = 4
+        return PlcSniffer(valid_config)
+
+    @staticmethod
+    def _receive(sniffer, frame):
+        lease = sniffer.buffer_pool.acquire()
+        lease.slab[: len(frame)] = frame
+        sniffer._process_frame(lease.view[: len(frame)], 1700000000.5, lease)
+        lease.release()
+
+    def test_process_frame(self, sniffer, mock_socket):
+        frame = bytes(
+            Ether()
+            / Dot1Q(vlan=5)
+            / IP(src="192.168.1.100", dst="192.168.1.200")
+            / UDP(sport=1234, dport=502)
+            / Raw(b"test payload")
+        )
+
+        self._receive(sniffer, frame)
+
+        sent = mock_socket.send.call_args[0][0]
+        assert isinstance(sent, memoryview)
+        assert bytes(sent) == b"test payload"
+        assert sniffer.stats.packets_forwarded == 1
+        assert sniffer.stats.bytes_forwarded == len(b"test payload")
+        assert sniffer.cycles.flows()[0].flow == "192.168.1.100:1234->192.168.1.200:502"
+        assert sniffer.buffer_pool.in_use == 0
+
+    def test_process_frame_ignores_trailer(self, sniffer, mock_socket):
+        # Short frames are padded to 60 bytes on the wire
+        frame = bytes(Ether() / IP() / UDP() / Raw(b"ab")) + bytes(16)
+
+        self._receive(sniffer, frame)
+
+        assert bytes(mock_socket.send.call_args[0][0]) == b"ab"
+
+    def test_process_frame_not_udp(self, sniffer, mock_socket):
+        self._receive(sniffer, bytes(Ether() / IP(proto=6) / Raw(b"x" * 20)))
+        self._receive(sniffer, bytes(Ether() / IP() / UDP()))
+
+        mock_socket.send.assert_not_called()
+        assert sniffer.stats.packets_dropped == 2
+
+    def test_receive_frames_injects(self, sniffer, mock_socket):
+        frame = (
+            Ether()
+            / IP(src="192.168.1.100", dst="192.168.1.200")
+            / UDP(sport=1234, dport=502)
+            / Raw(b"abc")
+        )
+        frames = [bytes(frame)]
+
+        def recv_into(buffer, wait=True):
+            if not frames:
+                return 0, 0.0
+            data = frames.pop(0)
+            buffer[: len(data)] = data
+            return len(data), 1700000000.0
+
+        capture_socket = Mock()
+        capture_socket.recv_into.side_effect = recv_into
+        sniffer.injector = Mock()
+        sniffer.injector.send.side_effect = (
+            lambda payload, meta: bytes(payload) == b"abc"
+        )
+
+        assert sniffer.receive_frames(capture_socket) == 1
+
+        meta = sniffer.injector.send.call_args[0][1]
+        assert (meta.dst_ip, meta.dst_port) == ("192.168.1.200", 502)
+        assert meta.udp_checksum == IP(bytes(frame)[14:])[UDP].chksum != 0
+        sniffer.injector.flush.assert_called_once_with()
+        mock_socket.send.assert_not_called()
+        assert sniffer.stats.packets_forwarded == 1
+
+    def test_process_fragmented_frames(self, sniffer, mock_socket):
+        data = bytes(range(256)) * 12
+        datagram = (
+            IP(src="192.168.1.100", dst="192.168.1.200", id=9)
+            / UDP(sport=1234, dport=502)
+            / Raw(data)
+        )
+
+        for f in reversed(fragment(datagram, fragsize=1024)):
+            self._receive(sniffer, bytes(Ether() / f))
+
+        mock_socket.send.assert_called_once_with(data)
+        assert sniffer.reassembler.reassembled == 1
+        assert sniffer.buffer_pool.in_use == 0
+
+    def test_receive_frames_batch(self, sniffer, mock_socket):
+        frames = [
+            bytes(Ether() / IP() / UDP(dport=502) / Raw(bytes([i]) * 4))
+            for i in range(3)
+        ]
+        waits = []
+
+        def recv_into(buffer, wait=True):
+            waits.append(wait)
+            if not frames:
+                return 0, 0.0
+            frame = frames.pop(0)
+            buffer[: len(frame)] = frame
+            return len(frame), 1700000000.0
+
+        capture_socket = Mock()
+        capture_socket.recv_into.side_effect = recv_into
+        sent = []
+        mock_socket.send.side_effect = lambda data: sent.append(bytes(data))
+
+        assert sniffer.receive_frames(capture_socket, limit=2) == 2
+        assert sniffer.receive_frames(capture_socket) == 1
+
+        # Only the first frame of a batch waits
+        assert waits == [True, False, True, False]
+        assert sent == [b"\x00" * 4, b"\x01" * 4, b"\x02" * 4]
+        assert sniffer.pipeline.counters()["forward"] == {
+            "batches": 2,
+            "packets": 3,
+            "dropped": 0,
+            "errors": 0,
+        }
+        assert sniffer.buffer_pool.in_use == 0
+
+    def test_receive_frames_timed(self, sniffer, mock_socket):
+        sniffer.stage_timer = sniffer._create_stage_timer(
+            replace(sniffer.config, stage_timing_sample=2)
+        )
+        frames = [bytes(Ether() / IP() / UDP(dport=502) / Raw(b"data"))] * 4
+
+        def recv_into(buffer, wait=True):
+            if not frames:
+                return 0, 0.0
+            frame = frames.pop()
+            buffer[: len(frame)] = frame
+            return len(frame), 1700000000.0
+
+        capture_socket = Mock()
+        capture_socket.recv_into.side_effect = recv_into
+
+        # Only the first of the two batches is timed
+        assert sniffer.receive_frames(capture_socket, limit=2) == 2
+        assert sniffer.receive_frames(capture_socket, limit=2) == 2
+
+        counts = {
+            stage: h.count for stage, h in sniffer.stage_timer.histograms().items()
+        }
+        assert set(counts.values()) == {1}
+        assert sniffer.stats.packets_forwarded == 4
+        assert sniffer.buffer_pool.in_use == 0
+
+    def test_stage_timing(self, sniffer, mock_socket):
+        assert sniffer.stage_timer is None
+        sniffer.stage_timer = sniffer._create_stage_timer(
+            replace(sniffer.config, stage_timing_sample=2)
+        )
+        frame = bytes(Ether() / IP() / UDP(dport=502) / Raw(b"cycle"))
+
+        for _ in range(4):
+            self._receive(sniffer, frame)
+        self._receive(sniffer, bytes(Ether() / IP(proto=6) / Raw(b"x" * 20)))
+
+        counts = {
+            stage: h.count for stage, h in sniffer.stage_timer.histograms().items()
+        }
+        # The non-UDP frame is decoded but never reaches the stages
+        assert counts == {
+            "parse": 3,
+            "cycles": 2,
+            "sample": 2,
+            "rate_limit": 2,
+            "size": 2,
+            "forward": 2,
+        }
+        assert sniffer.stats.packets_forwarded == 4
+        assert sniffer.stats.packets_dropped == 1
+        assert sniffer.buffer_pool.in_use == 0
+
+    def test_stage_timing_rate_limited(self, sniffer, mock_socket):
+        sniffer.stage_timer = sniffer._create_stage_timer(
+            replace(sniffer.config, stage_timing_sample=1)
+        )
+        sniffer.rate_limiter = Mock(allow=Mock(return_value=False))
+
+        self._receive(sniffer, bytes(Ether() / IP() / UDP() / Raw(b"x")))
+
+        counts = {
+            stage: h.count for stage, h in sniffer.stage_timer.histograms().items()
+        }
+        assert counts == {
+            "parse": 1,
+            "cycles": 1,
+            "sample": 1,
+            "rate_limit": 1,
+            "size": 0,
+            "forward": 0,
+        }
+        assert sniffer.stats.rate_limited == 1
+
+    def test_cycles_see_dropped_packets(self, sniffer, mock_socket):
+        sniffer.rate_limiter = Mock(rate=1, allow=Mock(return_value=False))
+        frame = bytes(
+            Ether()
+            / IP(src="10.0.0.1", dst="10.0.0.2")
+            / UDP(sport=1000, dport=502)
+            / Raw(b"x")
+        )
+
+        for _ in range(3):
+            self._receive(sniffer, frame)
+
+        assert sniffer.stats.rate_limited == 3
+        assert [flow.packets for flow in sniffer.cycles.flows()] == [3]
+
+    def test_traffic_classes(self, sniffer, mock_socket):
+        config = replace(
+            sniffer.config,
+            rate_limit=1,
+            traffic_classes=[TrafficClass("safety", port=502)],
+        )
+        sniffer = PlcSniffer(config)
+        sniffer.scheduler = sniffer._create_scheduler()
+
+        self._receive(sniffer, bytes(Ether() / IP() / UDP(dport=80) / Raw(b"bulk")))
+        self._receive(sniffer, bytes(Ether() / IP() / UDP(dport=502) / Raw(b"safety")))
+
+        # Capture does not limit; the scheduler forwards the higher class within rate
+        assert sniffer.rate_limiter.rate == 0
+        assert sniffer.buffer_pool.in_use == 2
+        assert sniffer.scheduler.serve() == 1
+        assert sniffer.scheduler.throttled
+
+        assert bytes(mock_socket.send.call_args[0][0]) == b"safety"
+        assert sniffer.stats.packets_forwarded == 1
+        sniffer.scheduler.stop()
+        assert sniffer.buffer_pool.in_use == 0
+
+    def test_adaptive_rate(self, sniffer, mock_socket):
+        config = replace(
+            sniffer.config,
+            rate_limit=1000,
+            rate_control="aimd",
+            adaptive_rate_interval=60,
+        )
+        sniffer = PlcSniffer(config)
+        sniffer.router = Router.from_config(config)
+        sniffer.adaptive = AdaptiveRate.from_config(
+            config, sniffer._feedback, sniffer._set_rate
+        )
+        sniffer.adaptive.update()
+        mock_socket.send.side_effect = BlockingIOError(errno.EAGAIN, "full")
+
+        self._receive(sniffer, bytes(Ether() / IP() / UDP(dport=502) / Raw(b"x")))
+
+        assert sniffer._feedback().send_errors == 1
+        assert sniffer.adaptive.update() == 500
+        assert sniffer.rate_limiter.rate == 500
+        sniffer.router.stop()
+
+    def test_adaptive_rate_with_traffic_classes(self, sniffer):
+        config = replace(
+            sniffer.config,
+            rate_limit=1000,
+            rate_control="aimd",
+            traffic_classes=[TrafficClass("safety", port=502)],
+        )
+        sniffer = PlcSniffer(config)
+        sniffer.scheduler = sniffer._create_scheduler()
+
+        sniffer._set_rate(300)
+
+        assert sniffer.output_limiter.rate == 300
+        assert sniffer.rate_limiter.rate == 0
+
+    def test_start_raw_engine(self, sniffer, mock_socket):
+        frame = bytes(Ether() / IP() / UDP(dport=502) / Raw(b"cycle"))
+
+        def recv_into(buffer, wait=True):
+            if not wait:
+                return 0, 0.0
+            if sniffer.stats.packets_processed:
+                sniffer.running = False
+                return 0, 0.0
+            buffer[: len(frame)] = frame
+            return len(frame), 1700000000.0
+
+        with patch("plc_sniffer.sniffer.RawCaptureSocket") as mock_raw:
+            mock_raw.return_value.recv_into.side_effect = recv_into
+            mock_raw.return_value.ins.getsockopt.return_value = bytes(12)
+            sniffer.start()
+
+        mock_raw.assert_called_once_with("eth0", sniffer.config.capture_filter)
+        mock_socket.send.assert_called_once()
+        assert sniffer.buffer_pool.reused >= 1
+        assert sniffer.buffer_pool.in_use == 0
+        mock_raw.return_value.close.assert_called_once()
+
+    def test_parallel_capture_threads(self, sniffer, mock_socket):
+        sniffer.config.capture_threads = 2
+
+        def capture_socket(sport):
+            frame = bytes(Ether() / IP() / UDP(sport=sport, dport=502) / Raw(b"cycle"))
+            delivered = []
+
+            def recv_into(buffer, wait=True):
+                if delivered or not wait:
+                    if sniffer.stats.packets_processed == 2:
+                        sniffer.running = False
+                    time.sleep(0.001)
+                    return 0, 0.0
+                delivered.append(frame)
+                buffer[: len(frame)] = frame
+                return len(frame), 1700000000.0
+
+            sock = Mock()
+            sock.recv_into.side_effect = recv_into
+            sock.ins.getsockopt.return_value = bytes(12)
+            return sock
+
+        sockets = [capture_socket(1000), capture_socket(2000)]
+        with patch("plc_sniffer.sniffer.RawCaptureSocket", side_effect=sockets), patch(
+            "plc_sniffer.sniffer.join_fanout_group"
+        ) as mock_join:
+            sniffer.start()
+
+        assert [c.args[0] for c in mock_join.call_args_list] == sockets
+        assert len({c.args[1] for c in mock_join.call_args_list}) == 1
+        assert sniffer.stats.packets_forwarded == 2
+        assert len(sniffer.stats.shards.all) == 2
+        assert sorted(f.flow.split(":")[1] for f in sniffer.cycles.flows()) == [
+            "1000->127.0.0.1",
+            "2000->127.0.0.1",
+        ]
+        assert sniffer.capture_threads == []
+        for sock in sockets:
+            sock.close.assert_called_once()
+
+
+class TestMirrorEngine:
+    """Test the mirror capture engine."""
+
+    @pytest.fixture
+    def sniffer(self, valid_config):
+        sniffer = PlcSniffer(
+            replace(valid_config, capture_engine="mirror", buffer_pool_slabs=8)
+        )
+        sniffer.capture_socket = MirrorSocket(
+            "vxlan", "127.0.0.1", 0, batch=4, timeout=0.05
+        )
+        yield sniffer
+        sniffer.stop()
+
+    def test_receive_frames(self, sniffer, mock_socket):
+        frame = (
+            Ether()
+            / IP(src="192.168.1.100", dst="192.168.1.200")
+            / UDP(sport=1234, dport=502)
+            / Raw(b"test payload")
+        )
+        # socket.socket is mocked out: the tunnel socket sends to itself
+        tunnel = sniffer.capture_socket.ins
+        for packet in (VXLAN(vni=5) / frame, b"not vxlan"):
+            tunnel.sendto(bytes(packet), tunnel.getsockname())
+
+        assert sniffer.receive_frames() == 1
+
+        sent = mock_socket.send.call_args[0][0]
+        assert isinstance(sent, memoryview)
+        assert bytes(sent) == b"test payload"
+        assert sniffer.stats.packets_forwarded == 1
+        assert sniffer.capture_socket.sessions[("127.0.0.1", 5)].packets == 1
+        assert sniffer.capture_socket.undecodable == 1
+        assert sniffer.receive_frames() == 0
+
+    def test_receive_frames_timed(self, sniffer, mock_socket):
+        sniffer.stage_timer = sniffer._create_stage_timer(
+            replace(sniffer.config, stage_timing_sample=1)
+        )
+        frame = Ether() / IP() / UDP(dport=502) / Raw(b"data")
+        tunnel = sniffer.capture_socket.ins
+        tunnel.sendto(bytes(VXLAN(vni=5) / frame), tunnel.getsockname())
+
+        assert sniffer.receive_frames() == 1
+
+        counts = {
+            stage: h.count for stage, h in sniffer.stage_timer.histograms().items()
+        }
+        assert set(counts.values()) == {1}
+        assert sniffer.stats.packets_forwarded == 1
+
+    def test_reload_leaves_tunnel_socket_unfiltered(self, sniffer):
+        with patch("plc_sniffer.sniffer.set_capture_filter") as mock_set_filter:
+            result = sniffer.reload(replace(sniffer.config, filter="udp port 502"))
+
+        assert result["result"] == "success"
+        mock_set_filter.assert_not_called()
+
+
+class TestReload:
+    """Test hot configuration reload."""
+
+    @pytest.fixture
+    def running(self, valid_config, mock_socket):
+        sniffer = PlcSniffer(valid_config)
+        sniffer.router = Router.from_config(valid_config)
+        sniffer.router.start()
+        sniffer.capture_socket = Mock()
+        sniffer.capture_socket.ins.getsockopt.return_value = bytes(12)
+        yield sniffer
+        sniffer.stop()
+
+    def test_reload_swaps_limiter_and_router(self, running, valid_config):
+        old_router = running.router
+        new_config = replace(
+            valid_config, rate_limit=50, destinations=[Destination("10.0.0.9", 514)]
+        )
+
+        result = running.reload(new_config)
+
+        assert result["result"] == "success"
+        assert result["changed"] == ["rate_limit", "destinations"]
+        assert result["duration_seconds"] >= 0
+        assert running.config is new_config
+        assert running.rate_limiter.rate == 50
+        assert running.router is not old_router
+        assert running.router.workers[0].name == "10.0.0.9:514"
+        assert old_router.workers[0].forwarder.socket is None
+        assert running.reloads == {"success": 1, "failure": 0}
+        assert running.last_reload is result
+
+    def test_reload_toggles_stage_timing(self, running, valid_config):
+        running.reload(replace(valid_config, stage_timing_sample=100))
+        assert running.stage_timer.every == 100
+
+        running.reload(replace(valid_config, stage_timing_sample=0))
+        assert running.stage_timer is None
+
+    def test_reload_updates_ring_sample_rate(
+        self, valid_config, mock_capture_socket, tmp_path
+    ):
+        config = replace(
+            valid_config,
+            output_mode="shm",
+            shm_ring_path=str(tmp_path / "ring"),
+            shm_ring_slots=16,
+        )
+        sniffer = PlcSniffer(config)
+        sniffer.open()
+        assert sniffer.ring.sample_rate == 1.0
+
+        result = sniffer.reload(replace(config, sample_fraction=0.5, sample_every=2))
+
+        assert result["result"] == "success"
+        assert sniffer.ring.sample_rate == 0.25
+        sniffer.stop()
+
+    def test_reload_reshapes_class_scheduler(self, running, valid_config):
+        running.config = replace(
+            valid_config,
+            rate_limit=0,
+            traffic_classes=[TrafficClass("safety", port=502)],
+        )
+        running.scheduler = running._create_scheduler()
+        assert running.scheduler.allow is None
+
+        result = running.reload(replace(running.config, rate_limit=10))
+
+        assert result["result"] == "success"
+        assert running.scheduler.allow is not None
+        assert running.rate_limiter.rate == 0
+        assert (
+            running.reload(replace(running.config, traffic_classes=[]))["result"]
+            == "failure"
+        )
+
+    def test_reload_keeps_adaptive_rate(self, running, valid_config):
+        running.config = replace(valid_config, rate_limit=1000, rate_control="aimd")
+        running.adaptive = AdaptiveRate.from_config(
+            running.config, running._feedback, running._set_rate
+        )
+        running.adaptive.rate = 400
+
+        running.reload(replace(running.config, rate_limit=2000))
+        assert running.rate_limiter.rate == 400
+        assert running.adaptive.ceiling == 2000
+
+        running.reload(replace(running.config, rate_limit=300))
+        assert running.rate_limiter.rate == 300
+        assert (
+            running.reload(replace(running.config, adaptive_rate_step=5))["result"]
+            == "failure"
+        )
+
+    def test_reload_reattaches_filter(self, running, valid_config):
+        capture_socket = running.capture_socket
+
+        new_config = replace(
+            valid_config, filter="udp port 502", reassembly_max_datagrams=0
+        )
+
+        with patch("plc_sniffer.sniffer.set_capture_filter") as mock_set_filter:
+            running.reload(new_config)
+            running.reload(replace(new_config, rate_limit=5))
+
+        # The live socket keeps running; only a changed filter is recompiled
+        mock_set_filter.assert_called_once_with(capture_socket, "udp port 502", "eth0")
+        assert running.capture_socket is capture_socket
+        capture_socket.close.assert_not_called()
+
+    def test_reload_rejects_restart_only_settings(self, running, valid_config):
+        old_router = running.router
+
+        result = running.reload(replace(valid_config, interface="eth1", rate_limit=5))
+
+        assert result["result"] == "failure"
+        assert "interface requires a restart" in result["error"]
+        assert running.config is valid_config
+        assert running.router is old_router
+        assert running.reloads == {"success": 0, "failure": 1}
+
+    def test_reload_keeps_old_state_on_bad_filter(self, running, valid_config):
+        old_router = running.router
+        old_limiter = running.rate_limiter
+
+        with patch(
+            "plc_sniffer.sniffer.set_capture_filter",
+            side_effect=Exception("bad filter"),
+        ):
+            result = running.reload(
+                replace(valid_config, filter="udp port", rate_limit=5)
+            )
+
+        assert result == {
+            "result": "failure",
+            "changed": ["filter", "rate_limit"],
+            "error": "bad filter",
+            "duration_seconds": result["duration_seconds"],
+        }
+        assert running.router is old_router
+        assert running.rate_limiter is old_limiter
+
+    def test_reload_from_environment(self, running):
+        with patch.dict(os.environ, {"RATE_LIMIT": "20"}, clear=True):
+            assert running.reload_from_environment()["result"] == "success"
+        assert running.rate_limiter.rate == 20
+
+        with patch.dict(os.environ, {"RATE_LIMIT": "fast"}, clear=True):
+            result = running.reload_from_environment()
+        assert result["result"] == "failure"
+        assert running.rate_limiter.rate == 20
+        assert running.reloads == {"success": 1, "failure": 1}
+
+    def test_reload_keeps_rate_limiter_if_unchanged(self, running, valid_config):
+        limiter = running.rate_limiter
+
+        running.reload(replace(valid_config, cycle_flows=8))
+        assert running.rate_limiter is limiter
+
+        running.reload(replace(valid_config, cycle_flows=8, rate_limit=20))
+        assert running.rate_limiter is not limiter
+
+    def test_reload_keeps_calibrated_settings(self, running):
+        running.config = replace(running.config, calibrate="auto", pipeline_batch=128)
+        running.calibrated = {"pipeline_batch": 128}
+        env_vars = {"CALIBRATE": "auto", "PIPELINE_BATCH": "16", "RATE_LIMIT": "20"}
+        with patch.dict(os.environ, env_vars, clear=True):
+            result = running.reload_from_environment()
+
+        assert result["result"] == "success"
+        assert result["changed"] == ["rate_limit"]
+        assert running.config.pipeline_batch == 128
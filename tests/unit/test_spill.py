@@ -0,0 +1,242 @@
+"""Unit tests for spill module."""
+
+import asyncio
+import os
+import time
+from unittest.mock import Mock
+
+import pytest
+
+from plc_sniffer.packet import PacketMeta
+from plc_sniffer.spill import (
+    RECORD_HEADER_SIZE,
+    SEGMENT_HEADER_SIZE,
+    SpillQueue,
+    SpillReplayer,
+    SpillSegment,
+    spill_directory,
+)
+
+SEGMENT_SIZE = 4096
+
+
+def forwarder(send_result=True):
+    """Forwarder double that is ready to replay to."""
+    mock = Mock(pending=0)
+    mock.breaker.available = True
+    mock.send.return_value = send_result
+    return mock
+
+
+def meta(timestamp=1700000000.0):
+    return PacketMeta("10.0.0.1", "10.0.0.2", 1000, 502, timestamp)
+
+
+@pytest.fixture
+def spill(tmp_path):
+    queue = SpillQueue(
+        str(tmp_path / "dest"),
+        forwarder(),
+        SEGMENT_SIZE,
+        4 * SEGMENT_SIZE,
+        replay_rate=100,
+    )
+    yield queue
+    queue.close()
+
+
+def sent(spill):
+    return [bytes(c.args[0]) for c in spill.forwarder.send.call_args_list]
+
+
+def recovered(spill):
+    """Let the quiet period after the last spill pass."""
+    spill.last_spilled -= 60
+
+
+class TestSpillQueue:
+    """Test SpillQueue functionality."""
+
+    def test_append_and_replay_in_order(self, spill):
+        for i in range(3):
+            assert spill.append(bytes([i]) * 10, meta())
+        assert (spill.pending, spill.segments, spill.disk_bytes) == (3, 1, SEGMENT_SIZE)
+        recovered(spill)
+
+        spill.replay(now=100.0)
+        assert spill.replay(now=101.0) == 3
+
+        assert sent(spill) == [b"\x00" * 10, b"\x01" * 10, b"\x02" * 10]
+        assert spill.replayed == 3
+        # Caught up: the segment is deleted and the next spill starts a new one
+        assert (spill.pending, spill.segments) == (0, 0)
+        assert os.listdir(spill.directory) == []
+        assert spill.append(b"later")
+        assert spill.segments == 1
+
+    def test_replay_rate(self, spill):
+        for _ in range(20):
+            spill.append(b"x" * 10, meta())
+        recovered(spill)
+
+        spill.replay(now=0.0)
+        assert spill.replay(now=0.0625) == 6  # 100 pps for 62.5ms
+        assert spill.replay(now=0.078125) == 1  # the remaining fraction carries over
+        assert spill.pending == 13
+
+    def test_waits_for_recovery(self, spill):
+        spill.append(b"x", meta())
+        spill.replay(now=100.0)
+
+        # Spilled just now: the destination is still failing
+        assert spill.replay(now=101.0) == 0
+        recovered(spill)
+        spill.forwarder.breaker.available = False
+        assert spill.replay(now=102.0) == 0
+        spill.forwarder.breaker.available = True
+        spill.forwarder.pending = 3
+        assert spill.replay(now=103.0) == 0
+
+        spill.forwarder.pending = 0
+        assert spill.replay(now=104.0) == 1
+
+    def test_failed_send_keeps_payload(self, spill):
+        spill.forwarder.send.return_value = False
+        spill.append(b"x", meta())
+        recovered(spill)
+
+        spill.replay(now=100.0)
+        assert spill.replay(now=101.0) == 0
+        assert spill.pending == 1
+
+    def test_segments_roll_over_and_oldest_is_evicted(self, spill):
+        payload = b"x" * 1000
+        per_segment = (SEGMENT_SIZE - SEGMENT_HEADER_SIZE) // (
+            RECORD_HEADER_SIZE + len(payload)
+        )
+
+        for _ in range(per_segment * 5):
+            assert spill.append(payload, meta())
+
+        assert spill.segments == 4
+        assert spill.evicted == per_segment
+        assert spill.pending == per_segment * 4
+        assert len(os.listdir(spill.directory)) == 4
+
+    def test_oversized_payload(self, spill):
+        assert not spill.append(b"x" * SEGMENT_SIZE, meta())
+        assert spill.errors == 1
+
+    def test_replay_lag(self, spill):
+        assert spill.replay_lag(now=1700000010.0) == 0.0
+        spill.append(b"x", meta(1700000000.0))
+        spill.append(b"y", meta(1700000005.0))
+        assert spill.replay_lag(now=1700000010.0) == pytest.approx(10.0)
+
+    def test_recovers_after_restart(self, tmp_path):
+        directory = str(tmp_path / "dest")
+        spill = SpillQueue(
+            directory, forwarder(), SEGMENT_SIZE, 4 * SEGMENT_SIZE, replay_rate=128
+        )
+        for i in range(4):
+            spill.append(bytes([i]), meta())
+        recovered(spill)
+        spill.replay(now=100.0)
+        assert spill.replay(now=100.015625) == 2
+        spill.close()
+
+        spill = SpillQueue(
+            directory, forwarder(), SEGMENT_SIZE, 4 * SEGMENT_SIZE, replay_rate=100
+        )
+        assert spill.pending == 2
+        spill.append(b"new", meta())
+        assert spill.segments == 2
+        recovered(spill)
+
+        spill.replay(now=100.0)
+        assert spill.replay(now=101.0) == 3
+        assert sent(spill) == [b"\x02", b"\x03", b"new"]
+        spill.close()
+
+    def test_ignores_foreign_files(self, tmp_path):
+        directory = tmp_path / "dest"
+        directory.mkdir()
+        (directory / "000000000001.seg").write_bytes(b"not a segment")
+        (directory / "notes.txt").write_text("keep")
+
+        spill = SpillQueue(str(directory), forwarder(), SEGMENT_SIZE, 4 * SEGMENT_SIZE)
+        spill.append(b"x")
+
+        assert spill.pending == 1
+        assert sorted(os.listdir(directory)) == [
+            "000000000001.seg",
+            "000000000002.seg",
+            "notes.txt",
+        ]
+        spill.close()
+
+    def test_spill_directory(self):
+        assert (
+            spill_directory("/var/spool", "[fe80::1]:514") == "/var/spool/_fe80__1__514"
+        )
+        assert (
+            spill_directory("/var/spool", "10.0.0.1:514") == "/var/spool/10.0.0.1_514"
+        )
+
+
+class TestSpillSegment:
+    """Test SpillSegment functionality."""
+
+    def test_torn_record_ends_segment(self, tmp_path):
+        path = str(tmp_path / "000000000000.seg")
+        segment = SpillSegment(path, SEGMENT_SIZE, create=True)
+        segment.append(b"complete", meta())
+        end = segment.write_offset
+        segment.append(b"torn", meta())
+        # Crash after the body was written but before the length
+        segment._mmap[end : end + 4] = bytes(4)
+        segment.close()
+
+        segment = SpillSegment(path, SEGMENT_SIZE)
+        assert segment.records == 1
+        assert segment.peek()[0] == b"complete"
+        segment.close()
+
+
+class TestSpillReplayer:
+    """Test SpillReplayer functionality."""
+
+    def test_replays_on_thread(self, spill):
+        spill.append(b"x", meta())
+        recovered(spill)
+        replayer = SpillReplayer({"dest": spill}, interval=0.005)
+
+        replayer.start()
+        deadline = time.monotonic() + 2
+        while spill.pending and time.monotonic() < deadline:
+            time.sleep(0.01)
+        replayer.stop()
+
+        assert spill.replayed == 1
+        assert replayer._thread is None
+
+    def test_loop_timer(self, spill):
+        replayer = SpillReplayer({"dest": spill}, interval=0.005)
+        spill.replay = Mock(return_value=0)
+
+        async def run():
+            replayer.start(asyncio.get_running_loop())
+            await asyncio.sleep(0.05)
+            replayer.stop()
+
+        asyncio.run(run())
+
+        assert spill.replay.call_count >= 2
+        assert replayer._timer is None
+
+    def test_error_in_one_queue(self, spill):
+        broken = Mock(directory="broken")
+        broken.replay.side_effect = OSError("disk gone")
+        spill.replay = Mock(return_value=2)
+
+        assert SpillReplayer({"a": broken, "b": spill}).replay() == 2
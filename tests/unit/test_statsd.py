@@ -0,0 +1,202 @@
+"""Unit tests for the StatsD push exporter."""
+
+import asyncio
+import socket
+from unittest.mock import Mock
+
+import pytest
+
+from plc_sniffer.config import SnifferConfig
+from plc_sniffer.metrics import Histogram
+from plc_sniffer.sniffer import PlcSniffer
+from plc_sniffer.statsd import StatsdExporter
+
+
+@pytest.fixture
+def listener():
+    """Local UDP socket standing in for the StatsD agent."""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(("127.0.0.1", 0))
+    sock.settimeout(1.0)
+    yield sock
+    sock.close()
+
+
+def receive_lines(sock, datagrams):
+    """Receive ``datagrams`` datagrams and split them into lines."""
+    lines = []
+    for _ in range(datagrams):
+        lines.extend(sock.recv(65535).decode().split("\n"))
+    return lines
+
+
+def destination_worker(name):
+    """Router worker double with the attributes the exporter reads."""
+    worker = Mock(queue_depth=3, healthy=True)
+    worker.name = name
+    worker.stats.sent, worker.stats.bytes_sent = 10, 1000
+    worker.stats.queue_full, worker.stats.send_failed = 2, 0
+    worker.stats.latency = Histogram()
+    worker.stats.latency.observe(0.001)
+    worker.forwarder.pending = 0
+    worker.forwarder.breaker.is_open = False
+    return worker
+
+
+class TestStatsdExporter:
+    """Test StatsdExporter functionality."""
+
+    @pytest.fixture
+    def sniffer(self, valid_config):
+        return PlcSniffer(valid_config)
+
+    @pytest.fixture
+    def exporter(self, listener, sniffer):
+        exporter = StatsdExporter(*listener.getsockname())
+        exporter.sniffer = sniffer
+        yield exporter
+        exporter.socket.close()
+
+    def test_dogstatsd_lines(self, exporter, listener, sniffer):
+        sniffer.stats.record_packet(forwarded=True, size=100)
+        sniffer.stats.record_packet(forwarded=False, reason="rate_limited")
+
+        assert exporter.flush() == 1
+        lines = receive_lines(listener, 1)
+
+        assert "plc_sniffer.packets_processed:2|c|#interface:eth0" in lines
+        assert "plc_sniffer.packets_rate_limited:1|c|#interface:eth0" in lines
+        assert "plc_sniffer.bytes_forwarded:100|c|#interface:eth0" in lines
+        assert any(
+            line.startswith("plc_sniffer.current_packet_rate:") for line in lines
+        )
+        assert not any("packets_oversized" in line for line in lines)
+
+    def test_counters_are_deltas(self, exporter, listener, sniffer):
+        sniffer.stats.record_packet(forwarded=True, size=10)
+        exporter.flush()
+        receive_lines(listener, 1)
+
+        for _ in range(3):
+            sniffer.stats.record_packet(forwarded=True, size=10)
+        exporter.flush()
+        lines = receive_lines(listener, 1)
+
+        assert "plc_sniffer.packets_forwarded:3|c|#interface:eth0" in lines
+        assert "plc_sniffer.bytes_forwarded:30|c|#interface:eth0" in lines
+
+    def test_counter_reset_after_reload(self, exporter):
+        assert exporter._delta("sent", 10, ()) == 10
+        assert exporter._delta("sent", 15, ()) == 5
+        # Reload recreated the counter
+        assert exporter._delta("sent", 4, ()) == 4
+
+    def test_large_counter_delta(self, exporter):
+        lines = []
+        tags = (("interface", "eth0"),)
+        exporter._counter(lines, "bytes", 12345678901, tags)
+        exporter._counter(lines, "bytes", 12345678901 + 9876543, tags)
+
+        assert lines == [
+            "plc_sniffer.bytes:12345678901|c|#interface:eth0",
+            "plc_sniffer.bytes:9876543|c|#interface:eth0",
+        ]
+
+    def test_destination_tags_and_histograms(self, exporter, listener, sniffer):
+        sniffer.router = Mock(workers=[destination_worker("10.0.0.1:514")])
+
+        exporter.flush()
+        lines = receive_lines(listener, 1)
+
+        tags = "#interface:eth0,destination:10.0.0.1:514"
+        assert f"plc_sniffer.destination_sent:10|c|{tags}" in lines
+        assert f"plc_sniffer.destination_dropped:2|c|{tags},reason:queue_full" in lines
+        assert f"plc_sniffer.destination_queue_depth:3|g|{tags}" in lines
+        assert f"plc_sniffer.destination_latency_seconds.count:1|c|{tags}" in lines
+        assert f"plc_sniffer.destination_latency_seconds.sum:0.001|c|{tags}" in lines
+
+        exporter.flush()
+        lines = receive_lines(listener, 1)
+        assert not any("destination_latency_seconds" in line for line in lines)
+        assert f"plc_sniffer.destination_queue_depth:3|g|{tags}" in lines
+
+    def test_plain_statsd_names(self, listener, sniffer):
+        exporter = StatsdExporter(
+            *listener.getsockname(), prefix="site1", statsd_format="statsd"
+        )
+        exporter.sniffer = sniffer
+        sniffer.router = Mock(workers=[destination_worker("10.0.0.1:514")])
+
+        exporter.flush()
+        lines = receive_lines(listener, 1)
+        exporter.socket.close()
+
+        assert "site1.eth0.10_0_0_1_514.destination_sent:10|c" in lines
+        assert all("|#" not in line for line in lines)
+
+    def test_packs_datagrams_to_size(self, listener, sniffer):
+        exporter = StatsdExporter(*listener.getsockname(), max_datagram=200)
+        exporter.sniffer = sniffer
+        sniffer.router = Mock(
+            workers=[destination_worker(f"10.0.0.{i}:514") for i in range(5)]
+        )
+
+        lines = exporter.collect()
+        datagrams = exporter.pack(lines)
+        exporter.socket.close()
+
+        assert len(datagrams) > 1
+        assert all(len(datagram) <= 200 for datagram in datagrams)
+        assert b"\n".join(datagrams).decode().split("\n") == lines
+        assert exporter.pack(["x" * 300, "y"]) == [b"x" * 300, b"y"]
+
+    def test_send_failure_counted(self, exporter, sniffer):
+        sniffer.stats.record_packet(forwarded=True)
+        exporter.socket = Mock()
+        exporter.socket.sendto.side_effect = OSError("unreachable")
+
+        assert exporter.flush() == 0
+        assert exporter.send_failed == 1
+
+    def test_thread_flushes_on_stop(self, listener, sniffer):
+        exporter = StatsdExporter(*listener.getsockname(), interval=60)
+        sniffer.stats.record_packet(forwarded=True)
+
+        exporter.start(sniffer)
+        exporter.stop()
+
+        assert "plc_sniffer.packets_forwarded:1|c|#interface:eth0" in receive_lines(
+            listener, 1
+        )
+        assert exporter.datagrams_sent == 1
+        assert exporter.socket.fileno() == -1
+
+    def test_loop_timer(self, listener, sniffer):
+        exporter = StatsdExporter(*listener.getsockname(), interval=0.01)
+
+        async def run():
+            exporter.start(sniffer, asyncio.get_running_loop())
+            await asyncio.sleep(0.05)
+            exporter.stop()
+
+        asyncio.run(run())
+
+        assert exporter.datagrams_sent >= 2
+        assert exporter._timer is None
+
+    def test_from_config(self, valid_config):
+        config = SnifferConfig(
+            **{
+                **vars(valid_config),
+                "statsd_host": "127.0.0.1",
+                "statsd_prefix": "",
+                "statsd_format": "StatsD",
+            }
+        )
+
+        exporter = StatsdExporter.from_config(config)
+        exporter.socket.close()
+
+        assert exporter.address == ("127.0.0.1", 8125)
+        assert exporter.prefix == ""
+        assert exporter.statsd_format == "statsd"
@@ -0,0 +1,45 @@
+"""Unit tests for timing module."""
+
+import threading
+
+from plc_sniffer.timing import StageTimer
+
+STAGES = ("parse", "rate_limit", "forward")
+
+
+class TestStageTimer:
+    """Test StageTimer functionality."""
+
+    def test_samples_one_in_n(self):
+        timer = StageTimer(every=3, stages=STAGES)
+
+        sampled = [timer.sample() is not None for _ in range(7)]
+
+        assert sampled == [True, False, False, True, False, False, True]
+
+    def test_every_batch(self):
+        timer = StageTimer(every=1, stages=STAGES)
+        assert all(timer.sample() is not None for _ in range(3))
+
+    def test_histograms_merged_over_threads(self):
+        timer = StageTimer(every=1, stages=STAGES)
+
+        def record():
+            timer.sample()[STAGES.index("forward")].observe(0.000002)
+
+        threads = [threading.Thread(target=record) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        histograms = timer.histograms()
+        assert list(histograms) == list(STAGES)
+        assert histograms["forward"].count == 2
+        assert histograms["parse"].count == 0
+
+    def test_histograms_before_first_batch(self):
+        histograms = StageTimer(every=10, stages=STAGES).histograms()
+        assert all(
+            h.count == 0 and h.buckets[0] == 0.00000025 for h in histograms.values()
+        )
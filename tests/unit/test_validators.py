@@ -4,28 +4,45 @@ import pytest
 
 from plc_sniffer.validators import (
     ValidationError,
-    validate_ip_address,
-    validate_port,
-    validate_interface,
     validate_bpf_filter,
+    validate_calibration_mode,
+    validate_capture_engine,
+    validate_class_scheduling,
+    validate_cpu_list,
+    validate_destination,
+    validate_gc_mode,
+    validate_interface,
+    validate_ip_address,
     validate_log_level,
+    validate_mac_address,
+    validate_mirror_encap,
+    validate_output_mode,
     validate_packet_size,
-    validate_rate_limit
+    validate_port,
+    validate_port_range,
+    validate_rate_control,
+    validate_rate_limit,
+    validate_realtime_priority,
+    validate_ring_slot_size,
+    validate_ring_slots,
+    validate_runtime,
+    validate_statsd_format,
+    validate_subnet,
 )
 
 
 class TestIPAddressValidation:
     """Test IP address validation."""
-    
+
     def test_valid_ipv4(self):
         assert validate_ip_address("192.168.1.1") == "192.168.1.1"
         assert validate_ip_address("10.0.0.0") == "10.0.0.0"
         assert validate_ip_address("255.255.255.255") == "255.255.255.255"
-    
+
     def test_valid_ipv6(self):
         assert validate_ip_address("::1") == "::1"
         assert validate_ip_address("2001:db8::1") == "2001:db8::1"
-    
+
     def test_invalid_ip(self):
         with pytest.raises(ValidationError):
             validate_ip_address("256.256.256.256")
@@ -37,13 +54,13 @@ class TestIPAddressValidation:
 
 class TestPortValidation:
     """Test port number validation."""
-    
+
     def test_valid_ports(self):
         assert validate_port(1) == 1
         assert validate_port(80) == 80
         assert validate_port(65535) == 65535
         assert validate_port("8080") == 8080
-    
+
     def test_invalid_ports(self):
         with pytest.raises(ValidationError):
             validate_port(0)
@@ -57,14 +74,14 @@ class TestPortValidation:
 
 class TestInterfaceValidation:
     """Test network interface validation."""
-    
+
     def test_valid_interfaces(self):
         assert validate_interface("eth0") == "eth0"
         assert validate_interface("wlan0") == "wlan0"
         assert validate_interface("en0") == "en0"
         assert validate_interface("docker0") == "docker0"
         assert validate_interface("veth.100") == "veth.100"
-    
+
     def test_invalid_interfaces(self):
         with pytest.raises(ValidationError):
             validate_interface("eth0$")  # Invalid character
@@ -78,13 +95,16 @@ class TestInterfaceValidation:
 
 class TestBPFFilterValidation:
     """Test BPF filter validation."""
-    
+
     def test_valid_filters(self):
         assert validate_bpf_filter("udp") == "udp"
         assert validate_bpf_filter("tcp port 80") == "tcp port 80"
         assert validate_bpf_filter("host 192.168.1.1") == "host 192.168.1.1"
-        assert validate_bpf_filter("(udp or tcp) and port 443") == "(udp or tcp) and port 443"
-    
+        assert (
+            validate_bpf_filter("(udp or tcp) and port 443")
+            == "(udp or tcp) and port 443"
+        )
+
     def test_invalid_filters(self):
         with pytest.raises(ValidationError):
             validate_bpf_filter("")  # Empty
@@ -96,14 +116,14 @@ class TestBPFFilterValidation:
 
 class TestLogLevelValidation:
     """Test log level validation."""
-    
+
     def test_valid_levels(self):
         assert validate_log_level("DEBUG") == "DEBUG"
         assert validate_log_level("info") == "INFO"
         assert validate_log_level("Warning") == "WARNING"
         assert validate_log_level("ERROR") == "ERROR"
         assert validate_log_level("critical") == "CRITICAL"
-    
+
     def test_invalid_levels(self):
         with pytest.raises(ValidationError):
             validate_log_level("TRACE")
@@ -115,12 +135,12 @@ class TestLogLevelValidation:
 
 class TestPacketSizeValidation:
     """Test packet size validation."""
-    
+
     def test_valid_sizes(self):
         assert validate_packet_size(64) == 64
         assert validate_packet_size(1500) == 1500
         assert validate_packet_size(65535) == 65535
-    
+
     def test_invalid_sizes(self):
         with pytest.raises(ValidationError):
             validate_packet_size(63)  # Too small
@@ -132,17 +152,217 @@ class TestPacketSizeValidation:
 
 class TestRateLimitValidation:
     """Test rate limit validation."""
-    
+
     def test_valid_rates(self):
         assert validate_rate_limit(0) == 0  # No limit
         assert validate_rate_limit(1000) == 1000
         assert validate_rate_limit("5000") == 5000
         assert validate_rate_limit(1000000) == 1000000  # Max
-    
+
     def test_invalid_rates(self):
         with pytest.raises(ValidationError):
             validate_rate_limit(-1)  # Negative
         with pytest.raises(ValidationError):
             validate_rate_limit(1000001)  # Too high
         with pytest.raises(ValidationError):
-            validate_rate_limit("invalid")
\ No newline at end of file
+            validate_rate_limit("invalid")
+
+
+class TestOutputModeValidation:
+    """Test output mode validation."""
+
+    def test_valid_modes(self):
+        assert validate_output_mode("udp") == "udp"
+        assert validate_output_mode("SHM") == "shm"
+        assert validate_output_mode("inject") == "inject"
+
+    def test_invalid_mode(self):
+        with pytest.raises(ValidationError):
+            validate_output_mode("tcp")
+
+
+class TestRingGeometryValidation:
+    """Test shared-memory ring geometry validation."""
+
+    def test_valid_geometry(self):
+        assert validate_ring_slots(16) == 16
+        assert validate_ring_slots("65536") == 65536
+        assert validate_ring_slot_size(2048) == 2048
+
+    def test_invalid_slots(self):
+        with pytest.raises(ValidationError):
+            validate_ring_slots(1000)  # Not a power of two
+        with pytest.raises(ValidationError):
+            validate_ring_slots(8)  # Too small
+        with pytest.raises(ValidationError):
+            validate_ring_slots("many")
+
+    def test_invalid_slot_size(self):
+        with pytest.raises(ValidationError):
+            validate_ring_slot_size(100)  # Not 8-byte aligned
+        with pytest.raises(ValidationError):
+            validate_ring_slot_size(32)  # Too small
+
+
+class TestDestinationValidation:
+    """Test destination validation."""
+
+    def test_valid_destinations(self):
+        assert validate_destination("10.0.0.1:514") == ("10.0.0.1", 514)
+        assert validate_destination(" [::1]:8514 ") == ("::1", 8514)
+
+    def test_invalid_destinations(self):
+        with pytest.raises(ValidationError):
+            validate_destination("10.0.0.1")  # Missing port
+        with pytest.raises(ValidationError):
+            validate_destination("::1:8514")  # Unbracketed IPv6
+        with pytest.raises(ValidationError):
+            validate_destination("10.0.0.1:70000")
+        with pytest.raises(ValidationError):
+            validate_destination("host:514")
+
+
+class TestRouteMatchValidation:
+    """Test port range and subnet validation."""
+
+    def test_port_range(self):
+        assert validate_port_range("2222-2230") == (2222, 2230)
+        assert validate_port_range("502 - 502") == (502, 502)
+        with pytest.raises(ValidationError):
+            validate_port_range("502")
+        with pytest.raises(ValidationError):
+            validate_port_range("600-500")
+
+    def test_subnet(self):
+        assert validate_subnet("192.168.1.0/24") == "192.168.1.0/24"
+        assert validate_subnet("192.168.1.77/24") == "192.168.1.0/24"
+        with pytest.raises(ValidationError):
+            validate_subnet("192.168.1.0/33")
+        with pytest.raises(ValidationError):
+            validate_subnet("2001:db8::/32")
+
+
+class TestRuntimeValidation:
+    """Test CPU list, realtime priority and GC mode validation."""
+
+    def test_cpu_list(self):
+        assert validate_cpu_list("") == []
+        assert validate_cpu_list("3") == [3]
+        assert validate_cpu_list("2-4, 7,3") == [2, 3, 4, 7]
+        assert validate_cpu_list([5, 1]) == [1, 5]
+        with pytest.raises(ValidationError):
+            validate_cpu_list("a")
+        with pytest.raises(ValidationError):
+            validate_cpu_list("4-2")
+        with pytest.raises(ValidationError):
+            validate_cpu_list("-1")
+
+    def test_realtime_priority(self):
+        assert validate_realtime_priority("50") == 50
+        with pytest.raises(ValidationError):
+            validate_realtime_priority(100)
+        with pytest.raises(ValidationError):
+            validate_realtime_priority("high")
+
+    def test_gc_mode(self):
+        assert validate_gc_mode("IDLE") == "idle"
+        with pytest.raises(ValidationError):
+            validate_gc_mode("off")
+
+
+class TestCaptureEngineValidation:
+    """Test capture engine validation."""
+
+    def test_valid_engines(self):
+        assert validate_capture_engine("scapy") == "scapy"
+        assert validate_capture_engine("RAW") == "raw"
+        assert validate_capture_engine("mirror") == "mirror"
+
+    def test_invalid_engine(self):
+        with pytest.raises(ValidationError):
+            validate_capture_engine("pcap")
+
+
+class TestRuntimeModeValidation:
+    """Test runtime mode validation."""
+
+    def test_valid_runtimes(self):
+        assert validate_runtime("threads") == "threads"
+        assert validate_runtime("AsyncIO") == "asyncio"
+
+    def test_invalid_runtime(self):
+        with pytest.raises(ValidationError):
+            validate_runtime("trio")
+
+
+class TestStatsdFormatValidation:
+    """Test StatsD format validation."""
+
+    def test_valid_formats(self):
+        assert validate_statsd_format("statsd") == "statsd"
+        assert validate_statsd_format("DogStatsD") == "dogstatsd"
+
+    def test_invalid_format(self):
+        with pytest.raises(ValidationError):
+            validate_statsd_format("graphite")
+
+
+class TestClassSchedulingValidation:
+    """Test traffic class scheduling validation."""
+
+    def test_valid_modes(self):
+        assert validate_class_scheduling("strict") == "strict"
+        assert validate_class_scheduling("Weighted") == "weighted"
+
+    def test_invalid_mode(self):
+        with pytest.raises(ValidationError):
+            validate_class_scheduling("fifo")
+
+
+class TestRateControlValidation:
+    """Test rate control mode validation."""
+
+    def test_valid_modes(self):
+        assert validate_rate_control("static") == "static"
+        assert validate_rate_control("AIMD") == "aimd"
+
+    def test_invalid_mode(self):
+        with pytest.raises(ValidationError):
+            validate_rate_control("pid")
+
+
+class TestMacAddressValidation:
+    """Test MAC address validation."""
+
+    def test_valid_address(self):
+        assert validate_mac_address("02:00:5E:10:00:01") == "02:00:5e:10:00:01"
+
+    def test_invalid_address(self):
+        with pytest.raises(ValidationError):
+            validate_mac_address("02-00-5e-10-00-01")
+        with pytest.raises(ValidationError):
+            validate_mac_address("02:00:5e:10:00")
+
+
+class TestMirrorEncapValidation:
+    """Test mirror encapsulation validation."""
+
+    def test_valid_encaps(self):
+        assert validate_mirror_encap("vxlan") == "vxlan"
+        assert validate_mirror_encap("GRE") == "gre"
+
+    def test_invalid_encap(self):
+        with pytest.raises(ValidationError):
+            validate_mirror_encap("geneve")
+
+
+class TestCalibrationModeValidation:
+    """Test calibration mode validation."""
+
+    def test_valid_modes(self):
+        assert validate_calibration_mode("off") == "off"
+        assert validate_calibration_mode("AUTO") == "auto"
+
+    def test_invalid_mode(self):
+        with pytest.raises(ValidationError):
+            validate_calibration_mode("always")